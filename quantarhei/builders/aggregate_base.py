@@ -803,19 +803,52 @@ class AggregateBase(UnitsManaged, Saveable):
             #Best implementation would be a table look-up. First we calculate
             #a table of FC factors from known omegas and shifts and here we
             #just consult the table.
-
-            if not self.FC.lookup(shft):
-                fc = self.ops.shift_operator(shft)[:20,:20]
-                self.FC.add(shft,fc)
-                
-            ii = self.FC.index(shft)
-            rs = self.FC.get(ii)[qn1,qn2]
+            rs = self._get_fc_table(shft)[qn1,qn2]
             
             res = res*rs
             
         return numpy.real(res)
 
 
+    def _get_fc_table(self, shft):
+        """Returns the table of Franck-Condon factors for a given shift
+        
+        The table is calculated only once for each value of the shift
+        
+        """
+        if not self.FC.lookup(shft):
+            fc = self.ops.shift_operator(shft)[:20,:20]
+            self.FC.add(shft,fc)
+            
+        ii = self.FC.index(shft)
+        return self.FC.get(ii)
+    
+    
+    def _fc_block(self, state1, state2, vsigs1, vsigs2):
+        """Franck-Condon factors between two sets of vibrational states
+        
+        Returns the matrix of Franck-Condon factors between all vibrational
+        states of the electronic state of `state1` (with vibrational 
+        signatures `vsigs1`) and those of the electronic state of `state2`
+        (signatures `vsigs2`)
+        
+        """
+        sta1 = state1.elstate.vibmodes
+        sta2 = state2.elstate.vibmodes
+
+        if not (len(sta1)==len(sta2)):
+            raise Exception("Incompatible states")
+            
+        res = numpy.ones((vsigs1.shape[0], vsigs2.shape[0]),
+                         dtype=numpy.float64)
+        for kk in range(len(sta1)):
+            shft = sta1[kk].shift - sta2[kk].shift
+            table = numpy.real(self._get_fc_table(shft))
+            res *= table[numpy.ix_(vsigs1[:,kk], vsigs2[:,kk])]
+            
+        return res
+
+
     def get_transition_width(self, state1, state2=None):
         """Returns phenomenological width of a given transition
 
@@ -973,25 +1006,38 @@ class AggregateBase(UnitsManaged, Saveable):
         state2 : class VibronicState
             state 2 
         
+        """
+        eldip = self._electronic_transition_dipole(state1, state2)
+        
+        if eldip is None:
+            return 0.0
+           
+        # Franck-Condon factor between the two states
+        fcfac = self.fc_factor(state1,state2)
+
+        return eldip*fcfac
+    
+    
+    def _electronic_transition_dipole(self, state1, state2):
+        """Electronic part of the transition dipole moment between two states
+        
+        Returns None if the states are not connected by a transition
+        
         """
         exindx = self._get_exindx(state1, state2)
         
         if (exindx < 0):
-            return 0.0
+            return None
         
         # get excitation indexes
         st1 = state1.elstate.elsignature[exindx]
         st2 = state2.elstate.elsignature[exindx]
         
         if st1<st2:
-            eldip = self.get_dipole(exindx, st1, st2)
+            return self.get_dipole(exindx, st1, st2)
         else:
-            eldip = self.get_dipole(exindx, st2, st1)
-           
-        # Franck-Condon factor between the two states
-        fcfac = self.fc_factor(state1,state2)
-
-        return eldip*fcfac
+            return self.get_dipole(exindx, st2, st1)
+    
     
     def transition_velocity_dipole(self, state1, state2):
         """ Transition dipole moment between two states 
@@ -1035,26 +1081,38 @@ class AggregateBase(UnitsManaged, Saveable):
         state2 : class VibronicState
             state 2 
         
+        """
+        magdip = self._electronic_transition_magnetic(state1, state2)
+        
+        if magdip is None:
+            return 0.0
+           
+        # Franck-Condon factor between the two states
+        fcfac = self.fc_factor(state1,state2)
+
+        return magdip*fcfac
+
+
+    def _electronic_transition_magnetic(self, state1, state2):
+        """Electronic part of the magnetic transition dipole moment
+        
+        Returns None if the states are not connected by a transition
+        
         """
         exindx = self._get_exindx(state1, state2)
         
         if (exindx < 0):
-            return 0.0
+            return None
         
         # get excitation indexes
         st1 = state1.elstate.elsignature[exindx]
         st2 = state2.elstate.elsignature[exindx]
         
-        magdip = self.get_magnetic_dipole(exindx, st1, st2)
+        return self.get_magnetic_dipole(exindx, st1, st2)
 #        if st1<st2:
 #            magdip = self.get_magnetic_dipole(exindx, st1, st2)
 #        else:
 #            magdip = self.get_magnetic_dipole(exindx, st2, st1)
-           
-        # Franck-Condon factor between the two states
-        fcfac = self.fc_factor(state1,state2)
-
-        return magdip*fcfac
 
     def _get_twoexindx(self, state1, state2):
         """ Indices of two molecule with transitions or negative number
@@ -1358,67 +1416,76 @@ class AggregateBase(UnitsManaged, Saveable):
         elif (isinstance(state1, VibronicState) 
           and isinstance(state2, VibronicState)):
               
-            es1 = state1.elstate
-            es2 = state2.elstate
-            
             fc = self.fc_factor(state1, state2)
             
-            # it make sense to calculate coupling only when the number
-            # of molecules is larger than 1
-            if self.nmono > 1:
+            coup = self._electronic_coupling_vec(state1.elstate,
+                                                 state2.elstate)*fc
+            
+        return self.convert_energy_2_current_u(coup)
+    
+    
+    def _electronic_coupling_vec(self, es1, es2):
+        """Resonance coupling between two electronic states
+        
+        Coupling between two vibronic states is this electronic coupling
+        multiplied by their Franck-Condon factor. The coupling is returned
+        in internal units.
+        
+        """
+        # it make sense to calculate coupling only when the number
+        # of molecules is larger than 1
+        if self.nmono > 1:
 
-                # coupling within the bands
-                if es1.band == es2.band:
-                    els1 = es1.elsignature
-                    els2 = es2.elsignature
-                    
-                    # single exciton band
-                    if es1.band == 1:
-                        mon1 = numpy.nonzero(els1)[0][0]
-                        mon2 = numpy.nonzero(els2)[0][0]
-                        if mon1 == mon2:
-                            coup = 0.0
-                        else:
-                            fin1 = els1[mon1]
-                            fin2 = els2[mon2]
-                            coup = self.get_resonance_coupling_vec(
-                                                            mon1,0,fin1,mon2,0,fin2)
-                            coup *= fc
+            # coupling within the bands
+            if es1.band == es2.band:
+                els1 = es1.elsignature
+                els2 = es2.elsignature
+                
+                # single exciton band
+                if es1.band == 1:
+                    mon1 = numpy.nonzero(els1)[0][0]
+                    mon2 = numpy.nonzero(els2)[0][0]
+                    if mon1 == mon2:
+                        coup = 0.0
                     else:
+                        fin1 = els1[mon1]
+                        fin2 = els2[mon2]
+                        coup = self.get_resonance_coupling_vec(
+                                                        mon1,0,fin1,mon2,0,fin2)
+                else:
 
-                        Ns = len(els1)
-                        sites = [0,0]
-                        k = 0
-                        # count differences
-                        for i in range(Ns):
-                            if els1[i] != els2[i]:
-                                if (k == 0) or (k == 1):
-                                    sites[k] = i
-                                k += 1
-                        # if there are exactly 2 differences, the differing
-                        # two molecules are those coupled; sites[k] contains
-                        # indiced those coupled molecules
-                        if k == 2:
-                            mon1 = sites[0]
-                            mon2 = sites[1]
-                            
-                            init1 = els1[mon1]
-                            fin1 = els2[mon1]
-                            init2 = els1[mon2]
-                            fin2 = els2[mon2]
-                            
-                            coup = self.get_resonance_coupling_vec(
-                                               mon1,init1,fin1,mon2,init2,fin2)
-                            coup *= fc
-                        else:
-                            coup = 0.0
+                    Ns = len(els1)
+                    sites = [0,0]
+                    k = 0
+                    # count differences
+                    for i in range(Ns):
+                        if els1[i] != els2[i]:
+                            if (k == 0) or (k == 1):
+                                sites[k] = i
+                            k += 1
+                    # if there are exactly 2 differences, the differing
+                    # two molecules are those coupled; sites[k] contains
+                    # indiced those coupled molecules
+                    if k == 2:
+                        mon1 = sites[0]
+                        mon2 = sites[1]
                         
-                else:
-                    coup = 0.0
+                        init1 = els1[mon1]
+                        fin1 = els2[mon1]
+                        init2 = els1[mon2]
+                        fin2 = els2[mon2]
+                        
+                        coup = self.get_resonance_coupling_vec(
+                                           mon1,init1,fin1,mon2,init2,fin2)
+                    else:
+                        coup = 0.0
+                    
             else:
                 coup = 0.0
+        else:
+            coup = 0.0
             
-        return self.convert_energy_2_current_u(coup)
+        return coup
     
     
     def coupling(self, state1, state2, full=False):
@@ -2041,14 +2108,15 @@ class AggregateBase(UnitsManaged, Saveable):
         
         #print(self.which_band, self.Ntot, len(self.which_band))
             
-        # Set up Hamiltonian and Transition dipole moment matrices
-        for a, s1 in self.allstates(mult=self.mult, 
+        # all states are generated only once
+        states = [s1 for a, s1 in self.allstates(mult=self.mult, 
                                     vibgen_approx=vibgen_approx, Nvib=Nvib,
                                     vibenergy_cutoff=vibenergy_cutoff,
-                                           band_external=band_external):
+                                    band_external=band_external)]
+        s0 = states[0]
             
-            if a == 0:
-                s0 = s1
+        # Set up diagonal elements of the Hamiltonian and of the widths
+        for a, s1 in enumerate(states):
 
             # diagonal Hamiltonian elements
             HH[a,a] = s1._energy() # for energy in current units use s1.energy()
@@ -2075,62 +2143,12 @@ class AggregateBase(UnitsManaged, Saveable):
                         # 0 is taken by the ground state
                         twoex_indx[a, k_s] = sig_position + 1 
                         k_s += 1
-                    sig_position += 1    
+                    sig_position += 1
 
-                
-            for b, s2 in self.allstates(mult=self.mult, 
-                                    vibgen_approx=vibgen_approx, Nvib=Nvib,
-                                    vibenergy_cutoff=vibenergy_cutoff,
-                                    band_external=band_external): 
-            
-                DD[a,b,:] = numpy.real(self.transition_dipole(s1, s2))  
-                MM[a,b,:] = self.transition_magnetic(s1, s2)
-                FC[a,b] = numpy.real(self.fc_factor(s1, s2))
-                # FIXME: Here we assume only excitation from the lowest state (lowest vibrational state)
-                mon1=s1.get_monomer()
-                mon2=s2.get_monomer()
-                try:
-                    if mon1 != -1 and mon2 != -1:
-                        da = self.transition_dipole(s0, s1)
-                        db = self.transition_dipole(s0, s2)
-                        ma = self.transition_magnetic(s0, s1)
-                        Ra = numpy.array(self.monomers[mon1].position,"f8")
-                        # alternative definition of rotatory strength
-                        #Rb = numpy.array(self.monomers[mon2].position,"f8")
-                        #RR[a,b] = numpy.dot( (Ra - Rb), numpy.cross(da, db)) 
-                        
-                        Ea = s1._energy() - s0._energy()
-                        # for energy in current units use s1.energy()
-                        try:
-                            dav = self.transition_velocity_dipole(s0, s1)
-                        except:
-                            dav = -1j*Ea*da
-                        RRv[a,b] = numpy.real(1j*numpy.dot(Ra, numpy.cross(dav,db)))
-                        RRm[a,b] = numpy.real(1j*numpy.dot(db,ma))
-                except:
-                    pass
-                
-                if a != b:
-
-                    #HH[a,b] = numpy.real(self.coupling(s1, s2)) 
-                    #HH[a,b] = self.coupling(s1, s2) 
-                    HH[a,b] = self.coupling_vec(s1, s2)
-#TODO: ADD FULL Frenkel exciton model
-                    # HH[a,b] = numpy.real(self.coupling(s1, s2, full=fem_full))
-                
-                nz1 = numpy.nonzero(s1.elstate.elsignature)[0]
-                nz2 = numpy.nonzero(s2.elstate.elsignature)[0]
-                if (nz1.size == 1) and (nz2.size == 1) and (nz1 == nz2) and (a!=b):
-                    if s1.elstate.elsignature[nz1[0]] < s2.elstate.elsignature[nz2[0]]:
-                        trwidth = self.get_transition_width(s2, s1)
-                    else:
-                        trwidth = 0.0
-                        
-                    if trwidth >= 0:
-                        Wd[b,a] = numpy.sqrt(trwidth)
-                    else:
-                        Wd[b,a] = 0.0
 
+        # Set up couplings, transition dipole moment matrices 
+        # and Franck-Condon factors
+        self._set_state_pair_matrices(states, HH, DD, MM, FC, RRv, RRm, Wd)
 
         # Storing Hamiltonian and dipole moment matrices
         self.HH = HH
@@ -2158,10 +2176,7 @@ class AggregateBase(UnitsManaged, Saveable):
         self.twoex_indx = twoex_indx
         
         # squares of transition dipoles
-        dd2 = numpy.zeros((Ntot, Ntot),dtype=numpy.float64)
-        for a in range(Ntot):
-            for b in range(Ntot):
-                dd2[a,b] = numpy.dot(self.DD[a,b,:],self.DD[a,b,:])
+        dd2 = numpy.einsum("abi,abi->ab", self.DD, self.DD)
         self.D2 = dd2
         # FIXME: do I need this??? Is it even corrrect??? (maybe amax?)
         # maximum of transition dipole moment elements
@@ -2413,6 +2428,124 @@ class AggregateBase(UnitsManaged, Saveable):
         manager.unset_current_units("energy")
         
         
+    def _set_state_pair_matrices(self, states, HH, DD, MM, FC, RRv, RRm, Wd):
+        """Sets matrix elements between all pairs of aggregate states
+        
+        All quantities, except for Franck-Condon factors, depend only on the
+        electronic parts of the states. They are calculated once for every
+        pair of electronic states and multiplied by the block of 
+        Franck-Condon factors between their vibrational sublevels.
+        
+        
+        Parameters
+        ----------
+        
+        states : list
+            List of all states of the aggregate (VibronicState objects)
+            in the order of their indices
+            
+        HH, DD, MM, FC, RRv, RRm, Wd : numpy.ndarray
+            Matrices of the Hamiltonian, transition dipole moments, magnetic
+            transition dipole moments, Franck-Condon factors, rotatory 
+            strengths and transition widths to be filled
+            
+        """
+        Ntot = len(states)
+        elinds = numpy.array(self.elinds[:Ntot])
+
+        # states grouped by their electronic state
+        blocks = []
+        for iel in numpy.unique(elinds):
+            indx = numpy.nonzero(elinds == iel)[0]
+            st = states[indx[0]]
+            vsigs = numpy.array([states[a].vsig for a in indx],
+                                dtype=numpy.int)
+            vsigs = vsigs.reshape((len(indx), st.elstate.vsiglength))
+            nz = numpy.nonzero(st.elstate.elsignature)[0]
+            blocks.append((indx, st, vsigs, nz))
+            
+        for indx1, s1, vsigs1, nz1 in blocks:
+            for indx2, s2, vsigs2, nz2 in blocks:
+                
+                ix = numpy.ix_(indx1, indx2)
+                fc = self._fc_block(s1, s2, vsigs1, vsigs2)
+                FC[ix] = fc
+                
+                eldip = self._electronic_transition_dipole(s1, s2)
+                if eldip is not None:
+                    DD[ix] = numpy.real(fc[:,:,numpy.newaxis]
+                                        *numpy.asarray(eldip))
+                magdip = self._electronic_transition_magnetic(s1, s2)
+                if magdip is not None:
+                    MM[ix] = fc[:,:,numpy.newaxis]*numpy.asarray(magdip)
+                    
+                # couplings between different electronic states (couplings
+                # within an electronic state are zero)
+                if s1.elstate.index != s2.elstate.index:
+                    coup = self._electronic_coupling_vec(s1.elstate,
+                                                         s2.elstate)
+                    HH[ix] = self.convert_energy_2_current_u(coup)*fc
+                
+                # widths of transitions between states of one molecule
+                if ((nz1.size == 1) and (nz2.size == 1) and (nz1 == nz2) 
+                    and (s1.elstate.index != s2.elstate.index)):
+                    if (s1.elstate.elsignature[nz1[0]] 
+                        < s2.elstate.elsignature[nz2[0]]):
+                        trwidth = self.get_transition_width(s2, s1)
+                    else:
+                        trwidth = 0.0
+                        
+                    if trwidth >= 0:
+                        Wd[numpy.ix_(indx2, indx1)] = numpy.sqrt(trwidth)
+                    else:
+                        Wd[numpy.ix_(indx2, indx1)] = 0.0
+        
+        #
+        # Rotatory strengths
+        #
+        # FIXME: Here we assume only excitation from the lowest state 
+        # (lowest vibrational state)
+        s0 = states[0]
+        dbs = numpy.zeros((Ntot, 3), dtype=numpy.complex128)
+        mas = numpy.zeros((Ntot, 3), dtype=numpy.complex128)
+        Ws = numpy.zeros((Ntot, 3), dtype=numpy.complex128)
+        # states localized on a single molecule
+        hasmon = numpy.zeros(Ntot, dtype=bool)
+        # states for which rotatory strength can be calculated
+        valid = numpy.zeros(Ntot, dtype=bool)
+        for a, s1 in enumerate(states):
+            mon1 = s1.get_monomer()
+            if mon1 == -1:
+                continue
+            hasmon[a] = True
+            try:
+                da = self.transition_dipole(s0, s1)
+                if numpy.ndim(da) == 0:
+                    # no transition from the ground state
+                    continue
+                dbs[a,:] = da
+                ma = self.transition_magnetic(s0, s1)
+                Ra = numpy.array(self.monomers[mon1].position,"f8")
+                
+                Ea = s1._energy() - s0._energy()
+                # for energy in current units use s1.energy()
+                try:
+                    dav = self.transition_velocity_dipole(s0, s1)
+                except:
+                    dav = -1j*Ea*da
+                # Ra.(dav x db) = db.(Ra x dav)
+                Ws[a,:] = numpy.cross(Ra, dav)
+                mas[a,:] = ma
+                valid[a] = True
+            except:
+                pass
+        # alternative definition of rotatory strength
+        # RR[a,b] = numpy.dot( (Ra - Rb), numpy.cross(da, db)) 
+        mask = numpy.outer(valid, hasmon)
+        RRv[mask] = numpy.real(1j*numpy.dot(Ws, dbs.T))[mask]
+        RRm[mask] = numpy.real(1j*numpy.dot(mas, dbs.T))[mask]
+        
+        
     def rebuild(self, mult=1, sbi_for_higher_ex=False,
               vibgen_approx=None, Nvib=None, vibenergy_cutoff=None):
         """Cleans the object and rebuilds it
@@ -669,7 +669,7 @@ class AggregateSpectroscopy(AggregateBase):
     
     def liouville_pathways_3T(self, ptype="R3g", eUt=None, ham=None, t2=0.0,
                               dtol=0.001, ptol=1.0e-3, etol=1.0e-6,
-                              verbose=0, lab=None):
+                              verbose=0, lab=None, columnar=False):
         """ Generator of Liouville pathways with energy transfer
         
         
@@ -684,7 +684,10 @@ class AggregateSpectroscopy(AggregateBase):
             
         eUt : EvolutionSuperOperator
             Evolution superoperator representing the energy 
-            transfer in the system 
+            transfer in the system. If None, the pathways are generated
+            with unit evolution factors and without the `etol` selection;
+            the factors for any waiting time can then be obtained
+            by the `get_evolution_factors` method of the returned table
             
         t2 : float
             Waiting time at which the spectrum is calculated
@@ -701,12 +704,18 @@ class AggregateSpectroscopy(AggregateBase):
         lab : LaboratorySetup
             Object representing laboratory setup - number of pulses, 
             polarization etc.
+
+        columnar : bool
+            If True, the pathways are returned in a LiouvillePathwayTable
+            which stores them column-wise and creates the pathway objects
+            only on demand
             
         Returns
         -------
         
-        lst : list
-            List of LiouvillePathway objects
+        lst : list or LiouvillePathwayTable
+            List of LiouvillePathway objects (their table if `columnar`
+            is True)
             
             
         """
@@ -728,7 +737,6 @@ class AggregateSpectroscopy(AggregateBase):
             ptype_tuple = (ptype,)
         else:
             ptype_tuple = ptype
-        lst = []
         
         if verbose > 0:
             print("Pathways", ptype_tuple)
@@ -737,92 +745,49 @@ class AggregateSpectroscopy(AggregateBase):
         # data of the evolution superoperator in eigenstate basis
         #
         
-        try:
-            # either the eUt is a complete evolution superoperator
-            eUt2 = eUt.at(t2)
-            #eUt2_dat = numpy.zeros(eUt2.data.shape, dtype=eUt2.data.dtype)
-            #HH = eUt.get_Hamiltonian()
-            #with eigenbasis_of(HH):
-            #eUt2_dat[:,:,:,:] = eUt2.data
-        except:
-            # or it is only a super operator at a given time t2
-            # in this case 'ham' must be specified
-            eUt2 = eUt
+        if eUt is None:
+            # only the skeletons of the pathways are generated
+            eUt2 = None
+
+        else:
+            try:
+                # either the eUt is a complete evolution superoperator
+                eUt2 = eUt.at(t2)
+                #eUt2_dat = numpy.zeros(eUt2.data.shape, dtype=eUt2.data.dtype)
+                #HH = eUt.get_Hamiltonian()
+                #with eigenbasis_of(HH):
+                #eUt2_dat[:,:,:,:] = eUt2.data
+            except:
+                # or it is only a super operator at a given time t2
+                # in this case 'ham' must be specified
+                eUt2 = eUt
 #            print(eUt.data.shape)
 #            print(eUt2.data.shape)
-            eUt2_dat = numpy.zeros(eUt2.data.shape, dtype=eUt2.data.dtype)
-            with eigenbasis_of(ham):
-                eUt2_dat[:,:,:,:] = eUt2.data
+                eUt2_dat = numpy.zeros(eUt2.data.shape, dtype=eUt2.data.dtype)
+                with eigenbasis_of(ham):
+                    eUt2_dat[:,:,:,:] = eUt2.data
     
         
         
         
+        pws = diag.LiouvillePathwayTable(self, order=3)
         for ptp in ptype_tuple:
-        
-            if ptp == "R1g":
-                
-                generate_R1g(self, lst, eUt2,
-                             pop_tol, dip_tol, evf_tol, verbose)
 
-            elif ptp == "R2g":
-                
-                generate_R2g(self, lst, eUt2,
-                             pop_tol, dip_tol, evf_tol, verbose)
+            generate_pathways(self, pws, ptp, eUt2,
+                              pop_tol, dip_tol, evf_tol, verbose)
 
-            elif ptp == "R3g":
-            
-                generate_R3g(self, lst, eUt2, pop_tol, dip_tol, verbose)
-                
-            elif ptp == "R4g":
-                
-                generate_R4g(self, lst, eUt2, pop_tol, dip_tol, verbose)
-                
-            
-            elif ptp == "R1f*":
-                
-                generate_R1f(self, lst, eUt2, 
-                             pop_tol, dip_tol, evf_tol, verbose)
-                
-            
-            elif ptp == "R2f*":
-                
-                generate_R2f(self, lst, eUt2, 
-                             pop_tol, dip_tol, evf_tol, verbose)
-            
-            elif ptp == "R1gE": 
-                generate_R1gE(self, lst, eUt2,
-                             pop_tol, dip_tol, evf_tol, verbose)
-            
-            elif ptp == "R2gE": 
-                generate_R2gE(self, lst, eUt2,
-                             pop_tol, dip_tol, evf_tol, verbose)
-            
-            elif ptp == "R1f*E":
-                
-                generate_R1fE(self, lst, eUt2, 
-                             pop_tol, dip_tol, evf_tol, verbose)
-                
-            
-            elif ptp == "R2f*E":
-                
-                generate_R2fE(self, lst, eUt2, 
-                             pop_tol, dip_tol, evf_tol, verbose)
-            
-                                   
-            else:
-                
-                raise Exception("Unknown pythway type: "+str(ptp))
-                
-        
         if lab is not None:
-            for l in lst:
-                l.orientational_averaging(lab)
-         
-        return lst     
+            pws.orientational_averaging(lab)
+
+        if columnar:
+            return pws
+
+        return pws.get_pathways()
 
 
     def liouville_pathways_1(self, eUt=None, ham=None, dtol=0.01, ptol=1.0e-3,
-                             etol=1.0e-6, verbose=0, lab=None):
+                             etol=1.0e-6, verbose=0, lab=None,
+                             columnar=False):
         """ Generator of the first order Liouville pathways 
         
         
@@ -852,12 +817,16 @@ class AggregateSpectroscopy(AggregateBase):
         lab : LaboratorySetup
             Object representing laboratory setup - number of pulses, 
             polarization etc.
+
+        columnar : bool
+            If True, the pathways are returned in a LiouvillePathwayTable
             
         Returns
         -------
         
-        lst : list
-            List of LiouvillePathway objects
+        lst : list or LiouvillePathwayTable
+            List of LiouvillePathway objects (their table if `columnar`
+            is True)
             
             
         """
@@ -882,91 +851,51 @@ class AggregateSpectroscopy(AggregateBase):
             
             raise Exception("Not implemented yet")
 
-        lst = []        
+        pws = diag.LiouvillePathwayTable(self, order=1)
 
         if sec:
-            generate_1orderP_sec(self, lst,
-                                 pop_tol, dip_tol, verbose)
+            generate_pathways(self, pws, "P1", None,
+                              pop_tol, dip_tol, verbose=verbose)
         else:
             raise Exception("Not implemented yet")                                
         
         if lab is not None:
-            for l in lst:
-                l.orientational_averaging(lab)
-         
-        return lst   
+            pws.orientational_averaging(lab)
 
+        if columnar:
+            return pws
 
+        return pws.get_pathways()
 
 
 
-        
-def generate_R1g(self, lst, eUt2, pop_tol, dip_tol, evf_tol, verbose=0):        
-        
-    ngs = self.get_electronic_groundstate()
-    nes = self.get_excitonic_band(band=1)
-    
-    ver = verbose              
-    
-    if verbose > 0:
-        print("Liouville pathway R1g")
-        print("Population tolerance: ", pop_tol)
-        print("Dipole tolerance:     ", dip_tol)
-        print("Evolution amplitude:  ", evf_tol)
-    
-    k = 0
-    l = 0
-    for i1g in ngs:
 
-        if verbose > 0: 
-            print("Ground state: ", i1g, "of", len(ngs))
-        
-        # Only thermally allowed starting states are considered
-        if self.rho0[i1g,i1g] > pop_tol:
-    
-            for i2e in nes:
-
-                if verbose > 1: 
-                    print("Excited state: ", i2e, "of", len(nes))
-                
-                if self.D2[i2e, i1g] > dip_tol:
 
-                    for i3e in nes:
-                    
-                        if self.D2[i3e, i1g] > dip_tol:
-                                        
-                            for i2d in nes:
-                                for i3d in nes:
-                                    if isinstance(eUt2,SuperOperator):
-                                        evf = eUt2.data[i2d, i3d, i2e, i3e]
-                                    else:
-                                        evf = eUt2.data(i2d, i3d, i2e, i3e)
-                                    if abs(evf) > evf_tol:
-
-                                        for i4g in ngs:
-
-                                            if ((self.D2[i4g,i3d] > dip_tol)
-                                            and (self.D2[i4g,i2d] > dip_tol)):
-                                   
-
-                                                l += 1
-                                                
-                                                lp = _generate_R1g(self, i1g,
-                                                                   i2e, i3e,
-                                                                   i2d, i3d,
-                                                                   i4g, evf,
-                                                                   verbose=ver)
-                                                
-                                                lp.build()
-                                                lst.append(lp)
-                                                k += 1
-
-
-def _generate_R1g(self, i1g, i2e, i3e, i2d, i3d, i4g, evf, verbose=0):
+        
+#
+# Specifications of the Liouville pathways
+#
+# A pathway is enumerated by a tuple of state indices ("variables"). The
+# variables are listed in the order in which they were looped over by
+# the original nested loop generators, so that the pathways are generated
+# in the same order. For each pathway type we specify
+#
+#   ptype, popt_band, relax_order ... properties of the pathway
+#   bands   ... electronic band of each variable (0 = ground state,
+#               1 = single exciton band, 2 = two-exciton band)
+#   dipoles ... pairs of variables (final, initial) whose squared transition
+#               dipole has to be larger than the dipole tolerance
+#   evf     ... variables of the element of the evolution superoperator
+#               (None if there is no evolution factor)
+#   etol    ... True if the evolution factor is checked against tolerance
+#   events  ... interactions with light ("I", (final, initial), side,
+#               interval, width transition or None) and relaxations
+#               ("R", (final left, final right), (start left, start right))
+#
+_pathway_specs = {
 
     #      Diagram R1g
     #
-    #                                     
     #      |g_i4> <g_i4|
     # <----|-----------|
     #      |d_i2> <g_i4|
@@ -978,1184 +907,578 @@ def _generate_R1g(self, i1g, i2e, i3e, i2d, i3d, i4g, evf, verbose=0):
     #      |e_i2> <g_i1|
     # ---->|-----------|
     #      |g_i1> <g_i1|
-    
-    try:
-        if verbose > 5:
-            print(" * Generating R1g", i1g, i2e, i3e)
-        lp = \
-        diag.liouville_pathway("NR",
-                   i1g,
-                   aggregate=self,
-                   order=3, pname="R1g",
-                   popt_band=1,
-                   relax_order=1)
-        # first transition lineshape
-        width1 = \
-        self.get_transition_width((i2e, i1g))
-        deph1 = \
-        self.get_transition_dephasing((i2e, 
-                   i1g))
-        # third transition lineshape
-        width3 = \
-        self.get_transition_width((i2d, i4g))
-        deph3 = \
-        self.get_transition_dephasing((i2d,
-                   i4g))
-
-
-        #      |g_i1> <g_i1|                                                           
-        lp.add_transition((i2e,i1g),+1,
-              interval=1, 
-              width=width1, 
-              deph=deph1)
-        #      |e_i2> <g_i1|        
-        lp.add_transition((i3e,i1g),-1)
-        #      |e_i2> <e_i3|
-        lp.add_transfer(((i2d, i3d)),
-             (i2e, i3e))
-        lp.set_evolution_factor(evf)
-        #      |d_i2> <d_i3|                                                                                
-        lp.add_transition((i4g,i3d),-1)
-        #      |d_i2> <g_i4|
-        lp.add_transition((i4g,i2d),+1,
-              interval=3, 
-              width=width3, 
-              deph=deph3)
-        #      |g_i4> <g_i4|
+    #
+    #      variables: i1g, i2e, i3e, i2d, i3d, i4g
+    "R1g": dict(ptype="NR", popt_band=1, relax_order=1,
+                bands=(0, 1, 1, 1, 1, 0),
+                dipoles=((1, 0), (2, 0), (5, 4), (5, 3)),
+                evf=(3, 4, 1, 2), etol=True,
+                events=(("I", (1, 0), +1, 1, (1, 0)),
+                        ("I", (2, 0), -1, 0, None),
+                        ("R", (3, 4), (1, 2)),
+                        ("I", (5, 4), -1, 0, None),
+                        ("I", (5, 3), +1, 3, (3, 5)))),
+
+    #      Diagram R2g
+    #
+    #      |g_i4> <g_i4|
+    # <----|-----------|
+    #      |d_i3> <g_i4|
+    #      |-----------|<----
+    #      |d_i3> <d_i2|
+    #      |***********|
+    #      |e_i3> <e_i2|
+    # ---->|-----------|
+    #      |g_i1> <e_i2|
+    #      |-----------|<----
+    #      |g_i1> <g_i1|
+    #
+    #      variables: i1g, i2e, i3e, i3d, i2d, i4g
+    "R2g": dict(ptype="R", popt_band=1, relax_order=1,
+                bands=(0, 1, 1, 1, 1, 0),
+                dipoles=((1, 0), (2, 0), (5, 4), (5, 3)),
+                evf=(3, 4, 2, 1), etol=True,
+                events=(("I", (1, 0), -1, 1, (1, 0)),
+                        ("I", (2, 0), +1, 0, None),
+                        ("R", (3, 4), (2, 1)),
+                        ("I", (5, 4), -1, 0, None),
+                        ("I", (5, 3), +1, 3, (3, 5)))),
+
+    #      Diagram R3g
+    #
+    #      |g_i3> <g_i3|
+    # <----|-----------|
+    #      |e_i4> <g_i3|
+    # ---->|-----------|
+    #      |g_i1> <g_i3|
+    #      |-----------|---->
+    #      |g_i1> <e_i2|
+    #      |-----------|<----
+    #      |g_i1> <g_i1|
+    #
+    #      variables: i1g, i2e, i3g, i4e
+    "R3g": dict(ptype="R", popt_band=0, relax_order=0,
+                bands=(0, 1, 0, 1),
+                dipoles=((1, 0), (2, 1), (3, 0), (2, 3)),
+                evf=(0, 2, 0, 2), etol=False,
+                events=(("I", (1, 0), -1, 1, (1, 0)),
+                        ("I", (2, 1), -1, 0, None),
+                        ("I", (3, 0), +1, 0, None),
+                        ("I", (2, 3), +1, 3, (3, 2)))),
+
+    #      Diagram R4g
+    #
+    #      |g_i1> <g_i1|
+    # <----|-----------|
+    #      |e_i4> <g_i1|
+    # ---->|-----------|
+    #      |g_i3> <g_i1|
+    # <----|-----------|
+    #      |e_i2> <g_i1|
+    # ---->|-----------|
+    #      |g_i1> <g_i1|
+    #
+    #      variables: i1g, i2e, i3g, i4e
+    "R4g": dict(ptype="NR", popt_band=0, relax_order=0,
+                bands=(0, 1, 0, 1),
+                dipoles=((1, 0), (2, 1), (3, 2), (0, 3)),
+                evf=(0, 2, 0, 2), etol=False,
+                events=(("I", (1, 0), +1, 1, (1, 0)),
+                        ("I", (2, 1), +1, 0, None),
+                        ("I", (3, 2), +1, 0, None),
+                        ("I", (0, 3), +1, 3, (3, 0)))),
+
+    #      Diagram R1f*
+    #
+    #      |d_i2> <d_i2|
+    # <----|-----------|
+    #      |f_i4> <d_i2|
+    # ---->|-----------|
+    #      |d_i3> <d_i2|
+    #      |***********|
+    #      |e_i3> <e_i2|
+    # ---->|-----------|
+    #      |g_i1> <e_i2|
+    #      |-----------|<----
+    #      |g_i1> <g_i1|
+    #
+    #      variables: i1g, i2e, i3e, i3d, i2d, i4f
+    "R1f*": dict(ptype="R", popt_band=1, relax_order=1,
+                 bands=(0, 1, 1, 1, 1, 2),
+                 dipoles=((1, 0), (2, 0), (5, 3), (4, 5)),
+                 evf=(3, 4, 2, 1), etol=True,
+                 events=(("I", (1, 0), -1, 1, (1, 0)),
+                         ("I", (2, 0), +1, 0, None),
+                         ("R", (3, 4), (2, 1)),
+                         ("I", (5, 3), +1, 0, None),
+                         ("I", (4, 5), +1, 3, (5, 4)))),
+
+    #      Diagram R2f*
+    #
+    #      |d_i3> <d_i3|
+    # <----|-----------|
+    #      |f_i4> <d_i3|
+    # ---->|-----------|
+    #      |d_i2> <d_i3|
+    #      |***********|
+    #      |e_i2> <e_i3|
+    #      |-----------|<----
+    #      |e_i2> <g_i1|
+    # ---->|-----------|
+    #      |g_i1> <g_i1|
+    #
+    #      variables: i1g, i2e, i3e, i2d, i3d, i4f
+    "R2f*": dict(ptype="NR", popt_band=1, relax_order=1,
+                 bands=(0, 1, 1, 1, 1, 2),
+                 dipoles=((1, 0), (2, 0), (5, 3), (4, 5)),
+                 evf=(3, 4, 1, 2), etol=True,
+                 events=(("I", (1, 0), +1, 1, (1, 0)),
+                         ("I", (2, 0), -1, 0, None),
+                         ("R", (3, 4), (1, 2)),
+                         ("I", (5, 3), +1, 0, None),
+                         ("I", (4, 5), +1, 3, (5, 4)))),
+
+    #      Diagram R1gE
+    #
+    #      |g_i5> <g_i5|
+    # <----|-----------|
+    #      |e_i6> <g_i5|
+    # ---->|-----------|
+    #      |g_i4> <g_i5|
+    #      |***********|
+    #      |e_i2> <e_i3|
+    #      |-----------|<----
+    #      |e_i2> <g_i1|
+    # ---->|-----------|
+    #      |g_i1> <g_i1|
+    #
+    #      variables: i1g, i2e, i3e, i4g, i5g, i6e
+    "R1gE": dict(ptype="NR", popt_band=1, relax_order=1,
+                 bands=(0, 1, 1, 0, 0, 1),
+                 dipoles=((1, 0), (2, 0), (3, 5), (4, 5)),
+                 evf=(3, 4, 1, 2), etol=True,
+                 events=(("I", (1, 0), +1, 1, (1, 0)),
+                         ("I", (2, 0), -1, 0, None),
+                         ("R", (3, 4), (1, 2)),
+                         ("I", (5, 3), +1, 0, None),
+                         ("I", (4, 5), +1, 3, (5, 3)))),
+
+    #      Diagram R2gE
+    #
+    #      |g_i5> <g_i5|
+    # <----|-----------|
+    #      |e_i6> <g_i5|
+    # ---->|-----------|
+    #      |g_i4> <g_i5|
+    #      |***********|
+    #      |e_i3> <e_i2|
+    # ---->|-----------|
+    #      |g_i1> <e_i2|
+    #      |-----------|<----
+    #      |g_i1> <g_i1|
+    #
+    #      variables: i1g, i2e, i3e, i4g, i5g, i6e
+    "R2gE": dict(ptype="R", popt_band=1, relax_order=1,
+                 bands=(0, 1, 1, 0, 0, 1),
+                 dipoles=((1, 0), (2, 0), (3, 5), (4, 5)),
+                 evf=(3, 4, 2, 1), etol=True,
+                 events=(("I", (1, 0), -1, 1, (1, 0)),
+                         ("I", (2, 0), +1, 0, None),
+                         ("R", (3, 4), (2, 1)),
+                         ("I", (5, 3), +1, 0, None),
+                         ("I", (4, 5), +1, 3, (5, 3)))),
+
+    #      Diagram R1f*E
+    #
+    #      |g_i2> <g_i2|
+    # <----|-----------|
+    #      |e_i4> <g_i2|
+    # ---->|-----------|
+    #      |g_i3> <g_i2|
+    #      |***********|
+    #      |e_i3> <e_i2|
+    # ---->|-----------|
+    #      |g_i1> <e_i2|
+    #      |-----------|<----
+    #      |g_i1> <g_i1|
+    #
+    #      variables: i1g, i2e, i3e, i3g, i2g, i4e
+    "R1f*E": dict(ptype="R", popt_band=1, relax_order=1,
+                  bands=(0, 1, 1, 0, 0, 1),
+                  dipoles=((1, 0), (2, 0), (5, 3), (4, 5)),
+                  evf=(3, 4, 2, 1), etol=True,
+                  events=(("I", (1, 0), -1, 1, (1, 0)),
+                          ("I", (2, 0), +1, 0, None),
+                          ("R", (3, 4), (2, 1)),
+                          ("I", (5, 3), +1, 0, None),
+                          ("I", (4, 5), +1, 3, (5, 4)))),
+
+    #      Diagram R2f*E
+    #
+    #      |g_i3> <g_i3|
+    # <----|-----------|
+    #      |e_i4> <g_i3|
+    # ---->|-----------|
+    #      |g_i2> <g_i3|
+    #      |***********|
+    #      |e_i2> <e_i3|
+    #      |-----------|<----
+    #      |e_i2> <g_i1|
+    # ---->|-----------|
+    #      |g_i1> <g_i1|
+    #
+    #      variables: i1g, i2e, i3e, i2g, i3g, i4e
+    "R2f*E": dict(ptype="NR", popt_band=1, relax_order=1,
+                  bands=(0, 1, 1, 0, 0, 1),
+                  dipoles=((1, 0), (2, 0), (5, 3), (4, 5)),
+                  evf=(3, 4, 1, 2), etol=True,
+                  events=(("I", (1, 0), +1, 1, (1, 0)),
+                          ("I", (2, 0), -1, 0, None),
+                          ("R", (3, 4), (1, 2)),
+                          ("I", (5, 3), +1, 0, None),
+                          ("I", (4, 5), +1, 3, (5, 4)))),
+
+    #      Diagram P1
+    #
+    #      |g_i1> <g_i1|
+    # <----|-----------|
+    #      |e_i2> <g_i1|
+    # ---->|-----------|
+    #      |g_i1> <g_i1|
+    #
+    #      variables: i1g, i2e
+    "P1": dict(ptype="NR", popt_band=1, relax_order=1,
+               bands=(0, 1),
+               dipoles=((1, 0),),
+               evf=None, etol=False,
+               events=(("I", (1, 0), +1, 1, (1, 0)),
+                       ("I", (0, 1), +1, 1, (1, 0)))),
+    }
 
-    except:
 
-        raise Exception("Pathway generation failed")
-        
-    return lp
+def _band_states(self, band, pname):
+    """Indices of the states of a given band as an array
 
+    """
+    if band == 0:
+        return numpy.array(self.get_electronic_groundstate(), dtype=int)
+    try:
+        return numpy.array(self.get_excitonic_band(band=band), dtype=int)
+    except:
+        raise Exception("Excited states not available for "+pname+
+                        " pathway generation")
 
-def generate_R1gE(self, lst, eUt2, pop_tol, dip_tol, evf_tol, verbose=0):
-    
-    ngs = self.get_electronic_groundstate()
-    nes = self.get_excitonic_band(band=1)
-    
-    if verbose > 0:
-        print("Liouville pathway R1g_ETICS")
-        print("Population tolerance: ", pop_tol)
-        print("Dipole tolerance:     ", dip_tol)
-        print("Evolution amplitude:  ", evf_tol)
-    
-    k = 0
-    l = 0
-    for i1g in ngs:
 
-        if verbose > 0: 
-            print("Ground state: ", i1g, "of", len(ngs))
+def _evolution_factors(eUt2, indices):
+    """Elements of the evolution superoperator for arrays of indices
 
-        # Only thermally allowed starting states are considered
-        if self.rho0[i1g,i1g] > pop_tol:
-    
-            for i2e in nes:
-                
-                if verbose > 1: 
-                    print("Excited state: ", i2e, "of", len(nes))
-               
-                if self.D2[i2e,i1g] > dip_tol:
-                
-                    for i3e in nes:
-                    
-                        if self.D2[i3e,i1g] > dip_tol:
+    """
+    if isinstance(eUt2, SuperOperator):
+        return eUt2.data[indices]
 
-                            for i4g in ngs:
-                                for i5g in ngs:
-                                    if isinstance(eUt2,SuperOperator):
-                                        evf = eUt2.data[i4g, i5g, i2e, i3e]
-                                    else:
-                                        evf = eUt2.data(i4g, i5g, i2e, i3e)
-                                    if abs(evf) > evf_tol:
+    # evolution superoperator is represented by a function
+    ii = numpy.broadcast_arrays(*indices)
+    evf = numpy.zeros(ii[0].shape, dtype=qr.COMPLEX)
+    for kk in numpy.ndindex(ii[0].shape):
+        evf[kk] = eUt2.data(ii[0][kk], ii[1][kk], ii[2][kk], ii[3][kk])
+    return evf
 
-                    
-                                        for i6e in nes:
-                                            if ((self.D2[i4g,i6e] > dip_tol)
-                                            and (self.D2[i5g,i6e] > dip_tol)):
-#                                            if ((self.D2[i5g,i2e] > dip_tol)
-#                                            and (self.D2[i5g,i3e] > dip_tol)):
-                                                
 
-                                                l += 1
+def _enumerate_pathways(self, spec, states, eUt2, pop_tol, dip_tol, evf_tol):
+    """Returns state indices of all allowed pathways of a given type
 
-                                    #      Diagram R1g_ETICS
-                                    #      (Compensates R3g)
-                                    #
-                                    #                                     
-                                    #      |g_i5> <g_i5|
-                                    # <----|-----------|
-                                    #      |e_i6> <g_i5|
-                                    # ---->|-----------|
-                                    #      |g_i4> <g_i5|
-                                    #      |***********|
-                                    #      |e_i2> <e_i3|
-                                    #      |-----------|<----
-                                    #      |e_i2> <g_i1|
-                                    # ---->|-----------|
-                                    #      |g_i1> <g_i1|
-                                
-                                                try:
-                                                    if verbose > 5:
-                                                        print(" * Generating R1g_ETICS", i1g, i2e, i3e)
-                                                    
-                                                    lp = \
-                                                    diag.liouville_pathway("NR", 
-                                                                           i1g,
-                                                                aggregate=self,
-                                                                order=3,pname="R1gE",
-                                                                popt_band=1,
-                                                                relax_order=1)
-                
-                                                    # first transition lineshape
-                                                    width1 = \
-                                            self.get_transition_width((i2e, i1g))
-                                                    deph1 = \
-                                            self.get_transition_dephasing((i2e, 
-                                                                           i1g))
-                                                    # third transition lineshape
-                                                    width3 = \
-                                            self.get_transition_width((i6e, i4g))
-                                                    deph3 = \
-                                            self.get_transition_dephasing((i6e,
-                                                                           i4g))
-                                                    
-                                        
-                                                    #      |g_i1> <g_i1|
-                                                    lp.add_transition((i2e,i1g),+1,
-                                                                      interval=1, 
-                                                                      width=width1, 
-                                                                      deph=deph1)
-                                                    #      |e_i2> <g_i1|
-                                                    lp.add_transition((i3e,i1g),-1)
-                                                    #      |e_i2> <e_i3|
-                                                    lp.add_transfer(((i4g, i5g)),
-                                                                     (i2e, i3e))
-                                                    lp.set_evolution_factor(evf)
-                                                    lp.add_transition((i6e,i4g),+1)
-                                                    #      |e_i6> <g_i4|
-                                                    lp.add_transition((i5g,i6e),+1,
-                                                                      interval=3, 
-                                                                      width=width3, 
-                                                                      deph=deph3)
-                                                    #      |g_i4> <g_i4|
-                
-                                                except:
-                                                    
-                                                    raise Exception()
-                                                    break
-                                                
-                                                lp.build()
-                                                lst.append(lp)
-                                                k += 1
-    #print("R1g_ETICS included")
+    The index tuples are extended by one variable at a time and all
+    the conditions are checked on boolean arrays as soon as all their
+    variables are known.
 
+    Returns
+    -------
 
+    idx : numpy.ndarray
+        State indices of the pathways, shape (Np, number of variables)
 
-def generate_R2g(self, lst, eUt2, pop_tol, dip_tol, evf_tol, verbose=0):
-    
-    ngs = self.get_electronic_groundstate()
-    nes = self.get_excitonic_band(band=1)
-    
-    if verbose > 0:
-        print("Liouville pathway R2g")
-        print("Population tolerance: ", pop_tol)
-        print("Dipole tolerance:     ", dip_tol)
-        print("Evolution amplitude:  ", evf_tol)
-    
-    k = 0
-    l = 0
-    for i1g in ngs:
+    evf : numpy.ndarray
+        Evolution factors of the pathways (ones if `eUt2` is None)
 
-        if verbose > 0: 
-            print("Ground state: ", i1g, "of", len(ngs))
+    """
+    allowed = self.D2 > dip_tol
+
+    # only thermally allowed starting states are considered
+    s0 = states[0]
+    idx = s0[self.rho0[s0, s0] > pop_tol][:, None]
+    evf = numpy.ones(idx.shape[0], dtype=qr.COMPLEX)
+
+    for v in range(1, len(states)):
+
+        sv = states[v]
+
+        # value of a variable on all (existing pathway, new state) pairs
+        def _var(k):
+            if k == v:
+                return sv[None, :]
+            return idx[:, k][:, None]
+
+        mask = numpy.ones((idx.shape[0], len(sv)), dtype=bool)
+        for (a, b) in spec["dipoles"]:
+            if max(a, b) == v:
+                mask &= allowed[_var(a), _var(b)]
+
+        ev = None
+        if ((eUt2 is not None) and (spec["evf"] is not None)
+                and (max(spec["evf"]) == v)):
+            ev = _evolution_factors(eUt2, tuple(_var(k)
+                                                for k in spec["evf"]))
+            ev = numpy.broadcast_to(ev, mask.shape)
+            if spec["etol"]:
+                mask &= numpy.abs(ev) > evf_tol
+
+        rows, cols = numpy.nonzero(mask)
+        idx = numpy.column_stack((idx[rows, :], sv[cols]))
+        if ev is None:
+            evf = evf[rows]
+        else:
+            evf = ev[rows, cols]
 
-        # Only thermally allowed starting states are considered
-        if self.rho0[i1g,i1g] > pop_tol:
-    
-            for i2e in nes:
-                
-                if verbose > 1: 
-                    print("Excited state: ", i2e, "of", len(nes))
-               
-                if self.D2[i2e,i1g] > dip_tol:
-                
-                    for i3e in nes:
-                    
-                        if self.D2[i3e,i1g] > dip_tol:
+    return idx, evf
 
-                            for i3d in nes:
-                                for i2d in nes:
-                                    if isinstance(eUt2,SuperOperator):
-                                        evf = eUt2.data[i3d, i2d, i3e, i2e]
-                                    else:
-                                        evf = eUt2.data(i3d, i2d, i3e, i2e)
-                                    if abs(evf) > evf_tol:
 
-                    
-                                        for i4g in ngs:
+def generate_pathways(self, table, pname, eUt2, pop_tol, dip_tol,
+                      evf_tol=0.0, verbose=0):
+    """Generates Liouville pathways of a given type into a table
 
-                                            if ((self.D2[i4g,i2d] > dip_tol)
-                                            and (self.D2[i4g,i3d] > dip_tol)):
-                                    
-                                
-                                                l += 1
-
-                                #      Diagram R2g
-                                #
-                                #                                     
-                                #      |g_i4> <g_i4|
-                                # <----|-----------|
-                                #      |d_i3> <g_i4|  
-                                #      |-----------|---->
-                                #      |d_i3> <d_i2|
-                                #      |***********|
-                                #      |e_i3> <e_i2|
-                                # ---->|-----------|
-                                #      |g_i1> <e_i2|
-                                #      |-----------|<----
-                                #      |g_i1> <g_i1|
-                                
-                                                try:
-                                                    if verbose > 5:
-                                                        print(" * Generating R2g", i1g, i2e, i3e)
-                                                    
-                                                    lp = \
-                                                    diag.liouville_pathway("R", 
-                                                                           i1g,
-                                                                aggregate=self,
-                                                                order=3,pname="R2g",
-                                                                popt_band=1,
-                                                                relax_order=1)
-                
-                                                    # first transition lineshape
-                                                    width1 = \
-                                            self.get_transition_width((i2e, i1g))
-                                                    deph1 = \
-                                            self.get_transition_dephasing((i2e, 
-                                                                           i1g))
-                                                    # third transition lineshape
-                                                    width3 = \
-                                            self.get_transition_width((i3d, i4g))
-                                                    deph3 = \
-                                            self.get_transition_dephasing((i3d,
-                                                                           i4g))
-                                                    
-                                        
-                                                    #      |g_i1> <g_i1|
-                                                    lp.add_transition((i2e,i1g),-1,
-                                                                      interval=1, 
-                                                                      width=width1, 
-                                                                      deph=deph1)
-                                                    #      |g_i1> <e_i2|
-                                                    lp.add_transition((i3e,i1g),+1)
-                                                    #      |e_i3> <e_i2|
-                                                    lp.add_transfer(((i3d, i2d)),
-                                                                     (i3e, i2e))
-                                                    lp.set_evolution_factor(evf)
-                                                    lp.add_transition((i4g,i2d),-1)
-                                                    #      |e_i3> <g_i4|
-                                                    lp.add_transition((i4g,i3d),+1,
-                                                                      interval=3, 
-                                                                      width=width3, 
-                                                                      deph=deph3)
-                                                    #      |g_i4> <g_i4|
-                
-                                                except:
-                                                    
-                                                    raise Exception()
-                                                    break
-                                                
-                                                lp.build()
-                                                lst.append(lp)
-                                                k += 1
-                    
-def generate_R2gE(self, lst, eUt2, pop_tol, dip_tol, evf_tol, verbose=0):
-    
-    ngs = self.get_electronic_groundstate()
-    nes = self.get_excitonic_band(band=1)
-    
-    if verbose > 0:
-        print("Liouville pathway R2g_ETICS")
-        print("Population tolerance: ", pop_tol)
-        print("Dipole tolerance:     ", dip_tol)
-        print("Evolution amplitude:  ", evf_tol)
-    
-    k = 0
-    l = 0
-    for i1g in ngs:
 
-        if verbose > 0: 
-            print("Ground state: ", i1g, "of", len(ngs))
+    Parameters
+    ----------
 
-        # Only thermally allowed starting states are considered
-        if self.rho0[i1g,i1g] > pop_tol:
-    
-            for i2e in nes:
-                
-                if verbose > 1: 
-                    print("Excited state: ", i2e, "of", len(nes))
-               
-                if self.D2[i2e,i1g] > dip_tol:
-                
-                    for i3e in nes:
-                    
-                        if self.D2[i3e,i1g] > dip_tol:
-
-                            for i4g in ngs:
-                                for i5g in ngs:
-                                    if isinstance(eUt2,SuperOperator):
-                                        evf = eUt2.data[i4g, i5g, i3e, i2e]
-                                    else:
-                                        evf = eUt2.data(i4g, i5g, i3e, i2e)
-                                    if verbose > 4:
-                                        print("Evolution factor",i4g, i5g, i3e, i2e, evf)
-                                    if abs(evf) > evf_tol:
+    table : LiouvillePathwayTable
+        Table to which the pathways are added
 
-                    
-                                        for i6e in nes:
-                                            if ((self.D2[i4g,i6e] > dip_tol)
-                                            and (self.D2[i5g,i6e] > dip_tol)):
-#                                            if ((self.D2[i5g,i2e] > dip_tol)
-#                                            and (self.D2[i5g,i3e] > dip_tol)):
-                                    
-                                
-                                                l += 1
+    pname : str
+        Name of the pathway type (e.g. "R1g", "R2f*", "P1")
 
-                                    #      Diagram R2g_ETICS
-                                    #      (Compensates R3g)
-                                    #
-                                    #                                     
-                                    #      |g_i5> <g_i5|
-                                    # <----|-----------|
-                                    #      |e_i6> <g_i5|
-                                    # ---->|-----------|
-                                    #      |g_i4> <g_i5|
-                                    #      |***********|
-                                    #      |e_i3> <e_i2|
-                                    # ---->|-----------|
-                                    #      |g_i1> <e_i2|
-                                    #      |-----------|<----
-                                    #      |g_i1> <g_i1|
-                                
-                                                try:
-                                                    if verbose > 5:
-                                                        print(" * Generating R2g_ETICS", i1g, i2e, i3e)
-                                                    
-                                                    lp = \
-                                                    diag.liouville_pathway("R", 
-                                                                           i1g,
-                                                                aggregate=self,
-                                                                order=3,pname="R2gE",
-                                                                popt_band=1,
-                                                                relax_order=1)
-                
-                                                    # first transition lineshape
-                                                    width1 = \
-                                            self.get_transition_width((i2e, i1g))
-                                                    deph1 = \
-                                            self.get_transition_dephasing((i2e, 
-                                                                           i1g))
-                                                    # third transition lineshape
-                                                    width3 = \
-                                            self.get_transition_width((i6e, i4g))
-                                                    deph3 = \
-                                            self.get_transition_dephasing((i6e,
-                                                                           i4g))
-                                                    
-                                        
-                                                    #      |g_i1> <g_i1|
-                                                    lp.add_transition((i2e,i1g),-1,
-                                                                      interval=1, 
-                                                                      width=width1, 
-                                                                      deph=deph1)
-                                                    #      |g_i1> <e_i2|
-                                                    lp.add_transition((i3e,i1g),+1)
-                                                    #      |e_i3> <e_i2|
-                                                    lp.add_transfer(((i4g, i5g)),
-                                                                     (i3e, i2e))
-                                                    lp.set_evolution_factor(evf)
-                                                    lp.add_transition((i6e,i4g),+1)
-                                                    #      |e_i3> <g_i4|
-                                                    lp.add_transition((i5g,i6e),+1,
-                                                                      interval=3, 
-                                                                      width=width3, 
-                                                                      deph=deph3)
-                                                    #      |g_i4> <g_i4|
-                
-                                                except:
-                                                    
-                                                    raise Exception()
-                                                    break
-                                                
-                                                lp.build()
-                                                lst.append(lp)
-                                                k += 1
-    #print("R2g_ETICS included")
+    eUt2 : SuperOperator
+        Evolution superoperator at the waiting time (it can also be
+        an object whose `data` attribute is a function of four indices).
+        If None, the evolution factors are set to 1 and they are not
+        used to exclude any pathways; the indices of the superoperator
+        elements stored in the table allow to evaluate them later.
 
+    pop_tol, dip_tol, evf_tol : float
+        Tolerances of the initial population, of the squared transition
+        dipole moments and of the absolute value of the evolution factor
 
-def generate_R3g(self, lst, eUt2, pop_tol, dip_tol, verbose=0):
+    """
+    try:
+        spec = _pathway_specs[pname]
+    except KeyError:
+        raise Exception("Unknown pythway type: "+str(pname))
 
-    ngs = self.get_electronic_groundstate()
-    nes = self.get_excitonic_band(band=1)
-    
     if verbose > 0:
-        print("Liouville pathway R3g")
+        print("Liouville pathway", pname)
         print("Population tolerance: ", pop_tol)
         print("Dipole tolerance:     ", dip_tol)
-        #print("Evolution amplitude:  ", evf_tol)
-        
-    
-    k = 0
-    l = 0
-    for i1g in ngs:
-        
-        if verbose > 0: 
-            print("Ground state: ", i1g, "of", len(ngs))
-            
-        # Only thermally allowed starting states are considered
-        if self.rho0[i1g,i1g] > pop_tol:
+        if spec["etol"]:
+            print("Evolution amplitude:  ", evf_tol)
+
+    states = [_band_states(self, band, pname) for band in spec["bands"]]
+    idx, evf = _enumerate_pathways(self, spec, states, eUt2,
+                                   pop_tol, dip_tol, evf_tol)
+
+    order = table.order
+    events = spec["events"]
+    Np = idx.shape[0]
+    Ne = 1 + order + spec["relax_order"]
+
+    HH = numpy.diag(self.HH)
+    lab = self.lab
+
+    transitions = numpy.zeros((Np, order+1, 2), dtype=int)
+    sides = numpy.zeros((Np, order+1), dtype=int)
+    relaxations = numpy.zeros((Np, 2, 2), dtype=int)
+    pstates = numpy.zeros((Np, Ne, 2), dtype=int)
+    frequency = numpy.zeros((Np, Ne), dtype=qr.REAL)
+    energy = numpy.zeros((Np, order+1), dtype=qr.REAL)
+    dmoments = numpy.zeros((Np, order+1, 3), dtype=qr.REAL)
+    widths = -numpy.ones((Np, 4), dtype=qr.REAL)
+    dephs = -numpy.ones((Np, 4), dtype=qr.REAL)
+
+    current = numpy.zeros((Np, 2), dtype=int)
+    current[:, 0] = idx[:, 0]
+    current[:, 1] = idx[:, 0]
+
+    nint = 0
+    for ne, event in enumerate(events):
+
+        if event[0] == "I":
+
+            (f, i), side, interval, wtr = event[1:]
+            nf = idx[:, f]
+            ni = idx[:, i]
+            sd = (abs(side)-side)//2
+
+            transitions[:, nint, 0] = nf
+            transitions[:, nint, 1] = ni
+            sides[:, nint] = side
+
+            if interval > 0:
+                widths[:, interval], dephs[:, interval] = \
+                    _transition_widths(self, idx[:, wtr[0]], idx[:, wtr[1]])
+
+            current[:, sd] = nf
+
+            energy[:, nint] = HH[nf] - HH[ni]
+            dmoments[:, nint, :] = self.DD[nf, ni, :]
+            dmoments[:, nint, :] *= \
+                _dipole_rescaling(lab, nint, energy[:, nint])[:, None]
+
+            if nint < order:
+                frequency[:, ne] = HH[current[:, 0]] - HH[current[:, 1]]
+
+            nint += 1
+
+        elif event[0] == "R":
+
+            fin, sta = event[1:]
+            relaxations[:, 0, 0] = idx[:, fin[0]]
+            relaxations[:, 0, 1] = idx[:, fin[1]]
+            relaxations[:, 1, 0] = idx[:, sta[0]]
+            relaxations[:, 1, 1] = idx[:, sta[1]]
+
+            current[:, 0] = idx[:, fin[0]]
+            current[:, 1] = idx[:, fin[1]]
+            frequency[:, ne] = HH[current[:, 0]] - HH[current[:, 1]]
+
+        pstates[:, ne, :] = current
+
+    table.add_pathways(pname, spec["ptype"], [ev[0] for ev in events],
+                       idx[:, 0], transitions, sides, pstates, frequency,
+                       energy, dmoments, relaxations=relaxations,
+                       widths=widths, dephs=dephs,
+                       evolfac=(evf if spec["evf"] is not None else None),
+                       evf_index=(idx[:, list(spec["evf"])]
+                                  if spec["evf"] is not None else None),
+                       evf_tol=spec["etol"],
+                       popt_band=spec["popt_band"],
+                       relax_order=spec["relax_order"])
 
-            for i2e in nes:
-                
-                if verbose > 1: 
-                    print("Excited state: ", i2e, "of", len(nes))
-                
-                if self.D2[i2e,i1g] > dip_tol:
+    if verbose > 0:
+        print("Number of pathways:   ", Np)
 
-                    for i3g in ngs:
-                    
-                        if self.D2[i3g,i2e] > dip_tol:
-                            if isinstance(eUt2,SuperOperator):
-                                evf = eUt2.data[i1g, i3g, i1g, i3g]
-                            else:
-                                evf = eUt2.data(i1g, i3g, i1g, i3g)
-                    
-                            for i4e in nes:
-                
-                                if ((self.D2[i4e,i1g] > dip_tol)
-                                and (self.D2[i3g,i4e] > dip_tol)) :
 
-                       
-                                    l += 1
+def _transition_widths(self, nf, ni):
+    """Widths and dephasings of the transitions between nf and ni
 
-                        #      Diagram R3g
-                        #
-                        #                                     
-                        #      |g_i3> <g_i3|
-                        # <----|-----------|
-                        #      |e_i4> <g_i3|
-                        # ---->|-----------|
-                        #      |g_i1> <g_i3|
-                        #      |-----------|---->
-                        #      |g_i1> <e_i2|
-                        #      |-----------|<----
-                        #      |g_i1> <g_i1|
-                        
-                                    try:
-                                        if verbose > 5:
-                                            print(" * Generating R3g", i1g, i2e)
-            
-                                        lp = \
-                                        diag.liouville_pathway("R", i1g,
-                                               aggregate=self,
-                                               order=3, pname="R3g")     
-            
-                                        # first transition lineshape
-                                        width1 = \
-                                        self.get_transition_width((i2e, i1g))
-                                        deph1 = \
-                                        self.get_transition_dephasing((i2e, 
-                                                                       i1g))
-                                        # third transition lineshape
-                                        width3 = \
-                                        self.get_transition_width((i4e,i3g))
-                                        deph3 = \
-                                        self.get_transition_dephasing((i4e,
-                                                                       i3g))
-                                        
-                                        # |g_i1> <g_i1|
-                                        lp.add_transition((i2e,i1g),-1,
-                                                                  interval=1, 
-                                                                  width=width1, 
-                                                                  deph=deph1)
-                                        # |g_i1> <e_i2|
-                                        lp.add_transition((i3g,i2e),-1)
-                                        # |g_i1> <g_i3|
-                                        lp.add_transition((i4e,i1g),+1)
-                                        # |e_i5> <g_i3|
-                                        lp.add_transition((i3g,i4e),+1,
-                                                                  interval=3, 
-                                                                  width=width3, 
-                                                                  deph=deph3)
-                                        # |g_i3> <g_i3|
-            
-                                        lp.set_evolution_factor(evf)
-            
-                                    except:
+    The aggregate is asked only once for each distinct transition.
 
-                                        raise Exception("Generation of pathway failed")
-                                    
-                                    lp.build()
-                                    lst.append(lp)
-                                    k += 1
+    """
+    widths = numpy.zeros(nf.shape[0], dtype=qr.REAL)
+    dephs = numpy.zeros(nf.shape[0], dtype=qr.REAL)
+    if nf.shape[0] == 0:
+        return widths, dephs
 
+    trs, inv = numpy.unique(numpy.column_stack((nf, ni)), axis=0,
+                            return_inverse=True)
+    inv = numpy.reshape(inv, -1)
+    wdt = numpy.zeros(trs.shape[0], dtype=qr.REAL)
+    dph = numpy.zeros(trs.shape[0], dtype=qr.REAL)
+    for kk, tr in enumerate(trs):
+        tr = (int(tr[0]), int(tr[1]))
+        wdt[kk] = self.get_transition_width(tr)
+        dph[kk] = self.get_transition_dephasing(tr)
 
-def generate_R4g(self, lst, eUt2, pop_tol, dip_tol, verbose=0):
-    
-    ngs = self.get_electronic_groundstate()
-    nes = self.get_excitonic_band(band=1)
-                    
-    if verbose > 0:
-        print("Liouville pathway R4g")
-        print("Population tolerance: ", pop_tol)
-        print("Dipole tolerance:     ", dip_tol)
-    
-    k = 0
-    l = 0
-    for i1g in ngs:
+    return wdt[inv], dph[inv]
 
-        if verbose > 0: 
-            print("Ground state: ", i1g, "of", len(ngs))
-        
-        # Only thermally allowed starting states are considered
-        if self.rho0[i1g,i1g] > pop_tol:
-    
-            for i2e in nes:
-                
-                if verbose > 1: 
-                    print("Excited state: ", i2e, "of", len(nes))
 
-                if self.D2[i2e,i1g] > dip_tol:
+def _dipole_rescaling(lab, nint, energy):
+    """Factors rescaling transition dipoles by the pulse spectra
 
-                    for i3g in ngs:
+    If the laboratory setup requires it ("rescale_dip" pulse effects),
+    the dipole moments of the nint-th interaction are multiplied
+    by the spectrum of the corresponding pulse at the transition energy.
 
-                        if self.D2[i3g,i2e] > dip_tol:
-                            if isinstance(eUt2,SuperOperator):
-                                evf = eUt2.data[i1g, i3g, i1g, i3g]
-                            else:
-                                evf = eUt2.data(i1g, i3g, i1g, i3g)
+    """
+    scale = numpy.ones(energy.shape[0], dtype=qr.REAL)
+    if lab is None:
+        return scale
 
-                            for i4e in nes:
+    if lab.has_timedomain or lab.has_freqdomain:
+        Np = len(lab.pulse_t)
+    else:
+        Np = 0
 
-                                if ((self.D2[i4e,i3g] > dip_tol)
-                                and (self.D2[i1g,i4e] > dip_tol)):
-                        
-                                    l += 1
-                        
+    if Np > 0:
+        # if pulses defined only in time domain transfer to the frequency one
+        if not lab.has_freqdomain:
+            lab.convert_to_frequency()
+        if Np > nint and lab.pulse_effects == "rescale_dip":
+            pulse = lab.pulse_f[nint]
+            tr_energy, inv = numpy.unique(numpy.abs(energy),
+                                          return_inverse=True)
+            values = numpy.array([numpy.real(pulse.at(en))
+                                  for en in tr_energy], dtype=qr.REAL)
+            scale = values[numpy.reshape(inv, -1)]
 
-                        #      Diagram R4g
-                        #
-                        #                                     
-                        #      |g_i1> <g_i1|
-                        # <----|-----------|
-                        #      |e_i4> <g_i1|
-                        # ---->|-----------|
-                        #      |g_i3> <g_i1|
-                        # <----|-----------|
-                        #      |e_i2> <g_i1|
-                        # ---->|-----------|
-                        #      |g_i1> <g_i1|
+    return scale
 
-                                    try:
-                                        if verbose > 5:
-                                            print(" * Generating R4g", i1g, i2e)
-                                        lp = \
-                                        diag.liouville_pathway("NR",i1g,
-                                                           aggregate=self,
-                                                           order=3,pname="R4g")
-                                                                                                          
-                                        # first transition lineshape
-                                        width1 = \
-                                        self.get_transition_width((i2e, i1g))
-                                        deph1 = \
-                                        self.get_transition_dephasing((i2e, 
-                                                                       i1g))
-                                        # third transition lineshape
-                                        width3 = \
-                                        self.get_transition_width((i4e,i1g))
-                                        deph3 = \
-                                        self.get_transition_dephasing((i4e,
-                                                                       i1g))
-                                        
-                                        
-                                        #      |g_i1> <g_i1|                                                           
-                                        lp.add_transition((i2e,i1g),+1,
-                                                                  interval=1, 
-                                                                  width=width1, 
-                                                                  deph=deph1)
-                                        #      |e_i2> <g_i1|
-                                        lp.add_transition((i3g,i2e),+1)
-                                        #      |g_i3> <g_i1|
-                                        lp.add_transition((i4e,i3g),+1)
-                                        #      |e_i4> <g_i1|
-                                        lp.add_transition((i1g,i4e),+1,
-                                                                  interval=3, 
-                                                                  width=width3, 
-                                                                  deph=deph3)
-                                        #      |g_i1> <g_i1|
-                                        
-                                        lp.set_evolution_factor(evf)
-            
-                                    except:
-                                        
-                                        break
-                                    
-                                    lp.build()
-                                    lst.append(lp)
-                                    k += 1
 
-def generate_R1f(self, lst, eUt2, pop_tol, dip_tol, evf_tol, verbose=0):
-    
-    ngs = self.get_electronic_groundstate()
-    nes = self.get_excitonic_band(band=1)
-    try:
-        nfs = self.get_excitonic_band(band=2)
-    except:
-        raise Exception("Excited states not available for R1f* pathway"+
-                        " generation")
-    
-    if verbose > 0:
-        print("Liouville pathway R1f*")    
-        print("Population tolerance: ", pop_tol)
-        print("Dipole tolerance:     ", dip_tol)
-        print("Evolution amplitude:  ", evf_tol)
-    
-    k = 0
-    l = 0
-    for i1g in ngs:
-    
-        if verbose > 0: 
-            print("Ground state: ", i1g, "of", len(ngs))
-        
-        # Only thermally allowed starting states are considered
-        if self.rho0[i1g,i1g] > pop_tol:
-    
-            for i2e in nes:
-                
-                if self.D2[i2e,i1g] > dip_tol:
-                
-                    for i3e in nes:
-                    
-                        if self.D2[i3e,i1g] > dip_tol:
-                             
-                            if verbose > 2:
-                                print("Excited state: ", i2e, i3e, "of",
-                                      nes[len(nes)-1])
-                            for i3d in nes:
-                                for i2d in nes:
-                                    if isinstance(eUt2,SuperOperator):
-                                        evf = eUt2.data[i3d, i2d, i3e, i2e]
-                                    else:
-                                        evf = eUt2.data(i3d, i2d, i3e, i2e)
-                                    if abs(evf) > evf_tol:
-                    
-                                        for i4f in nfs:
-    
-                                            if ((self.D2[i4f,i3d] > dip_tol)
-                                            and (self.D2[i2d,i4f] > dip_tol)):
-                        
-                                                l += 1           
-    
-                        #      Diagram R1f*
-                        #
-                        #                                     
-                        #      |d_i2> <d_i2|
-                        # <----|-----------|
-                        #      |f_i4> <d_i2|
-                        # ---->|-----------|
-                        #      |d_i3> <d_i2|
-                        #      |***********|
-                        #      |e_i3> <e_i2|
-                        # ---->|-----------|
-                        #      |g_i1> <e_i2|
-                        #      |-----------|<----
-                        #      |g_i1> <g_i1|
-    
-                                                try:
-                                                    if verbose > 5:
-                                                        print(" * Generating R1f*", i1g, i2e)
-                                                    lp = \
-                                                    diag.liouville_pathway("R",i1g,
-                                                               aggregate=self,
-                                                               order=3,pname="R1f*",
-                                                               popt_band=1,
-                                                               relax_order=1)
-                                                    
-                                                    # first transition lineshape
-                                                    width1 = \
-                                            self.get_transition_width((i2e, i1g))
-                                                    deph1 = \
-                                            self.get_transition_dephasing((i2e, 
-                                                                           i1g))
-                                                    # third transition lineshape
-                                                    width3 = \
-                                            self.get_transition_width((i4f,i2d))
-                                                    deph3 = \
-                                            self.get_transition_dephasing((i4f,
-                                                                           i2d))
-                                                    
-                                                    #      |g_i1> <g_i1|                                                           
-                                                    lp.add_transition((i2e,i1g),-1,
-                                                                      interval=1, 
-                                                                      width=width1, 
-                                                                      deph=deph1)
-                                                    #      |g_i1> <e_i2|
-                                                    lp.add_transition((i3e,i1g),+1)
-                                                    #      |e_i3> <e_i2|
-                                                    lp.add_transfer(((i3d, i2d)),
-                                                                     (i3e, i2e))
-                                                    lp.set_evolution_factor(evf)
-                                                    #      |d_i3> <d_i2|                                        
-                                                    lp.add_transition((i4f,i3d),+1)
-                                                    #      |f_i4> <d_i2|
-                                                    lp.add_transition((i2d,i4f),+1,
-                                                                      interval=3, 
-                                                                      width=width3, 
-                                                                      deph=deph3)
-                                                    #      |d_i2> <d_i2|
-                    
-                                                except:
-                                                    
-                                                    raise Exception("Construction"+
-                                                    "relaxation pathway failed")
-                                        
-                                                lp.build()
-                                                lst.append(lp)
-                                                k += 1
+def _generate_into_list(self, lst, pname, eUt2, pop_tol, dip_tol,
+                        evf_tol=0.0, verbose=0, order=3):
+    table = diag.LiouvillePathwayTable(self, order=order)
+    generate_pathways(self, table, pname, eUt2, pop_tol, dip_tol,
+                      evf_tol, verbose)
+    lst.extend(table.get_pathways())
 
-def generate_R2f(self, lst, eUt2, pop_tol, dip_tol, evf_tol, verbose=0):
-    
-    ngs = self.get_electronic_groundstate()
-    nes = self.get_excitonic_band(band=1)
-    
-    try:
-        nfs = self.get_excitonic_band(band=2)
-    except:
-        raise Exception("Excited states not available for R2f* pathway"+
-                        " generation")
-    
-    if verbose > 0:
-        print("Liouville pathway R2f*")
-        print("Population tolerance: ", pop_tol)
-        print("Dipole tolerance:     ", dip_tol)
-        print("Evolution amplitude:  ", evf_tol)
 
-    k = 0
-    l = 0
-    for i1g in ngs:
+def generate_R1g(self, lst, eUt2, pop_tol, dip_tol, evf_tol, verbose=0):
+    _generate_into_list(self, lst, "R1g", eUt2, pop_tol, dip_tol,
+                        evf_tol, verbose)
 
-        if verbose > 0: 
-            print("Ground state: ", i1g, "of", len(ngs))
-        
-        # Only thermally allowed starting states are considered
-        if self.rho0[i1g,i1g] > pop_tol:
-    
-            for i2e in nes:
-                
-                if self.D2[i2e,i1g] > dip_tol:
-                
-                    for i3e in nes:
-                    
-                        if self.D2[i3e,i1g] > dip_tol:
-                    
-                            if verbose > 2:
-                                print("Excited state: ", i2e, i3e, "of",
-                                      nes[len(nes)-1])
-                                
-                            for i2d in nes:
-                                for i3d in nes:
-                                    if isinstance(eUt2,SuperOperator):
-                                        evf = eUt2.data[i2d, i3d, i2e, i3e]
-                                    else:
-                                        evf = eUt2.data(i2d, i3d, i2e, i3e)
-                                    if abs(evf) > evf_tol:
-
-                                        for i4f in nfs:
-
-                                            if ((self.D2[i4f,i2d] > dip_tol)
-                                            and (self.D2[i3d,i4f] > dip_tol)):
-                                
-                                                l += 1
-                                
 
-                                #      Diagram R2f*
-                                #
-                                #                                     
-                                #      |d_i3> <d_i3|
-                                # <----|-----------|
-                                #      |f_i4> <d_i3|
-                                # ---->|-----------|
-                                #      |d_i2> <d_i3|
-                                #      |***********|
-                                #      |e_i2> <e_i3|
-                                #      |-----------|<----
-                                #      |e_i2> <g_i1|
-                                # ---->|-----------|
-                                #      |g_i1> <g_i1|
-
-                                                try:
-                                                    if verbose > 5:
-                                                        print(" * Generating R1f*", i1g, i2e)
-                
-                                                    lp = \
-                                                    diag.liouville_pathway("NR",
-                                                                           i1g,
-                                                                aggregate=self,
-                                                                order=3,pname="R2f*",
-                                                                popt_band=1,
-                                                                relax_order=1)
-                                                    
-                                                    # first transition lineshape
-                                                    width1 = \
-                                            self.get_transition_width((i2e, i1g))
-                                                    deph1 = \
-                                            self.get_transition_dephasing((i2e, 
-                                                                           i1g))
-                                                    # third transition lineshape
-                                                    width3 = \
-                                            self.get_transition_width((i4f,i3d))
-                                                    deph3 = \
-                                            self.get_transition_dephasing((i4f,
-                                                                           i3d))
-                                                    
-                                                    #      |g_i1> <g_i1|                                                           
-                                                    lp.add_transition((i2e,i1g),+1,
-                                                                      interval=1, 
-                                                                      width=width1, 
-                                                                      deph=deph1)
-                                                    #      |e_i2> <g_i1|
-                                                    lp.add_transition((i3e,i1g),-1)                                        
-                                                    #      |e_i2> <e_i3|
-                                                    lp.add_transfer(((i2d, i3d)),
-                                                                     (i2e, i3e))
-                                                    lp.set_evolution_factor(evf)
-                                                    #      |d_i2> <d_i3|                                        
-                                                    lp.add_transition((i4f,i2d),+1)
-                                                    #      |f_i4> <d_i3|
-                                                    lp.add_transition((i3d,i4f),+1,
-                                                                      interval=3, 
-                                                                      width=width3, 
-                                                                      deph=deph3)
-                                                    #      |d_i3> <d_i3|
-                
-                                                except:
-                                                    
-                                                    break
-                                                
-                                                lp.build()
-                                                lst.append(lp)
-                                                k += 1
+def generate_R1gE(self, lst, eUt2, pop_tol, dip_tol, evf_tol, verbose=0):
+    _generate_into_list(self, lst, "R1gE", eUt2, pop_tol, dip_tol,
+                        evf_tol, verbose)
 
 
+def generate_R2g(self, lst, eUt2, pop_tol, dip_tol, evf_tol, verbose=0):
+    _generate_into_list(self, lst, "R2g", eUt2, pop_tol, dip_tol,
+                        evf_tol, verbose)
 
-def generate_R1fE(self, lst, eUt2, pop_tol, dip_tol, evf_tol, verbose=0):
-    
-    ngs = self.get_electronic_groundstate()
-    nes = self.get_excitonic_band(band=1)
-    
-    if verbose > 0:
-        print("Liouville pathway R1f*E")    
-        print("Population tolerance: ", pop_tol)
-        print("Dipole tolerance:     ", dip_tol)
-        print("Evolution amplitude:  ", evf_tol)
-    
-    k = 0
-    l = 0
-    for i1g in ngs:
-    
-        if verbose > 0: 
-            print("Ground state: ", i1g, "of", len(ngs))
-        
-        # Only thermally allowed starting states are considered
-        if self.rho0[i1g,i1g] > pop_tol:
-    
-            for i2e in nes:
-                
-                if self.D2[i2e,i1g] > dip_tol:
-                
-                    for i3e in nes:
-                    
-                        if self.D2[i3e,i1g] > dip_tol:
-                             
-                            if verbose > 2:
-                                print("Excited state: ", i2e, i3e, "of",
-                                      nes[len(nes)-1])
-                            for i3g in ngs:
-                                for i2g in ngs:
-                                    if isinstance(eUt2,SuperOperator):
-                                        evf = eUt2.data[i3g, i2g, i3e, i2e]
-                                    else:
-                                        evf = eUt2.data(i3g, i2g, i3e, i2e)
-                                    if abs(evf) > evf_tol:
-                    
-                                        for i4e in nes:
-    
-                                            if ((self.D2[i4e,i3g] > dip_tol)
-                                            and (self.D2[i2g,i4e] > dip_tol)):
-                        
-                                                l += 1           
-    
-                        #      Diagram R1f*
-                        #
-                        #                                     
-                        #      |g_i2> <g_i2|
-                        # <----|-----------|
-                        #      |e_i4> <g_i2|
-                        # ---->|-----------|
-                        #      |g_i3> <g_i2|
-                        #      |***********|
-                        #      |e_i3> <e_i2|
-                        # ---->|-----------|
-                        #      |g_i1> <e_i2|
-                        #      |-----------|<----
-                        #      |g_i1> <g_i1|
-    
-                                                try:
-                                                    if verbose > 5:
-                                                        print(" * Generating R1f*E", i1g, i2e)
-                                                    lp = \
-                                                    diag.liouville_pathway("R",i1g,
-                                                               aggregate=self,
-                                                               order=3,pname="R1f*E",
-                                                               popt_band=1,
-                                                               relax_order=1)
-                                                    
-                                                    # first transition lineshape
-                                                    width1 = \
-                                            self.get_transition_width((i2e, i1g))
-                                                    deph1 = \
-                                            self.get_transition_dephasing((i2e, 
-                                                                           i1g))
-                                                    # third transition lineshape
-                                                    width3 = \
-                                            self.get_transition_width((i4e,i2g))
-                                                    deph3 = \
-                                            self.get_transition_dephasing((i4e,
-                                                                           i2g))
-                                                    
-                                                    #      |g_i1> <g_i1|                                                           
-                                                    lp.add_transition((i2e,i1g),-1,
-                                                                      interval=1, 
-                                                                      width=width1, 
-                                                                      deph=deph1)
-                                                    #      |g_i1> <e_i2|
-                                                    lp.add_transition((i3e,i1g),+1)
-                                                    #      |e_i3> <e_i2|
-                                                    lp.add_transfer(((i3g, i2g)),
-                                                                     (i3e, i2e))
-                                                    lp.set_evolution_factor(evf)
-                                                    #      |g_i3> <g_i2|                                        
-                                                    lp.add_transition((i4e,i3g),+1)
-                                                    #      |e_i4> <g_i2|
-                                                    lp.add_transition((i2g,i4e),+1,
-                                                                      interval=3, 
-                                                                      width=width3, 
-                                                                      deph=deph3)
-                                                    #      |g_i2> <g_i2|
-                    
-                                                except:
-                                                    
-                                                    raise Exception("Construction"+
-                                                    "relaxation pathway failed")
-                                        
-                                                lp.build()
-                                                lst.append(lp)
-                                                k += 1
 
-def generate_R2fE(self, lst, eUt2, pop_tol, dip_tol, evf_tol, verbose=0):
-    
-    ngs = self.get_electronic_groundstate()
-    nes = self.get_excitonic_band(band=1)
-    
-    if verbose > 0:
-        print("Liouville pathway R2f*E")
-        print("Population tolerance: ", pop_tol)
-        print("Dipole tolerance:     ", dip_tol)
-        print("Evolution amplitude:  ", evf_tol)
+def generate_R2gE(self, lst, eUt2, pop_tol, dip_tol, evf_tol, verbose=0):
+    _generate_into_list(self, lst, "R2gE", eUt2, pop_tol, dip_tol,
+                        evf_tol, verbose)
 
-    k = 0
-    l = 0
-    for i1g in ngs:
 
-        if verbose > 0: 
-            print("Ground state: ", i1g, "of", len(ngs))
-        
-        # Only thermally allowed starting states are considered
-        if self.rho0[i1g,i1g] > pop_tol:
-    
-            for i2e in nes:
-                
-                if self.D2[i2e,i1g] > dip_tol:
-                
-                    for i3e in nes:
-                    
-                        if self.D2[i3e,i1g] > dip_tol:
-                    
-                            if verbose > 2:
-                                print("Excited state: ", i2e, i3e, "of",
-                                      nes[len(nes)-1])
-                                
-                            for i2g in ngs:
-                                for i3g in ngs:
-                                    if isinstance(eUt2,SuperOperator):
-                                        evf = eUt2.data[i2g, i3g, i2e, i3e]
-                                    else:
-                                        evf = eUt2.data(i2g, i3g, i2e, i3e)
-                                    if abs(evf) > evf_tol:
-
-                                        for i4e in nes:
-
-                                            if ((self.D2[i4e,i2g] > dip_tol)
-                                            and (self.D2[i3g,i4e] > dip_tol)):
-                                
-                                                l += 1
-                                
+def generate_R3g(self, lst, eUt2, pop_tol, dip_tol, verbose=0):
+    _generate_into_list(self, lst, "R3g", eUt2, pop_tol, dip_tol,
+                        verbose=verbose)
 
-                                #      Diagram R2f*E
-                                #
-                                #                                     
-                                #      |g_i3> <g_i3|
-                                # <----|-----------|
-                                #      |e_i4> <g_i3|
-                                # ---->|-----------|
-                                #      |g_i2> <g_i3|
-                                #      |***********|
-                                #      |e_i2> <e_i3|
-                                #      |-----------|<----
-                                #      |e_i2> <g_i1|
-                                # ---->|-----------|
-                                #      |g_i1> <g_i1|
-
-                                                try:
-                                                    if verbose > 5:
-                                                        print(" * Generating R1f*E", i1g, i2e)
-                
-                                                    lp = \
-                                                    diag.liouville_pathway("NR",
-                                                                           i1g,
-                                                                aggregate=self,
-                                                                order=3,pname="R2f*E",
-                                                                popt_band=1,
-                                                                relax_order=1)
-                                                    
-                                                    # first transition lineshape
-                                                    width1 = \
-                                            self.get_transition_width((i2e, i1g))
-                                                    deph1 = \
-                                            self.get_transition_dephasing((i2e, 
-                                                                           i1g))
-                                                    # third transition lineshape
-                                                    width3 = \
-                                            self.get_transition_width((i4e,i3g))
-                                                    deph3 = \
-                                            self.get_transition_dephasing((i4e,
-                                                                           i3g))
-                                                    
-                                                    #      |g_i1> <g_i1|                                                           
-                                                    lp.add_transition((i2e,i1g),+1,
-                                                                      interval=1, 
-                                                                      width=width1, 
-                                                                      deph=deph1)
-                                                    #      |e_i2> <g_i1|
-                                                    lp.add_transition((i3e,i1g),-1)                                        
-                                                    #      |e_i2> <e_i3|
-                                                    lp.add_transfer(((i2g, i3g)),
-                                                                     (i2e, i3e))
-                                                    lp.set_evolution_factor(evf)
-                                                    #      |g_i2> <g_i3|                                        
-                                                    lp.add_transition((i4e,i2g),+1)
-                                                    #      |e_i4> <g_i3|
-                                                    lp.add_transition((i3g,i4e),+1,
-                                                                      interval=3, 
-                                                                      width=width3, 
-                                                                      deph=deph3)
-                                                    #      |g_i3> <g_i3|
-                
-                                                except:
-                                                    
-                                                    break
-                                                
-                                                lp.build()
-                                                lst.append(lp)
-                                                k += 1
 
+def generate_R4g(self, lst, eUt2, pop_tol, dip_tol, verbose=0):
+    _generate_into_list(self, lst, "R4g", eUt2, pop_tol, dip_tol,
+                        verbose=verbose)
 
 
+def generate_R1f(self, lst, eUt2, pop_tol, dip_tol, evf_tol, verbose=0):
+    _generate_into_list(self, lst, "R1f*", eUt2, pop_tol, dip_tol,
+                        evf_tol, verbose)
 
-def generate_1orderP_sec(self, lst, pop_tol, dip_tol, verbose=0):
-    
-    ngs = self.get_electronic_groundstate()
-    nes = self.get_excitonic_band(band=1)
-    
-    if verbose > 0:
-        print("Liouville pathway of first order")
-        print("Population tolerance: ", pop_tol)
-        print("Dipole tolerance:     ", dip_tol)
 
-    k = 0
-    l = 0
-    for i1g in ngs:
+def generate_R2f(self, lst, eUt2, pop_tol, dip_tol, evf_tol, verbose=0):
+    _generate_into_list(self, lst, "R2f*", eUt2, pop_tol, dip_tol,
+                        evf_tol, verbose)
 
-        if verbose > 0: 
-            print("Ground state: ", i1g, "of", len(ngs))
-        
-        # Only thermally allowed starting states are considered
-        if self.rho0[i1g,i1g] > pop_tol:
-    
-            for i2e in nes:
-                
-                if self.D2[i2e,i1g] > dip_tol:
-                
-                                
-                    l += 1
-                                
 
-                    #      Diagram P1
-                    #
-                    #                                     
-                    #      |g_i1> <g_i1|
-                    # <----|-----------|
-                    #      |e_i2> <g_i1|
-                    # ---->|-----------|
-                    #      |g_i1> <g_i1|
-
-                    try:
-                        if verbose > 5:
-                            print(" * Generating P1", i1g, i2e)
-
-                        lp = \
-                        diag.liouville_pathway("NR",
-                                               i1g,
-                                    aggregate=self,
-                                    order=1,pname="P1",
-                                    popt_band=1,
-                                    relax_order=1)
-                        
-                        # first transition lineshape
-                        width1 = \
-                            self.get_transition_width((i2e, i1g))
-                        deph1 = \
-                            self.get_transition_dephasing((i2e, 
-                                               i1g))
-                        
-                        #      |g_i1> <g_i1|                                                           
-                        lp.add_transition((i2e,i1g),+1,
-                                          interval=1, 
-                                          width=width1, 
-                                          deph=deph1)
-                        #      |e_i2> <g_i1|
-                        lp.add_transition((i1g,i2e),+1,
-                                          interval=1, 
-                                          width=width1, 
-                                          deph=deph1)
-                        #      |g_i1> <g_i1|
-
-                    except:
-                        
-                        break
-                    
-                    lp.build()
-                    lst.append(lp)
-                    k += 1
+def generate_R1fE(self, lst, eUt2, pop_tol, dip_tol, evf_tol, verbose=0):
+    _generate_into_list(self, lst, "R1f*E", eUt2, pop_tol, dip_tol,
+                        evf_tol, verbose)
+
+
+def generate_R2fE(self, lst, eUt2, pop_tol, dip_tol, evf_tol, verbose=0):
+    _generate_into_list(self, lst, "R2f*E", eUt2, pop_tol, dip_tol,
+                        evf_tol, verbose)
+
+
+def generate_1orderP_sec(self, lst, pop_tol, dip_tol, verbose=0):
+    _generate_into_list(self, lst, "P1", None, pop_tol, dip_tol,
+                        verbose=verbose, order=1)
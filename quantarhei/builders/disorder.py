@@ -3,8 +3,30 @@ import numpy
 
 
 class Disorder:
+    """Static disorder of the energies of an excitonic Hamiltonian
     
-
+    Parameters
+    ----------
+    
+    data : numpy.array
+        Hamiltonian matrix without disorder. The disorder is added to its
+        diagonal elements, except for the first (ground state) one.
+        
+    distribution : str
+        Type of the distribution of the disorder. Only "Gaussian" is
+        currently supported. Its width (half width at half maximum) is
+        set by the `set_distribution` method.
+        
+    dtype : str
+        Type of the disorder. Only "diagonal" is currently supported.
+        
+    seed : int
+        Seed of the random numbers. It seeds the global `numpy.random`
+        state used by the `disorder_update` method, and the sequence of
+        independent seeds of the realizations of the ensemble (see the
+        `get_Hamiltonians` method).
+        
+    """
         
     def __init__(self, data=None, distribution="Gaussian", dtype="diagonal",
                  seed=None):
@@ -20,6 +42,10 @@ class Disorder:
 
         if seed is not None:
             numpy.random.seed(seed)        
+            
+        # independent seeds of the realizations are spawned from here
+        self.seed_sequence = numpy.random.SeedSequence(seed)
+            
         
     def disorder_update(self, i_dis, H, ignore_first=False):
         """Adds disorder to an excitonic Hamiltonian 
@@ -43,8 +69,8 @@ class Disorder:
                 raise Exception("Unknown distribution")
     
             # Update the Hamiltonian energies
-            for i in range(N):
-                H._data[1+i,1+i] = self.data[1+i,1+i] + de[i]
+            ii = numpy.arange(1, N+1)
+            H._data[ii,ii] = self.data[ii,ii] + de
 
         else:
             
@@ -60,3 +86,118 @@ class Disorder:
         else:
             
             raise Exception("Unknown distribution")
+
+
+    def get_realization_seeds(self, Nreal):
+        """Returns seeds of the first `Nreal` realizations of the disorder
+        
+        The seeds are spawned from the seed sequence of the object, so that
+        the realization with a given index is always the same, irrespective
+        of how many realizations are calculated, and in which order or by 
+        which process they are calculated.
+        
+        """
+        if len(self.seed_pool) < Nreal:
+            self.seed_pool += \
+                self.seed_sequence.spawn(Nreal - len(self.seed_pool))
+        return self.seed_pool[0:Nreal]
+    
+    
+    def get_energy_shifts(self, realizations):
+        """Returns energy shifts of the states in a set of realizations
+        
+        Parameters
+        ----------
+        
+        realizations : iterable of int
+            Indices of the realizations
+            
+        Returns
+        -------
+        
+        de : numpy.array
+            Energy shifts of shape (number of realizations, N), where N 
+            is the number of states with disorder
+            
+        """
+        realizations = list(realizations)
+        N = self.shape[0] - 1
+        de = numpy.zeros((len(realizations), N), dtype=numpy.float64)
+        if len(realizations) == 0:
+            return de
+        
+        seeds = self.get_realization_seeds(max(realizations)+1)
+        
+        if self.dtype == "diagonal":
+            
+            if self.distribution == "Gaussian":
+                
+                sigma = self.width/numpy.sqrt(2.0*numpy.log(2))
+                
+                for k, ri in enumerate(realizations):
+                    rng = numpy.random.default_rng(seeds[ri])
+                    de[k,:] = rng.normal(0.0, sigma, N)
+                    
+            else:
+                
+                raise Exception("Unknown distribution")
+                
+        else:
+            
+            raise Exception("Unknown disorder type")
+            
+        return de
+    
+    
+    def get_Hamiltonians(self, realizations, ignore_first=False):
+        """Returns Hamiltonian matrices of a set of disorder realizations
+        
+        Parameters
+        ----------
+        
+        realizations : iterable of int
+            Indices of the realizations
+            
+        ignore_first : bool
+            If True, the realization with index 0 is without disorder
+            
+        Returns
+        -------
+        
+        HH : numpy.array
+            Stack of Hamiltonian matrices of shape (number of realizations,
+            N+1, N+1)
+            
+        """
+        realizations = list(realizations)
+        de = self.get_energy_shifts(realizations)
+        if ignore_first:
+            de[numpy.array(realizations) == 0,:] = 0.0
+        
+        HH = numpy.empty((len(realizations),) + self.shape, 
+                         dtype=self.data.dtype)
+        HH[:,:,:] = self.data
+        ii = numpy.arange(1, self.shape[0])
+        HH[:,ii,ii] += de
+        
+        return HH
+    
+    
+    def diagonalize_Hamiltonians(self, realizations, ignore_first=False):
+        """Returns eigenvalues and eigenvectors of a set of realizations
+        
+        All Hamiltonians are diagonalized in one batched call
+        
+        Returns
+        -------
+        
+        ee : numpy.array
+            Eigenvalues of shape (number of realizations, N+1)
+            
+        SS : numpy.array
+            Diagonalization matrices of shape (number of realizations, 
+            N+1, N+1); the eigenvectors of a realization are its columns
+            
+        """
+        HH = self.get_Hamiltonians(realizations, ignore_first=ignore_first)
+        return numpy.linalg.eigh(HH)
@@ -119,7 +119,6 @@ from .. import REAL
 
 
 #FIXME Check the posibility to set a derivative of the spline at the edges
-#FIXME Enable vectorial arguments and values
 class DFunction(Saveable, DataSaveable):
     """Discrete function with interpolation
 
@@ -134,7 +133,7 @@ class DFunction(Saveable, DataSaveable):
 
     """
 
-    allowed_interp_types = ("linear", "spline", "default")
+    allowed_interp_types = ("linear", "cubic", "spline", "default")
 
     def __init__(self, x=None, y=None):
 
@@ -149,6 +148,23 @@ class DFunction(Saveable, DataSaveable):
 
         self._splines_initialized = False
 
+    @property
+    def data(self):
+        """Values of the function
+        
+        Spline interpolation is recalculated when the values are set.
+        After individual elements are changed in place, the values
+        have to be set again for the splines to follow them.
+        
+        """
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+        # splines have to be recalculated from the new values
+        self._splines_initialized = False
+
     def _make_me(self, x, y):
         """Creates the DFunction internals
         
@@ -244,20 +260,16 @@ class DFunction(Saveable, DataSaveable):
             
             # we trim to the new axis
             ndata = numpy.zeros(axis.length, dtype=self.data.dtype)
-            for ii in range(axis.length):
-                ndata[ii] = self.at(axis.data[ii])
+            ndata[:] = self.at(axis.data)
                 
             self.__init__(x=axis, y=ndata)
                 
         elif self.axis.is_subsection_of(axis):
             # we zero pad the values
             ndata = numpy.zeros(axis.length, dtype=self.data.dtype)
-            for ii in range(axis.length):
-                x = axis.data[ii]
-                if (x >= self.axis.min) and (x <= self.axis.max):
-                    ndata[ii] = self.at(axis.data[ii])
-                else:
-                    ndata[ii] = 0.0
+            inside = ((axis.data >= self.axis.min) 
+                      & (axis.data <= self.axis.max))
+            ndata[inside] = self.at(axis.data[inside])
                 
             self.__init__(x=axis, y=ndata)
         
@@ -265,7 +277,7 @@ class DFunction(Saveable, DataSaveable):
             raise Exception("Incompatible axis")
         
 
-    def at(self, x, approx="default"):
+    def at(self, x, approx="default", deriv=0):
         """Returns the function value at the argument `x`
         
         Returns the value of the function at a given value of argument `x`. The
@@ -276,11 +288,17 @@ class DFunction(Saveable, DataSaveable):
         Parameters
         ----------
 
-        x : number
+        x : number or array of numbers
             Function argument
 
-        approx : string {"default","linear","spline"}
-            Type of interpolation
+        approx : string {"default","linear","cubic","spline"}
+            Type of interpolation. The "cubic" interpolation is piecewise
+            cubic with the derivatives at the points of the axis given by
+            finite differences; unlike splines, it does not require any
+            setup.
+
+        deriv : int
+            Order of the derivative of the interpolant to return
 
         """
 
@@ -294,9 +312,11 @@ class DFunction(Saveable, DataSaveable):
                 approx = "spline"
 
         if approx == "linear":
-            return self._get_linear_approx(x)
+            return self._get_linear_approx(x, deriv)
+        elif approx == "cubic":
+            return self._get_cubic_approx(x, deriv)
         elif approx == "spline":
-            return self._get_spline_approx(x)
+            return self._get_spline_approx(x, deriv)
 
     #
     #
@@ -304,55 +324,71 @@ class DFunction(Saveable, DataSaveable):
     #
     #
 
-    def _get_linear_approx(self, x_in):
+    def _locate_interval(self, x_in):
+        """Returns interval indices and relative positions in the intervals
+
+        The last point of the axis is assigned to the last interval, 
+        so that arguments beyond it are extrapolated from this interval.
+
+        """
+        n, dval = self.axis.locate(x_in)
+        nb = numpy.minimum(n, self.axis.length-2)
+        tt = (dval + (n - nb)*self.axis.step)/self.axis.step
+        return nb, tt
+
+
+    def _get_linear_approx(self, x_in, deriv=0):
         """Returns linear interpolation of the function
 
         """
-        # FIXME: we need qr.FLOAT or more flexible, here
-        try:
-            ln = len(x_in)
-        except:
-            ln = 0
-        
-        if ln > 0:
-                
-            val = numpy.zeros(len(x_in), dtype=self.data.dtype)
-            k_i = 0
-            for x in x_in:
-#                n,dval = self.axis.locate(x)
-#                if n+1 >= self.axis.length:
-#                    val[k_i] = self.data[n] \
-#                    + dval/self.axis.step*(self.data[n]-self.data[n-1])
-#                else:
-#                    val[k_i] = self.data[n] \
-#                    + dval/self.axis.step*(self.data[n+1]-self.data[n])
-                val[k_i] = self._approx_point(x)
-                k_i += 1
-        else:
-            val = self._approx_point(x_in)
-            
-        return val
+        nb, tt = self._locate_interval(x_in)
+        slope = self.data[nb+1] - self.data[nb]
+        if deriv == 0:
+            return self.data[nb] + tt*slope
+        elif deriv == 1:
+            return slope/self.axis.step
+        return 0.0*slope
 
 
-    def _approx_point(self, x):
-        
-        n, dval = self.axis.locate(x)
-        if n+1 >= self.axis.length:
-            val = self.data[n] \
-            + dval/self.axis.step*(self.data[n]-self.data[n-1])
-        else:
-            val = self.data[n] \
-            + dval/self.axis.step*(self.data[n+1]-self.data[n])
-        return val
-    
-        
-    def _get_spline_approx(self, x):
+    def _get_cubic_approx(self, x_in, deriv=0):
+        """Returns piecewise cubic (Hermite) interpolation of the function
+
+        The tangents at the points of the axis are central differences
+        (one-sided at the ends of the axis).
+
+        """
+        if self.axis.length < 3:
+            return self._get_linear_approx(x_in, deriv)
+
+        nb, tt = self._locate_interval(x_in)
+
+        mm = numpy.gradient(self.data)
+        y0 = self.data[nb]
+        y1 = self.data[nb+1]
+        m0 = mm[nb]
+        m1 = mm[nb+1]
+
+        # coefficients of y(t) = c0 + c1*t + c2*t^2 + c3*t^3
+        c2 = 3.0*(y1 - y0) - 2.0*m0 - m1
+        c3 = 2.0*(y0 - y1) + m0 + m1
+        if deriv == 0:
+            return y0 + tt*(m0 + tt*(c2 + tt*c3))
+        elif deriv == 1:
+            return (m0 + tt*(2.0*c2 + 3.0*tt*c3))/self.axis.step
+        elif deriv == 2:
+            return (2.0*c2 + 6.0*tt*c3)/self.axis.step**2
+        elif deriv == 3:
+            return 6.0*c3/self.axis.step**3
+        return 0.0*y0
+
+        
+    def _get_spline_approx(self, x, deriv=0):
         """Returns spline interpolation of the function
 
         """
         if not self._splines_initialized:
             self._set_splines()
-        return self._spline_value(x)
+        return self._spline_value(x, deriv)
 
     def _set_splines(self):
         """Calculates the spline representation of the function
@@ -370,14 +406,14 @@ class DFunction(Saveable, DataSaveable):
         self._splines_initialized = True
         #print("Calculating splines")
 
-    def _spline_value(self, x):
+    def _spline_value(self, x, deriv=0):
         """Returns the splie interpolated value of the function
 
         """
         if self._has_imag:
-            ret = self._spline_r(x) + 1j*self._spline_i(x)
+            ret = self._spline_r(x, nu=deriv) + 1j*self._spline_i(x, nu=deriv)
         else:
-            ret = self._spline_r(x)
+            ret = self._spline_r(x, nu=deriv)
         return ret
 
     def __add__(self, other):
@@ -403,8 +439,6 @@ class DFunction(Saveable, DataSaveable):
         
         """
         self.data = func(self.data)
-        if self._splines_initialized:
-            self._splines_initiated = False
 
 
     #
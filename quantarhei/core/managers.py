@@ -62,6 +62,7 @@ import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
 import json
+import weakref
 import pkg_resources
 
 import numpy
@@ -267,6 +268,9 @@ class Manager(metaclass=Singleton):
         self.basis_transformations = []
         self.basis_transformations.append(1)
         self.basis_registered = {}
+        self._basis_chains = {}
+        self.basis_registration_count = 0
+        self.basis_transformation_count = 0
         
         self.warn_about_basis_change = False
         self.warn_about_basis_changing_objects = False
@@ -737,8 +741,56 @@ class Manager(metaclass=Singleton):
         nb = self.get_current_basis() + 1
         self.basis_stack.append(nb)
         self.basis_transformations.append(SS)
-        self.basis_registered[nb] = []
+        self.basis_registered[nb] = weakref.WeakValueDictionary()
+        self._basis_chains.clear()
         return nb
+    
+    def leave_current_basis(self):
+        """Removes the current basis from the stack
+        
+        Returns the id of the basis, the transformation matrix with which
+        it was entered and the objects registered with it.
+        
+        """
+        bb = self.basis_stack.pop()
+        SS = self.basis_transformations.pop()
+        registered = self.basis_registered.pop(bb)
+        self._basis_chains.clear()
+        return bb, SS, list(registered.values())
+        
+    def _get_basis_chain(self, ob, dim):
+        """Transformation matrix from the basis `ob` to the current basis
+        
+        The product of the transformations along the stack is calculated
+        once per stack configuration and stored.
+        
+        """
+        try:
+            return self._basis_chains[ob, dim]
+        except KeyError:
+            pass
+
+        SS = numpy.diag(numpy.ones(dim))
+        # find out if current basis of the object is in the stack (i.e. it 
+        # was used sometime in the past)
+        if ob in self.basis_stack:
+            sl = len(self.basis_stack)
+            # scroll back over the bases
+            for k in range(1,sl):
+
+                # take the basis transformation to the earlier used basis
+                ZZ = self.basis_transformations[sl-k]
+
+                # included it into the transformation matrix
+                SS = numpy.dot(ZZ,SS)                
+                # if the basis is found, break away from the loop
+                if self.basis_stack[sl-k-1] == ob:
+                    break
+        else:
+            raise Exception("Basis of the object is not on stack.")
+        
+        self._basis_chains[ob, dim] = SS
+        return SS
         
     def transform_to_current_basis(self, operator):
         """Transforms an operator to the currently used basis
@@ -764,32 +816,43 @@ class Manager(metaclass=Singleton):
                 
         if ob != cb:
                             
-            SS = numpy.diag(numpy.ones(operator.dim))
-            # find out if current basis of the object is in the stack (i.e. it 
-            # was used sometime in the past)
-            if ob in self.basis_stack:
-                sl = len(self.basis_stack)
-                # scroll back over the bases
-                for k in range(1,sl):
-
-                    # take the basis transformation to the earlier used basis
-                    ZZ = self.basis_transformations[sl-k]
-
-                    # included it into the transformation matrix
-                    SS = numpy.dot(ZZ,SS)                
-                    # if the basis is found, break away from the loop
-                    if self.basis_stack[sl-k-1] == ob:
-                        break
-            else:
-                raise Exception("Basis of the object is not on stack.")
+            SS = self._get_basis_chain(ob, operator.dim)
             
             operator.transform(SS)
+            self.basis_transformation_count += 1
             operator.set_current_basis(cb)
             self.register_with_basis(cb,operator)
         
 
     def register_with_basis(self,nb,operator):
-        self.basis_registered[nb].append(operator)
+        """Registers an object to be transformed back when the basis is left
+        
+        Only weak references are stored, objects are removed from 
+        the registry when they are garbage collected.
+        
+        """
+        self.basis_registered[nb][id(operator)] = operator
+        self.basis_registration_count += 1
+        
+    def is_registered_with_basis(self, nb, operator):
+        """Returns True if the object is registered with the basis `nb`
+        
+        """
+        try:
+            return id(operator) in self.basis_registered[nb]
+        except KeyError:
+            return False
+        
+    def get_basis_info(self):
+        """Returns a dictionary with statistics of the basis management
+        
+        """
+        return dict(depth=len(self.basis_stack)-1,
+                    registered=sum(len(reg) for reg in 
+                                   self.basis_registered.values()),
+                    registrations=self.basis_registration_count,
+                    transformations=self.basis_transformation_count,
+                    chains=len(self._basis_chains))
         
         
     def get_DistributedConfiguration(self):
@@ -1047,10 +1110,9 @@ class eigenbasis_of(basis_context_manager):
         if self.manager.warn_about_basis_change:
             print("\nQr >>> Returning from basis context manager. Cleaning ...")  
             
-        # This is the basis we are leaving
-        bb = self.manager.basis_stack.pop()
-        # this is the transformation we got here with
-        SS = self.manager.basis_transformations.pop()
+        # This is the basis we are leaving, the transformation we got
+        # here with and the objects which are still alive in it
+        bb, SS, operators = self.manager.leave_current_basis()
         # This is the new basis
         bss = len(self.manager.basis_stack)
         nb = self.manager.basis_stack[bss-1]
@@ -1059,28 +1121,21 @@ class eigenbasis_of(basis_context_manager):
         S1 = numpy.linalg.inv(SS)     
         
         # transform all registered objects
-        operators = self.manager.basis_registered[bb]
-        
-        if nb != 0:
-            # operators registered with the context above this one
-            ops_above = self.manager.basis_registered[nb]
-
         for op in operators:
             # the operator might have been set to protected mode
             # inside the context
             if not op.is_basis_protected:
                 op.transform(S1,inv=SS) 
+                self.manager.basis_transformation_count += 1
             op.set_current_basis(nb)
             
             # operators which appeared in this context and where not
             # register in the one above are now registerd
             if nb != 0:
-                if op not in ops_above:
+                if not self.manager.is_registered_with_basis(nb, op):
                     self.manager.register_with_basis(nb,op)
             
         self.manager.remove_current_basis_operator()
-            
-        del self.manager.basis_registered[bb]
 
         if self.manager.warn_about_basis_change:
             print("\nQr >>> ... cleaning done")        
@@ -170,11 +170,19 @@ class ValueAxis(Saveable):
         Parameters
         ----------
 
-        val : float
-            A value within the min and max values of the axis
+        val : float or array of floats
+            A value within the min and max values of the axis. For an array
+            of values, arrays of indices and distances are returned
 
         """
 
+        if numpy.ndim(val) > 0:
+            val = numpy.asarray(val)
+            nsni = numpy.floor((val-self.start)/self.step).astype(int)
+            if numpy.any(nsni < 0) or numpy.any(nsni >= self.length):
+                raise Exception("Value out of bounds")
+            return nsni, val-self.data[nsni]
+
         # nearest smaller neighbor index
         nsni = numpy.int(numpy.floor((val-self.start)/self.step))
 
@@ -5,6 +5,9 @@
     cfmatrix module
 
 """
+from collections import OrderedDict
+import hashlib
+
 import numpy
 
 from ...core.saveable import Saveable
@@ -12,6 +15,10 @@ from ...core.time import TimeAxis
 
 from .correlationfunctions import c2h
 from .correlationfunctions import c2g
+from .correlationfunctions import exp2hoft
+from .correlationfunctions import exp2goft
+from .correlationfunctions import half_fourier_sum
+from .correlationfunctions import half_fourier_transform
 from ... import REAL, COMPLEX
 
 
@@ -37,8 +44,23 @@ class CorrelationFunctionMatrix(Saveable):
     or have a cross-correlation specified by a completely different function
     (which then should be on the list of functions).
 
+    Integrals of the correlation functions (the first integral, the
+    lineshape function and the interpolant of the one-sided Fourier
+    transform) are stored in a cache which is shared by all instances of
+    the class. The cache is keyed by the time axis and the values of the
+    correlation function, so that matrices built repeatedly for the same
+    bath (e.g. for different realizations of disorder) integrate each
+    function only once. The cache holds at most `spectral_cache_size`
+    items; the least recently used items are discarded first.
+
     """
 
+    # cache of integrals shared by all instances
+    _spectral_cache = OrderedDict()
+    _spectral_cache_hits = 0
+    _spectral_cache_misses = 0
+    spectral_cache_size = 64
+
     def __init__(self, timeaxis=TimeAxis(0.0,1,1.0), nob=0, nof=0):
         # Number of baths
         self.nob = nob
@@ -53,6 +75,7 @@ class CorrelationFunctionMatrix(Saveable):
 
         self._A2 = None
         self._A4 = None
+        self._W4 = None
 
         # empty list for functions
         self.cfuncs = None
@@ -99,8 +122,11 @@ class CorrelationFunctionMatrix(Saveable):
         if self._is_transformed:
             self._A4 = numpy.zeros((nob, nob, nob, nob, nof),
                                    dtype=REAL)
+            self._W4 = numpy.zeros((nob, nob, nob, nob, nof),
+                                   dtype=REAL)
         else:
             self._A4 = None
+            self._W4 = None
 
         # empty list for functions
         self.cfuncs = [None]*(nof+1)
@@ -114,6 +140,9 @@ class CorrelationFunctionMatrix(Saveable):
         # here we store correlation functions
         self._cofts = numpy.zeros((nof+1, self.timeAxis.length),
                                   dtype=COMPLEX)
+        # integrals have to be recalculated
+        self._hofts = None
+        self._gofts = None
 
         self.data = self._cofts
 
@@ -131,6 +160,7 @@ class CorrelationFunctionMatrix(Saveable):
         save_A2 = self._A2
         if self._is_transformed:
             save_A4 = self._A4
+            save_W4 = self._W4
         save_cfunc = self.cfuncs
         save_lambdas = self.lambdas
         save_where = self.where
@@ -146,6 +176,7 @@ class CorrelationFunctionMatrix(Saveable):
         self._A2[:,:,0:nof+1] = save_A2
         if self._is_transformed:
             self._A4[:,:,:,:,0:nof] = save_A4
+            self._W4[:,:,:,:,0:nof] = save_W4
         for i in range(nof+1):
             self.cfuncs[i] = save_cfunc[i]
             self.lambdas[i] = save_lambdas[i]
@@ -224,10 +255,7 @@ class CorrelationFunctionMatrix(Saveable):
 
         """
         if self._is_transformed:
-            lm = 0.0
-            for k in range(self.nof):
-                lm += self._A4[a,b,c,d,k]
-            return lm
+            return numpy.sum(self._A4[a,b,c,d,:])
         else:
             raise Exception()
 
@@ -251,6 +279,8 @@ class CorrelationFunctionMatrix(Saveable):
         n, m : int
             indices of the matrix
         """
+        if self._hofts is None:
+            self.create_one_integral()
         return self._hofts[self.cpointer[n,m],:]
 
 
@@ -262,20 +292,19 @@ class CorrelationFunctionMatrix(Saveable):
         n, m : int
             indices of the matrix
         """
+        if self._gofts is None:
+            self.create_double_integral()
         return self._gofts[self.cpointer[n,m],:]
 
 
     def get_coft4(self,a,b,c,d):
         if self._is_transformed:
-            ret = numpy.zeros(self.timeAxis.length, dtype=COMPLEX)
-            for k in range(self.nof):
-                ret += self._A4[a,b,c,d,k]*self._cofts[k+1,:]
-            return ret
+            return numpy.dot(self._W4[a,b,c,d,:], self._cofts[1:,:])
         else:
             raise Exception()
 
 
-    def get_coft_matrix(self,t=None):
+    def get_coft_matrix(self, t=None, subset=None):
         """Returns full matrix of correlation functions
 
         It is expected that the matrix is transformed into new basis after
@@ -287,40 +316,27 @@ class CorrelationFunctionMatrix(Saveable):
             If t is specified, the routine returns the matrix
             at the particular time, otherwise a full matrix is returned.
 
+        subset : str, optional
+            Four letters specifying a subset of the elements of the matrix,
+            e.g. "aabb" returns the elements [a,a,b,b] as an array with
+            the indices [a,b]. Distinct letters correspond to independent
+            indices in the order of their first appearance. By default,
+            all elements are returned.
 
         """
-        nob = self.nob
-        if self._is_transformed:
-            if t is None:
-                Nt = self.max_cutoff_index
-                print(Nt)
-                ret = numpy.zeros((nob,nob,nob,nob,Nt),dtype=COMPLEX)
-                for k in range(self.nof):
-                    for it in range(Nt):
-                        ret[:,:,:,:,it] += self._A4[:,:,:,:,k]\
-                        *self._cofts[k+1,it]
-                return ret
-            else:
-                ret = numpy.zeros((nob,nob,nob,nob),dtype=COMPLEX)
-                it = self.timeAxis.nearest(t)
-                for k in range(self.nof):
-                    ret += self._A4[:,:,:,:,k]*self._cofts[k+1,it]
-                return ret
-        else:
-            raise Exception()
+        return self._get_function_matrix(self._cofts, t, subset)
 
 
     def get_hoft4(self,a,b,c,d):
         if self._is_transformed:
-            ret = numpy.zeros(self.timeAxis.length, dtype=COMPLEX)
-            for k in range(self.nof):
-                ret += self._A4[a,b,c,d,k]*self._hofts[k+1,:]
-            return ret
+            if self._hofts is None:
+                self.create_one_integral()
+            return numpy.dot(self._W4[a,b,c,d,:], self._hofts[1:,:])
         else:
             raise Exception()
 
 
-    def get_hoft_matrix(self,t=None):
+    def get_hoft_matrix(self, t=None, subset=None):
         """Returns full matrix of once integrated correlation functions
 
         It is expected that the matrix is transformed into new basis after
@@ -332,39 +348,26 @@ class CorrelationFunctionMatrix(Saveable):
             If t is specified, the routine returns the matrix
             at the particular time, otherwise a full matrix is returned.
 
+        subset : str, optional
+            Four letters specifying a subset of the elements of the matrix
+            (see `get_coft_matrix`)
 
         """
-        nob = self.nob
-        if self._is_transformed:
-            if t is None:
-                Nt = self.max_cutoff_index
-                ret = numpy.zeros((nob,nob,nob,nob,Nt),dtype=COMPLEX)
-                for k in range(self.nof):
-                    for it in range(Nt):
-                        ret[:,:,:,:,it] += self._A4[:,:,:,:,k]\
-                        *self._hofts[k+1,it]
-                return ret
-            else:
-                ret = numpy.zeros((nob,nob,nob,nob),dtype=COMPLEX)
-                it = self.timeAxis.nearest(t)
-                for k in range(self.nof):
-                    ret += self._A4[:,:,:,:,k]*self._hofts[k+1,it]
-                return ret
-        else:
-            raise Exception()
+        if self._hofts is None:
+            self.create_one_integral()
+        return self._get_function_matrix(self._hofts, t, subset)
 
 
     def get_goft4(self,a,b,c,d):
         if self._is_transformed:
-            ret = numpy.zeros(self.timeAxis.length, dtype=COMPLEX)
-            for k in range(self.nof):
-                ret += self._A4[a,b,c,d,k]*self._gofts[k+1,:]
-            return ret
+            if self._gofts is None:
+                self.create_double_integral()
+            return numpy.dot(self._W4[a,b,c,d,:], self._gofts[1:,:])
         else:
             raise Exception()
 
 
-    def get_goft_matrix(self,t=None):
+    def get_goft_matrix(self, t=None, subset=None):
         """Returns full matrix of lineshape functions
 
         It is expected that the matrix is transformed into new basis after
@@ -376,24 +379,63 @@ class CorrelationFunctionMatrix(Saveable):
             If t is specified, the routine returns the matrix
             at the particular time, otherwise a full matrix is returned.
 
+        subset : str, optional
+            Four letters specifying a subset of the elements of the matrix
+            (see `get_coft_matrix`)
+
+        """
+        if self._gofts is None:
+            self.create_double_integral()
+        return self._get_function_matrix(self._gofts, t, subset)
+
+
+    def get_reorganization_energy_matrix(self, subset=None):
+        """Returns the matrix of reorganization energies in transformed basis
+
+        Parameters
+        ----------
+        subset : str, optional
+            Four letters specifying a subset of the elements of the matrix
+            (see `get_coft_matrix`)
+
+        """
+        if self._is_transformed:
+            return numpy.sum(self._get_subset(self._A4, subset), axis=-1)
+        else:
+            raise Exception()
+
+
+    def _get_subset(self, A4, subset=None):
+        """Returns the transformation coefficients for a subset of indices
+
+        """
+        if subset is None:
+            return A4
+
+        if (len(subset) != 4) or (not subset.isalpha()):
+            raise Exception("Subset of indices has to be specified by"+
+                            " four letters, e.g. 'aabb'")
+        out = "".join(OrderedDict.fromkeys(subset))
+        return numpy.einsum(subset+"...->"+out+"...", A4)
+
+
+    def _get_function_matrix(self, fofts, t, subset):
+        """Returns a function matrix in the transformed basis
+
+        The functions are obtained as a contraction of the transformation
+        coefficients with the functions of the (site basis) matrix
 
         """
-        nob = self.nob
         if self._is_transformed:
+            A4 = self._get_subset(self._W4, subset)
             if t is None:
                 Nt = self.max_cutoff_index
-                ret = numpy.zeros((nob,nob,nob,nob,Nt),dtype=COMPLEX)
-                for k in range(self.nof):
-                    for it in range(Nt):
-                        ret[:,:,:,:,it] += self._A4[:,:,:,:,k]\
-                        *self._gofts[k+1,it]
-                return ret
+                return numpy.tensordot(A4, fofts[1:,0:Nt],
+                                       axes=([A4.ndim-1],[0]))
             else:
-                ret = numpy.zeros((nob,nob,nob,nob),dtype=COMPLEX)
                 it = self.timeAxis.nearest(t)
-                for k in range(self.nof):
-                    ret += self._A4[:,:,:,:,k]*self._gofts[k+1,it]
-                return ret
+                return numpy.tensordot(A4, fofts[1:,it],
+                                       axes=([A4.ndim-1],[0]))
         else:
             raise Exception()
 
@@ -484,35 +526,159 @@ class CorrelationFunctionMatrix(Saveable):
 
 
     def create_one_integral(self):
-        self._hofts = numpy.zeros((self.nof+1,self.timeAxis.length),
-                                  dtype=numpy.complex128)
-        for ii in range(self.nof+1):
-            self._hofts[ii,:] = c2h(self.timeAxis,self._cofts[ii,:])
+        self._hofts = self._create_integrals("hoft", c2h, exp2hoft)
 
     def create_double_integral(self):
-        self._gofts = numpy.zeros((self.nof+1,self.timeAxis.length),
-                                  dtype=numpy.complex128)
-        for ii in range(self.nof+1):
-            self._gofts[ii,:] = c2g(self.timeAxis,self._cofts[ii,:])
+        self._gofts = self._create_integrals("goft", c2g, exp2goft)
+
+    def _create_integrals(self, kind, func, efunc):
+        """Integrals of all correlation functions
+
+        Integrals of the analytical correlation functions are evaluated
+        from their exponential expansions, all at once. The remaining
+        functions are integrated numerically by `func` (via the cache).
+
+        """
+        ta = self.timeAxis
+        fofts = numpy.zeros((self.nof+1, ta.length), dtype=numpy.complex128)
+
+        analytic = []
+        for ii in range(1, self.nof+1):
+            cf = self.cfuncs[ii]
+            if (cf is not None and cf.is_analytical()
+                and cf.axis.length == ta.length
+                and cf.axis.start == ta.start and cf.axis.step == ta.step):
+                analytic.append(ii)
+            else:
+                fofts[ii,:] = self._get_cached(kind, self._cofts[ii,:], func)
+
+        if analytic:
+            exps = [self.cfuncs[ii].get_exponents() for ii in analytic]
+            nterms = max([len(cc) for cc, nu in exps])
+            # padding terms have zero amplitude
+            ccs = numpy.zeros((len(analytic), nterms), dtype=numpy.complex128)
+            nus = numpy.ones((len(analytic), nterms), dtype=numpy.complex128)
+            for k, (cc, nu) in enumerate(exps):
+                ccs[k,0:len(cc)] = cc
+                nus[k,0:len(nu)] = nu
+            fofts[analytic,:] = efunc(ta.data, ccs, nus)
+
+        return fofts
+
+
+    def get_half_fourier_transform(self, n, m, omega, length=None):
+        """Returns one-sided Fourier transform of a correlation function
+
+        The discrete Fourier sum of the correlation function is taken
+        from the cache (or calculated and stored in it) and it is
+        evaluated at the frequencies `omega`.
+
+        Parameters
+        ----------
+        n, m : int
+            indices of the matrix
+
+        omega : float or numpy array
+            Frequencies (in internal units) at which the transform is
+            evaluated
+
+        length : int, optional
+            Number of points of the time axis over which the correlation
+            function is integrated. Defaults to the whole time axis.
+
+        """
+        if length is None:
+            length = self.timeAxis.length
+        coft = self._cofts[self.cpointer[n,m],0:length]
+        ssum = self._get_cached("hft", coft, half_fourier_sum)
+        return half_fourier_transform(self.timeAxis, coft, omega, ssum=ssum)
+
+
+    def _get_cached(self, kind, coft, func):
+        """Returns func(timeAxis, coft) from the shared cache
+
+        """
+        cls = CorrelationFunctionMatrix
+        ta = self.timeAxis
+        coft = numpy.ascontiguousarray(coft)
+        key = (kind, ta.start, ta.step, coft.shape[0],
+               hashlib.sha1(coft.view(numpy.uint8)).hexdigest())
+
+        cache = cls._spectral_cache
+        if key in cache:
+            cls._spectral_cache_hits += 1
+            cache.move_to_end(key)
+            return cache[key]
+
+        cls._spectral_cache_misses += 1
+        val = func(ta, coft)
+        if isinstance(val, numpy.ndarray):
+            val.setflags(write=False)
+
+        if cls.spectral_cache_size > 0:
+            cache[key] = val
+            while len(cache) > cls.spectral_cache_size:
+                cache.popitem(last=False)
+
+        return val
+
+
+    @classmethod
+    def clear_spectral_cache(cls):
+        """Removes all items from the cache of integrals
+
+        """
+        cls._spectral_cache.clear()
+        cls._spectral_cache_hits = 0
+        cls._spectral_cache_misses = 0
+
+
+    @classmethod
+    def get_spectral_cache_info(cls):
+        """Returns a dictionary with statistics of the cache of integrals
+
+        """
+        return dict(hits=cls._spectral_cache_hits,
+                    misses=cls._spectral_cache_misses,
+                    size=len(cls._spectral_cache),
+                    maxsize=cls.spectral_cache_size)
 
 
     def transform(self,SS):
+        """Transforms the matrix into a new basis
+
+        Two sets of coefficients are calculated: A4[a,b,c,d,k] with which
+        the reorganization energy of the k-th function contributes to the
+        element [a,b,c,d] of the transformed matrix (from the site basis
+        coefficients _A2), and W4[a,b,c,d,k] with which the k-th function
+        itself contributes to it (from the pointers to the functions).
+
+        Parameters
+        ----------
+        SS : numpy.ndarray
+            Transformation matrix, the columns of which are the new basis
+            vectors expressed in the site basis
+
+        """
         nob = self.nob
         nof = self.nof
         self._A4 = numpy.zeros((nob,nob,nob,nob,nof), dtype=REAL)
-
-        for a in range(nob):
-            for b in range(nob):
-                for c in range(nob):
-                    for d in range(nob):
-                        for k in range(nof):
-
-                           for n in range(nob):
-                                for m in range(nob):
-                                    self._A4[a,b,c,d,k] += SS[n,a]*SS[n,b]*\
-                                    self._A2[n,m,k+1]*SS[m,c]*SS[m,d]
+        self._W4 = numpy.zeros((nob,nob,nob,nob,nof), dtype=REAL)
+
+        # site basis coefficients of the reorganization energies
+        # and of the functions
+        B2 = numpy.zeros((nob,nob,2*nof), dtype=REAL)
+        B2[:,:,0:nof] = self._A2[:,:,1:]
+        B2[:,:,nof:] = (self.cpointer[:,:,numpy.newaxis]
+                        == numpy.arange(1,nof+1)[numpy.newaxis,numpy.newaxis,:])
+
+        # products SS[n,a]*SS[n,b] of the components on each site
+        PP = numpy.einsum("na,nb->nab", SS, SS)
+        # contraction over the first site index: [a,b,m,k]
+        AA = numpy.tensordot(PP, B2, axes=([0],[0]))
+        # contraction over the second site index
+        BB = numpy.einsum("abmk,mcd->abcdk", AA, PP, optimize=True)
+        self._A4[:,:,:,:,:] = BB[:,:,:,:,0:nof]
+        self._W4[:,:,:,:,:] = BB[:,:,:,:,nof:]
 
         self._is_transformed = True
-        #print(self._A4[1,1,1,1,0])
-        #print(self._A2[1,1,1])
-        #print(SS[:,1])
@@ -86,13 +86,17 @@ class CorrelationFunction(DFunction, UnitsManaged):
                      )
 
     analytical_types = ("OverdampedBrownian-HighTemperature",
-                        "OverdampedBrownian")
+                        "OverdampedBrownian",
+                        "UnderdampedBrownian")
     
     energy_params = ("reorg", "omega", "freq", "fcp", "g_FWHM", "l_FWHM",\
                      "freq1", "freq2", "gamma")
 
     def __init__(self, axis=None, params=None , values=None):
         super().__init__()
+
+        # data specified by values are not covered by analytical formulae
+        self._values_defined = values is not None
         
         if (axis is not None) and (params is not None):
             
@@ -225,18 +229,6 @@ class CorrelationFunction(DFunction, UnitsManaged):
                     
                 
 
-    def _matsubara(self, kBT, ctime, nof):
-        """Matsubara frequency part of the Brownian correlation function
-        
-        """
-        msf = 0.0
-        nut = 2.0*numpy.pi*kBT
-        time = self.axis.data
-        for i in range(0, nof):
-            n = i+1
-            msf += nut*n*numpy.exp(-nut*n*time)/((nut*n)**2-(1.0/ctime)**2)
-        return msf
-
     def _set_temperature_and_cutoff_time(self, temperature, ctime):
         """Sets the temperature and cutoff time of for the component
         
@@ -271,21 +263,9 @@ class CorrelationFunction(DFunction, UnitsManaged):
         else:
             nmatsu = 10
 
-        kBT = kB_intK*temperature
-        time = self.axis.data
-
-        #if values is not None:
-        #    cfce = values
-            
-        #else:
-        if True:
-            
-            cfce = (lamb/(ctime*numpy.tan(1.0/(2.0*kBT*ctime))))\
-                *numpy.exp(-time/ctime) \
-                - 1.0j*(lamb/ctime)*numpy.exp(-time/ctime)
-
-            cfce += (4.0*lamb*kBT/ctime) \
-                *self._matsubara(kBT, ctime, nmatsu)
+        cc, nu = overdamped_brownian_exponents(lamb, ctime, temperature,
+                                               nmatsu=nmatsu)
+        cfce = exp2coft(self.axis.data, cc, nu)
         
         # this is a call to the function inherited from DFunction class 
         self._add_me(self.axis, cfce)
@@ -306,16 +286,9 @@ class CorrelationFunction(DFunction, UnitsManaged):
         ctime = params["cortime"]
         lamb = params["reorg"]
         
-        kBT = kB_intK*temperature
-        time = self.axis.data
-
-        #if values is not None:
-        #    cfce = values
-        #    
-        #else:
-        if True:
-            cfce = 2.0*lamb*kBT*(numpy.exp(-time/ctime)
-                                 - 1.0j*(lamb/ctime)*numpy.exp(-time/ctime))
+        cc, nu = overdamped_brownian_exponents(lamb, ctime, temperature,
+                                               high_temperature=True)
+        cfce = exp2coft(self.axis.data, cc, nu)
 
         # this is a call to the function inherited from DFunction class 
         self._add_me(self.axis, cfce)
@@ -333,30 +306,19 @@ class CorrelationFunction(DFunction, UnitsManaged):
         
         
         """
-        from .spectraldensities import SpectralDensity
-        
         temperature = params["T"]
-        ctime = params["gamma"]
-        #omega = params["freq"]
+        gamma = params["gamma"]
+        omega = params["freq"]
         lamb = params["reorg"]
-        
-        #kBT = kB_intK*temperature
-        time = self.axis #.data
 
-        #if values is not None:
-        #    cfce = values
-        #    
-        #else:
-        if True:
-            with energy_units("int"):
-                # Make it via SpectralDensity
-                fa = SpectralDensity(time, params)
-            
-                cf = fa.get_CorrelationFunction(temperature=temperature)
-            
-                cfce = cf.data
-                   #2.0*lamb*kBT*(numpy.exp(-time/ctime)
-                   #              - 1.0j*(lamb/ctime)*numpy.exp(-time/ctime))
+        if "matsubara" in params.keys():
+            nmatsu = params["matsubara"]
+        else:
+            nmatsu = 10
+
+        cc, nu = underdamped_brownian_exponents(lamb, gamma, omega,
+                                                temperature, nmatsu=nmatsu)
+        cfce = exp2coft(self.axis.data, cc, nu)
 
         # this is a call to the function inherited from DFunction class 
         self._add_me(self.axis, cfce)
@@ -365,9 +327,8 @@ class CorrelationFunction(DFunction, UnitsManaged):
         self.lamb += lamb
         
         # check temperature and update cutoff time
-        self._set_temperature_and_cutoff_time(temperature, 5.0/ctime)  
-        
-        
+        self._set_temperature_and_cutoff_time(temperature, 5.0/gamma)
+
     def _make_underdamped(self, params, values=None):
         from .spectraldensities import SpectralDensity
         
@@ -535,6 +496,8 @@ class CorrelationFunction(DFunction, UnitsManaged):
     
             for p in other.params:
                 self.params.append(p)
+            self._values_defined = (self._values_defined
+                                    or other._values_defined)
                 
             self._is_composed = True
             self._is_empty = False
@@ -568,6 +531,8 @@ class CorrelationFunction(DFunction, UnitsManaged):
 
             for p in ocor.params:
                 self.params.append(p)
+            self._values_defined = (self._values_defined
+                                    or ocor._values_defined)
             
             self._is_composed = True
             self._is_empty = False
@@ -600,8 +565,88 @@ class CorrelationFunction(DFunction, UnitsManaged):
         by analytical formula. Returns `False` if the object was constructed
         by numerical transformation from spectral density.
         """
+        if self._values_defined:
+            return False
+        for prms in self.params:
+            if prms["ftype"] not in self.analytical_types:
+                return False
+        return True
 
-        return bool(self.params["ftype"] in self.analytical_types)
+
+    def get_exponents(self):
+        """Returns the exponential expansion of the correlation function
+
+        For analytical correlation functions, the correlation function
+        is a sum C(t) = sum_k c_k exp(-nu_k t). The terms of all components
+        are returned in two arrays in internal units.
+
+        Returns
+        -------
+
+        cc : complex array
+            Amplitudes of the exponentials
+
+        nu : complex array
+            Decay rates of the exponentials
+
+        """
+        if not self.is_analytical():
+            raise Exception("Exponential expansion is only available"
+                            + " for analytical correlation functions")
+
+        ccs = []
+        nus = []
+        for prms in self.params:
+            ftype = prms["ftype"]
+            nmatsu = prms.get("matsubara", 10)
+            if ftype == "OverdampedBrownian":
+                cc, nu = overdamped_brownian_exponents(prms["reorg"],
+                                                       prms["cortime"],
+                                                       prms["T"],
+                                                       nmatsu=nmatsu)
+            elif ftype == "OverdampedBrownian-HighTemperature":
+                cc, nu = overdamped_brownian_exponents(prms["reorg"],
+                                                       prms["cortime"],
+                                                       prms["T"],
+                                                       high_temperature=True)
+            elif ftype == "UnderdampedBrownian":
+                cc, nu = underdamped_brownian_exponents(prms["reorg"],
+                                                        prms["gamma"],
+                                                        prms["freq"],
+                                                        prms["T"],
+                                                        nmatsu=nmatsu)
+            ccs.append(cc)
+            nus.append(nu)
+
+        return numpy.concatenate(ccs), numpy.concatenate(nus)
+
+
+    def get_hoft(self):
+        """Returns the time integral of the correlation function
+
+        For analytical correlation functions the integral is evaluated
+        in a closed form, otherwise the correlation function is integrated
+        numerically by `c2h`.
+
+        """
+        if self.is_analytical():
+            cc, nu = self.get_exponents()
+            return exp2hoft(self.axis.data, cc, nu)
+        return c2h(self.axis, self.data)
+
+
+    def get_goft(self):
+        """Returns the lineshape function g(t)
+
+        For analytical correlation functions the lineshape function is
+        evaluated in a closed form, otherwise the correlation function is
+        integrated numerically by `c2g`.
+
+        """
+        if self.is_analytical():
+            cc, nu = self.get_exponents()
+            return exp2goft(self.axis.data, cc, nu)
+        return c2g(self.axis, self.data)
 
 
     def get_temperature(self):
@@ -631,7 +676,7 @@ class CorrelationFunction(DFunction, UnitsManaged):
 
         """
         #with energy_units("int"):
-        primitive = c2h(self.axis, self.data)
+        primitive = self.get_hoft()
         lamb = -numpy.imag(primitive[self.axis.length-1])
         return self.convert_energy_2_current_u(lamb)
 
@@ -852,7 +897,22 @@ class OddFTCorrelationFunction(DFunction, UnitsManaged):
                 raise Exception("Unknown Correlation Function Type")
     
             self.params.append(params)
-                
+
+            # the odd part of the Fourier transform is the spectral density
+            # which is known analytically for some types
+            if ftype in CorrelationFunction.analytical_types:
+                prms = {}
+                for key in params.keys():
+                    if key in CorrelationFunction.energy_params:
+                        prms[key] = \
+                        self.convert_energy_2_internal_u(params[key])
+                    else:
+                        prms[key] = params[key]
+                with energy_units("int"):
+                    ndata = _spectral_density(self.axis.data, prms)
+                self._add_me(self.axis, ndata)
+                continue
+
             # We create CorrelationFunction and FTT it
             if params["ftype"] == "Value-defined":
                 if values is None:
@@ -952,6 +1012,305 @@ class EvenFTCorrelationFunction(DFunction, UnitsManaged):
             self._add_me(self.axis,ndata)
 
 
+def _expansion_parameters(*args):
+    """Broadcasts parameters of the parameter sets against each other
+
+    Returns float arrays of equal shape with an added last axis, along
+    which the terms of the exponential expansions are arranged.
+
+    """
+    prms = numpy.broadcast_arrays(*[numpy.asarray(a, dtype=numpy.float64)
+                                    for a in args])
+    return [a[..., numpy.newaxis] for a in prms]
+
+
+def _matsubara(kBT, nmatsu):
+    """Matsubara frequencies 2 pi n kB T (n = 1 ... nmatsu)
+
+    """
+    return 2.0*numpy.pi*kBT*numpy.arange(1, nmatsu+1)
+
+
+def overdamped_brownian_exponents(reorg, cortime, temperature, nmatsu=10,
+                                  high_temperature=False):
+    """Exponential expansion of the overdamped Brownian correlation function
+
+    The correlation function is expressed as
+
+        C(t) = sum_k c_k exp(-nu_k t)
+
+    where the first term corresponds to the pole of the spectral density
+    and the remaining `nmatsu` terms are the Matsubara terms. All parameters
+    can be arrays of equal shape (one element per parameter set), and the
+    returned arrays then have one more (last) axis which runs over the terms.
+
+    Parameters
+    ----------
+
+    reorg : float or array
+        Reorganization energy in internal units
+
+    cortime : float or array
+        Correlation time in fs
+
+    temperature : float or array
+        Temperature in Kelvins
+
+    nmatsu : int
+        Number of the Matsubara terms
+
+    high_temperature : bool
+        If True, the high temperature limit is returned (single term, no
+        Matsubara terms)
+
+
+    Returns
+    -------
+
+    cc : complex array
+        Amplitudes of the exponentials
+
+    nu : complex array
+        Decay rates of the exponentials
+
+    """
+    lamb, ctime, temp = _expansion_parameters(reorg, cortime, temperature)
+    Lam = 1.0/ctime
+    kBT = kB_intK*temp
+
+    if high_temperature:
+        cc = 2.0*lamb*kBT - 1.0j*lamb*Lam
+        nu = Lam
+        return cc.astype(numpy.complex128), nu.astype(numpy.complex128)
+
+    c0 = lamb*Lam*(1.0/numpy.tan(Lam/(2.0*kBT)) - 1.0j)
+    nun = _matsubara(kBT, nmatsu)
+    cn = 4.0*lamb*Lam*kBT*nun/(nun**2 - Lam**2)
+
+    cc = numpy.concatenate((c0, cn), axis=-1)
+    nu = numpy.concatenate((Lam, nun), axis=-1)
+
+    return cc.astype(numpy.complex128), nu.astype(numpy.complex128)
+
+
+def underdamped_brownian_exponents(reorg, gamma, freq, temperature,
+                                   nmatsu=10):
+    """Exponential expansion of the underdamped Brownian correlation function
+
+    The correlation function corresponding to the spectral density
+
+        J(w) = 2 lambda gamma w0^2 w / ((w^2 - w0^2)^2 + w^2 gamma^2)
+
+    is expressed as C(t) = sum_k c_k exp(-nu_k t). The first two terms
+    correspond to the poles of the spectral density at
+    w = +/- xi - i gamma/2, with xi = sqrt(w0^2 - gamma^2/4), and they have
+    complex decay rates nu = gamma/2 +/- i xi. The remaining `nmatsu` terms
+    are the Matsubara terms. All parameters can be arrays of equal shape
+    (one element per parameter set).
+
+    Parameters
+    ----------
+
+    reorg : float or array
+        Reorganization energy in internal units
+
+    gamma : float or array
+        Damping rate in internal units
+
+    freq : float or array
+        Frequency of the oscillator w0 in internal units
+
+    temperature : float or array
+        Temperature in Kelvins
+
+    nmatsu : int
+        Number of the Matsubara terms
+
+
+    Returns
+    -------
+
+    cc : complex array
+        Amplitudes of the exponentials
+
+    nu : complex array
+        Decay rates of the exponentials
+
+    """
+    lamb, gam, om0, temp = _expansion_parameters(reorg, gamma, freq,
+                                                 temperature)
+    kBT = kB_intK*temp
+
+    xi = numpy.sqrt(om0**2 - (gam**2)/4.0 + 0.0j)
+    if numpy.any(numpy.abs(xi) == 0.0):
+        raise Exception("Critically damped oscillator (gamma = 2*freq)"
+                        + " is not supported")
+
+    # poles of the spectral density in the lower half plane
+    pp = numpy.concatenate((xi - 0.5j*gam, -xi - 0.5j*gam), axis=-1)
+    # residues of J(w)(1 + n(w)) at these poles
+    res = (2.0*lamb*gam*om0**2*pp
+           /(2.0*xi*numpy.array([1.0, -1.0]))
+           /((pp - xi - 0.5j*gam)*(pp + xi - 0.5j*gam))
+           /(1.0 - numpy.exp(-pp/kBT)))
+    c0 = -2.0j*res
+
+    nun = _matsubara(kBT, nmatsu)
+    cn = (-4.0*lamb*gam*om0**2*kBT*nun
+          /((nun**2 + om0**2)**2 - (gam*nun)**2))
+
+    cc = numpy.concatenate((c0, cn), axis=-1)
+    nu = numpy.concatenate((1.0j*pp, nun), axis=-1)
+
+    return cc.astype(numpy.complex128), nu.astype(numpy.complex128)
+
+
+def overdamped_brownian_spectral_density(omega, reorg, cortime):
+    """Spectral density of the overdamped Brownian oscillator
+
+    Parameters
+    ----------
+
+    omega : array
+        Frequencies in internal units
+
+    reorg : float or array
+        Reorganization energy in internal units
+
+    cortime : float or array
+        Correlation time in fs
+
+
+    Returns
+    -------
+
+    J : array
+        Spectral density with the shape of the parameters plus the last axis
+        corresponding to `omega`
+
+    """
+    lamb, ctime = _expansion_parameters(reorg, cortime)
+    Lam = 1.0/ctime
+    return 2.0*lamb*Lam*omega/(omega**2 + Lam**2)
+
+
+def underdamped_brownian_spectral_density(omega, reorg, gamma, freq):
+    """Spectral density of the underdamped Brownian oscillator
+
+    Parameters
+    ----------
+
+    omega : array
+        Frequencies in internal units
+
+    reorg : float or array
+        Reorganization energy in internal units
+
+    gamma : float or array
+        Damping rate in internal units
+
+    freq : float or array
+        Frequency of the oscillator in internal units
+
+
+    Returns
+    -------
+
+    J : array
+        Spectral density with the shape of the parameters plus the last axis
+        corresponding to `omega`
+
+    """
+    lamb, gam, om0 = _expansion_parameters(reorg, gamma, freq)
+    return (2.0*lamb*gam*(om0**2)
+            *(omega/(((omega**2) - (om0**2))**2 + (omega**2)*(gam**2))))
+
+
+def _spectral_density(omega, params):
+    """Analytical spectral density of a correlation function component
+
+    Parameters are assumed in internal units.
+
+    """
+    if params["ftype"] == "UnderdampedBrownian":
+        return underdamped_brownian_spectral_density(omega, params["reorg"],
+                                                     params["gamma"],
+                                                     params["freq"])
+    return overdamped_brownian_spectral_density(omega, params["reorg"],
+                                                params["cortime"])
+
+
+def _expm1_sum(time, aa, nu):
+    """Returns sum_k a_k (exp(-nu_k t) - 1)
+
+    Terms with real decay rates (e.g. the Matsubara terms) are evaluated
+    in real arithmetics, which is considerably faster than complex
+    exponentials.
+
+    """
+    cplx = numpy.any(nu.imag != 0.0, axis=tuple(range(nu.ndim-1)))
+    rl = numpy.logical_not(cplx)
+
+    ret = numpy.zeros(aa.shape[:-1]+(len(time),), dtype=numpy.complex128)
+    if numpy.any(rl):
+        ee = numpy.expm1(-nu[..., rl, numpy.newaxis].real*time)
+        ar = aa[..., numpy.newaxis, rl]
+        ret += (numpy.matmul(ar.real, ee)
+                + 1j*numpy.matmul(ar.imag, ee))[..., 0, :]
+    if numpy.any(cplx):
+        ee = numpy.expm1(-nu[..., cplx, numpy.newaxis]*time)
+        ret += numpy.matmul(aa[..., numpy.newaxis, cplx], ee)[..., 0, :]
+
+    return ret
+
+
+def exp2coft(time, cc, nu):
+    """Correlation function from its exponential expansion
+
+    Evaluates C(t) = sum_k c_k exp(-nu_k t). The sum runs over the last
+    axis of `cc` and `nu`; the remaining axes (parameter sets) are preserved
+    and the time is added as the last axis of the result.
+
+    Parameters
+    ----------
+
+    time : array
+        Values of time
+
+    cc : complex array
+        Amplitudes of the exponentials
+
+    nu : complex array
+        Decay rates of the exponentials
+
+    """
+    return (_expm1_sum(time, cc, nu)
+            + numpy.sum(cc, axis=-1)[..., numpy.newaxis])
+
+
+def exp2hoft(time, cc, nu):
+    """Time integral of the correlation function from its exponential expansion
+
+    Evaluates h(t) = sum_k (c_k/nu_k)(1 - exp(-nu_k t)), i.e. the closed
+    form of what `c2h` calculates numerically. See `exp2coft` for the
+    convention on array axes.
+
+    """
+    return -_expm1_sum(time, cc/nu, nu)
+
+
+def exp2goft(time, cc, nu):
+    """Lineshape function from the exponential expansion
+
+    Evaluates g(t) = sum_k (c_k/nu_k^2)(exp(-nu_k t) + nu_k t - 1), i.e.
+    the closed form of what `c2g` calculates numerically. See `exp2coft`
+    for the convention on array axes.
+
+    """
+    return (_expm1_sum(time, cc/(nu**2), nu)
+            + numpy.sum(cc/nu, axis=-1)[..., numpy.newaxis]*time)
+
+
 #FIXME: these functions can go to DFunction
 def c2g(timeaxis, coft):
     """ Converts correlation function to lineshape function
@@ -1032,3 +1391,125 @@ def h2g(timeaxis, coft):
         in the TimeAxis object
     """
     return c2h(timeaxis, coft)
+
+
+def half_fourier_transform(timeaxis, coft, omega, padding=16, ssum=None):
+    """ One-sided Fourier transform of a correlation function
+
+    Calculates the integral
+
+    .. math::
+
+        \\int_{t_0}^{t_{max}} dt\\ C(t) e^{-i\\omega t}
+
+    at an arbitrary set of frequencies. The correlation function is
+    interpolated linearly between the points of the time axis and the
+    integrals with the exponential factor are evaluated analytically
+    (Filon-type quadrature). The sum over the time points is obtained 
+    once for all frequencies by a single zero-padded FFT and interpolated
+    by a periodic cubic spline to the requested frequencies. The end-point corrections
+    are evaluated exactly.
+
+    For correlation functions which decay within the time axis, the result
+    agrees with the integration via spline antiderivatives to a relative 
+    precision of about 3.0e-3 as long as omega*step < 1. For faster 
+    oscillating integrands, the spline integration becomes inaccurate, 
+    while the present method remains exact for the linearly interpolated 
+    correlation function.
+
+    Parameters
+    ----------
+
+    timeaxis : TimeAxis
+        TimeAxis of the correlation function
+
+    coft : complex numpy array
+        Values of correlation function given at points specified
+        in the TimeAxis object. If the array is shorter than the time 
+        axis, the integration ends at its last point.
+
+    omega : float or numpy array
+        Frequencies (in internal units) at which the transform is 
+        evaluated
+
+    padding : int
+        Factor by which the FFT grid is padded with zeros. Larger values
+        lead to a denser frequency grid and more precise interpolation.
+
+    ssum : scipy.interpolate.CubicSpline, optional
+        Interpolant of the discrete sum as returned by `half_fourier_sum`.
+        When specified, the FFT is not recalculated and `padding` is
+        ignored.
+
+    """
+    coft = numpy.asarray(coft)
+    N = coft.shape[0]
+    h = timeaxis.step
+    t0 = timeaxis.data[0]
+    tN = t0 + (N-1)*h
+    om = numpy.asarray(omega, dtype=numpy.float64)
+
+    if ssum is None:
+        ssum = half_fourier_sum(timeaxis, coft, padding=padding)
+
+    # the sum is periodic in omega with the period 2*pi/h
+    omr = numpy.mod(om, 2.0*numpy.pi/h)
+    ssum = ssum(omr)
+
+    # weights of the piecewise linear interpolation
+    th = om*h
+    small = numpy.abs(th) < 1.0e-2
+    ths = numpy.where(small, 1.0, th)
+    ww = numpy.sinc(th/(2.0*numpy.pi))**2
+    w0 = numpy.where(small,
+                     0.5 - 1j*th/6.0 - (th**2)/24.0 + 1j*(th**3)/120.0,
+                     1.0/(1j*ths) + (1.0 - numpy.exp(-1j*ths))/(ths**2))
+    w1 = numpy.conj(w0)
+
+    ret = h*(ww*ssum*numpy.exp(-1j*om*t0)
+             + (w0 - ww)*coft[0]*numpy.exp(-1j*om*t0)
+             + (w1 - ww)*coft[N-1]*numpy.exp(-1j*om*tN))
+
+    return ret
+
+
+def half_fourier_sum(timeaxis, coft, padding=16):
+    """ Interpolant of the discrete Fourier sum of a correlation function
+
+    Returns a periodic cubic spline of the sum
+
+    .. math::
+
+        \\sum_{n} C(t_n) e^{-i\\omega n \\Delta t}
+
+    over the interval of frequencies :math:`[0, 2\\pi/\\Delta t]`. The sum
+    is calculated by a single zero-padded FFT. This is the only part of
+    `half_fourier_transform` whose cost depends on the length of the time
+    axis, and it can be stored and reused for different sets of
+    frequencies.
+
+    Parameters
+    ----------
+
+    timeaxis : TimeAxis
+        TimeAxis of the correlation function
+
+    coft : complex numpy array
+        Values of correlation function given at points specified
+        in the TimeAxis object
+
+    padding : int
+        Factor by which the FFT grid is padded with zeros.
+
+    """
+    coft = numpy.asarray(coft)
+    N = coft.shape[0]
+    h = timeaxis.step
+
+    Nfft = padding*N
+    sft = numpy.fft.fft(coft, n=Nfft)
+    sft = numpy.append(sft, sft[0])
+    dom = 2.0*numpy.pi/(Nfft*h)
+    grid = dom*numpy.arange(Nfft+1)
+
+    return interp.CubicSpline(grid, sft, bc_type="periodic")
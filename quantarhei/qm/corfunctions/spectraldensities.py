@@ -15,6 +15,8 @@ from ...core.time import TimeAxis
 #from ...core.frequency import FrequencyAxis
 from .correlationfunctions import CorrelationFunction
 from .correlationfunctions import FTCorrelationFunction
+from .correlationfunctions import overdamped_brownian_spectral_density
+from .correlationfunctions import underdamped_brownian_spectral_density
 from ...core.units import kB_int
 from ...core.units import convert
 
@@ -234,7 +236,7 @@ class SpectralDensity(DFunction, UnitsManaged):
         # protect calculation from units management
         with energy_units("int"):
             omega = self.axis.data
-            cfce = (2.0*lamb/ctime)*omega/(omega**2 + (1.0/ctime)**2)
+            cfce = overdamped_brownian_spectral_density(omega, lamb, ctime)
 
         if values is not None:
             self._add_me(self.axis, values)
@@ -263,8 +265,8 @@ class SpectralDensity(DFunction, UnitsManaged):
             omega = self.axis.data
             #cfce = (lamb*ctime)*omega/((omega-omega0)**2 + (ctime)**2) \
             #      +(lamb*ctime)*omega/((omega+omega0)**2 + (ctime)**2)
-            cfce = (2.0*lamb*ctime)*(omega0**2)*\
-                  (omega/(((omega**2)-(omega0**2))**2 + (omega**2)*(ctime**2))) 
+            cfce = underdamped_brownian_spectral_density(omega, lamb, ctime,
+                                                         omega0)
                   #+omega/((omega**2+omega0**2)**2 + (omega**2)*(ctime)**2))
 
 
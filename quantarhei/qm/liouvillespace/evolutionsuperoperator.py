@@ -186,14 +186,17 @@
 # standard library imports
 import time
 import numbers
+from collections import OrderedDict
 
 # dependencies imports
 import numpy
+import scipy.linalg
 
 # quantarhei imports
 from ..propagators.rdmpropagator import ReducedDensityMatrixPropagator
 from ..propagators.dmevolution import ReducedDensityMatrixEvolution
 from ..hilbertspace.operators import ReducedDensityMatrix
+from ..hilbertspace.operators import BasisReferenceOperator
 from ...core.time import TimeAxis
 from ...core.saveable import Saveable
 
@@ -228,10 +231,33 @@ class EvolutionSuperOperator(SuperOperator, TimeDependent, Saveable):
         points of the evolution are stored, or it can be "jit" = just in (one)
         time. In the "jit" mode, only the "present" time of the evolution
         operator is stored.
+        
+    secular: bool
+        If True, the evolution is calculated in the secular approximation
+        in the eigenbasis of the Hamiltonian. Only the propagator of
+        populations (a dim x dim matrix) is stored for every time, and
+        coherences are represented by their complex decay rates. The full 
+        four-index tensor of all times is never created, so that the `data`
+        attribute is not available; use `at()` and `apply()` methods 
+        instead. The relaxation tensor has to be time-independent, and
+        its non-secular terms are ignored. Default is False. Only "all" 
+        mode is supported.
+        
+    storage: str, None
+        Name of a file in which the data of the superoperator are stored
+        in the "all" mode. The file is memory-mapped, every time slice
+        is written into it as soon as it is calculated, and `at()` and
+        `apply()` read only the slices they need. If None (default),
+        the data are kept in memory.
+        
+    slice_cache_size: int
+        Number of recently used time slices kept in memory when the data
+        are stored in a file
     
     """
     
-    def __init__(self, time=None, ham=None, relt=None, pdeph=None, mode="all"):
+    def __init__(self, time=None, ham=None, relt=None, pdeph=None, mode="all",
+                 secular=False, storage=None, slice_cache_size=8):
         super().__init__()
         
         self.time = time
@@ -240,6 +266,10 @@ class EvolutionSuperOperator(SuperOperator, TimeDependent, Saveable):
         self.mode = mode
         self.pdeph = pdeph
         
+        self.storage = storage
+        self.slice_cache_size = slice_cache_size
+        self._slice_cache = OrderedDict()
+        
         try:
             self.dim = ham.dim
         except:
@@ -247,12 +277,34 @@ class EvolutionSuperOperator(SuperOperator, TimeDependent, Saveable):
         
         self.dense_time = None
         self.set_dense_dt(1)
+        
+        if secular and (mode != "all"):
+            raise Exception("Secular representation is available only"+
+                            " with mode='all'")
+        if secular and isinstance(self.relt, TimeDependent):
+            raise Exception("Secular representation is available only"+
+                            " with time-independent relaxation tensor")
+        if secular and (self.pdeph is not None):
+            if self.pdeph.dtype != "Lorentzian":
+                raise Exception("Secular representation is available only"+
+                                " with Lorentzian pure dephasing")
+            
+        self.secular = secular
+        
+        # secular representation: propagators of populations 
+        # and decay rates of coherences in the eigenbasis of the Hamiltonian
+        self.secular_pops = None
+        self.secular_rates = None
+        self._secular_reference = None
+            
+        if self.secular:
+            
+            # data are not stored
+            pass
             
-        if (self.time is not None) and (self.mode == "all"):
+        elif (self.time is not None) and (self.mode == "all"):
             
-            self.data = numpy.zeros((self.time.length, self.dim, self.dim,
-                                     self.dim, self.dim),
-                                     dtype=qr.COMPLEX)
+            self.data = self._allocate_data(self.time.length)
             #
             # zero time value (unity superoperator)
             #
@@ -326,6 +378,83 @@ class EvolutionSuperOperator(SuperOperator, TimeDependent, Saveable):
             return True
 
 
+    def _allocate_data(self, Nt):
+        """Allocates zero data for Nt time slices
+        
+        If the `storage` file is specified, the data are memory-mapped
+        to this file, otherwise they are created in memory.
+        
+        """
+        shape = (Nt, self.dim, self.dim, self.dim, self.dim)
+        self._slice_cache.clear()
+        if self.storage is None:
+            return numpy.zeros(shape, dtype=qr.COMPLEX)
+        
+        # newly created file is filled with zeros
+        return numpy.memmap(self.storage, dtype=qr.COMPLEX, mode="w+",
+                            shape=shape)
+    
+    
+    def _flush_data(self):
+        """Writes memory-mapped data to the storage file
+        
+        """
+        if isinstance(self._data, numpy.memmap):
+            self._data.flush()
+            
+            
+    def _get_slice(self, ti):
+        """Returns the superoperator tensor at the time index ti
+        
+        With file storage, only the requested slice is read and brought
+        to the current basis; the file itself is not rewritten. Recently
+        used slices are kept in memory.
+        
+        """
+        if self.storage is None:
+            # data are brought to the current basis first
+            return self.data[ti,:,:,:,:]
+        
+        # basis change is only recorded as a pending transformation
+        self.manager.transform_to_current_basis(self)
+        
+        try:
+            Ut = self._slice_cache[ti]
+            self._slice_cache.move_to_end(ti)
+        except KeyError:
+            Ut = numpy.array(self._data_storage[ti,:,:,:,:])
+            if self._pending_transform is not None:
+                SS, S1 = self._pending_transform
+                Ut = self._transform_tensor(Ut, SS, S1)
+            if self.slice_cache_size > 0:
+                self._slice_cache[ti] = Ut
+                if len(self._slice_cache) > self.slice_cache_size:
+                    self._slice_cache.popitem(last=False)
+        return Ut
+    
+    
+    def transform(self, SS, inv=None):
+        """Transformation of the superoperator by a given matrix
+        
+        Slices kept in memory are discarded, because they were 
+        calculated in the original basis.
+        
+        """
+        self._slice_cache.clear()
+        super().transform(SS, inv=inv)
+
+
+    def _apply_pending_transform(self):
+        """Applies pending basis transformation and updates file storage
+        
+        This happens only when the whole `data` are accessed. Individual
+        time slices are transformed by `_get_slice`.
+        
+        """
+        super()._apply_pending_transform()
+        self._flush_data()
+
+
     def _initialize_data(self, save=False):
         """Initializes EvolutionSuperOperator data
         
@@ -339,9 +468,7 @@ class EvolutionSuperOperator(SuperOperator, TimeDependent, Saveable):
 
             # if we are supposed to save all time steps
             Nt = self.time.length                    
-            self.data = numpy.zeros((Nt, self.dim, self.dim,
-                                         self.dim, self.dim),
-                                         dtype=qr.COMPLEX)
+            self.data = self._allocate_data(Nt)
             #
             # zero time value (unity superoperator)
             #
@@ -385,6 +512,10 @@ class EvolutionSuperOperator(SuperOperator, TimeDependent, Saveable):
                             " with mode='all'")
         Nt = self.time.length
         
+        if self.secular:
+            self._calculate_secular(show_progress)
+            return
+        
         self._initialize_data()
             
         if show_progress:
@@ -430,10 +561,139 @@ class EvolutionSuperOperator(SuperOperator, TimeDependent, Saveable):
             self._calculate_remainig_using_first_interval(Nt,
                                                           show_progress)
 
+        self._flush_data()
+        
         if show_progress:
             print("...done")
             
             
+    def _calculate_secular(self, show_progress=False):
+        """Calculates the secular representation of the superoperator
+        
+        In the eigenbasis of the Hamiltonian, the populations evolve 
+        by the exponential of the population transfer rate matrix and 
+        the coherences decay independently of each other.
+        
+        For degenerate eigenvalues of the Hamiltonian, the secular 
+        approximation depends on the choice of the eigenvectors in the
+        degenerate subspace. The eigenvectors chosen by the `eigenbasis_of`
+        context at the time of the calculation are recorded by a basis
+        reference operator, and they are used whenever the superoperator
+        is applied, in any basis.
+        
+        """
+        if show_progress:
+            print("Calculating secular evolution superoperator ")
+            
+        Nt = self.time.length
+        dim = self.dim
+        
+        with qr.eigenbasis_of(self.ham):
+            
+            if self.ham.has_rwa:
+                HH = self.ham.get_RWA_data()
+            else:
+                HH = self.ham.data
+            en = numpy.real(numpy.diag(HH))
+            
+            KK, GG = self._get_secular_rates()
+            
+            # diagonal in the eigenbasis, its nondegenerate eigenvectors
+            # follow the eigenbasis through basis transformations
+            self._secular_reference = BasisReferenceOperator(dim)
+            
+        rates = -1j*(en[:,numpy.newaxis] - en[numpy.newaxis,:]) + GG
+        if self.pdeph is not None:
+            rates -= self.pdeph.data
+        numpy.fill_diagonal(rates, 0.0)
+        self.secular_rates = rates
+        
+        Udt = scipy.linalg.expm(KK*self.time.step)
+        self.secular_pops = numpy.zeros((Nt, dim, dim), dtype=COMPLEX)
+        self.secular_pops[0,:,:] = numpy.eye(dim)
+        for ti in range(1, Nt):
+            self.secular_pops[ti,:,:] = numpy.dot(Udt, 
+                                                  self.secular_pops[ti-1,:,:])
+            
+        if show_progress:
+            print("...done")
+            
+            
+    def _get_secular_rates(self):
+        """Returns population transfer rates and coherence dephasing rates
+        
+        Rates are taken from the relaxation tensor in the current basis.
+        The population transfer matrix KK[a,b] = R_aabb and the dephasing
+        rates GG[a,b] = R_abab are obtained without construction of the 
+        full tensor when the relaxation tensor is in the operator form.
+        
+        """
+        dim = self.dim
+        RT = self.relt
+        
+        if RT is None:
+            
+            KK = numpy.zeros((dim, dim), dtype=COMPLEX)
+            GG = numpy.zeros((dim, dim), dtype=COMPLEX)
+            
+        elif RT.as_operators:
+            
+            Km = RT.Km
+            Lm = RT.Lm
+            Ld = RT.Ld
+            Kd = numpy.transpose(Km, (0, 2, 1))
+            KdL = numpy.einsum("mii->mi", numpy.matmul(Kd, Lm))
+            LdK = numpy.einsum("mii->mi", numpy.matmul(Ld, Km))
+            
+            KK = numpy.einsum("mab,mba->ab", Km, Ld) \
+               + numpy.einsum("mab,mba->ab", Lm, Kd) \
+               - numpy.diag(numpy.sum(KdL + LdK, axis=0))
+            
+            Kdg = numpy.einsum("mii->mi", Km)
+            GG = numpy.einsum("ma,mb->ab", Kdg, numpy.einsum("mii->mi", Ld)) \
+               + numpy.einsum("ma,mb->ab", numpy.einsum("mii->mi", Lm), Kdg) \
+               - numpy.sum(KdL, axis=0)[:,numpy.newaxis] \
+               - numpy.sum(LdK, axis=0)[numpy.newaxis,:]
+            
+        else:
+            
+            KK = numpy.einsum("iijj->ij", RT.data).copy()
+            GG = numpy.einsum("ijij->ij", RT.data).copy()
+            
+        return KK, GG
+    
+    
+    def _get_secular_transformation(self):
+        """Returns the transformation matrix into the eigenbasis of the Hamiltonian
+        
+        Eigenvectors are ordered in the same way as in the `eigenbasis_of`
+        context of the Hamiltonian in which the secular representation 
+        was calculated. They are obtained from the basis reference operator,
+        so that eigenvectors in degenerate subspaces of the Hamiltonian 
+        are always the same as those used in the calculation.
+        
+        """
+        dd, SS = numpy.linalg.eigh(self._secular_reference.data)
+        return SS
+    
+    
+    def _apply_secular(self, ti, rho, SS=None):
+        """Applies the secular superoperator at time index ti to an array
+        
+        """
+        if self.secular_pops is None:
+            raise Exception("Evolution superoperator is not calculated")
+        if SS is None:
+            SS = self._get_secular_transformation()
+            
+        rho_e = numpy.dot(numpy.conj(numpy.transpose(SS)), 
+                          numpy.dot(rho, SS))
+        ret = numpy.exp(self.secular_rates*self.time.step*ti)*rho_e
+        numpy.fill_diagonal(ret, numpy.dot(self.secular_pops[ti,:,:],
+                                           numpy.diag(rho_e)))
+        return numpy.dot(SS, numpy.dot(ret, numpy.conj(numpy.transpose(SS))))
+    
+    
     def _elemental_step_TimeIndep(self, t0, dens_dt, Nt, show_progress=False):
         """Single elemental step of propagation with the dense time step
         
@@ -444,17 +704,9 @@ class EvolutionSuperOperator(SuperOperator, TimeDependent, Saveable):
         prop = ReducedDensityMatrixPropagator(one_step_time, self.ham, 
                                               RTensor=self.relt, 
                                               PDeph=self.pdeph)
-        rhonm0 = ReducedDensityMatrix(dim=dim)
-        Ut1 = numpy.zeros((dim, dim, dim, dim), dtype=COMPLEX)
-        for n in range(dim):
-            if show_progress:
-                self._progress(Nt, dim, 0, n, 0)
-            for m in range(dim):
-                rhonm0.data[n,m] = 1.0
-                rhot = prop.propagate(rhonm0)
-                Ut1[:,:,n,m] = rhot.data[one_step_time.length-1,:,:]
-                rhonm0.data[n,m] = 0.0
-        return Ut1
+        if show_progress:
+            self._progress(Nt, dim, 0, 0, 0)
+        return self._propagate_unit_matrices(prop, one_step_time)
 
 
     def _elemental_step_TimeDependent(self, t0):
@@ -471,16 +723,22 @@ class EvolutionSuperOperator(SuperOperator, TimeDependent, Saveable):
         prop = ReducedDensityMatrixPropagator(one_step_time, self.ham,
                                               RTensor=self.relt, 
                                               PDeph=self.pdeph)
-        rhonm0 = ReducedDensityMatrix(dim=dim)
-        Ut1 = numpy.zeros((dim, dim, dim, dim), dtype=COMPLEX)
-        for n in range(dim):
-            for m in range(dim):
-                rhonm0.data[n,m] = 1.0
-                rhot = prop.propagate(rhonm0)
-                Ut1[:,:,n,m] = rhot.data[one_step_time.length-1,:,:]
-                rhonm0.data[n,m] = 0.0
-                #self.now += 1
-        return Ut1
+        return self._propagate_unit_matrices(prop, one_step_time)
+
+
+    def _propagate_unit_matrices(self, prop, one_step_time):
+        """Propagates all unit matrices |n><m| in one batch
+        
+        Returns the superoperator at the last point of `one_step_time`
+        
+        """
+        dim = self.dim
+        rhonm0 = numpy.reshape(numpy.eye(dim**2, dtype=COMPLEX), 
+                               (dim**2, dim, dim))
+        rhot = prop.propagate(rhonm0)
+        Ut1 = numpy.reshape(rhot[:,one_step_time.length-1,:,:],
+                            (dim, dim, dim, dim))
+        return numpy.transpose(Ut1, (2, 3, 0, 1)).copy()
 
 
     def _one_step_with_dense_TimeIndep(self, t0, Ndense, dens_dt, Nt,
@@ -508,7 +766,7 @@ class EvolutionSuperOperator(SuperOperator, TimeDependent, Saveable):
         
         
         """
-        Udt = self.data[1,:,:,:,:]
+        Udt = numpy.array(self.data[1,:,:,:,:])
         
         for ti in range(2, Nt):
             if show_progress:
@@ -613,14 +871,75 @@ class EvolutionSuperOperator(SuperOperator, TimeDependent, Saveable):
             
         """
 
+        if self.secular:
+            if time is None:
+                raise Exception("Secular evolution superoperator can be"+
+                                " returned only at a given time")
+            ti, dt = self.time.locate(time)
+            return SecularSuperOperator(self, ti)
+        
         if time is not None:
             ti, dt = self.time.locate(time)
 
-            return SuperOperator(data=self.data[ti, :, :, :, :])
+            Ut = self._get_slice(ti)
+            if self.storage is not None:
+                # cached slice must not be transformed with the result
+                Ut = Ut.copy()
+            return SuperOperator(data=Ut)
         else:
             return SuperOperator(data=self.data)
 
-          
+
+    def get_elements(self, indices, times=None):
+        """Returns selected elements of the superoperator at many times
+
+        All elements are gathered from the data at once, without creating
+        the superoperator objects at individual times.
+
+
+        Parameters
+        ----------
+
+        indices : tuple of four int arrays
+            Indices of the elements
+
+        times : array of float, None
+            Times (in fs) at which the elements should be returned. If None,
+            the elements are returned at all times of the superoperator
+
+
+        Returns
+        -------
+
+        elems : complex array
+            Elements of the superoperator, shape (number of times,
+            number of elements)
+
+        """
+        if times is None:
+            tis = numpy.arange(self.time.length, dtype=int)
+        else:
+            tis = numpy.array([self.time.locate(t)[0] for t in times],
+                              dtype=int)
+
+        ii = [numpy.asarray(ind, dtype=int)[numpy.newaxis,:]
+              for ind in indices]
+
+        if self.secular or (self.storage is not None):
+            elems = numpy.zeros((len(tis), ii[0].shape[1]), dtype=COMPLEX)
+            for kk, ti in enumerate(tis):
+                if self.secular:
+                    Ut = SecularSuperOperator(self, ti).data
+                else:
+                    Ut = self._get_slice(ti)
+                elems[kk,:] = Ut[ii[0][0,:], ii[1][0,:], ii[2][0,:],
+                                 ii[3][0,:]]
+            return elems
+
+        return numpy.array(self.data[tis[:,numpy.newaxis],
+                                     ii[0], ii[1], ii[2], ii[3]])
+
+
     def apply(self, time, target, copy=True):
         """Applies the evolution superoperator at a given time
         
@@ -648,14 +967,23 @@ class EvolutionSuperOperator(SuperOperator, TimeDependent, Saveable):
             # Apply at a single point in time and return ReducedDensityMatrix
             #
             ti, dt = self.time.locate(time)
+            if self.secular:
+                if copy:
+                    import copy
+                    oper_ven = copy.copy(target)
+                    oper_ven.data = self._apply_secular(ti, target.data)
+                    return oper_ven
+                else:
+                    target.data = self._apply_secular(ti, target.data)
+                    return target
             if copy:
                 import copy
                 oper_ven = copy.copy(target)
-                oper_ven.data = numpy.tensordot(self.data[ti, :, :, :, :],
+                oper_ven.data = numpy.tensordot(self._get_slice(ti),
                                                 target.data)
                 return oper_ven
             else:
-                target.data = numpy.tensordot(self.data[ti, :, :, :, :],
+                target.data = numpy.tensordot(self._get_slice(ti),
                                               target.data)
                 return target
             
@@ -679,11 +1007,17 @@ class EvolutionSuperOperator(SuperOperator, TimeDependent, Saveable):
 
                 rhot = ReducedDensityMatrixEvolution(timeaxis=self.time,
                                                      rhoi=target)
+                if self.secular:
+                    SS = self._get_secular_transformation()
+                    for k_i in range(self.time.length):
+                        rhot.data[k_i,:,:] = \
+                        self._apply_secular(k_i, target.data, SS)
+                    return rhot
+                
                 k_i = 0
-                for tt in time.data:
+                for tt in self.time.data:
                     rhot.data[k_i,:,:] = \
-                    numpy.tensordot(self.data[k_i,:,:,:,:],
-                                    target.data)
+                    numpy.tensordot(self._get_slice(k_i), target.data)
                     k_i += 1
                 
                 return rhot
@@ -707,7 +1041,11 @@ class EvolutionSuperOperator(SuperOperator, TimeDependent, Saveable):
                 k_i = 0
                 for tt in ntime.data:
                     Ut = self.at(tt)
-                    rhot.data[k_i,:,:] = numpy.tensordot(Ut.data, target.data)
+                    if self.secular:
+                        rhot.data[k_i,:,:] = Ut._apply(target.data)
+                    else:
+                        rhot.data[k_i,:,:] = numpy.tensordot(Ut.data, 
+                                                             target.data)
                     k_i += 1
                     
                 return rhot
@@ -803,4 +1141,102 @@ class EvolutionSuperOperator(SuperOperator, TimeDependent, Saveable):
 #                +str(self.rwa_energies[self.rwa_indices[k]])
         #out += "\ndata = \n"
         #out += str(self.data)
-        return out                        
\ No newline at end of file
+        return out                        
+
+class SecularSuperOperator(SuperOperator):
+    """Evolution superoperator at a given time in the secular approximation
+    
+    The object is returned by the `at()` method of a secular 
+    EvolutionSuperOperator. It can be applied to operators in any basis
+    without creating the four-index tensor. The tensor is created only
+    when the `data` attribute is accessed, and it is always returned
+    in the current basis. The object is therefore protected from basis
+    transformations and it cannot be transformed explicitly.
+    
+    
+    Parameters
+    ----------
+    
+    evol : EvolutionSuperOperator
+        Secular evolution superoperator
+        
+    ti : int
+        Index of the time point
+    
+    """
+    
+    def __init__(self, evol, ti):
+        
+        super().__init__()
+        self.protect_basis()
+        
+        self.evol = evol
+        self.ti = ti
+        self.dim = evol.dim
+        
+        
+    def transform(self, SS, inv=None):
+        """Transformation is not available, data are in the current basis
+        
+        """
+        raise Exception("Secular evolution superoperator cannot be"+
+                        " transformed; its data are always returned"+
+                        " in the current basis")
+        
+        
+    def _apply(self, rho):
+        """Application of the superoperator directly to an array
+        
+        """
+        return self.evol._apply_secular(self.ti, rho)
+        
+    
+    def apply(self, oper, copy=True):
+        """Applies superoperator to an operator
+        
+        
+        Parameters
+        ----------
+        
+        oper : Operator
+            Operator on which the present superoperator is applied
+            
+        copy : bool
+            If True, the result is returned as a new object
+        
+        """
+        if copy:
+            import copy
+            oper_ven = copy.copy(oper)
+            oper_ven.data = self._apply(oper.data)
+            return oper_ven
+        else:
+            oper.data = self._apply(oper.data)
+            return oper
+        
+        
+    @property
+    def data(self):
+        """Four-index tensor of the superoperator in the current basis
+        
+        """
+        dim = self.dim
+        evol = self.evol
+        SS = evol._get_secular_transformation()
+        S1 = numpy.conj(numpy.transpose(SS))
+        
+        # tensor in the eigenbasis
+        Ue = numpy.zeros((dim, dim, dim, dim), dtype=COMPLEX)
+        cohs = numpy.exp(evol.secular_rates*evol.time.step*self.ti)
+        for aa in range(dim):
+            Ue[aa,:,aa,:] = numpy.diag(cohs[aa,:])
+            Ue[aa,aa,:,:] = numpy.diag(evol.secular_pops[self.ti,aa,:])
+            
+        # U_ijkl = S_ia S*_jb U_abcd S1_ck S1*_dl
+        Ue = numpy.tensordot(SS, Ue, axes=(1, 0))
+        Ue = numpy.tensordot(numpy.conj(SS), Ue, axes=(1, 1))
+        Ue = numpy.transpose(Ue, (1, 0, 2, 3))
+        Ue = numpy.tensordot(Ue, S1, axes=(2, 0))
+        Ue = numpy.tensordot(Ue, numpy.conj(S1), axes=(2, 0))
+        
+        return Ue
@@ -5,16 +5,36 @@ import scipy.interpolate as interp
 from ..hilbertspace.hamiltonian import Hamiltonian
 from ..liouvillespace.systembathinteraction import SystemBathInteraction
 from .relaxationtensor import RelaxationTensor
-from ..corfunctions.correlationfunctions import c2g
 from ...core.managers import energy_units
+from ...core.managers import Manager
+from ... import COMPLEX
 
 class FoersterRelaxationTensor(RelaxationTensor):
     """Weak resonance coupling relaxation tensor by Foerster theory
     
     
+    Parameters
+    ----------
+    ham : Hamiltonian
+        Hamiltonian of the system
+        
+    sbi : SystemBathInteraction
+        Object specifying system bath interaction
+        
+    initialize : bool
+        If True, the tensor is imediately calculated
+        
+    cutoff_time : float
+        Time after which the integration kernel is assumed to be zero
+        
+    coupling_threshold : float
+        Rates between sites whose resonance coupling is not larger (in 
+        absolute value) than the threshold are set to zero and they are 
+        not calculated. By default all rates are calculated.
     
     """
-    def __init__(self, ham, sbi, initialize=True, cutoff_time=None):
+    def __init__(self, ham, sbi, initialize=True, cutoff_time=None,
+                 coupling_threshold=None):
         
         #super().__init__()
         self._initialize_basis()
@@ -34,6 +54,13 @@ class FoersterRelaxationTensor(RelaxationTensor):
             self.cutoff_time = cutoff_time
             self._has_cutoff_time = True            
             
+        if coupling_threshold is not None:
+            m = Manager()
+            self.coupling_threshold = \
+                m.convert_energy_2_internal_u(coupling_threshold)
+        else:
+            self.coupling_threshold = None
+            
         self.Hamiltonian = ham
         self.dim = ham.dim
         self.SystemBathInteraction = sbi
@@ -67,26 +94,25 @@ class FoersterRelaxationTensor(RelaxationTensor):
             
             # line shape functions
             gt = numpy.zeros((Na, sbi.TimeAxis.length),
-                             dtype=numpy.complex64)
+                             dtype=COMPLEX)
     
             # SBI is defined with "sites"
             for ii in range(1, Na):
-                gt[ii,:] = c2g(sbi.TimeAxis, sbi.CC.get_coft(ii-1,ii-1))
+                gt[ii,:] = sbi.CC.get_goft(ii-1,ii-1)
             
             # reorganization energies
             ll = numpy.zeros(Na)
             for ii in range(1, Na):
                 ll[ii] = sbi.CC.get_reorganization_energy(ii-1,ii-1)
                         
-            KK = _reference_implementation(Na, HH, tt, gt, ll)
+            KK = _foerster_rates(Na, HH, tt, gt, ll,
+                                 coupling_threshold=self.coupling_threshold)
    
             #
-            # Transfer rates
+            # Transfer rates (KK has zeros on the diagonal)
             #                                                          
-            for aa in range(self.dim):
-                for bb in range(self.dim):
-                    if aa != bb:
-                        self.data[aa,aa,bb,bb] = KK[aa,bb]
+            aa = numpy.arange(Na)
+            self.data[aa[:,numpy.newaxis],aa[:,numpy.newaxis],aa,aa] = KK
                 
             #  
             # calculate dephasing rates and depopulation rates
@@ -197,4 +223,108 @@ def _fintegral(tt, gtd, gta, ed, ea, ld):
     ret = 2.0*numpy.real(hoft[len(tt)-1])
     
     return ret
-    
\ No newline at end of file
+    
+
+
+def _foerster_rates(Na, HH, tt, gt, ll, coupling_threshold=None):
+    """Foerster rates calculated from overlaps of site lineshapes
+    
+    The rate from the donor b to the acceptor a is given by the overlap 
+    of the absorption lineshape of the acceptor and the fluorescence 
+    lineshape of the donor. Both lineshapes are calculated only once 
+    for each site, and all overlap integrals are obtained by a single
+    matrix product. The time integration reproduces the integration 
+    of the interpolating spline used by `_fintegral`.
+
+    Parameters
+    ----------
+    
+    Na : integer
+        Number of sites in the problem (rank of the rate matrix)
+        
+    HH : float array
+        Hamiltonian matrix
+        
+    tt : float array
+        Time points in which the line shape functions are given
+        
+    gt : complex array
+        Line shape functions values at give time points.
+        First index corresponds to the site, the second to the time point
+        
+    ll : array
+        Reorganization energies on sites
+        
+    coupling_threshold : float, optional
+        Only the rates between states coupled by a coupling larger than
+        the threshold (in absolute value) are calculated
+        
+    Returns
+    -------
+    
+    KK : float array
+        Rate matrix with zeros on the diagonal
+
+    """
+    HH = numpy.real(HH)
+    
+    # transition energies relative to their mean value (only differences
+    # of energies enter the rates)
+    ee = numpy.diag(HH) - numpy.mean(numpy.diag(HH))
+    
+    # absorption and fluorescence lineshapes in time domain
+    ab = numpy.exp(-gt - 1j*numpy.outer(ee, tt))
+    fl = numpy.exp(-gt + 1j*numpy.outer(ee - 2.0*ll, tt))
+    ab *= _spline_weights(tt)[numpy.newaxis,:]
+
+    if coupling_threshold is None:
+
+        KK = 2.0*numpy.real(numpy.dot(ab, fl.T))*(HH**2)
+        numpy.fill_diagonal(KK, 0.0)
+
+    else:
+
+        mask = numpy.abs(HH) > coupling_threshold
+        numpy.fill_diagonal(mask, False)
+
+        KK = numpy.zeros((Na,Na), dtype=numpy.float64)
+        for b in range(Na):
+            acc = numpy.nonzero(mask[:,b])[0]
+            if acc.shape[0] > 0:
+                KK[acc,b] = 2.0*numpy.real(numpy.dot(ab[acc,:], fl[b,:]))\
+                            *(HH[acc,b]**2)
+
+    return KK
+
+
+def _spline_weights(tt, nedge=32):
+    """Quadrature weights of the integral of an interpolating spline
+    
+    The integral of the cubic spline interpolating values on the 
+    equidistant points `tt` is a linear function of these values. The
+    weights of the points close to the ends of the interval are obtained 
+    from the splines of unit vectors on a short axis. Far from the ends,
+    the weights are equal to the time step (up to exponentially small
+    corrections).
+    
+    """
+    Nt = tt.shape[0]
+    Nr = min(Nt, 2*nedge)
+    
+    ref = tt[0:Nr]
+    wr = numpy.zeros(Nr, dtype=numpy.float64)
+    unit = numpy.zeros(Nr, dtype=numpy.float64)
+    for ii in range(Nr):
+        unit[:] = 0.0
+        unit[ii] = 1.0
+        wr[ii] = interp.UnivariateSpline(ref, unit,
+                                         s=0).integral(ref[0], ref[Nr-1])
+    if Nr == Nt:
+        return wr
+    
+    ww = numpy.zeros(Nt, dtype=numpy.float64)
+    ww[:] = tt[1] - tt[0]
+    ww[0:nedge] = wr[0:nedge]
+    ww[Nt-nedge:] = wr[Nr-nedge:]
+    
+    return ww
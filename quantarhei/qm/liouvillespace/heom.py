@@ -5,8 +5,11 @@
 
 """
 import numpy
+import scipy.sparse
+
 from ... import REAL, COMPLEX
 from ..propagators.dmevolution import DensityMatrixEvolution
+from ..propagators.adaptive import adaptive_integration
 from ..hilbertspace.operators import ReducedDensityMatrix
 from ..hilbertspace.operators import UnityOperator
 from ...core.units import kB_int
@@ -172,6 +175,11 @@ class KTHierarchy:
         self.Gamma = numpy.zeros(self.hsize, dtype=REAL)
         self._make_Gamma()
         
+        # sparse coupling of the ADOs
+        self.Cplus = None
+        self.Cminus = None
+        self._make_coupling_matrices()
+        
         self.hpop = None
         
 
@@ -228,12 +236,14 @@ class KTHierarchy:
                 for kk in range(level):
                     last_level = kk
                     new_level_prev = []
+                    new_level_set = set()
                     for old_level in level_prev:
                         for nn in range(N):
                             nlist = old_level.copy()
                             nlist[nn] += 1
                             #check if it is already in
-                            if nlist not in new_level_prev:
+                            if tuple(nlist) not in new_level_set:
+                                new_level_set.add(tuple(nlist))
                                 new_level_prev.append(nlist)
                                 
                     level_prev = new_level_prev
@@ -328,6 +338,11 @@ class KTHierarchy:
         
         """
         
+        # position of each index in the hierarchy
+        position = dict()
+        for nn in range(self.hsize):
+            position[tuple(self.hinds[nn,:])] = nn
+            
         for nn in range(self.hsize):
             for kk in range(self.nbath):
                 indxm = numpy.zeros(self.nbath, dtype=numpy.int)
@@ -338,17 +353,8 @@ class KTHierarchy:
                 indxp[:] = self.hinds[nn,:]
                 indxp[kk] += 1
                 
-                venm = -1
-                for ll in range(nn):
-                    if numpy.array_equal(self.hinds[ll,:], indxm):
-                        venm = ll
-                venp = -1
-                for ll in range(self.hsize):
-                    if numpy.array_equal(self.hinds[ll,:], indxp):
-                        venp = ll
-                
-                self.nm1[nn, kk] = venm
-                self.np1[nn, kk] = venp
+                self.nm1[nn, kk] = position.get(tuple(indxm), -1)
+                self.np1[nn, kk] = position.get(tuple(indxp), -1)
         
         
     def _make_Gamma(self):
@@ -361,6 +367,62 @@ class KTHierarchy:
                 self.Gamma[nn] += self.hinds[nn,kk]*self.gamma[kk]
 
    
+    def _make_coupling_matrices(self):
+        """ Sparse matrices coupling the ADOs through the bath operators
+        
+        The cross-terms of the hierarchy are written as
+        
+        .. math::
+            
+            \\dot{\\rho}_n = \\sum_{k}\\sum_{m} C^{+}_{n,km}
+            \\{V_k,\\rho_m\\} + C^{-}_{n,km}[V_k,\\rho_m]
+            
+        The matrices `Cplus` and `Cminus` have the dimension 
+        (hsize, nbath*hsize) and the column index km = k*hsize + m runs 
+        over the (anti-)commutators of all bath operators with all ADOs.
+        
+        """
+        hsize = self.hsize
+        
+        rows_p = []
+        cols_p = []
+        vals_p = []
+        rows_m = []
+        cols_m = []
+        vals_m = []
+        
+        for nn in range(hsize):
+            for kk in range(self.nbath):
+                
+                # Theta+ and Psi+
+                nk = self.hinds[nn,kk]
+                jj = self.nm1[nn,kk]
+                if nk > 0 and jj >= 0:
+                    # Theta
+                    rows_p.append(nn)
+                    cols_p.append(kk*hsize + jj)
+                    vals_p.append(nk*self.lam[kk]*self.gamma[kk])
+                    # Psi
+                    rows_m.append(nn)
+                    cols_m.append(kk*hsize + jj)
+                    vals_m.append(1j*2.0*nk*self.lam[kk]*self.kBT)
+                    
+                # Psi-
+                jj = self.np1[nn,kk]
+                if jj > 0:
+                    rows_m.append(nn)
+                    cols_m.append(kk*hsize + jj)
+                    vals_m.append(1j)
+                    
+        shape = (hsize, self.nbath*hsize)
+        self.Cplus = scipy.sparse.csr_matrix((numpy.array(vals_p, 
+                                                          dtype=COMPLEX),
+                                              (rows_p, cols_p)), shape=shape)
+        self.Cminus = scipy.sparse.csr_matrix((numpy.array(vals_m, 
+                                                           dtype=COMPLEX),
+                                               (rows_m, cols_m)), shape=shape)
+        
+
     def reset_ados(self):
         """Creates memory of ADOs and sets them to zero
         
@@ -522,12 +584,61 @@ class KTHierarchyPropagator:
                                 
             self.HOmega = HOmega        
     
+        # work buffers of the right-hand side
+        self._rhs_buffers = None
+        
+        # statistics of the last propagation with an adaptive step
+        self.step_statistics = None
+    
+    
+    def _get_rhs_buffers(self, shape, dtype):
+        """Returns preallocated work arrays of the right-hand side
+        
+        """
+        nbath = self.hy.nbath
+        bshape = (nbath,) + shape
+        if ((self._rhs_buffers is None) 
+            or (self._rhs_buffers[0].shape != bshape)
+            or (self._rhs_buffers[0].dtype != dtype)):
+            
+            self._rhs_buffers = (numpy.zeros(bshape, dtype=dtype),
+                                 numpy.zeros(bshape, dtype=dtype),
+                                 numpy.zeros(shape, dtype=dtype))
+            
+        return self._rhs_buffers
+    
+    
+    def _get_system_Hamiltonian(self):
+        """Returns Hamiltonian matrix (with RWA energies removed)
+        
+        """
+        if self.hy.ham.has_rwa:
+            return self.hy.ham.data  - self.HOmega
+        else:
+            return self.hy.ham.data
+        
+    
     
     def propagate(self, rhoi, L=4, report_hierarchy=False,
-                                   free_hierarchy=False):
+                                   free_hierarchy=False,
+                                   method="short-exp", mdata=None):
         """Propagates the Kubo-Tanimura Hierarchy including the RDO
         
+        Parameters
+        ----------
+        
+        method : str
+            "short-exp" (default) uses a fixed time step of the TimeAxis 
+            and Taylor expansion of the order L. "adaptive" integrates
+            the hierarchy by an embedded Runge-Kutta method with an 
+            adaptive time step (see `adaptive_integration`); its 
+            parameters are submitted in the dictionary `mdata` and the 
+            step statistics are stored in the `step_statistics` attribute.
+            
         """
+        if method not in ["short-exp", "adaptive"]:
+            raise Exception("Unknown propagation method: "+method)
+            
         rhot = DensityMatrixEvolution(timeaxis=self.timeaxis, rhoi=rhoi)
         
         if free_hierarchy:
@@ -549,8 +660,11 @@ class KTHierarchyPropagator:
             self.hy.ado[0,:,:] = rhoi.data
             slevel = 0
         
-        ado1 = self.hy.ado
-        ado2 = self.hy.ado
+        # ado1 holds the terms of the Taylor expansion, ado2 their sum
+        ado1 = self.hy.ado.copy()
+        ado2 = self.hy.ado.copy()
+        ado3 = numpy.zeros(ado1.shape, dtype=ado1.dtype)
+        HH = self._get_system_Hamiltonian()
 
         # no fine time-step for integro-differential solver
         self.Nref = 1
@@ -562,6 +676,21 @@ class KTHierarchyPropagator:
             for kk in range(self.hy.hsize):
                 self.hy.hpop[0,kk] = numpy.trace(self.hy.ado[kk,:,:])
 
+        if method == "adaptive":
+            
+            adot = self._propagate_adaptive(ado1, slevel, HH, mdata)
+            
+            self.hy.ado = adot[self.Nt-1,:,:,:].copy()
+            if free_hierarchy:
+                ker[1:,:,:] = adot[1:,1,:,:]
+            else:
+                rhot.data[1:,:,:] = adot[1:,0,:,:]
+            if report_hierarchy:
+                self.hy.hpop[1:,:] = numpy.real(numpy.trace(adot[1:,:,:,:], 
+                                                            axis1=2, axis2=3))
+            
+            return rhot
+            
         indx = 1
         for ii in self.timeaxis.data[1:self.Nt]:
 
@@ -569,11 +698,11 @@ class KTHierarchyPropagator:
 
                 for ll in range(1,L+1):
 
-                    ado1 = self._ado_cros_rhs(ado1, (self.dt/ll), slevel) \
-                         + self._ado_self_rhs(ado1, (self.dt/ll), slevel)
+                    self._ado_rhs(ado1, (self.dt/ll), slevel, HH, out=ado3)
+                    ado1, ado3 = ado3, ado1
 
-                    ado2 = ado2 + ado1      
-                ado1 = ado2
+                    ado2 += ado1      
+                ado1[:,:,:] = ado2
 
             self.hy.ado = ado2
             
@@ -592,24 +721,87 @@ class KTHierarchyPropagator:
         return rhot
 
 
+    def _propagate_adaptive(self, ado, slevel, HH, mdata=None):
+        """Propagates all ADOs with an adaptive time step
+        
+        Returns the ADOs at all points of the TimeAxis as an array of 
+        the shape (Nt, hsize, dim, dim)
+        
+        """
+        if mdata is None:
+            mdata = dict()
+            
+        shape = ado.shape
+        out = numpy.zeros(shape, dtype=COMPLEX)
+        
+        def rhs(t, y):
+            self._ado_rhs(numpy.reshape(y, shape), 1.0, slevel, HH, out=out)
+            return out.flatten()
+        
+        adot, stats = adaptive_integration(rhs, ado.flatten(), 
+                                self.timeaxis.data,
+                                rtol=mdata.get("rtol", 1.0e-6),
+                                atol=mdata.get("atol", 1.0e-9),
+                                solver=mdata.get("solver", "RK45"),
+                                first_step=mdata.get("first_step", None),
+                                max_step=mdata.get("max_step", numpy.inf))
+        
+        self.step_statistics = stats
+        
+        return numpy.reshape(adot, (self.Nt,) + shape)
+        
+        
+    def _ado_rhs(self, ado1, dt, slevel, HH, out):
+        """Complete right-hand side of the hierarchy equations 
+        
+        The result is written into the `out` array. The cross-terms
+        are calculated by batched products of the bath operators with
+        all ADOs and a sparse matrix product which couples the ADOs
+        (see `KTHierarchy._make_coupling_matrices`).
+        
+        """
+        hsize = self.hy.hsize
+        N = ado1.shape[1]
+        VA, AV, tmp = self._get_rhs_buffers(ado1.shape, ado1.dtype)
+        
+        # V_k rho_m and rho_m V_k for all baths and ADOs
+        numpy.matmul(self.hy.Vs[:,numpy.newaxis,:,:], 
+                     ado1[numpy.newaxis,:,:,:], out=VA)
+        numpy.matmul(ado1[numpy.newaxis,:,:,:], 
+                     self.hy.Vs[:,numpy.newaxis,:,:], out=AV)
+        
+        # anti-commutators and commutators
+        numpy.add(VA, AV, out=VA)
+        numpy.multiply(AV, 2.0, out=AV)
+        numpy.subtract(VA, AV, out=AV)
+        
+        ret = self.hy.Cplus.dot(VA.reshape(self.hy.nbath*hsize, N*N))
+        ret += self.hy.Cminus.dot(AV.reshape(self.hy.nbath*hsize, N*N))
+        
+        # self-terms
+        numpy.matmul(HH, ado1, out=out)
+        numpy.matmul(ado1, HH, out=tmp)
+        numpy.subtract(out, tmp, out=out)
+        out *= 1j
+        out += self.hy.Gamma[:,numpy.newaxis,numpy.newaxis]*ado1
+        out *= -1.0
+        out += ret.reshape(hsize, N, N)
+        out *= dt
+        
+        out[0:slevel,:,:] = 0.0
+        
+        return out
+    
+
     def _ado_self_rhs(self, ado1, dt, slevel=0):
         """Self contribution of the equation for the hierarchy ADOs
 
         """
-        ado3 = numpy.zeros(ado1.shape, dtype=ado1.dtype)
-        
-        if self.hy.ham.has_rwa:
-            HH = self.hy.ham.data  - self.HOmega
-        else:
-            HH = self.hy.ham.data
+        HH = self._get_system_Hamiltonian()
         
-        for nn in range(slevel, self.hy.hsize):
-            
-            # 
-            ado3[nn,:,:] = -dt*(1j*(numpy.dot(HH, ado1[nn,:,:])
-                                  - numpy.dot(ado1[nn,:,:],HH)) 
-                                + self.hy.Gamma[nn]*ado1[nn,:,:])
-           
+        ado3 = -dt*(1j*(numpy.matmul(HH, ado1) - numpy.matmul(ado1, HH))
+                    + self.hy.Gamma[:,numpy.newaxis,numpy.newaxis]*ado1)
+        ado3[0:slevel,:,:] = 0.0
                            
         return ado3
 
@@ -619,45 +811,19 @@ class KTHierarchyPropagator:
         """All cross-terms of the Hierarchy 
         
         """
-        
-        ado3 = numpy.zeros(ado1.shape, dtype=ado1.dtype)
-        rl = numpy.zeros((ado1.shape[1],ado1.shape[2]), dtype=ado1.dtype)
-        rr = numpy.zeros((ado1.shape[1],ado1.shape[2]), dtype=ado1.dtype)
-        
-        
-        for nn in range(slevel, self.hy.hsize):
-            for kk in range(self.hy.nbath):
-                
-                # Theta+ and Psi+
-                nk = self.hy.hinds[nn,kk]   
-                jj = self.hy.nm1[nn,kk]
-                
-                
-                if nk*jj >= 0:
-                    
-                    
-                    rr = numpy.dot(self.hy.Vs[kk,:,:], ado1[jj,:,:])
-                    rl = numpy.dot(ado1[jj,:,:],self.hy.Vs[kk,:,:])
-                    
-                    # Theta
-                    ado3[nn,:,:] += dt*nk*self.hy.lam[kk]*self.hy.gamma[kk]* \
-                                    (rr+rl)
-                        
-                            
-                    # Psi
-                    ado3[nn,:,:] += (1j*dt)*2.0*nk* \
-                                    self.hy.lam[kk]*self.hy.kBT* \
-                                    (rr-rl)
-                    
-                # Psi-
-                jj = self.hy.np1[nn,kk]
-                
-                if jj > 0:
-   
-                    rr = numpy.dot(self.hy.Vs[kk,:,:], ado1[jj, :,:])
-                    rl = numpy.dot(ado1[jj,:,:],self.hy.Vs[kk,:,:])
-                    
-                    ado3[nn,:,:] += (1j*dt)*(rr-rl)
+        hsize = self.hy.hsize
+        nbath = self.hy.nbath
+        N = ado1.shape[1]
+        
+        VA = numpy.matmul(self.hy.Vs[:,numpy.newaxis,:,:], 
+                          ado1[numpy.newaxis,:,:,:])
+        AV = numpy.matmul(ado1[numpy.newaxis,:,:,:], 
+                          self.hy.Vs[:,numpy.newaxis,:,:])
+        
+        ado3 = self.hy.Cplus.dot((VA + AV).reshape(nbath*hsize, N*N)) \
+             + self.hy.Cminus.dot((VA - AV).reshape(nbath*hsize, N*N))
+        ado3 = dt*ado3.reshape(hsize, N, N)
+        ado3[0:slevel,:,:] = 0.0
                     
         return ado3
 
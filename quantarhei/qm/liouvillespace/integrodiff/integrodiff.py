@@ -49,13 +49,20 @@ class IntegrodiffPropagator:
     
     correction_length : float
         How long the correction should be (from zero)
+        
+    block_length : int
+        Length of the blocks of the time axis in which the convolution with
+        the kernel is calculated by FFT in the time domain propagation. 
+        By default, it is the square root of the number of the kernel 
+        time points.
 
     """
     
     def __init__(self, timeaxis, ham, kernel=None, cutoff_time=-1,
                  inhom=None, fft=True, save_fft_kernel=False,
                  timefac=3, decay_fraction=2.0,
-                 correct_short_time=False, correction_length=0.0):
+                 correct_short_time=False, correction_length=0.0,
+                 block_length=None):
         
         self.timeaxis = timeaxis
         self.ham = ham
@@ -72,10 +79,11 @@ class IntegrodiffPropagator:
             
         self.inhom = inhom
         self.fft = fft
+        self.block_length = block_length
         
         if self.fft:
 
-            self.resolv = None
+            self.inv_resolv = None
             
             # FFT on timeaxis twice as long as defines (we add negative times)
             tlen = timefac*self.timeaxis.length
@@ -98,49 +106,37 @@ class IntegrodiffPropagator:
             om = self.om           
             
             # Superoperator unity  
-            unity = SOpUnity(dim=self.ham.dim).data                
+            unity = SOpUnity(dim=self.ham.dim).data.reshape(N1**2, N1**2)
             
             # Liouvillian
-            LL = Liouvillian(self.ham).data
+            LL = Liouvillian(self.ham).data.reshape(N1**2, N1**2)
+            
+            #
+            # Inverse of the resolvent at all frequencies, shape 
+            # (frequencies, N1**2, N1**2). The resolvent itself is never 
+            # calculated; propagation solves linear equations with these 
+            # matrices for all frequencies at once
+            #
+            self.inv_resolv = \
+                (((-1j*om + gamma)[:,numpy.newaxis,numpy.newaxis])
+                 *unity[numpy.newaxis,:,:] 
+                 + 1j*LL[numpy.newaxis,:,:]).astype(COMPLEX)
             
             if self.kernel is not None:
-                with_kernel = True
-            else:
-                with_kernel = False
                 
-            if with_kernel:
-                
-                # if kernel is present, we use it for calculation
-                MM = numpy.zeros((tlen, N1, N1, N1, N1), dtype=COMPLEX)
-                MM[:self.timeaxis.length,:,:,:,:] = self.kernel
-                
-                # we renormalize the kernel by a e^{-gam*t} decay
-                for tm in range(len(tt)):
-                    MM[tm,:,:,:,:] = MM[tm,:,:,:,:]*numpy.exp(-gamma*tt[tm])
-                    
-                MM = numpy.fft.ifft(MM, axis=0)*self.timeaxis.step*tlen*2.0
+                # we renormalize the kernel by a e^{-gam*t} decay; the FFT
+                # pads the kernel with zeros to the length of the FFT
+                Nk = self.kernel.shape[0]
+                MM = numpy.fft.ifft(self.kernel
+                                    *numpy.exp(-gamma*tt[0:Nk])[:,numpy.newaxis,
+                                                numpy.newaxis,numpy.newaxis,
+                                                numpy.newaxis],
+                                    n=tlen, axis=0)*self.timeaxis.step*tlen*2.0
                 if save_fft_kernel:
                     self.fftKernel = MM
                     
                 # this is now going over frequencies 
-                self.resolv = numpy.zeros(MM.shape, COMPLEX)
-                for io in range(len(tt)):
-                    self.resolv[io,:,:,:,:] = (-1j*om[io] + gamma)*unity \
-                                               +1j*LL + MM[io,:,:,:,:]
-                    A = self.resolv[io,:,:,:,:].reshape(N1**2, N1**2)
-                    A = numpy.linalg.inv(A)                          
-                    self.resolv[io,:,:,:,:] = A.reshape(N1, N1, N1, N1)
-
-            else:
-                
-                # if kernel is not present, we calculate with Hamiltonian only
-                self.resolv = numpy.zeros((tlen, N1, N1, N1, N1), COMPLEX)
-                for io in range(len(tt)):
-                    self.resolv[io,:,:,:,:] = (-1j*om[io] + gamma)*unity \
-                                               +1j*LL
-                    A = self.resolv[io,:,:,:,:].reshape(N1**2, N1**2)
-                    A = numpy.linalg.inv(A)
-                    self.resolv[io,:,:,:,:] = A.reshape(N1, N1, N1, N1)                          
+                self.inv_resolv += MM.reshape(tlen, N1**2, N1**2)
             
         else:
             
@@ -163,23 +159,21 @@ class IntegrodiffPropagator:
             
             Nt = len(self.om)
             
-            rhOm = numpy.zeros((Nt, N1, N1), dtype=COMPLEX)
-            
-            rho0 = rhoi.data #.reshape(N1**2)
+            rho0 = numpy.broadcast_to(rhoi.data.reshape(N1**2, 1),
+                                      (Nt, N1**2, 1))
             
-            for ii in range(Nt):
-                G = self.resolv[ii,:,:,:,:]
-                #Gr = G.reshape(N1**2, N1**2)
-                rhOm[ii,:,:] = numpy.tensordot(G, rho0)            
+            # resolvent applied to the initial condition at all frequencies
+            rhOm = numpy.linalg.solve(self.inv_resolv, 
+                                      rho0).reshape(Nt, N1, N1)
             
             rhOm = numpy.fft.fft(rhOm, axis=0) \
                     *((self.om[1]-self.om[0])/(2.0*numpy.pi))
     
             # lift the gamma damping
             Nt = self.timeaxis.length
-            for ii in range(1,Nt):
-                rhot.data[ii,:,:] = rhOm[ii,:,:]* \
-                numpy.exp(self.gamma*self.timeaxis.data[ii])
+            rhot.data[1:Nt,:,:] = rhOm[1:Nt,:,:]* \
+                numpy.exp(self.gamma*self.timeaxis.data[1:Nt])[:,numpy.newaxis,
+                                                               numpy.newaxis]
             
             return rhot
         
@@ -197,6 +191,7 @@ class IntegrodiffPropagator:
             
             L = 4
             self.last_tn = -1
+            self._init_convolution(rhot)
             dt = self.timeaxis.step
             indx = 1
             
@@ -219,6 +214,64 @@ class IntegrodiffPropagator:
         
         
         
+    def _init_convolution(self, rhot):
+        """Prepares the blocked convolution with the integration kernel
+        
+        The memory integral at time t_n is split into the contributions
+        of the density matrix from the previous blocks of the time axis,
+        which are added by FFT convolution whenever a block is completed,
+        and the contributions from the current block, which are summed 
+        directly.
+        
+        """
+        Nt, dim = rhot.data.shape[0:2]
+        
+        # accumulated contributions of the completed blocks
+        self._conv_hist = numpy.zeros((Nt, dim, dim), dtype=COMPLEX)
+        self._conv_done = 0
+        
+        Nc = self.kernel_cutoff
+        if Nc <= 1:
+            self._conv_block = 0
+            return
+        
+        if self.block_length is None:
+            self._conv_block = max(int(numpy.sqrt(Nc)), 1)
+        else:
+            self._conv_block = self.block_length
+        
+        # FFT of the kernel (without its zero time value)
+        Nb = self._conv_block
+        self._conv_fft_len = Nc + Nb - 1
+        kernel = numpy.array(self.kernel[0:Nc,:,:,:,:])
+        kernel[0,:,:,:,:] = 0.0
+        self._conv_fft_kernel = numpy.fft.fft(kernel, 
+                                              n=self._conv_fft_len, axis=0)
+            
+        
+    def _add_block_to_convolution(self, rhot):
+        """Adds contribution of the last completed block to the convolution
+        
+        """
+        Nb = self._conv_block
+        Nc = self.kernel_cutoff
+        Nt = rhot.data.shape[0]
+        n0 = self._conv_done
+        n1 = n0 + Nb
+        
+        rhoF = numpy.fft.fft(rhot.data[n0:n1,:,:], n=self._conv_fft_len,
+                             axis=0)
+        conv = numpy.fft.ifft(numpy.einsum("tijkl,tkl->tij",
+                                           self._conv_fft_kernel, rhoF),
+                              axis=0)
+        
+        # contributions to the times after the block
+        nmax = min(n1 + Nc - 1, Nt)
+        self._conv_hist[n1:nmax,:,:] += \
+            self.timeaxis.step*conv[Nb:Nb+nmax-n1,:,:]
+        self._conv_done = n1
+
+
     def _convolution_with_kernel(self, tn, rho_in, rhot):
         """Convolution of the density matrix with integration kernel
         
@@ -226,16 +279,29 @@ class IntegrodiffPropagator:
         """
         dim = rhot.data.shape[1]
         
+        if self.kernel is None:
+            return numpy.zeros((dim, dim), dtype=COMPLEX)
+        
         if tn == self.last_tn:
-            rho = self.last_int
+            rho = self.last_int.copy()
         else:
-            rho = numpy.zeros((dim, dim), dtype=COMPLEX)
-            self.last_int = numpy.zeros((dim, dim), dtype=COMPLEX)
-            for nn in range(1, self.kernel_cutoff):
-                nr = tn - nn
+            Nc = self.kernel_cutoff
+            
+            # blocks completed before tn
+            while (self._conv_block > 0 
+                   and self._conv_done + self._conv_block <= tn):
+                self._add_block_to_convolution(rhot)
+                
+            rho = self._conv_hist[tn,:,:].copy()
+            
+            # direct sum over the current block
+            n0 = max(self._conv_done, tn - Nc + 1, 0)
+            if n0 < tn:
                 rho += self.timeaxis.step* \
-                   numpy.tensordot(self.kernel[nn,:,:,:,:],rhot.data[nr,:,:])
-            self.last_int[:,:] = rho
+                    numpy.einsum("nijkl,nkl->ij", 
+                                 self.kernel[tn-n0:0:-1,:,:,:,:],
+                                 rhot.data[n0:tn,:,:])
+            self.last_int = rho.copy()
             
         rho += \
         self.timeaxis.step*numpy.tensordot(self.kernel[0,:,:,:,:],rho_in)
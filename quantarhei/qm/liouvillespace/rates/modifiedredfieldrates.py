@@ -6,222 +6,199 @@
       MODIFIED REDFIELD RATE MATRIX
 
 *******************************************************************************
-"""  
+"""
 
 import numpy
 from scipy import integrate
 
-from quantarhei.core.implementations import implementation
-from quantarhei.core.units import cm2int
-from quantarhei.core.units import kB_intK
-
 from quantarhei.qm.hilbertspace.hamiltonian import Hamiltonian
 from quantarhei.qm.liouvillespace.systembathinteraction import SystemBathInteraction
 
 import quantarhei as qr
-import itertools as it
+
 
 class ModifiedRedfieldRateMatrix:
     """Modifield Redfield relaxation rate matrix
-    
-    Modified Redfield population relaxation rate matrix is calculated from the 
-    Hamiltonian and system-system bath interation. The bath
-    correlation functions are Fourier transformed by FFT and the negative
-    frequency part is calculated from the expected thermodynamic
-    symmetry. 
-    
+
+    Modified Redfield population relaxation rate matrix is calculated from the
+    Hamiltonian and system-system bath interation. The rates are obtained
+    by a time integration of the products of the lineshape functions
+    of the excitons transformed from the site basis.
+
     Parameters
     ----------
-    
+
     ham : Hamiltonian
-        Hamiltonian object 
-        
+        Hamiltonian object
+
     sbi : SystemBathInteraction
         SystemBathInteraction object
-        
+
+    time : TimeAxis
+        Time axis on which the rates are integrated
+
     initialize : bool (default True)
         If true, the rates will be calculated when the object is created
-        
+
     cutoff_time : float
         If cutoff time is specified, the tensor is integrated only up to the
         cutoff time
-    
-    
+
+
     """
-    
+
     def __init__(self, ham, sbi, time, initialize=True, cutoff_time=None):
-        
+
         if not isinstance(ham,Hamiltonian):
             raise Exception("First argument must be a Hamiltonian")
-            
+
         if not isinstance(sbi,SystemBathInteraction):
-            raise Exception
-            
-        self._is_initialized = False            
+            raise Exception("Second argument must be a SystemBathInteraction")
+
+        self._is_initialized = False
         self._has_cutoff_time = False
-        
+
         if cutoff_time is not None:
             self.cutoff_time = cutoff_time
-            self._has_cutoff_time = True            
-            
+            self._has_cutoff_time = True
+
         self.ham = ham
         self.sbi = sbi
+        self.time = time
         self.tt = time.data
-        
-        if initialize: 
-            self._set_rates()          
+
+        if initialize:
+            self._set_rates()
             self._is_initialized = True
-            
+
+
     def _set_rates(self):
+        """Prepares all data for rate calculation and calculates the rates
+
+        The correlation function matrix of the system-bath interaction is
+        transformed into the basis of the excitons of the single exciton
+        band and only the elements required by the theory are evaluated.
+
         """
-        
-        """
+        # dimension of the Hamiltonian (includes the ground state)
+        Na = self.ham._data.shape[0]
 
-        Na = self.ham.dim
-        Nc = self.sbi.N 
-        tt = self.tt
-    
-        # Eigen problem
-        hD,SS = numpy.linalg.eigh(self.ham._data) #hD=eigenvalues, SS=eigenvectors
-        
-        Nt = self.sbi.CC.timeAxis.length
-        
-        lam4 = numpy.zeros((Na-1,Na-1,Na-1,Na-1),dtype=qr.REAL)
-        #lam4 = numpy.zeros((Na,Na,Na,Na),dtype=qr.REAL)
-        
-        for a in range(Na-1):
-        #for a in range(1,Na):    
-            for b in range(Na-1):
-            #for b in range(1,Na):
-                for c in range(Na-1):
-                #for c in range(1,Na):   
-                    for d in range(Na-1):
-                    #for d in range(1,Na):   
-                         lam4[a,b,c,d] = self.sbi.CC.get_reorganization_energy4(a,b,c,d)
-            
-        self.sbi.CC.create_double_integral() #g(t)
-        self.sbi.CC.create_one_integral()  #g_dot(t)
-        self.sbi.CC.transform(SS)
-        #g4_1value = self.sbi.CC.get_goft4(1,2,3,4)
-        g4 = self.sbi.CC.get_goft_matrix()   #g_{abcd}(t), dimensions (Na, Na, Na, Na, Nt-1)
-        h4 = self.sbi.CC.get_hoft_matrix()   #g_dot_{abcd}(t), dimensions (Na, Na, Na, Na, Nt-1)
-        c4 = self.sbi.CC.get_coft_matrix()   #g_dotdot_{abcd}(t) = C(t) in exciton basis, dimensions (Na, Na, Na, Na, Nt-1)
-        
-        rates = ssModifiedRedfieldRateMatrix(Na, Nc, Nt, hD, lam4, g4, h4, c4, tt)
-        self.rates = rates
-
-def ssModifiedRedfieldRateMatrix(Na, Nc, Nt, hD, lam4, g4, h4, c4, tt): #, Ee, SS, prt, gg, hh, cf, tt, ls,
-                                 #rtol, werror, RR):
-        """Standard redfield rates
-    
-    
-        Parameters
-        ----------
-    
-        Na : integer
-        Rank of the rate matrix, number of excitons
-        
-        Nc : integer
-        Number of components of the interaction Hamiltonian (number of sites
-        or number of distinct correlation functions)
-    
-        Ee : float array
-        Eigen energies of the Hamiltonian
-        
-        SS : float array
-        Transformation matrix 
-        (components of the interaction operator in the exciton basis)
-        
-        prt : integer array
-        Pointer between site index and correlation function index
-    
-        gg : float array
-        Line shape functions
-        
-        hh : float array
-        derivative of the line shape function
-    
-        cf : float array
-        second derivatives of the line shape functions (correlation functions)
-        
-        tt : float array
+        CC = self.sbi.CC
+
+        # start and size of the single exciton band
+        if self.sbi.aggregate is not None:
+            n0 = self.sbi.aggregate.Nb[0]
+            Nb = self.sbi.aggregate.Nb[1]
+        else:
+            Nb = CC.nob
+            n0 = Na - Nb
+        n1 = n0 + Nb
+
+        # Eigen problem of the single exciton block
+        hD, S1 = numpy.linalg.eigh(self.ham._data[n0:n1,n0:n1])
+
+        # baths of the higher exciton bands (if present) are not mixed
+        # with those of the single exciton band
+        SS = numpy.eye(CC.nob)
+        SS[0:Nb,0:Nb] = S1
+
+        # number of time points on which the rates are integrated
+        Nt = min(CC.max_cutoff_index, self.tt.shape[0])
+        if self._has_cutoff_time:
+            Nt = min(Nt, self.time.nearest(self.cutoff_time)+1)
+        tt = self.tt[0:Nt]
+
+        CC.create_double_integral() #g(t)
+        CC.create_one_integral()  #g_dot(t)
+        CC.transform(SS)
+
+        # only the elements of the single exciton band are used
+        l_aaaa = CC.get_reorganization_energy_matrix(subset="aaaa")[0:Nb]
+        l_aabb = CC.get_reorganization_energy_matrix(subset="aabb")[0:Nb,0:Nb]
+        l_abbb = CC.get_reorganization_energy_matrix(subset="abbb")[0:Nb,0:Nb]
+        l_abaa = CC.get_reorganization_energy_matrix(subset="abaa")[0:Nb,0:Nb]
+
+        g_aaaa = CC.get_goft_matrix(subset="aaaa")[0:Nb,0:Nt]
+        g_aabb = CC.get_goft_matrix(subset="aabb")[0:Nb,0:Nb,0:Nt]
+        h_abbb = CC.get_hoft_matrix(subset="abbb")[0:Nb,0:Nb,0:Nt]
+        h_abaa = CC.get_hoft_matrix(subset="abaa")[0:Nb,0:Nb,0:Nt]
+        c_abba = CC.get_coft_matrix(subset="abba")[0:Nb,0:Nb,0:Nt]
+
+        RR = ssModifiedRedfieldRateMatrix(hD, tt, l_aaaa, l_aabb, l_abbb,
+                                          l_abaa, g_aaaa, g_aabb,
+                                          h_abbb, h_abaa, c_abba)
+
+        self.data = numpy.zeros((Na,Na), dtype=qr.REAL)
+        self.data[n0:n1,n0:n1] = RR
+        self.rates = self.data
+
+
+def ssModifiedRedfieldRateMatrix(Ee, tt, l_aaaa, l_aabb, l_abbb, l_abaa,
+                                 g_aaaa, g_aabb, h_abbb, h_abaa, c_abba):
+    """Modified Redfield rates
+
+    All quantities are specified in the exciton basis. The elements of the
+    four index functions are specified by the pattern of their indices,
+    e.g. g_aabb[a,b,:] is the lineshape function g_{aabb}(t). The rates
+    are integrated over the time points `tt` by Simpson's rule.
+
+
+    Parameters
+    ----------
+
+    Ee : float array
+        Eigen energies of the excitons
+
+    tt : float array
         values of time
-        
-        ls : float array
-        reorganization energies of the sites
-        
-        RR : real array
-        Relaxation rate matrix (to be calculated and returned)
-    
-        rtol : float array
-        tolerances
-        
-        werror : integer array
-        warnings and errors
-        
-        """
-        
-        print("***")
-        
-        E_0k = numpy.zeros(Na-1,dtype=numpy.float)
-        #E_0k = numpy.zeros(Na,dtype=numpy.float)
-        
-        for ii in range(Na-1):
-        #for ii in range(1,Na):
-            E_0k[ii] = hD[ii] - lam4[ii,ii,ii,ii]  
-            
-        F_k_t = numpy.zeros((Na-1,Nt-1),dtype=numpy.complex)    
-        A_k_t = numpy.zeros((Na-1,Nt-1),dtype=numpy.complex) 
-        N_kl_t = numpy.zeros((Na-1,Na-1,Nt-1),dtype=numpy.complex) 
-        
-        #F_k_t = numpy.zeros((Na,Nt-1),dtype=numpy.complex)    
-        #A_k_t = numpy.zeros((Na,Nt-1),dtype=numpy.complex) 
-        #N_kl_t = numpy.zeros((Na,Na,Nt-1),dtype=numpy.complex) 
-        
-        for a in range(Na-1):
-        #for a in range(1,Na):
-            for ti in range(Nt-1):
-                F_k_t[a,ti] = numpy.exp(-1j*(E_0k[a] - lam4[a,a,a,a])*tt[ti] - numpy.conjugate(g4[a,a,a,a,ti])) 
-                A_k_t[a,ti] = numpy.exp(-1j*(E_0k[a] + lam4[a,a,a,a])*tt[ti] - g4[a,a,a,a,ti]) 
-                                
-        for a in range(Na-1):
-        #for a in range(1,Na):
-            for b in range(Na-1):
-            #for b in range(1,Na):
-                for ti in range(Nt-1): 
-                    N_kl_t[a,b,ti] = (c4[b,a,a,b,ti] - (h4[b,a,a,a,ti] -  h4[b,a,b,b,ti] - 2j*lam4[b,a,b,b])*(h4[a,b,a,a,ti] - h4[a,b,b,b,ti] - 2j*lam4[a,b,b,b]))*numpy.exp(2*(g4[a,a,b,b,ti] + 1j*lam4[a,a,b,b]*tt[ti]))
-                  
-        f = numpy.zeros((Na-1,Na-1,Nt),dtype=numpy.complex) 
-        RR = numpy.zeros((Na-1,Na-1),dtype=numpy.complex) 
-        
-        #f = numpy.zeros((Na,Na,Nt),dtype=numpy.complex) 
-        #RR = numpy.zeros((Na,Na),dtype=numpy.complex) 
-        
-        for a in range(Na-1):
-        #for a in range(1,Na):
-            for b in range(Na-1):
-            #for b in range(1,Na):
-                for ti in range(Nt-1):
-                    f[a,b,ti] = numpy.conjugate(F_k_t[b,ti])*A_k_t[a,ti]*N_kl_t[a,b,ti]
-                    RR[a,b] = 2*numpy.real(integrate.simps(f[a,b,:],tt))
-                    
-        for a in range(Na-1):
-        #for a in range(1,Na):
-            RR[a,a] = 0
-                   
-        RR_bbaa = -numpy.sum(RR, axis = 0)
-        print('RR_bbaa is:')
-        print(RR_bbaa)
-        #RR = numpy.diag(numpy.diag(RR_bbaa)) + RR  
-        RR = numpy.diag(RR_bbaa) + RR  
-        print('diag RR_bbaa is:')
-        print(numpy.diag(RR_bbaa))
-        print('RR is:')
-        print(RR)
-                        
-        print("I am called from outside")
-        return RR
-
-        qr.stop()
-                    
-                    
+
+    l_aaaa, l_aabb, l_abbb, l_abaa : float arrays
+        Reorganization energies in the exciton basis
+
+    g_aaaa, g_aabb : complex arrays
+        Line shape functions
+
+    h_abbb, h_abaa : complex arrays
+        Derivatives of the line shape functions
+
+    c_abba : complex array
+        Second derivatives of the line shape functions (correlation
+        functions)
+
+
+    Returns
+    -------
+
+    RR : real array
+        Relaxation rate matrix; RR[a,b] is the rate of the transfer
+        from b to a, and the diagonal contains the depopulation rates
+
+    """
+    t = tt[numpy.newaxis,:]
+
+    # zero-phonon transition energies
+    E_0k = Ee - l_aaaa
+
+    # fluorescence and absorption line shapes
+    F_k_t = numpy.exp(-1j*(E_0k - l_aaaa)[:,numpy.newaxis]*t
+                      - numpy.conjugate(g_aaaa))
+    A_k_t = numpy.exp(-1j*(E_0k + l_aaaa)[:,numpy.newaxis]*t - g_aaaa)
+
+    # (h_baaa - h_babb - 2i lam_babb) with indices [b,a]
+    X_ba = h_abbb - h_abaa - 2j*l_abaa[:,:,numpy.newaxis]
+    # (h_abaa - h_abbb - 2i lam_abbb) with indices [a,b]
+    X_ab = h_abaa - h_abbb - 2j*l_abbb[:,:,numpy.newaxis]
+
+    N_kl_t = ((numpy.transpose(c_abba, (1,0,2))
+               - numpy.transpose(X_ba, (1,0,2))*X_ab)
+              *numpy.exp(2*(g_aabb + 1j*l_aabb[:,:,numpy.newaxis]*t)))
+
+    f = (numpy.conjugate(F_k_t)[numpy.newaxis,:,:]
+         *A_k_t[:,numpy.newaxis,:]*N_kl_t)
+
+    RR = 2*numpy.real(integrate.simpson(f, x=tt, axis=2))
+
+    numpy.fill_diagonal(RR, 0.0)
+    RR += numpy.diag(-numpy.sum(RR, axis=0))
+
+    return RR
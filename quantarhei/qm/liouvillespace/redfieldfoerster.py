@@ -3,8 +3,7 @@ import numpy
 
 from .redfieldtensor import RedfieldRelaxationTensor
 from .foerstertensor import FoersterRelaxationTensor
-from .foerstertensor import _reference_implementation as foerster_rates
-from ..corfunctions.correlationfunctions import c2g
+from .foerstertensor import _foerster_rates as foerster_rates
 from ...core.managers import Manager
 from ...core.managers import energy_units
 
@@ -105,7 +104,7 @@ class RedfieldFoersterRelaxationTensor(RedfieldRelaxationTensor,
             gvals = numpy.zeros((Na,Nt),dtype=numpy.complex128)
             Gt = numpy.zeros((Na,Nt),dtype=numpy.complex128)
             for ii in range(1,Na):
-                Gt[ii,:] = c2g(sbi.TimeAxis, sbi.CC.get_coft(ii-1,ii-1))
+                Gt[ii,:] = sbi.CC.get_goft(ii-1,ii-1)
             for aa in range(Na):
                 for bb in range(Na):
                     # Here we assume no correlation between sites 
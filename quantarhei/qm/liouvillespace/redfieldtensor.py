@@ -48,6 +48,15 @@ class RedfieldRelaxationTensor(RelaxationTensor):
         If True the tensor will not be constructed. Instead a set of
         operators whose application is equal to the application of the
         tensor will be defined and stored
+        
+    integration : str
+        Method of integration of the bath correlation functions. 
+        "splines" (default) integrates separately for every pair of states
+        using spline antiderivatives. "fft" calculates the one-sided 
+        Fourier transform of each correlation function once and evaluates 
+        it at all transition frequencies in one vectorized step (see
+        `half_fourier_transform` in the `correlationfunctions` module).
+        The transforms are cached by the `CorrelationFunctionMatrix`
             
     Methods
     -------
@@ -77,7 +86,7 @@ class RedfieldRelaxationTensor(RelaxationTensor):
 
     def __init__(self, ham, sbi, initialize=True,
                  cutoff_time=None, as_operators=False,
-                 name=""):
+                 name="", integration="splines"):
                      
         self._initialize_basis()
         
@@ -106,6 +115,10 @@ class RedfieldRelaxationTensor(RelaxationTensor):
         self._has_cutoff_time = False
         self.as_operators = as_operators
         
+        if integration not in ["splines", "fft"]:
+            raise Exception("Unknown integration method: "+integration)
+        self.integration = integration
+        
         if not self.as_operators:
             self.data = numpy.zeros((self.dim,self.dim,self.dim,self.dim),
                                     dtype=numpy.complex128)
@@ -175,7 +188,9 @@ class RedfieldRelaxationTensor(RelaxationTensor):
         
         
         This function transforms the Operator into a different basis, using
-        a given transformation matrix.
+        a given transformation matrix. Operators of the operator form are
+        transformed immediately, the tensor form is transformed only when
+        its data are needed.
         
         Parameters
         ----------
@@ -199,14 +214,16 @@ class RedfieldRelaxationTensor(RelaxationTensor):
             else:
                 S1 = inv
 
-            for m in range(self._Lm.shape[0]):
-                self._Lm[m,:,:] = numpy.dot(S1,numpy.dot(self._Lm[m,:,:], SS))  
-                self._Ld[m,:,:] = numpy.dot(S1,numpy.dot(self._Ld[m,:,:], SS))
-                self._Km[m,:,:] = numpy.dot(S1,numpy.dot(self._Km[m,:,:], SS))
+            # all operators (and all their times, if time dependent) 
+            # are transformed at once
+            self._Lm = numpy.matmul(S1, numpy.matmul(self._Lm, SS))
+            self._Ld = numpy.matmul(S1, numpy.matmul(self._Ld, SS))
+            self._Km = numpy.matmul(S1, numpy.matmul(self._Km, SS))
      
         else:
     
-            super().transform(SS)
+            # transformation is applied when the data are needed
+            super().transform(SS, inv=inv)
             
 
     def _implementation(self, ham, sbi):
@@ -325,8 +342,12 @@ class RedfieldRelaxationTensor(RelaxationTensor):
                 
                 #FIXME: reaching correct correlation function is a nightmare!!!
                 rc1 = sbi.CC.get_coft(ms, ns)  
-                        
-                self._guts_Cmplx_Splines(ms, Lm, Km, Na, Om, length, rc1, tm)
+                
+                if self.integration == "fft":
+                    self._guts_Cmplx_FFT(ms, ns, Lm, Km, Om, length, sbi.CC)
+                else:
+                    self._guts_Cmplx_Splines(ms, Lm, Km, Na, Om, length,
+                                             rc1, tm)
              
         # perform reduction of Lm
         qr.log_quick()
@@ -417,31 +438,25 @@ class RedfieldRelaxationTensor(RelaxationTensor):
                 Lm[ms,a,b] += cc_mnab*Km[ms,a,b] 
                 
                 
-    def _guts_Cmplx_FFT(self, ms, Lm, Km, Na, Om, length, rc1, tm):
-
-        for a in range(Na):
-            for b in range(Na):
-                
-                # argument of the integration
-                eexp = numpy.exp(-1.0j*Om[a,b]*tm) 
-                rc = rc1[0:length]*eexp
-                
-                # spline integration instead of FFT
-                rr = numpy.real(rc)
-                ri = numpy.imag(rc)
-                sr = scipy.interpolate.UnivariateSpline(tm,
-                            rr, s=0).antiderivative()(tm)
-                si = scipy.interpolate.UnivariateSpline(tm,
-                            ri, s=0).antiderivative()(tm)
-                        
-                # we take the last value (integral to infinity)
-                cc_mnab = (sr[length-1] + 1.0j*si[length-1]) 
-
-                # \Lambda_m operators
-                Lm[ms,a,b] += cc_mnab*Km[ms,a,b]   
+    def _guts_Cmplx_FFT(self, ms, ns, Lm, Km, Om, length, CC):
+        """Integrates correlation function at all frequencies Om at once
+        
+        The one-sided Fourier transform of the correlation function is 
+        evaluated by a single FFT and interpolated to all transition 
+        frequencies. The FFT is cached by the correlation function matrix,
+        so that it is reused by tensors of different Hamiltonians
+        
+        """
+        
+        # integrals to "infinity" (or the cut-off time)
+        cc_mn = CC.get_half_fourier_transform(ms, ns, Om, length=length)
+        
+        # \Lambda_m operators
+        Lm[ms,:,:] += cc_mn*Km[ms,:,:]
                 
             
-    def _convert_operators_2_tensor(self, Km, Lm, Ld):
+    def _convert_operators_2_tensor(self, Km, Lm, Ld, out=None,
+                                    block_sparse=False):
         """Converts operator representation to the tensor one
         
         Convertes operator representation of the Redfield tensor
@@ -459,52 +474,53 @@ class RedfieldRelaxationTensor(RelaxationTensor):
         Ld : 3D array
             Hermite conjuget \Lambda_m operators
             
+        out : 4D array
+            Preallocated (possibly memory mapped) array into which the 
+            tensor is written. Its content is overwritten.
+            
+        block_sparse : bool
+            If True, only the blocks of the tensor connecting the diagonal
+            blocks of the operators are calculated. The remaining elements
+            are zero by construction (e.g. the blocks between different 
+            exciton bands of a multi-exciton aggregate)
+            
         """    
         
         Na = self.Hamiltonian.data.shape[0]
         Nb = self.SystemBathInteraction.N
         
-        RR = numpy.zeros((Na, Na, Na, Na), dtype=numpy.complex128)
+        if out is None:
+            RR = numpy.zeros((Na, Na, Na, Na), dtype=numpy.complex128)
+        else:
+            if out.shape != (Na, Na, Na, Na):
+                raise Exception("Output array has a wrong shape")
+            RR = out
+            RR[:,:,:,:] = 0.0
+            
+        if block_sparse:
+            blocks = _operator_blocks(Km, Lm)
+        else:
+            blocks = [slice(0, Na)]
         
         #######################################################################
         # PARALLELIZATION
         #######################################################################
-        
-        #from ...implementations.cython.loopit import loopit
-        
 
         start_parallel_region()
-        #tt1 = time.time()
-        for m in block_distributed_range(0,Nb): #range(Nb):
-            
-            Kd = numpy.transpose(Km[m,:,:])
-#            KdLm = numpy.dot(Kd,Lm[m,:,:])
-#            LdKm = numpy.dot(Ld[m,:,:],Km[m,:,:])
-#            for a in range(Na):
-#                print(a)
-#                for b in range(Na):
-#                    for c in range(Na):
-#                        for d in range(Na):
-#                            
-#                            RR[a,b,c,d] += (Km[m,a,c]*Ld[m,d,b] 
-#                                            + Lm[m,a,c]*Kd[d,b])
-#                            if b == d:
-#                                RR[a,b,c,d] -= KdLm[a,c] 
-#                            if a == c:
-#                                RR[a,b,c,d] -= LdKm[d,b]
-                                
-            _loopit(Km, Kd, Lm, Ld, Na, RR, m)
+        
+        ms = [m for m in block_distributed_range(0,Nb)]
+        if len(ms) > 0:
+            _contract_operators(Km[ms,:,:], Lm[ms,:,:], Ld[ms,:,:], RR,
+                                blocks)
         
         # perform reduction of the RR
         distributed_configuration().allreduce(RR, operation="sum")
-        #tt2 = time.time()
         
         close_parallel_region()
         #######################################################################
         # END PARALLELIZATION
         #######################################################################
         
-        #print(tt2-tt1)
         return RR
 
 
@@ -516,17 +532,30 @@ class RedfieldRelaxationTensor(RelaxationTensor):
                              self.SystemBathInteraction)
 
 
-    def convert_2_tensor(self):
+    def convert_2_tensor(self, out=None, block_sparse=False):
         """Converts internally the operator representation to a tensor one
         
         Converst the representation of the relaxation tensor through a set
         of operators into a tensor representation.
         
+        Parameters
+        ----------
+        
+        out : 4D array
+            Preallocated (possibly memory mapped) array which will hold
+            the tensor data
+            
+        block_sparse : bool
+            If True, blocks of the tensor which are zero by construction
+            are skipped
+        
         """
         
         if self.as_operators:
             
-            RR = self._convert_operators_2_tensor(self.Km, self.Lm, self.Ld)
+            RR = self._convert_operators_2_tensor(self.Km, self.Lm, self.Ld,
+                                                  out=out,
+                                                  block_sparse=block_sparse)
             if True:
                 self.data = RR
                 self._data_initialized = True
@@ -535,20 +564,62 @@ class RedfieldRelaxationTensor(RelaxationTensor):
          
  
 
-def _loopit(Km, Kd, Lm, Ld, Na, RR, m):
+def _operator_blocks(Km, Lm):
+    """Returns the diagonal blocks of the operators Km and Lm
+    
+    The blocks are contiguous index ranges (returned as slices) such that
+    all operators are block diagonal with respect to them. 
+    
+    """
+    Na = Km.shape[1]
+    mask = numpy.any(Km != 0.0, axis=0) | numpy.any(Lm != 0.0, axis=0)
+    mask = mask | mask.T
+    
+    # the last index connected to a given index (or to any index before)
+    idx = numpy.arange(Na)
+    last = numpy.where(mask, idx[numpy.newaxis,:], idx[:,numpy.newaxis])
+    last = numpy.maximum.accumulate(numpy.max(last, axis=1))
+    
+    # a block ends where no index before is connected to the next ones
+    ends = numpy.where(last == idx)[0] + 1
+    starts = numpy.concatenate(([0], ends[:-1]))
+    
+    return [slice(st, en) for st, en in zip(starts, ends)]
+
 
+def _contract_operators(Km, Lm, Ld, RR, blocks):
+    """Adds the Redfield tensor constructed from operators to RR
+    
+    The tensor 
+    
+    R_abcd = sum_m [ K_ac Ld_db + L_ac K_bd 
+                     - delta_bd (K^T L)_ac - delta_ac (Ld K)_db ]
+                     
+    is calculated by tensor contractions over the baths m. Only
+    the elements R_abcd with a, c from one block and b, d from another
+    are calculated for all pairs of `blocks`.
+    
+    """
+    
+    # the tensor is complex; all contractions are done in complex numbers
+    Km = numpy.asarray(Km, dtype=numpy.complex128)
+    Lm = numpy.asarray(Lm, dtype=numpy.complex128)
+    Ld = numpy.asarray(Ld, dtype=numpy.complex128)
+    
+    # terms with Kronecker delta summed over the baths
+    KdLm = numpy.einsum("mka,mkc->ac", Km, Lm)
+    LdKm = numpy.einsum("mdk,mkb->db", Ld, Km)
     
-    KdLm = numpy.dot(Kd,Lm[m,:,:])
-    LdKm = numpy.dot(Ld[m,:,:],Km[m,:,:])
-    for a in range(Na):
-        for b in range(Na):
-            for c in range(Na):
-                for d in range(Na):
-                    
-                    RR[a,b,c,d] += (Km[m,a,c]*Ld[m,d,b] 
-                                    + Lm[m,a,c]*Kd[d,b])
-                    if b == d:
-                        RR[a,b,c,d] -= KdLm[a,c] 
-                    if a == c:
-                        RR[a,b,c,d] -= LdKm[d,b]
-            
\ No newline at end of file
+    for P in blocks:
+        for Q in blocks:
+            Rb = RR[P,Q,P,Q]
+            # sums over the baths as matrix products with (ac) and (db) 
+            # as compound indices
+            KL = numpy.tensordot(Km[:,P,P], Ld[:,Q,Q], axes=(0,0))
+            Rb += numpy.transpose(KL, (0,3,1,2))
+            LK = numpy.tensordot(Lm[:,P,P], Km[:,Q,Q], axes=(0,0))
+            Rb += numpy.transpose(LK, (0,2,1,3))
+            for b in range(Rb.shape[1]):
+                Rb[:,b,:,b] -= KdLm[P,P]
+            for a in range(Rb.shape[0]):
+                Rb[a,:,a,:] -= LdKm[Q,Q].T
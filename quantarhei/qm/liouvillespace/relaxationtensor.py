@@ -12,6 +12,10 @@ class RelaxationTensor(SuperOperator, Secular, Saveable):
     
     """
     
+    # number of stored time points of a time dependent tensor after which 
+    # the last one is used for all later times (None means no such limit)
+    cutoff_index = None
+    
     def __init__(self):
         
         self._initialize_basis()
@@ -130,34 +134,7 @@ class RelaxationTensor(SuperOperator, Secular, Saveable):
                 print("\nQr >>> Relaxation tensor '%s' changes basis"
                       %self.name)
            
-        if inv is None:
-            S1 = numpy.linalg.inv(SS)
-        else:
-            S1 = inv
-        dim = SS.shape[0]
-        
-        if self._data.ndim == 4:
-            for c in range(dim):
-                for d in range(dim):
-                    self._data[:,:,c,d] = \
-                    numpy.dot(S1,numpy.dot(self._data[:,:,c,d],SS))
-                    
-            for a in range(dim):
-                for b in range(dim):
-                    self._data[a,b,:,:] = \
-                    numpy.dot(S1,numpy.dot(self._data[a,b,:,:],SS))
-        else:
-
-            for tt in range(self._data.shape[0]):
-                for c in range(dim):
-                    for d in range(dim):
-                        self._data[tt,:,:,c,d] = \
-                            numpy.dot(S1,numpy.dot(self._data[tt,:,:,c,d],SS))
-                    
-                for a in range(dim):
-                    for b in range(dim):
-                        self._data[tt,a,b,:,:] = \
-                            numpy.dot(S1,numpy.dot(self._data[tt,a,b,:,:],SS))            
+        self._add_pending_transform(SS, inv)
 
 
     def convert_2_tensor(self):
@@ -82,6 +82,9 @@ class SuperOperator(BasisManaged):
     
     data = BasisManagedComplexArray("data")
     
+    # basis transformation waiting to be applied to the data
+    _pending_transform = None
+    
     def __init__(self, dim=None, data=None, real=False):
         
         # Set the currently used basis
@@ -282,6 +285,41 @@ class SuperOperator(BasisManaged):
             print("\nQr >>> SuperOperator "+
                   "'%s' changes basis" %self.name)
         
+        self._add_pending_transform(SS, inv)
+
+
+    @property
+    def _data(self):
+        """Data of the superoperator in its current basis
+        
+        Basis transformations are not applied immediately. They are
+        recorded by the `transform` method and applied here, when 
+        the data are actually needed.
+        
+        """
+        if self._pending_transform is not None:
+            self._apply_pending_transform()
+        try:
+            return self._data_storage
+        except AttributeError:
+            raise AttributeError("'%s' object has no attribute '_data'"
+                                 % self.__class__.__name__)
+        
+    
+    @_data.setter
+    def _data(self, value):
+        # new data are always in the current basis of the object
+        self._data_storage = value
+        self._pending_transform = None
+        
+        
+    def _add_pending_transform(self, SS, inv=None):
+        """Records a basis transformation to be applied to the data later
+        
+        Consecutive transformations are composed into one. If they
+        cancel each other, no transformation remains pending.
+        
+        """
         #
         # if inverse matrix not present, we create it
         #
@@ -290,36 +328,50 @@ class SuperOperator(BasisManaged):
         else:
             S1 = inv
             
-        # dimension of the transformation matrix
-        dim = SS.shape[0]
-        
-        #
-        # Dimension 4 means a single, time independent superoperator 
-        #
-        if self._data.ndim == 4:
-            for c in range(dim):
-                for d in range(dim):
-                    self._data[:,:,c,d] = \
-                    numpy.dot(S1,numpy.dot(self._data[:,:,c,d],SS))
-                    
-            for a in range(dim):
-                for b in range(dim):
-                    self._data[a,b,:,:] = \
-                    numpy.dot(S1,numpy.dot(self._data[a,b,:,:],SS))
-                    
-        #
-        # Larger dimension means more superoperators or time dependence
-        #
+        if self._pending_transform is not None:
+            SS0, S10 = self._pending_transform
+            SS = numpy.dot(SS0, SS)
+            S1 = numpy.dot(S1, S10)
+            
+        unity = numpy.eye(SS.shape[0])
+        if (numpy.allclose(SS, unity, rtol=0.0, atol=1.0e-12) and 
+            numpy.allclose(S1, unity, rtol=0.0, atol=1.0e-12)):
+            self._pending_transform = None
         else:
+            self._pending_transform = (SS, S1)
 
-            for tt in range(self._data.shape[0]):
-                for c in range(dim):
-                    for d in range(dim):
-                        self._data[tt,:,:,c,d] = \
-                            numpy.dot(S1,numpy.dot(self._data[tt,:,:,c,d],SS))
-                    
-                for a in range(dim):
-                    for b in range(dim):
-                        self._data[tt,a,b,:,:] = \
-                            numpy.dot(S1,numpy.dot(self._data[tt,a,b,:,:],SS))            
-    
\ No newline at end of file
+
+    def _transform_tensor(self, RR, SS, S1):
+        """Returns a four-index tensor transformed by given matrices
+        
+        """
+        # each contraction consumes the first index and appends 
+        # a transformed one at the end
+        RR = numpy.tensordot(RR, S1, axes=(0,1))
+        RR = numpy.tensordot(RR, SS, axes=(0,0))
+        RR = numpy.tensordot(RR, S1, axes=(0,1))
+        return numpy.tensordot(RR, SS, axes=(0,0))
+    
+    
+    def _apply_pending_transform(self):
+        """Applies the pending basis transformation to the data
+        
+        The superoperator (or each superoperator in a set or a time
+        dependent superoperator) is transformed by four consecutive 
+        contractions with the transformation matrices
+        
+        """
+        SS, S1 = self._pending_transform
+        self._pending_transform = None
+        
+        data = self._data_storage
+        dim = SS.shape[0]
+        
+        # the first indices enumerate superoperators (or times)
+        dd = data.reshape((-1, dim, dim, dim, dim))
+        for tt in range(dd.shape[0]):
+            dd[tt,:,:,:,:] = self._transform_tensor(dd[tt,:,:,:,:], SS, S1)
+            
+        # reshaping may have required a copy of the data
+        if not numpy.may_share_memory(dd, data):
+            self._data_storage = dd.reshape(data.shape)
@@ -5,7 +5,6 @@ import scipy.interpolate as interp
 from ..hilbertspace.hamiltonian import Hamiltonian
 from ..liouvillespace.systembathinteraction import SystemBathInteraction
 from .foerstertensor import FoersterRelaxationTensor
-from ..corfunctions.correlationfunctions import c2g
 from ...core.managers import energy_units
 
 from ...core.time import TimeDependent
@@ -45,7 +44,7 @@ class TDFoersterRelaxationTensor(FoersterRelaxationTensor, TimeDependent):
     
             # SBI is defined with "sites"
             for ii in range(1, Na):
-                gt[ii,:] = c2g(sbi.TimeAxis, sbi.CC.get_coft(ii-1,ii-1))
+                gt[ii,:] = sbi.CC.get_goft(ii-1,ii-1)
             
             # reorganization energies
             ll = numpy.zeros(Na)
@@ -4,7 +4,6 @@ import numpy
 from .redfieldfoerster import RedfieldFoersterRelaxationTensor
 from .tdredfieldtensor import TDRedfieldRelaxationTensor
 from .tdfoerstertensor import _td_reference_implementation as td_foerster_rates
-from ..corfunctions.correlationfunctions import c2g
 #from ...core.managers import Manager
 from ...core.managers import energy_units
 
@@ -104,7 +103,7 @@ class TDRedfieldFoersterRelaxationTensor(RedfieldFoersterRelaxationTensor,
             gvals = numpy.zeros((Na,Nt),dtype=numpy.complex128)
             Gt = numpy.zeros((Na,Nt),dtype=numpy.complex128)
             for ii in range(1,Na):
-                Gt[ii,:] = c2g(sbi.TimeAxis, sbi.CC.get_coft(ii-1,ii-1))
+                Gt[ii,:] = sbi.CC.get_goft(ii-1,ii-1)
             for aa in range(Na):
                 for bb in range(Na):
                     # Here we assume no correlation between sites 
@@ -1,13 +1,37 @@
 # -*- coding: utf-8 -*-
 import numpy
 import scipy
+import scipy.interpolate
 
 from .redfieldtensor import RedfieldRelaxationTensor
+from .redfieldtensor import _contract_operators
 from ...core.time import TimeDependent
 
 class TDRedfieldRelaxationTensor(RedfieldRelaxationTensor, TimeDependent):
+    """Time dependent Redfield relaxation tensor
     
+    Parameters are the same as of the `RedfieldRelaxationTensor` with 
+    the following addition
     
+    tail_tolerance : float
+        If specified, the tensor is stored only up to the time after which 
+        it stays constant within this relative tolerance. The last stored 
+        element then holds the asymptotic value of the tensor, and it is 
+        used for all later times. The number of stored elements is 
+        available as the `cutoff_index` attribute.
+        
+    """
+    
+    def __init__(self, ham, sbi, initialize=True,
+                 cutoff_time=None, as_operators=False,
+                 name="", integration="splines", tail_tolerance=None):
+        
+        self.tail_tolerance = tail_tolerance
+        
+        super().__init__(ham, sbi, initialize=initialize, 
+                         cutoff_time=cutoff_time, as_operators=as_operators,
+                         name=name, integration=integration)
+        
     
     def _implementation(self, ham, sbi):
         """ Reference implementation, completely in Python
@@ -113,34 +137,29 @@ class TDRedfieldRelaxationTensor(RedfieldRelaxationTensor, TimeDependent):
                 #FIXME: reaching correct correlation function is a nightmare!!!
                 rc1 = sbi.CC.get_coft(ms, ns) 
                 
-                for a in range(Na):
-                    for b in range(Na):
-                        
-                        # argument of the integration
-                        eexp = numpy.exp(-1.0j*Om[a,b]*tm) 
-                        rc = rc1[0:length]*eexp
-                        
-                        # spline integration instead of FFT
-                        rr = numpy.real(rc)
-                        ri = numpy.imag(rc)
-                        sr = scipy.interpolate.UnivariateSpline(tm,
-                                    rr, s=0).antiderivative()(tm)
-                        si = scipy.interpolate.UnivariateSpline(tm,
-                                    ri, s=0).antiderivative()(tm)
-                                
-                        # we take the last value (integral to infinity)
-                        # #### cc_mnab = (sr[length-1] + 1.0j*si[length-1]) 
-                        cc_mnab = (sr + 1.0j*si)
-                        
-                        # \Lambda_m operators
-                        Lm[:,ms,a,b] += cc_mnab*Km[ns,a,b] 
+                # argument of the integration for all pairs of states
+                rc = rc1[numpy.newaxis,numpy.newaxis,0:length] \
+                    *numpy.exp(-1.0j*Om[:,:,numpy.newaxis]
+                               *tm[numpy.newaxis,numpy.newaxis,:])
+                
+                # spline integration of real and imaginary parts 
+                # of all the functions at once
+                yy = numpy.stack((numpy.real(rc), numpy.imag(rc)))
+                sp = scipy.interpolate.make_interp_spline(tm, yy, k=3,
+                                                          axis=-1)
+                ss = sp.antiderivative()(tm)
+                cc_mn = ss[0,:,:,:] + 1.0j*ss[1,:,:,:]
+                
+                # \Lambda_m operators
+                Lm[:,ms,:,:] += numpy.transpose(cc_mn, (2,0,1))*Km[ns,:,:]
              
+        # keep only the transient part and the asymptotic value
+        if self.tail_tolerance is not None:
+            Lm = self._compress_tail(Lm)
+            Nt = self.Nt
         
         # create the Hermite conjuged version of \Lamnda_m
-        Ld = numpy.zeros((Nt, Nb, Na, Na), dtype=numpy.complex128)
-        for tt in range(Nt):
-            for ms in range(Nb):
-                Ld[tt, ms, :, :] += numpy.conj(numpy.transpose(Lm[tt,ms,:,:]))        
+        Ld = numpy.conj(numpy.transpose(Lm, (0,1,3,2)))
             
         if self.as_operators:
             
@@ -162,6 +181,42 @@ class TDRedfieldRelaxationTensor(RedfieldRelaxationTensor, TimeDependent):
         self._is_initialized = True
 
     
+    def _compress_tail(self, Lm):
+        """Removes the converged tail of the time dependent operators
+        
+        Returns the time slices of Lm up to the last one which differs
+        from the asymptotic value by more than the relative tolerance
+        `tail_tolerance`, followed by the asymptotic value itself. The
+        length of the result is stored as the number of time points of
+        the tensor and as its cut-off index, so that propagators use 
+        the asymptotic value afterwards, whatever their time axis is.
+        
+        """
+        Nt = Lm.shape[0]
+        
+        # deviation of every time slice from the asymptotic value
+        dev = numpy.max(numpy.abs(Lm - Lm[Nt-1,:,:,:]), axis=(1,2,3))
+        scale = numpy.max(numpy.abs(Lm[Nt-1,:,:,:]))
+        
+        transient = numpy.nonzero(dev > self.tail_tolerance*scale)[0]
+        if len(transient) > 0:
+            Nc = transient[-1] + 2
+        else:
+            Nc = 1
+            
+        if Nc >= Nt:
+            return Lm
+        
+        Lc = numpy.zeros((Nc,)+Lm.shape[1:], dtype=Lm.dtype)
+        Lc[0:Nc-1,:,:,:] = Lm[0:Nc-1,:,:,:]
+        Lc[Nc-1,:,:,:] = Lm[Nt-1,:,:,:]
+        
+        self.Nt = Nc
+        self.cutoff_index = Nc
+        
+        return Lc
+    
+
     def _convert_operators_2_tensor(self, Km, Lm, Ld):
         """Converts operator representation to the tensor one
         
@@ -188,80 +243,14 @@ class TDRedfieldRelaxationTensor(RedfieldRelaxationTensor, TimeDependent):
         
         RR = numpy.zeros((Nt, Na, Na, Na, Na), dtype=numpy.complex128)
         
-        for m in range(Nb):
-            #print("m =", m ,"of", Nb)
-            for tt in range(Nt):
-                KmLm = numpy.dot(Km[m,:,:],Lm[tt,m,:,:])
-                LdKm = numpy.dot(Ld[tt,m,:,:],Km[m,:,:])
-                for a in range(Na):
-                    for b in range(Na):
-                        for c in range(Na):
-                            for d in range(Na):
-                            
-                                RR[tt,a,b,c,d] += (Km[m,a,c]*Ld[tt,m,d,b] 
-                                                + Lm[tt,m,a,c]*Km[m,d,b])
-                                if b == d:
-                                    RR[tt,a,b,c,d] -= KmLm[a,c] 
-                                if a == c:
-                                    RR[tt,a,b,c,d] -= LdKm[d,b]
+        blocks = [slice(0, Na)]
+        for tt in range(Nt):
+            _contract_operators(Km[0:Nb,:,:], Lm[tt,0:Nb,:,:],
+                                Ld[tt,0:Nb,:,:], RR[tt,:,:,:,:], blocks)
         
         return RR
         
         
-    def transform(self, SS, inv=None):
-        """Transformation of the tensor by a given matrix
-        
-        
-        This function transforms the Operator into a different basis, using
-        a given transformation matrix.
-        
-        Parameters
-        ----------
-         
-        SS : matrix, numpy.ndarray
-            transformation matrix
-            
-        inv : matrix, numpy.ndarray
-            inverse of the transformation matrix
-            
-        """        
-
-        if inv is None:
-            S1 = numpy.linalg.inv(SS)
-        else:
-            S1 = inv
-        dim = SS.shape[0]
-        
-
-        if not self._data_initialized:
-            for tt in range(self.Nt):
-                for m in range(self.Km.shape[0]):
-                    self.Lm[tt, m, :, :] = \
-                    numpy.dot(S1,numpy.dot(self.Lm[tt, m, :, :],SS))
-                    self.Ld[tt, m, :, :] = \
-                    numpy.dot(S1,numpy.dot(self.Ld[tt, m, :, :],SS))            
-            for m in range(self.Km.shape[0]):
-                self.Km[m, :, :] = numpy.dot(S1,numpy.dot(self.Km[m, :, :],SS))
-                
-            return
-        
-        
-        if (self.manager.warn_about_basis_change):
-                print("\nQr >>> Relaxation tensor '%s' changes basis" %self.name)
-           
-        
-        for tt in range(self.Nt):
-            for c in range(dim):
-                for d in range(dim):
-                    self._data[tt,:,:,c,d] = \
-                        numpy.dot(S1,numpy.dot(self._data[tt,:,:,c,d],SS))
-                
-            for a in range(dim):
-                for b in range(dim):
-                    self._data[tt,a,b,:,:] = \
-                        numpy.dot(S1,numpy.dot(self._data[tt,a,b,:,:],SS))
-
-            
     def secularize(self):
         """Secularizes the relaxation tensor
 
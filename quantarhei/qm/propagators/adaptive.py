@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+*******************************************************************************
+
+    ADAPTIVE STEP INTEGRATION
+
+*******************************************************************************
+
+Integration of linear equations of motion by embedded Runge-Kutta methods
+with an adaptive time step. The internal steps of the integrator are
+independent of the TimeAxis on which the results are stored; the values
+at the points of the TimeAxis are obtained from the dense output of the
+integrator.
+
+"""
+
+import numpy
+import scipy.integrate
+
+from ... import COMPLEX
+
+
+_solvers = {"RK23":scipy.integrate.RK23,
+            "RK45":scipy.integrate.RK45,
+            "DOP853":scipy.integrate.DOP853}
+
+
+def adaptive_integration(rhs, y0, times, rtol=1.0e-6, atol=1.0e-9,
+                         solver="RK45", first_step=None, max_step=numpy.inf):
+    """Integrates y' = rhs(t, y) with an adaptive time step
+
+
+    Parameters
+    ----------
+
+    rhs : callable
+        Function rhs(t, y) returning the time derivative of the
+        one-dimensional complex array y as a new array
+
+    y0 : numpy.ndarray
+        Initial condition at times[0]
+
+    times : numpy.ndarray
+        Increasing times at which the solution is stored
+
+    rtol, atol : float
+        Relative and absolute tolerance of the local error
+
+    solver : str
+        Embedded Runge-Kutta pair: "RK45" (Dormand-Prince, default),
+        "RK23" (Bogacki-Shampine) or "DOP853"
+
+    first_step : float, optional
+        Initial step. By default it is chosen automatically.
+
+    max_step : float
+        Maximum allowed step
+
+
+    Returns
+    -------
+
+    ys : numpy.ndarray
+        Solution at all times, array of the shape (len(times), len(y0))
+
+    stats : dict
+        Step statistics: number of accepted steps ("nsteps"), number
+        of evaluations of the right-hand side ("nfev") and the smallest,
+        the largest and the average accepted step ("min_step",
+        "max_step" and "mean_step")
+
+    """
+    try:
+        Solver = _solvers[solver]
+    except KeyError:
+        raise Exception("Unknown adaptive solver: "+solver)
+
+    times = numpy.asarray(times)
+    y0 = numpy.asarray(y0, dtype=COMPLEX)
+    Nt = times.shape[0]
+
+    ys = numpy.zeros((Nt, y0.shape[0]), dtype=COMPLEX)
+    ys[0,:] = y0
+
+    stats = dict(nsteps=0, nfev=0, min_step=0.0, max_step=0.0,
+                 mean_step=0.0)
+    if Nt < 2:
+        return ys, stats
+
+    sol = Solver(rhs, times[0], y0, times[Nt-1], rtol=rtol, atol=atol,
+                 first_step=first_step, max_step=max_step)
+
+    hmin = numpy.inf
+    hmax = 0.0
+    nsteps = 0
+    indx = 1
+    while sol.status == "running":
+
+        message = sol.step()
+        if sol.status == "failed":
+            raise Exception("Adaptive integration failed: "+str(message))
+
+        nsteps += 1
+        hh = sol.t - sol.t_old
+        hmin = min(hmin, hh)
+        hmax = max(hmax, hh)
+
+        # store all output points passed by the step
+        if (indx < Nt) and (times[indx] <= sol.t):
+            iend = numpy.searchsorted(times, sol.t, side="right")
+            dense = sol.dense_output()
+            ys[indx:iend,:] = numpy.transpose(dense(times[indx:iend]))
+            indx = iend
+
+    stats["nsteps"] = nsteps
+    stats["nfev"] = sol.nfev
+    stats["min_step"] = hmin
+    stats["max_step"] = hmax
+    stats["mean_step"] = (times[Nt-1]-times[0])/nsteps
+
+    return ys, stats
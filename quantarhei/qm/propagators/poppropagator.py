@@ -1,5 +1,10 @@
 # -*- coding: utf-8 -*-
+import hashlib
+from collections import OrderedDict
+
 import numpy
+import scipy.linalg
+
 from ..liouvillespace.rates.ratematrix import RateMatrix
 
 class PopulationPropagator:
@@ -19,11 +24,25 @@ class PopulationPropagator:
         Rate matrix used to propagate the populations
         
         
+    For a constant rate matrix the propagation is given by the matrix
+    exponential. The rate matrix is decomposed only once (if it satisfies
+    the detailed balance condition, it is symmetrized first) and the
+    propagation matrices at all times are obtained from this decomposition.
+    Propagation matrices and their corrections are stored in a cache which
+    is shared by all instances of the class. The cache holds at most 
+    `propagation_cache_size` items; the least recently used items are
+    discarded first.
+    
+        
     Examples
     --------
     
     """   
     
+    # cache of propagation matrices shared by all instances
+    _propagation_cache = OrderedDict()
+    propagation_cache_size = 32
+    
     def __init__(self, timeaxis, rate_matrix=None):
 
         self.timeAxis = timeaxis
@@ -44,7 +63,10 @@ class PopulationPropagator:
         if not isinstance(pini, numpy.ndarray):
             pini = numpy.array(pini)
             
-        return self._propagate_short_exp(pini)    
+        tau = self.timeAxis.data - self.timeAxis.start
+        UU = self._get_evolution_matrices(tau)
+        
+        return numpy.einsum("ijt,j->ti", UU, pini)
         
         
     def _propagate_short_exp(self,pini,L=4):
@@ -85,35 +107,160 @@ class PopulationPropagator:
         """Splits the relaxation matrix into diagonal and transfer parts
         
         """
-        N = self.KK.shape[0]
+        KK = self._get_rate_matrix()
+        N = KK.shape[0]
         KKD = numpy.zeros(N, dtype=numpy.float64)
         KKT = numpy.zeros((N,N), dtype=numpy.float64)
         for i in range(N):
-            KKD[i] = -self.KK[i,i]
-        KKT = self.KK+numpy.diag(KKD)
+            KKD[i] = -KK[i,i]
+        KKT = KK+numpy.diag(KKD)
         return KKD, KKT
     
-    def _integrateK0(self,timeaxis,Kab,Ka,Kb):
-        """Returns an integral of transfer matrix element
+    def _get_rate_matrix(self):
+        """Rate matrix as a numpy array
+        
+        """
+        if isinstance(self.KK, numpy.ndarray):
+            return numpy.asarray(self.KK, dtype=numpy.float64)
+        # objects holding the rate matrix in their data attribute
+        return numpy.asarray(self.KK.data, dtype=numpy.float64)
+    
+    
+    def _decompose(self):
+        """Decomposition of the rate matrix into eigenvalues and eigenvectors
+        
+        If the rate matrix satisfies the detailed balance condition
+        with a strictly positive equilibrium, it is transformed into
+        a symmetric matrix and diagonalized by `eigh`. Otherwise,
+        a general diagonalization is attempted. If the eigenvectors are
+        (nearly) linearly dependent, None is returned and the propagation
+        matrices are calculated by `scipy.linalg.expm`.
+        
+        """
+        KK = self._get_rate_matrix()
+        key = self._rate_matrix_hash()
+        try:
+            if self._decomposition[0] == key:
+                return self._decomposition[1]
+        except AttributeError:
+            pass
+        
+        decomp = None
+        
+        # equilibrium populations from the null space of the rate matrix
+        peq = numpy.linalg.svd(KK)[2][-1,:]
+        peq = peq*numpy.sign(numpy.sum(peq))
+        
+        KP = KK*peq[numpy.newaxis,:]
+        if (numpy.all(peq > 0.0) and 
+            numpy.allclose(KP, KP.T, rtol=1.0e-8,
+                           atol=1.0e-12*numpy.max(numpy.abs(KP)))):
+            
+            # detailed balance: symmetrized matrix
+            sq = numpy.sqrt(peq)
+            KS = KK*(sq[numpy.newaxis,:]/sq[:,numpy.newaxis])
+            Kd, VV = numpy.linalg.eigh(0.5*(KS + KS.T))
+            decomp = (Kd, sq[:,numpy.newaxis]*VV, 
+                      VV.T/sq[numpy.newaxis,:])
+            
+        else:
+            
+            Kd, SS = numpy.linalg.eig(KK)
+            if numpy.linalg.cond(SS) < 1.0e8:
+                decomp = (Kd, SS, numpy.linalg.inv(SS))
+
+        self._decomposition = (key, decomp)
+        return decomp
+    
+    
+    def _rate_matrix_hash(self):
+        """Hash of the values of the rate matrix
         
         """
-        expK = numpy.exp((Ka-Kb)*timeaxis.data)
-        integ = numpy.zeros(timeaxis.length,dtype=numpy.float64)
-        for i in range(timeaxis.length):
-            integ[i] = numpy.sum(expK[0:i])
-        return Kab*integ*timeaxis.step
+        KK = numpy.ascontiguousarray(self._get_rate_matrix())
+        return (KK.shape, hashlib.sha1(KK.view(numpy.uint8)).hexdigest())
+        
+        
+    def _get_evolution_matrices(self, tau):
+        """Propagation matrices exp(KK*tau) for an array of times
+        
+        Returns an array with the shape (N, N, tau.shape[0])
+        
+        """
+        decomp = self._decompose()
+        
+        if decomp is None:
+            KK = self._get_rate_matrix()
+            UU = numpy.zeros(KK.shape+(tau.shape[0],), dtype=numpy.float64)
+            for i in range(tau.shape[0]):
+                UU[:,:,i] = scipy.linalg.expm(KK*tau[i])
+            return UU
+
+        Kd, SS, S1 = decomp
+        UU = numpy.einsum("ik,kt,kj->ijt", SS,
+                          numpy.exp(Kd[:,numpy.newaxis]*tau[numpy.newaxis,:]),
+                          S1)
+        return numpy.real(UU)
     
-    def _integrateKn(self,timeaxis,Kab,Ka,Kb,Kbc):
-        """Returns an integral of transfer matrix element multiplied by 
-        a result of previous order of expansion
+    
+    def _exact_corrections(self, tt, KKD, KKT):
+        """Zeroth, first and second order of the propagation matrix in
+        the transfer rates
         
+        The orders are the blocks of the exponential of a block 
+        upper-triangular matrix with the diagonal part of the rate matrix
+        on the diagonal and the transfer part above it. This is exact 
+        also when some of the depopulation rates are equal.
         
         """
-        expK = numpy.exp((Ka-Kb)*timeaxis.data)
-        integ = numpy.zeros(timeaxis.length,dtype=numpy.float64)
-        for i in range(timeaxis.length):
-            integ[i] = numpy.sum(expK[0:i]*Kbc[0:i])
-        return Kab*integ*timeaxis.step
+        N = KKD.shape[0]
+        MM = numpy.zeros((3*N,3*N), dtype=numpy.float64)
+        for k in range(3):
+            MM[k*N:(k+1)*N,k*N:(k+1)*N] = -numpy.diag(KKD)
+            if k < 2:
+                MM[k*N:(k+1)*N,(k+1)*N:(k+2)*N] = KKT
+                
+        Ucs = numpy.zeros((3,N,N,tt.shape[0]), dtype=numpy.float64)
+        for i in range(tt.shape[0]):
+            EM = scipy.linalg.expm(MM*tt[i])
+            for k in range(3):
+                Ucs[k,:,:,i] = EM[0:N,k*N:(k+1)*N]
+        return Ucs
+    
+    
+    def _numerical_corrections(self, timeaxis, KKD, KKT, corrections):
+        """Orders of the propagation matrix in the transfer rates integrated
+        numerically
+        
+        The integrals are evaluated by the rectangle rule with the left 
+        end points, for all elements at once.
+        
+        """
+        tt = timeaxis.data
+        Nt = timeaxis.length
+        dt = timeaxis.step
+        
+        def _integrate(ff):
+            # integral from 0 to t of ff along the last axis
+            integ = numpy.zeros(ff.shape, dtype=numpy.float64)
+            integ[...,1:] = numpy.cumsum(ff[...,0:Nt-1], axis=-1)
+            return integ*dt
+        
+        # exp((K_i - K_j)t) with indices [i,j,t]
+        expK = numpy.exp((KKD[:,numpy.newaxis,numpy.newaxis]
+                          - KKD[numpy.newaxis,:,numpy.newaxis])
+                         *tt[numpy.newaxis,numpy.newaxis,:])
+        decay = numpy.exp(-KKD[:,numpy.newaxis,numpy.newaxis]
+                          *tt[numpy.newaxis,numpy.newaxis,:])
+        
+        KKI = KKT[:,:,numpy.newaxis]*_integrate(expK)
+        higher_c = [decay*KKI]
+        for c in range(1,corrections):
+            KKI = _integrate(numpy.einsum("ik,ikt,kjt->ijt", KKT, expK, KKI))
+            higher_c.append(decay*KKI)
+            
+        return higher_c
+        
         
     def get_PropagationMatrix(self, timeaxis, corrections=-1, exact=False):
         """Returns propagation matrix corresponding to the present propagator
@@ -138,185 +285,78 @@ class PopulationPropagator:
         
         
         """
-        if timeaxis.is_subset_of(self.timeAxis):
-            N = self.KK.shape[0]
-            U = numpy.zeros((N,N,timeaxis.length), dtype=numpy.float64)
-            
-            # initial condition
-            U0 = numpy.eye(N)
-            
-            # diagonalization of the rate matrix
-            Kd, SS = numpy.linalg.eig(self.KK)
-            S1 = numpy.linalg.inv(SS)
-
-            
-            # calculating exp(KK*step)
-            expKd_step = numpy.dot(SS,numpy.dot(
-                    numpy.diag(numpy.exp(Kd*timeaxis.step)),S1))
-
-            #
-            # If the starts of the time axes do not coincide, and the
-            # shift is not a multiple of the submitted time axis step,
-            # we have to calculate the evolution matrix also with
-            # the difference of the starting times
-            #
-            if self.timeAxis.start != timeaxis.start:
-
-                
-                # get the distance of the starts in timeaxis.steps
-                Ns = round((timeaxis.start - self.timeAxis.start)
-                            /timeaxis.step)
-                # if one can use timeaxis.step, make Ns steps 
-                if (timeaxis.start == self.timeAxis.start + Ns*timeaxis.step):
-                    for i in range(Ns):
-                        U0 = numpy.dot(expKd_step,U0)
-                # otherwise new exp(KK*dt) has to be calculated and applied
-                else:
-                    dt = timeaxis.start - self.timeAxis.start
-                    expKd_dt = numpy.dot(SS,numpy.dot(
-                            numpy.diag(numpy.exp(Kd*dt)),S1))
-                    U0 = numpy.dot(expKd_dt,U0)
-                    
-            # initial condition at the start of the submitted timeaxis            
-            U[:,:,0] = U0
- 
-            # application of the exp(KK*step) on initial condition
-            for i in range(1,timeaxis.length):
-                U[:,:,i] = numpy.dot(expKd_step,U[:,:,i-1])
-                
+        if not timeaxis.is_subset_of(self.timeAxis):
+            raise Exception("TimeAxis is not a subset of the internal"
+                            +" TimeAxis of this propagator.")
             
-            #
-            # Calculate exact orders in transfer matrix
-            #
-            if corrections > -1:
+        cls = PopulationPropagator
+        key = (self._rate_matrix_hash(), self.timeAxis.start, 
+               timeaxis.start, timeaxis.step, timeaxis.length,
+               corrections, exact)
+        
+        cache = cls._propagation_cache
+        if key in cache:
+            cache.move_to_end(key)
+        else:
+            cache[key] = self._calculate_PropagationMatrix(timeaxis,
+                                                           corrections, exact)
+            while len(cache) > max(cls.propagation_cache_size, 1):
+                cache.popitem(last=False)
             
-                #
-                # Split relaxation matrix into diagonal and transfer parts
-                #
-                KKD, KKT = self._split_relaxation_matrix()
-                
-                #
-                # zero's order correction to the evolution matrix
-                # (exact version)
-                #
-                Uc0 = numpy.zeros((N,N,timeaxis.length), dtype=numpy.float64)
-                for i in range(N):
-                    Uc0[i,i,:] = numpy.exp(-KKD[i]*timeaxis.data) 
-                    
-                if corrections == 0:
-                    return U, (Uc0)
-                
-                
-            if (corrections > 0) and exact:
-                
-                #
-                # first order correction
-                # (exact version)
-                #
-                Uc1 = numpy.zeros((N,N,timeaxis.length), dtype=numpy.float64)
-                for i in range(N):
-                    for j in range(N):
-                        if i != j:
-                            if KKD[i] == KKD[j]:
-                                Uc1[i,j,:] = KKT[i,j]*timeaxis.data
-                            else:
-                                Uc1[i,j,:] = (
-                                (KKT[i,j]/(KKD[i]-KKD[j]))
-                                *(numpy.exp(-KKD[j]*timeaxis.data) 
-                                - numpy.exp(-KKD[i]*timeaxis.data)))
-                                
-                if corrections == 1:
-                    return U, (Uc0, Uc1)
-                
-                #
-                # second order correction
-                # (exact version)
-                #
-                Uc2 = numpy.zeros((N,N,timeaxis.length), dtype=numpy.float64)
-                for i in range(N):
-                    for j in range(N):
-
-                        for k in range(N):
-                            
-                            if (k != j):
-                                if (i != j):
-                                    # two parts of an expressions for i != i
-                                    Uc2[i,j,:] += (
-                                    (KKT[i,k]*KKT[k,j]/(KKD[k]-KKD[j]))
-                                    *((numpy.exp(-KKD[j]*timeaxis.data) - 
-                                       numpy.exp(-KKD[i]*timeaxis.data))
-                                      /(KKD[i]-KKD[j]))
-                                    )
-                                    if (k != i):
-                                        Uc2[i,j,:] -= (
-                                        (KKT[i,k]*KKT[k,j]/(KKD[k]-KKD[j]))
-                                        *((numpy.exp(-KKD[k]*timeaxis.data) -
-                                           numpy.exp(-KKD[i]*timeaxis.data))
-                                          /(KKD[i]-KKD[k]))
-                                        )
-                                else: 
-                                    # whole expression for i = j
-                                    Uc2[i,j,:] += (
-                                    (KKT[i,k]*KKT[k,j]/(KKD[k]-KKD[j]))
-                                    *(numpy.exp(-KKD[i]*timeaxis.data)
-                                      *timeaxis.data
-                                    -(numpy.exp(-KKD[k]*timeaxis.data)
-                                     -numpy.exp(-KKD[i]*timeaxis.data))
-                                     /(KKD[i]-KKD[k]))
-                                    ) 
-                                    pass
-                                    
-                if corrections >= 2:
-                    return U, (Uc0, Uc1, Uc2)
-                
-            elif (corrections > 0) and not exact:
-
-                
-                #
-                # first order correction
-                # (numerical)
-                #
-                Uc1 = numpy.zeros((N,N,timeaxis.length), dtype=numpy.float64)
-                KKI = numpy.zeros((N,N,timeaxis.length), dtype=numpy.float64)
-                for i in range(N):
-                    for j in range(N):
-                        KKI[i,j,:] = self._integrateK0(timeaxis, 
-                                      KKT[i,j], KKD[i], KKD[j])
-                        Uc1[i,j,:] = (numpy.exp(-KKD[i]*timeaxis.data)
-                                      *KKI[i,j,:])
-                if corrections == 1:
-                    return U, (Uc0, Uc1)
-
-                #
-                # second and higher order corrections
-                # (numerical)
-                #
-                higher_c = [Uc0, Uc1]
-                for c in range(1,corrections):
-                    Uc2 = numpy.zeros((N,N,timeaxis.length), dtype=numpy.float64)
-                    for i in range(N):
-                        for j in range(N):
-
-                            for k in range(N):
-                                Uc2[i,j,:] += (
-                                      self._integrateKn(timeaxis, 
-                                      KKT[i,k], KKD[i], KKD[k], KKI[k,j,:]))
-                            
-                    KKI[:,:,:] = Uc2[:,:,:] # ! we do not want to assign a pointer !!!
-                    for i in range(N):
-                        for j in range(N):
-                            Uc2[i,j,:] = numpy.exp(-KKD[i]*timeaxis.data)*KKI[i,j,:]
-                    higher_c.append(Uc2)
-                    
-                if corrections >= 2:
-                    return U, tuple(higher_c)                       
-                        
-            else:
-                return U
+        # callers receive copies of the cached matrices
+        val = cache[key]
+        if cls.propagation_cache_size <= 0:
+            del cache[key]
+        if not isinstance(val, tuple):
+            return val.copy()
+        U, cor = val
+        if isinstance(cor, tuple):
+            return U.copy(), tuple(Uc.copy() for Uc in cor)
+        return U.copy(), cor.copy()
+    
+    
+    @classmethod
+    def clear_propagation_cache(cls):
+        """Removes all items from the cache of propagation matrices
+        
+        """
+        cls._propagation_cache.clear()
+        
+        
+    def _calculate_PropagationMatrix(self, timeaxis, corrections, exact):
+        """Calculates propagation matrix and its corrections
+        
+        """
+        # propagation matrix from the start of the internal time axis
+        U = self._get_evolution_matrices(timeaxis.data - self.timeAxis.start)
+        
+        if corrections < 0:
+            return U
             
-        else:
-            raise Exception("TimeAxis is not a subset of the internal"
-                            +" TimeAxis of this propagator.")
+        #
+        # Split relaxation matrix into diagonal and transfer parts
+        #
+        KKD, KKT = self._split_relaxation_matrix()
+        
+        #
+        # zero's order correction to the evolution matrix
+        # (exact version)
+        #
+        N = KKD.shape[0]
+        Uc0 = numpy.zeros((N,N,timeaxis.length), dtype=numpy.float64)
+        Uc0[numpy.arange(N),numpy.arange(N),:] = \
+            numpy.exp(-KKD[:,numpy.newaxis]*timeaxis.data[numpy.newaxis,:])
             
+        if corrections == 0:
+            return U, Uc0
+        
+        if exact:
             
-    
\ No newline at end of file
+            Ucs = self._exact_corrections(timeaxis.data, KKD, KKT)
+            if corrections == 1:
+                return U, (Uc0, Ucs[1])
+            return U, (Uc0, Ucs[1], Ucs[2])
+        
+        higher_c = self._numerical_corrections(timeaxis, KKD, KKT,
+                                               corrections)
+        return U, tuple([Uc0]+higher_c)
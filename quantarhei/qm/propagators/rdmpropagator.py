@@ -18,6 +18,7 @@ import numpy
 
 #import scipy.integrate
 import numpy.linalg
+import scipy.linalg
 
 #import cu.oqs.cython.propagators as prop
 
@@ -29,6 +30,7 @@ from ...core.saveable import Saveable
 from ..liouvillespace.redfieldtensor import RelaxationTensor
 from ..hilbertspace.operators import ReducedDensityMatrix, DensityMatrix
 from .dmevolution import ReducedDensityMatrixEvolution
+from .adaptive import adaptive_integration
 from ...core.matrixdata import MatrixData
 from ...core.managers import Manager
 
@@ -89,6 +91,13 @@ class ReducedDensityMatrixPropagator(MatrixData, Saveable):
         self.has_RTensor = False
         self.has_RWA = False
         
+        # cached step propagator of the "dense-exp" method
+        self._step_propagator = None
+        self._step_propagator_basis = None
+        
+        # statistics of the last propagation with an adaptive step
+        self.step_statistics = None
+        
         if not ((timeaxis is None) and (Ham is None)):
             
             #
@@ -192,10 +201,64 @@ class ReducedDensityMatrixPropagator(MatrixData, Saveable):
         self.Nref = Nref
         self.dt = self.Odt/self.Nref
         
+
+    def get_step_propagator(self):
+        """Returns the propagator over one step of the TimeAxis
+        
+        The Liouvillian superoperator of the time-independent equation 
+        of motion is constructed in the current basis and exponentiated 
+        (scipy.linalg.expm uses the scaling-and-squaring algorithm) to 
+        obtain the propagator U = exp(L*dt*Nref) over one step of the 
+        TimeAxis. The result is cached, so that repeated propagations 
+        (e.g. from different initial conditions) reuse it.
+        
+        Returns
+        -------
+        
+        U : numpy.ndarray
+            Step propagator as a (N**2, N**2) complex matrix acting on 
+            the density matrix flattened in row-major (C) order
+            
+        """
+        cb = Manager().get_current_basis()
+        if ((self._step_propagator is None) 
+            or (self._step_propagator_basis != cb)):
+            
+            LL = self._get_Liouvillian_matrix()
+            self._step_propagator = scipy.linalg.expm(LL*self.Odt)
+            self._step_propagator_basis = cb
+            
+        return self._step_propagator
+    
+    
+    def reset_step_propagator(self):
+        """Deletes the cached step propagator
+        
+        This has to be called when the Hamiltonian, the relaxation tensor
+        or the pure dephasing of the propagator are changed after the step
+        propagator was calculated.
+        
+        """
+        self._step_propagator = None
+        self._step_propagator_basis = None
+        
         
     def propagate(self, rhoi, method="short-exp", mdata=None, name=""):
         """
         
+        Instead of a single density matrix, ``rhoi`` can be a numpy.ndarray 
+        of the shape (Nbatch, N, N) holding a stack of initial density
+        matrices. They are all propagated together and a complex
+        numpy.ndarray of the shape (Nbatch, Nt, N, N) is returned.
+        
+        With ``method="adaptive"`` the equation of motion is integrated
+        by an embedded Runge-Kutta method with an adaptive time step 
+        (see `_propagate_adaptive`). Its parameters are submitted as 
+        a dictionary ``mdata`` with the optional keys "rtol", "atol", 
+        "solver", "first_step" and "max_step". The step refinement set 
+        by `setDtRefinement` is ignored by this method, and the step
+        statistics are stored in the `step_statistics` attribute.
+        
         >>> T0   = 0
         >>> Tmax = 100
         >>> dt   = 1
@@ -228,6 +291,12 @@ class ReducedDensityMatrixPropagator(MatrixData, Saveable):
         #
         self.propagation_name = name
         
+        #
+        # Stack of initial density matrices is propagated in one go
+        #
+        if isinstance(rhoi, numpy.ndarray) and (rhoi.ndim == 3):
+            return self._propagate_batch(rhoi, method=method, mdata=mdata)
+        
         #
         # Testing if the object submitted is density matrix
         #
@@ -296,6 +365,8 @@ class ReducedDensityMatrixPropagator(MatrixData, Saveable):
                     elif method == "short-exp-6":
                         return self.__propagate_short_exp_with_TD_relaxation(\
                         rhoi,L=6)            
+                    elif method == "adaptive":
+                        return self._propagate_adaptive(rhoi, mdata=mdata)
                     else:
                         raise Exception("Unknown propagation method: "+method)
 
@@ -351,6 +422,10 @@ class ReducedDensityMatrixPropagator(MatrixData, Saveable):
                     elif method == "short-exp-6":
                         return self.__propagate_short_exp_with_relaxation(
                         rhoi,L=6)            
+                    elif method == "dense-exp":
+                        return self._propagate_dense_exp(rhoi)
+                    elif method == "adaptive":
+                        return self._propagate_adaptive(rhoi, mdata=mdata)
 
                     #
                     # FIXME: These methods are untested
@@ -387,6 +462,10 @@ class ReducedDensityMatrixPropagator(MatrixData, Saveable):
                     return self.__propagate_short_exp(rhoi,L=4)
                 elif method == "short-exp-6":
                     return self.__propagate_short_exp(rhoi,L=6)            
+                elif method == "dense-exp":
+                    return self._propagate_dense_exp(rhoi)
+                elif method == "adaptive":
+                    return self._propagate_adaptive(rhoi, mdata=mdata)
     
                 #
                 # FIXME: These methods are not tested
@@ -1053,11 +1132,7 @@ class ReducedDensityMatrixPropagator(MatrixData, Saveable):
             HH = self.Hamiltonian.data
        
 
-        if self.RelaxationTensor._has_cutoff_time:
-            cutoff_indx = \
-            self.TimeAxis.nearest(self.RelaxationTensor.cutoff_time)
-        else:
-            cutoff_indx = self.TimeAxis.length
+        cutoff_indx = self._get_cutoff_index(self.RelaxationTensor)
             
         indx = 1
         indxR = 1
@@ -1107,11 +1182,7 @@ class ReducedDensityMatrixPropagator(MatrixData, Saveable):
         else:
             HH = self.Hamiltonian.data
             
-        if self.RelaxationTensor._has_cutoff_time:
-            cutoff_indx = \
-            self.TimeAxis.nearest(self.RelaxationTensor.cutoff_time)
-        else:
-            cutoff_indx = self.TimeAxis.length
+        cutoff_indx = self._get_cutoff_index(self.RelaxationTensor)
 
         try:
             Km = self.RelaxationTensor.Km
@@ -1159,6 +1230,478 @@ class ReducedDensityMatrixPropagator(MatrixData, Saveable):
         return pr
         
         
+    def _get_cutoff_index(self, RT):
+        """Index of the time after which time dependent relaxation is constant
+        
+        After this index, the last used element of the time dependent 
+        relaxation tensor is applied. It is the index of the cut-off time
+        of the tensor on the time axis of the propagator, or the number 
+        of stored elements of a tensor with a compressed tail, whichever 
+        is smaller.
+        
+        """
+        if RT._has_cutoff_time:
+            cutoff_indx = self.TimeAxis.nearest(RT.cutoff_time)
+        else:
+            cutoff_indx = self.TimeAxis.length
+        if RT.cutoff_index is not None:
+            cutoff_indx = min(cutoff_indx, RT.cutoff_index)
+        return cutoff_indx
+        
+        
+    def _get_Liouvillian_matrix(self):
+        """Returns the Liouvillian of the equation of motion as a matrix
+        
+        The Liouvillian (including the relaxation tensor and Lorentzian
+        pure dephasing, if present) is returned as a (N**2, N**2) matrix 
+        acting on the density matrix flattened in row-major order. 
+        
+        """
+        N = self.N
+        
+        if self.Hamiltonian.has_rwa:
+            HH = self.Hamiltonian.get_RWA_data()
+        else:
+            HH = self.Hamiltonian.data
+        
+        one = numpy.eye(N, dtype=qr.REAL)
+        
+        # -i[H, rho]
+        LL = -1j*(numpy.kron(HH, one) - numpy.kron(one, numpy.transpose(HH)))
+        LL = LL.astype(qr.COMPLEX)
+        
+        if self.has_RTensor:
+            
+            RT = self.RelaxationTensor
+            
+            if RT.as_operators:
+                
+                Km = RT.Km
+                Lm = RT.Lm
+                Ld = RT.Ld
+                Nm = Km.shape[0]
+                for mm in range(Nm):
+                    Kd = numpy.transpose(Km[mm,:,:])
+                    LL += (numpy.kron(Km[mm,:,:], numpy.transpose(Ld[mm,:,:]))
+                          +numpy.kron(Lm[mm,:,:], Km[mm,:,:])
+                          -numpy.kron(numpy.dot(Kd, Lm[mm,:,:]), one)
+                          -numpy.kron(one, numpy.transpose(
+                                      numpy.dot(Ld[mm,:,:], Km[mm,:,:]))))
+                
+            else:
+                
+                LL += numpy.reshape(RT.data, (N**2, N**2))
+                
+        if self.has_PDeph:
+            
+            if self.PDeph.dtype == "Lorentzian":
+                LL -= numpy.diag(numpy.reshape(self.PDeph.data, N**2))
+            else:
+                raise Exception("Only Lorentzian pure dephasing can be used"+
+                                " with the 'dense-exp' method")
+                
+        return LL
+    
+    
+    def _propagate_dense_exp(self, rhoi):
+        """Propagation by a precomputed propagator of the time step
+        
+        The propagator over one step of the TimeAxis is calculated only
+        once (see `get_step_propagator`) and each saved time point is 
+        obtained by a single matrix-vector multiplication. This applies
+        to time-independent Hamiltonian and relaxation tensor only.
+        
+        """
+        
+        qr.log_detail("PROPAGATION (precomputed step propagator)",
+                      verbose=self.verbose)
+        
+        pr = ReducedDensityMatrixEvolution(self.TimeAxis, rhoi,
+                                           name=self.propagation_name)
+        
+        UU = self.get_step_propagator()
+        
+        N = self.N
+        rho = numpy.reshape(pr.data[0,:,:], N**2)
+        for indx in range(1, self.Nt):
+            rho = numpy.dot(UU, rho)
+            pr.data[indx,:,:] = numpy.reshape(rho, (N, N))
+            
+        qr.log_detail("...DONE")
+        
+        if self.Hamiltonian.has_rwa:
+            pr.is_in_rwa = True
+            
+        return pr
+    
+    
+    def _propagate_adaptive(self, rhoi, mdata=None):
+        """Propagation with an adaptive time step
+        
+        The equation of motion is integrated by an embedded Runge-Kutta 
+        method with the step controlled by the requested tolerances
+        (see `adaptive_integration`). Values on the TimeAxis are obtained
+        by dense output of the integrator. Time-dependent relaxation 
+        tensors are interpolated linearly between the points of their
+        TimeAxis.
+        
+        Parameters
+        ----------
+        
+        rhoi : ReducedDensityMatrix
+            Initial density matrix
+            
+        mdata : dict
+            Parameters of the integrator: "rtol" (default 1.0e-6), 
+            "atol" (default 1.0e-9), "solver" (default "RK45"),
+            "first_step" and "max_step"
+        
+        """
+        
+        qr.log_detail("PROPAGATION (adaptive step)", verbose=self.verbose)
+        
+        if mdata is None:
+            mdata = dict()
+            
+        pr = ReducedDensityMatrixEvolution(self.TimeAxis, rhoi,
+                                           name=self.propagation_name)
+        
+        N = self.N
+        if (self.has_RTensor 
+            and isinstance(self.RelaxationTensor, TimeDependent)):
+            rhs = self._get_TD_relaxation_rhs()
+        else:
+            rhs = self._get_relaxation_rhs()
+            
+        rhos, stats = adaptive_integration(rhs, 
+                                numpy.reshape(pr.data[0,:,:], N**2),
+                                self.TimeAxis.data,
+                                rtol=mdata.get("rtol", 1.0e-6),
+                                atol=mdata.get("atol", 1.0e-9),
+                                solver=mdata.get("solver", "RK45"),
+                                first_step=mdata.get("first_step", None),
+                                max_step=mdata.get("max_step", numpy.inf))
+        
+        pr.data[:,:,:] = numpy.reshape(rhos, (self.Nt, N, N))
+        self.step_statistics = stats
+        
+        qr.log_detail("... number of steps:", stats["nsteps"], 
+                      "(function evaluations:", str(stats["nfev"])+")",
+                      verbose=self.verbose)
+        qr.log_detail("...DONE")
+        
+        if self.Hamiltonian.has_rwa:
+            pr.is_in_rwa = True
+            
+        return pr
+    
+    
+    def _get_relaxation_rhs(self):
+        """Returns the right-hand side of the equation of motion
+        
+        Time-independent relaxation tensor is applied in the form in which
+        it is stored (operators or a tensor), so that no (N**2, N**2) 
+        Liouvillian matrix is created. Lorentzian pure dephasing is 
+        included if present.
+        
+        """
+        N = self.N
+        
+        if self.Hamiltonian.has_rwa:
+            HH = self.Hamiltonian.get_RWA_data()
+        else:
+            HH = self.Hamiltonian.data
+            
+        RT = None
+        ops = False
+        if self.has_RTensor:
+            RT = self.RelaxationTensor
+            ops = RT.as_operators
+            
+        if ops:
+            Km = RT.Km
+            Lm = RT.Lm
+            Ld = RT.Ld
+            Kd = numpy.transpose(Km, (0, 2, 1))
+            KdLm = numpy.sum(numpy.matmul(Kd, Lm), axis=0)
+            LdKm = numpy.sum(numpy.matmul(Ld, Km), axis=0)
+        elif RT is not None:
+            RR = RT.data
+            
+        dephs = None
+        if self.has_PDeph:
+            if self.PDeph.dtype == "Lorentzian":
+                dephs = self.PDeph.data
+            else:
+                raise Exception("Only Lorentzian pure dephasing can be used"+
+                                " with the 'adaptive' method")
+        
+        def rhs(t, y):
+            rho = numpy.reshape(y, (N, N))
+            drho = -1j*(numpy.dot(HH, rho) - numpy.dot(rho, HH))
+            if ops:
+                drho += numpy.sum(numpy.matmul(Km, numpy.matmul(rho, Ld))
+                                 +numpy.matmul(Lm, numpy.matmul(rho, Kd)),
+                                  axis=0) \
+                        - numpy.dot(KdLm, rho) - numpy.dot(rho, LdKm)
+            elif RT is not None:
+                drho += numpy.tensordot(RR, rho)
+            if dephs is not None:
+                drho -= dephs*rho
+            return numpy.reshape(drho, N**2)
+        
+        return rhs
+    
+    
+    def _get_TD_relaxation_rhs(self):
+        """Returns the right-hand side of the equation of motion
+        
+        The time-dependent relaxation tensor (or its operators) is 
+        interpolated linearly between the points of the TimeAxis. After 
+        the cut-off time, the last calculated value is used.
+        
+        """
+        N = self.N
+        RT = self.RelaxationTensor
+        
+        if self.Hamiltonian.has_rwa:
+            HH = self.Hamiltonian.get_RWA_data()
+        else:
+            HH = self.Hamiltonian.data
+            
+        cutoff_indx = self._get_cutoff_index(RT)
+        last = max(cutoff_indx-1, 0)
+            
+        t0 = self.TimeAxis.data[0]
+        dt = self.TimeAxis.step
+        
+        def weights(t):
+            """Indices and weights of the linear interpolation"""
+            x = (t - t0)/dt
+            k1 = min(int(numpy.floor(x)), last)
+            k2 = min(k1 + 1, last)
+            w2 = min(max(x - k1, 0.0), 1.0) if k2 > k1 else 0.0
+            return k1, k2, w2
+        
+        if RT.as_operators:
+            
+            Km = RT.Km
+            Kd = numpy.transpose(Km, (0, 2, 1))
+            
+            def rhs(t, y):
+                k1, k2, w2 = weights(t)
+                Lm = (1.0-w2)*RT.Lm[k1,:,:,:] + w2*RT.Lm[k2,:,:,:]
+                Ld = (1.0-w2)*RT.Ld[k1,:,:,:] + w2*RT.Ld[k2,:,:,:]
+                rho = numpy.reshape(y, (N, N))
+                drho = -1j*(numpy.dot(HH, rho) - numpy.dot(rho, HH))
+                drho += numpy.sum(
+                    numpy.matmul(Km, numpy.matmul(rho, Ld))
+                   +numpy.matmul(Lm, numpy.matmul(rho, Kd))
+                   -numpy.matmul(numpy.matmul(Kd, Lm), rho)
+                   -numpy.matmul(rho, numpy.matmul(Ld, Km)), axis=0)
+                return numpy.reshape(drho, N**2)
+            
+        else:
+            
+            def rhs(t, y):
+                k1, k2, w2 = weights(t)
+                RR = (1.0-w2)*RT.data[k1,:,:,:,:] + w2*RT.data[k2,:,:,:,:]
+                rho = numpy.reshape(y, (N, N))
+                drho = -1j*(numpy.dot(HH, rho) - numpy.dot(rho, HH)) \
+                       + numpy.tensordot(RR, rho)
+                return numpy.reshape(drho, N**2)
+            
+        return rhs
+    
+    
+    def _propagate_batch(self, rhois, method="short-exp", mdata=None):
+        """Propagation of a stack of initial density matrices
+        
+        All initial conditions are propagated simultaneously, so that 
+        the Python loops run only over time and each operation acts 
+        on the whole stack through numpy.matmul. Cases without a batched
+        implementation are propagated one by one.
+        
+        Parameters
+        ----------
+        
+        rhois : numpy.ndarray
+            Array of the shape (Nbatch, N, N) of initial density matrices
+            
+        method : str
+            Propagation method (see `propagate`)
+            
+        mdata : dict
+            Parameters of the propagation method (see `propagate`)
+            
+        """
+        
+        if rhois.shape[1:] != (self.N, self.N):
+            raise Exception("Initial density matrices have to be"+
+                            " of the shape (Nbatch, N, N)")
+            
+        orders = {"short-exp":4, "short-exp-2":2, 
+                  "short-exp-4":4, "short-exp-6":6}
+        
+        with_field = self.has_Efield and self.has_Trdip
+        if self.has_RTensor:
+            td = isinstance(self.RelaxationTensor, TimeDependent)
+        else:
+            td = False
+        
+        if ((method in orders) and (not with_field) 
+            and (self.has_RTensor or not self.has_relaxation)):
+            
+            return self._propagate_batch_short_exp(rhois, L=orders[method])
+        
+        elif (method == "dense-exp") and (not with_field) and (not td):
+            
+            return self._propagate_batch_dense_exp(rhois)
+        
+        #
+        # one by one propagation
+        #
+        Nb = rhois.shape[0]
+        rhots = numpy.zeros((Nb, self.Nt, self.N, self.N), dtype=qr.COMPLEX)
+        for kk in range(Nb):
+            rhoi = ReducedDensityMatrix(data=rhois[kk,:,:])
+            rhot = self.propagate(rhoi, method=method, mdata=mdata,
+                                  name=self.propagation_name)
+            rhots[kk,:,:,:] = rhot.data
+            
+        return rhots
+    
+    
+    def _propagate_batch_short_exp(self, rhois, L=4):
+        """Short exponential expansion applied to a stack of density matrices
+        
+        Relaxation tensor (time-independent or time-dependent) can be 
+        in the tensor or in the operator form. The pure dephasing is 
+        treated as in the single density matrix propagation.
+        
+        """
+        Nb = rhois.shape[0]
+        N = self.N
+        dt = self.dt
+        
+        rhots = numpy.zeros((Nb, self.Nt, N, N), dtype=qr.COMPLEX)
+        rhots[:,0,:,:] = rhois
+        
+        #
+        # RWA is applied here
+        #
+        if self.Hamiltonian.has_rwa:
+            HH = self.Hamiltonian.get_RWA_data()
+        else:
+            HH = self.Hamiltonian.data
+            
+        RT = None
+        td = False
+        ops = False
+        if self.has_RTensor:
+            RT = self.RelaxationTensor
+            td = isinstance(RT, TimeDependent)
+            ops = RT.as_operators
+            
+        if td:
+            cutoff_indx = self._get_cutoff_index(RT)
+            
+        if ops:
+            Km = RT.Km
+            Kd = numpy.transpose(Km, (0, 2, 1))
+            Nm = Km.shape[0]
+            if not td:
+                Lm = RT.Lm
+                Ld = RT.Ld
+                KdLm = numpy.matmul(Kd, Lm)
+                LdKm = numpy.matmul(Ld, Km)
+        elif (RT is not None) and (not td):
+            RR = RT.data
+            
+        # pure dephasing is applied after each step (operator form only)
+        dephase = self.has_PDeph and ops and (not td)
+        if dephase:
+            if self.PDeph.dtype == "Lorentzian":
+                expo = numpy.exp(-self.PDeph.data*dt)
+                t0 = 0.0
+            elif self.PDeph.dtype == "Gaussian":
+                expo = numpy.exp(-self.PDeph.data*(dt**2)/2.0)
+                t0 = self.PDeph.data*dt
+                
+        rho1 = numpy.array(rhois, dtype=qr.COMPLEX)
+        rho2 = rho1
+        
+        indxR = 1
+        for indx in range(1, self.Nt):
+            
+            if td:
+                if ops:
+                    Lm = RT.Lm[indxR,:,:,:]
+                    Ld = RT.Ld[indxR,:,:,:]
+                    KdLm = numpy.matmul(Kd, Lm)
+                    LdKm = numpy.matmul(Ld, Km)
+                else:
+                    RR = RT.data[indxR,:,:,:,:]
+            
+            # time at the beginning of the step
+            tNt = self.TimeAxis.data[indx-1]
+            
+            for jj in range(self.Nref):
+                
+                for ll in range(1, L+1):
+                    
+                    rhoY = -(1j*dt/ll)*(numpy.matmul(HH, rho1)
+                                       -numpy.matmul(rho1, HH))
+                    if ops:
+                        for mm in range(Nm):
+                            rhoY += (dt/ll)*(
+                             numpy.matmul(Km[mm,:,:], 
+                                          numpy.matmul(rho1, Ld[mm,:,:]))
+                            +numpy.matmul(Lm[mm,:,:], 
+                                          numpy.matmul(rho1, Kd[mm,:,:]))
+                            -numpy.matmul(KdLm[mm,:,:], rho1)
+                            -numpy.matmul(rho1, LdKm[mm,:,:]))
+                    elif RT is not None:
+                        rhoY += (dt/ll)*numpy.tensordot(rho1, RR,
+                                                        axes=([1,2],[2,3]))
+                    
+                    rho1 = rhoY
+                    rho2 = rho2 + rho1
+                    
+                if dephase:
+                    tt = tNt + jj*dt
+                    rho2 = rho2*expo*numpy.exp(-t0*tt)
+                    
+                rho1 = rho2
+                
+            rhots[:,indx,:,:] = rho2
+            
+            if td and (indxR < cutoff_indx-1):
+                indxR += 1
+                
+        return rhots
+    
+    
+    def _propagate_batch_dense_exp(self, rhois):
+        """Precomputed step propagator applied to a stack of density matrices
+        
+        """
+        Nb = rhois.shape[0]
+        N = self.N
+        
+        rhots = numpy.zeros((Nb, self.Nt, N, N), dtype=qr.COMPLEX)
+        rhots[:,0,:,:] = rhois
+        
+        UU = self.get_step_propagator()
+        
+        rho = numpy.reshape(rhots[:,0,:,:], (Nb, N**2))
+        for indx in range(1, self.Nt):
+            rho = numpy.dot(rho, numpy.transpose(UU))
+            rhots[:,indx,:,:] = numpy.reshape(rho, (Nb, N, N))
+            
+        return rhots
+    
+    
     def __propagate_diagonalization(self,rhoi):
         pass
         
@@ -8,6 +8,7 @@
 """
 import numpy
 import scipy
+import scipy.interpolate
 
 from ..utils import derived_type
 from ..builders import Molecule 
@@ -20,6 +21,9 @@ from ..core.managers import EnergyUnitsManaged
 from ..core.time import TimeDependent
 from ..core.managers import eigenbasis_of
 from ..core.units import convert
+from ..core.units import kB_intK
+from ..core.parallel import block_distributed_range
+from ..core.parallel import distributed_configuration
 
 from .linear_spectra import LinSpectrum
 
@@ -159,23 +163,23 @@ class LinSpectrumCalculator(EnergyUnitsManaged):
             
         coft : complex numpy array
             Values of correlation function given at points specified
-            in the TimeAxis object
+            in the TimeAxis object. Several correlation functions can
+            be submitted as rows of a two-dimensional array; they are
+            then all integrated at once.
             
         
         """
         
         ta = timeaxis
-        rr = numpy.real(coft)
-        ri = numpy.imag(coft)
-        sr = scipy.interpolate.UnivariateSpline(ta.data,
-                            rr,s=0).antiderivative()(ta.data)
-        sr = scipy.interpolate.UnivariateSpline(ta.data,
-                            sr,s=0).antiderivative()(ta.data)
-        si = scipy.interpolate.UnivariateSpline(ta.data,
-                            ri,s=0).antiderivative()(ta.data)
-        si = scipy.interpolate.UnivariateSpline(ta.data,
-                            si,s=0).antiderivative()(ta.data)
-        gt = sr + 1j*si
+        # interpolating splines of all functions (real and imaginary 
+        # parts) are integrated together
+        sr = numpy.real(numpy.asarray(coft, dtype=numpy.complex128))
+        si = numpy.imag(numpy.asarray(coft, dtype=numpy.complex128))
+        yy = numpy.stack((sr, si), axis=-2)
+        for ii in range(2):
+            yy = scipy.interpolate.make_interp_spline(ta.data, yy, k=3,
+                                axis=-1).antiderivative()(ta.data)
+        gt = yy[...,0,:] + 1j*yy[...,1,:]
         return gt
     
     def _equilibrium_excit_populations(self, AG, temperature=300,
@@ -512,7 +516,17 @@ class LinSpectrumCalculator(EnergyUnitsManaged):
         return ct
     
     def _excitonic_coft_all(self,SS,AG):
-        """ Returns energy gap correlation function data of an exciton state n
+        """ Returns energy gap correlation functions of all exciton states
+        
+        The correlation function of the exciton n is a sum of the site
+        correlation functions weighted by the products of the squares of
+        the expansion coefficients SS[k,n]**2 SS[l,n]**2. The weights are
+        collected for each function of the correlation function matrix
+        and all exciton functions are obtained as one matrix product.
+        The result has the shape (number of states, number of times).
+        SS can also be a stack of diagonalization matrices (e.g. of several
+        disorder realizations) with the states in its last axis; the 
+        leading axes are then retained in the result.
         
         """
         
@@ -520,32 +534,43 @@ class LinSpectrumCalculator(EnergyUnitsManaged):
         sbi = AG.get_SystemBathInteraction()
         # CorrelationFunctionMatrix
         cfm = sbi.CC
+    
+        # electronic states corresponding to single excited states
+        elst = numpy.where(AG.which_band == 1)[0]
+        
+        # weights of the electronic states in the excitons
+        WW = numpy.zeros((len(elst),)+SS.shape[:-2]+SS.shape[-1:],
+                         dtype=numpy.float64)
+        for k, el1 in enumerate(elst):
+            WW[k,...] = numpy.sum(SS[...,AG.vibindices[el1],:]**2, axis=-2)
             
-        c0 = AG.monomers[0].get_egcf((0,1))
-        Nt = len(c0)
+        # weights of the functions of the correlation function matrix
+        cp = cfm.cpointer[numpy.ix_(elst-1, elst-1)]
+        PP = numpy.zeros(WW.shape[1:]+(cfm._cofts.shape[0],),
+                         dtype=numpy.float64)
+        for ifc in numpy.unique(cp[cp > 0]):
+            k1, k2 = numpy.nonzero(cp == ifc)
+            PP[...,ifc] = numpy.sum(WW[k1,...]*WW[k2,...], axis=0)
+            
+        return numpy.dot(PP, cfm._cofts).astype(numpy.complex128)
     
-        Nst = AG.HamOp.dim
-        ct = numpy.zeros((Nst,Nt),dtype=numpy.complex128)
-
+    def _excitonic_reorg_energy_all(self, SS, AG):
+        """ Returns the reorganisation energies of all exciton states
+        
+        """
+        
+        # SystemBathInteraction
+        sbi = AG.get_SystemBathInteraction()
+        # CorrelationFunctionMatrix
+        cfm = sbi.CC
+        
+        rg = numpy.zeros(SS.shape[:-2]+SS.shape[-1:], dtype=numpy.float64)
         # electronic states corresponding to single excited states
-        import time
-        timecount = 0
         elst = numpy.where(AG.which_band == 1)[0]
-        start = time.time()
         for el1 in elst:
-            for el2 in elst:
-                coft = cfm.get_coft(el1-1,el2-1)
-                start2 = time.time()
-                for kk in AG.vibindices[el1]:
-                    for ll in AG.vibindices[el2]:
-                        ct[:,:] += numpy.dot(
-                         numpy.expand_dims((SS[kk,:]**2)*(SS[ll,:]**2),axis=1),
-                         numpy.expand_dims(coft,axis=0))
-                stop2 = time.time()
-                timecount += stop2 - start2
-        stop = time.time()
-        print(stop-start,stop-start - timecount)
-        return ct
+            reorg = cfm.get_reorganization_energy(el1-1,el1-1)
+            rg += reorg*numpy.sum(SS[...,AG.vibindices[el1],:]**4, axis=-2)
+        return rg
 
     def _excitonic_reorg_energy(self, SS, AG, n):
         """ Returns the reorganisation energy of an exciton state
@@ -619,6 +644,13 @@ class LinSpectrumCalculator(EnergyUnitsManaged):
         
         return Rot_n#,Rot_nm
         
+    def _excitonic_rotatory_strength_all(self,SS,AG):
+        """ Returns rotatory strengths of all exciton states
+        
+        """
+        S1 = SS[...,0:AG.Ntot,:]
+        return numpy.einsum("...in,ij,...jn->...n", S1, AG.RRv+AG.RRm, S1)
+        
     def _calculate_monomer(self, raw=False):
         """ Calculates the absorption spectrum of a monomer 
         
@@ -696,16 +728,6 @@ class LinSpectrumCalculator(EnergyUnitsManaged):
         # we represent the Frequency axis anew
         axis = FrequencyAxis(st,Nt,do) 
         
-        # TimeAxis
-        tr = {"ta":ta, "fa":axis, "fwhm": 0}
-        
-        # If gaussian groadening is specified calculate also spectra
-        if self._gass_lineshape:
-            tr["HWHH"] = self.HWHH
-        
-        if self._gauss_broad:
-            tr["fwhm"] = self.gauss
-        
         if relaxation_tensor is not None:
             RR = relaxation_tensor
             RR.transform(SS)
@@ -716,7 +738,6 @@ class LinSpectrumCalculator(EnergyUnitsManaged):
             else:
                 for ii in range(HH.dim):
                     gg.append([RR.data[ii,ii,ii,ii]])
-            tr["gg"] = gg[1]
         elif rate_matrix is not None:
             RR = rate_matrix  # rate matrix is in excitonic basis
             gg = []
@@ -726,30 +747,8 @@ class LinSpectrumCalculator(EnergyUnitsManaged):
             else:
                 for ii in range(HH.dim):
                     gg.append([RR.data[ii,ii]/2.0])
-            tr["gg"] = gg[1]
         else:
-            
-            tr["gg"] = [0.0]
-        
-        # get square of transition dipole moment here
-        tr["dd"] = DD.dipole_strength(0,1)
-        # first transition energy
-        tr["om"] = HH.data[1,1]-HH.data[0,0]-self.rwa
-        # get a transformed ct here
-        ct = self._excitonic_coft(SS,self.system,1)
-        tr["ct"] = ct
-        # calculate g(t)   
-        tr["gt"] = self._c2g(tr["ta"],tr["ct"].data)
-        # get reorganization energy
-        tr["re"] = self._excitonic_reorg_energy(SS,self.system,1)
-        # get rotatory strength
-        tr["rr"] = self._excitonic_rotatory_strength_fullv(SS,self.system,energy,1)
-        #tr["rr"] = self._excitonic_rotatory_strength(SS,self.system,energy,1)
-#        print(1,convert(tr["rr"],"int","1/cm")*numpy.pi*1e-4)
-        dip = DD.data[0,1]
-        tr["ld"] = (3*(numpy.dot(dip,self.ld_axis))**2 - tr["dd"]) # *3/2
-        #tr["ld"] = 3*(DD.  # *3/2
-        
+            gg = None
 
         self.system._has_system_bath_coupling = True
         
@@ -757,75 +756,122 @@ class LinSpectrumCalculator(EnergyUnitsManaged):
         rho_eq_exct = self._equilibrium_excit_populations(self.system,
                                                temperature=temperature)
         
-#        print(tr["ct"])
-#        print(max(tr["ct"]))
-#        print(self.one_transition_spectrum(tr))
-#        print(max(self.one_transition_spectrum(tr)))
         #
-        # Calculates spectrum of a single transition
+        # All transitions are treated together: properties of the 
+        # transitions are arrays and their time dependent responses 
+        # are rows of a matrix
         #
-        data = numpy.real(self.one_transition_spectrum_abs(tr))
-        data_fl = numpy.real(rho_eq_exct.data[1, 1]*self.one_transition_spectrum_fluor(tr))
-        data_cd = numpy.real(self.one_transition_spectrum_cd(tr))
-        data_ld = numpy.real(self.one_transition_spectrum_ld(tr))
-        if self._gass_lineshape:
-            data_gauss,data_cd_gauss,data_ld_gauss = numpy.real(self.one_transition_spectrum_gauss(tr))
-#        print("Population mine:",rho_eq_exct.data[1, 1])
-
-        # FOR THE VIBRONIC SYSTEM THE SPECTRA HAVE TO BE SUMED THROUGH THE GROUND STATES (VIBRONIC)
-        for jj in range(1,min(1,self.system.Nb[0])): # sum over the ground states
-            tr["dd"] = DD.dipole_strength(jj,1)
-            # first transition energy
-            tr["om"] = HH.data[1,1]-HH.data[jj,jj]-self.rwa
-            data_fl += numpy.real(rho_eq_exct.data[1, 1]*self.one_transition_spectrum_fluor(tr))
+        tt = ta.data
+        ntr = numpy.arange(1, HH.dim)
+        Etr = numpy.diag(HH.data)[ntr]
+        
+        # squares of transition dipole moments
+        dd = numpy.sum(DD.data[0,ntr,:]**2, axis=1)
+        # transition energies
+        om = Etr-HH.data[0,0]-self.rwa
+        # rotatory strengths
+        rr = self._excitonic_rotatory_strength_all(SS,self.system)[ntr]
+        # linear dichroism strengths
+        ld = 3*numpy.dot(DD.data[0,ntr,:],self.ld_axis)**2 - dd # *3/2
+        # equilibrium populations
+        pops = numpy.diag(rho_eq_exct.data)[ntr]
+        
+        # lineshape functions and reorganization energies
+        ct = self._excitonic_coft_all(SS,self.system)
+        gt = self._c2g(ta,ct[ntr,:])
+        re = self._excitonic_reorg_energy_all(SS,self.system)[ntr]
+        
+        # natural broadening (constant or time dependent)
+        rt = numpy.ones((len(ntr), ta.length), dtype=numpy.complex128)
+        if gg is not None:
+            for k, ii in enumerate(ntr):
+                rt[k,:] = numpy.exp(numpy.asarray(gg[ii])*tt)
+                
+        # Additional gaussian broadening of the spectra
+        if self._gauss_broad and (self.gauss != 0.0):
+            sgm = self.gauss/(2*numpy.sqrt(2*numpy.log(2)))
+            rt *= numpy.exp(-2*(numpy.pi**2)*(sgm**2)*(tt**2))
             
+        # time dependent responses of absorption, fluorescence, CD and LD
+        resp = numpy.zeros((4, ta.length), dtype=numpy.complex128)
+        
+        at = numpy.exp(-gt - 1j*numpy.outer(om,tt))*rt
+        resp[0,:] = numpy.dot(dd, at)
+        resp[2,:] = numpy.dot(rr, at)
+        resp[3,:] = numpy.dot(ld, at)
+        
+        # FOR THE VIBRONIC SYSTEM THE SPECTRA HAVE TO BE SUMED THROUGH THE 
+        # GROUND STATES (VIBRONIC)
+        at = numpy.exp(-numpy.conjugate(gt) + 2j*numpy.outer(re,tt))*rt
+        for jj in range(min(self.system.Nb[0], HH.dim)):
+            sel = ntr > jj
+            dd_j = numpy.sum(DD.data[jj,ntr[sel],:]**2, axis=1)
+            om_j = Etr[sel]-HH.data[jj,jj]-self.rwa
+            resp[1,:] += numpy.dot(pops[sel]*dd_j,
+                                at[sel,:]*numpy.exp(-1j*numpy.outer(om_j,tt)))
         
-        for ii in range(2,HH.dim):
-            if relaxation_tensor is not None or rate_matrix is not None:
-                tr["gg"] = gg[ii]
-            else:
-                tr["gg"] = [0.0]
-#            print(tr["gg"])
-            #tr[1] = DD.dipole_strength(0,ii) # update transition dipole moment
-            tr["dd"] = DD.dipole_strength(0,ii)
-            #tr[2] = HH.data[ii,ii]-HH.data[0,0]-rwa
-            tr["om"] = HH.data[ii,ii]-HH.data[0,0]-self.rwa
-            #tr[3] = self._excitonic_coft(SS,self.system,ii-1) # update ct here
-            tr["ct"] = self._excitonic_coft(SS,self.system,ii)
-            tr["gt"] = self._c2g(tr["ta"],tr["ct"].data)
-            tr["re"] = self._excitonic_reorg_energy(SS,self.system,ii)
-            tr["rr"] = self._excitonic_rotatory_strength_fullv(SS,self.system,energy,ii)
-            dip = DD.data[0,ii]
-            tr["ld"] = (3*(numpy.dot(dip,self.ld_axis))**2 - tr["dd"]) # *3/2
-            #tr["rr"] = self._excitonic_rotatory_strength(SS,self.system,energy,ii)
-#            print(ii,convert(HH.data[ii,ii]-HH.data[0,0]-tr["re"],"int","1/cm"),convert(HH.data[ii,ii]-HH.data[0,0]-2*tr["re"],"int","1/cm"),convert(tr["re"],"int","1/cm"))
-#            print(ii,convert(tr["rr"],"int","1/cm")*numpy.pi*1e-4)
-            # conversion factor is convert rotatory strength to inverse centimeters and multiply *numpy.pi*1e-4
-
+        # If gaussian groadening is specified calculate also spectra
+        if self._gass_lineshape:
+            gs = self._gauss_lineshapes(axis, om)
+            gauss_data = numpy.dot(numpy.array([dd, rr, ld]), gs)
+        else:
+            gauss_data = None
+        
+        # transform all quantities back
+        S1 = numpy.linalg.inv(SS)
+        HH.transform(S1)
+        DD.transform(S1)
+        
+        if relaxation_tensor is not None:
+            RR.transform(S1)
 
+        return self._spectra_from_responses(resp, axis, gauss_data=gauss_data,
+                                            raw=raw)
+    
+    
+    def _gauss_lineshapes(self, axis, om):
+        """ Gaussian lineshapes of transitions with frequencies om
+        
+        The definition is the same as in one_transition_spectrum_gauss.
+        The frequency axis is added as the last axis of the result.
+        
+        """
+        sigma = self.HWHH/numpy.sqrt(2*numpy.log(2))
+        fa = axis.data
+        return (fa/(sigma*numpy.sqrt(2*numpy.pi))
+                *numpy.exp(-0.5*((fa - (om+self.rwa)[...,numpy.newaxis])
+                                 /sigma)**2))
+    
+    
+    def _spectra_from_responses(self, resp, axis, gauss_data=None, 
+                                raw=False):
+        """ Returns linear spectra calculated from their responses
+        
+        Parameters
+        ----------
+        
+        resp : numpy.array
+            Time dependent responses of absorption, fluorescence, CD and LD
+            (rows of the array)
             
-            #
-            # Calculates spectrum of a single transition
-            #
-            data += numpy.real(self.one_transition_spectrum_abs(tr))
-            data_fl += numpy.real(rho_eq_exct.data[ii, ii]*self.one_transition_spectrum_fluor(tr))
-            data_cd += numpy.real(self.one_transition_spectrum_cd(tr))
-            data_ld += numpy.real(self.one_transition_spectrum_ld(tr))
-            if self._gass_lineshape:
-                data_gauss_tmp,data_cd_gauss_tmp, data_ld_gauss_tmp = numpy.real(self.one_transition_spectrum_gauss(tr))
-                data_gauss += data_gauss_tmp
-                data_cd_gauss += data_cd_gauss_tmp
-                data_ld_gauss += data_ld_gauss_tmp
-#            print("Population mine:",rho_eq_exct.data[ii, ii])
-
-            # FOR THE VIBRONIC SYSTEM THE SPECTRA HAVE TO BE SUMED THROUGH THE GROUND STATES (VIBRONIC)
-            for jj in range(1,min(ii,self.system.Nb[0])): # sum over the ground states
-                tr["dd"] = DD.dipole_strength(jj,ii)
-                # first transition energy
-                tr["om"] = HH.data[ii,ii]-HH.data[jj,jj]-self.rwa
-                data_fl += numpy.real(rho_eq_exct.data[ii, ii]*self.one_transition_spectrum_fluor(tr))
-
+        axis : FrequencyAxis
+            Frequency axis of the spectra
+            
+        gauss_data : numpy.array
+            Absorption, CD and LD spectra with gaussian lineshapes (rows 
+            of the array) or None
+            
+        """
+        ta = self.TimeAxis
         
+        # Fourier transform of all responses
+        ft = numpy.fft.hfft(resp, axis=1)*ta.step
+        ft = numpy.fft.fftshift(ft, axes=1)
+        # invert the order because hfft is a transform with -i
+        ft = ft[:,::-1]
+        # cut the center of the spectrum
+        Nt = ta.length
+        data, data_fl, data_cd, data_ld = numpy.real(ft[:,Nt//2:Nt+Nt//2])
         
         # multiply the spectrum by frequency (compulsory prefactor)
         if not raw:
@@ -833,22 +879,13 @@ class LinSpectrumCalculator(EnergyUnitsManaged):
             data_fl = axis.data*data_fl
             data_cd =  axis.data*data_cd
             data_ld = axis.data*data_ld
-            #data_gauss = axis.data*data_gauss
-            #data_cd_gauss = axis.data*data_cd_gauss
-        
-        # transform all quantities back
-        S1 = numpy.linalg.inv(SS)
-        HH.transform(S1)
-        DD.transform(S1)
-        
-        if relaxation_tensor is not None:
-            RR.transform(S1)
-
+            
         abs_spect = LinSpectrum(axis=axis, data=data)
         fluor_spect = LinSpectrum(axis=axis, data=data_fl)
         CD_spect = LinSpectrum(axis=axis, data=data_cd)
         LD_spect = LinSpectrum(axis=axis, data=data_ld)
-        if self._gass_lineshape:
+        if gauss_data is not None:
+            data_gauss, data_cd_gauss, data_ld_gauss = gauss_data
             abs_spect_gauss = LinSpectrum(axis=axis, data=data_gauss)
             CD_spect_gauss = LinSpectrum(axis=axis, data=data_cd_gauss)
             LD_spect_gauss = LinSpectrum(axis=axis, data=data_ld_gauss)
@@ -860,6 +897,164 @@ class LinSpectrumCalculator(EnergyUnitsManaged):
             return {"abs": abs_spect, "fluor": fluor_spect, "CD":  CD_spect,
                     "LD":  LD_spect}    
 
+
+    def calculate_disorder_average(self, disorder, Nreal, raw=False,
+                                   ignore_first=False, block_size=100):
+        """ Calculates linear spectra averaged over disorder realizations
+        
+        The realizations are treated in blocks: the Hamiltonians of a block
+        are diagonalized together and the responses of all transitions of
+        all realizations are calculated as arrays and summed. When run
+        in a parallel region, the realizations are distributed among the 
+        processes, and the results are reduced at the end.
+        
+        Parameters
+        ----------
+        
+        disorder : quantarhei.Disorder
+            Disorder of the Hamiltonian of the aggregate. Its data have to
+            be the Hamiltonian matrix of the aggregate without disorder.
+            
+        Nreal : int
+            Number of disorder realizations
+            
+        raw : bool
+            If True, the spectra are not multiplied by frequency
+            
+        ignore_first : bool
+            If True, the first realization is without disorder
+            
+        block_size : int
+            Number of realizations treated together
+            
+        Returns
+        -------
+        
+        Dictionary of LinSpectrum objects with the same keys as the 
+        dictionary returned by the `calculate` method.
+            
+        """
+        if not isinstance(self.system, Aggregate):
+            raise Exception("Disorder averaging requires an Aggregate")
+        if ((self._relaxation_tensor is not None) or 
+            (self._rate_matrix is not None) or
+            (self._relaxation_hamiltonian is not None)):
+            raise Exception("Disorder averaging with relaxation"+
+                            " not implemented")
+        if disorder.shape != self.system.get_Hamiltonian().data.shape:
+            raise Exception("Disorder does not match the Hamiltonian")
+        
+        with energy_units("int"):
+            
+            # Frequency axis
+            Nt = len(self.frequencyAxis.data)//2        
+            do = self.frequencyAxis.data[1]-self.frequencyAxis.data[0]
+            st = self.frequencyAxis.data[Nt//2]
+            axis = FrequencyAxis(st,Nt,do) 
+            
+            resp = numpy.zeros((4, self.TimeAxis.length), 
+                               dtype=numpy.complex128)
+            gauss_data = numpy.zeros((3, axis.length), dtype=numpy.float64)
+            
+            # realizations of this process
+            rng = block_distributed_range(0, Nreal)
+            for n0 in range(rng.start, rng.stop, block_size):
+                n1 = min(n0 + block_size, rng.stop)
+                self._add_realizations(disorder, range(n0, n1), resp, 
+                                       gauss_data, axis, ignore_first)
+                
+            distributed_configuration().allreduce(resp, operation="sum")
+            distributed_configuration().allreduce(gauss_data, 
+                                                  operation="sum")
+            resp = resp/Nreal
+            gauss_data = gauss_data/Nreal
+            
+            if not self._gass_lineshape:
+                gauss_data = None
+                
+            return self._spectra_from_responses(resp, axis, 
+                                                gauss_data=gauss_data,
+                                                raw=raw)
+    
+    
+    def _add_realizations(self, disorder, realizations, resp, gauss_data,
+                          axis, ignore_first):
+        """ Adds responses of a block of disorder realizations
+        
+        This is the calculation of _calculate_aggregate with all properties
+        of the transitions given for all realizations of the block. 
+        
+        """
+        ta = self.TimeAxis
+        tt = ta.data
+        AG = self.system
+        
+        # eigenvalues and diagonalization matrices of all realizations
+        en, SS = disorder.diagonalize_Hamiltonians(realizations,
+                                                   ignore_first=ignore_first)
+        dim = en.shape[1]
+        ntr = numpy.arange(1, dim)
+        Etr = en[:,ntr]
+        Nb0 = min(AG.Nb[0], dim)
+        
+        # transition dipole moments from the states of the ground band
+        D0 = AG.get_TransitionDipoleMoment().data
+        DD = numpy.zeros((len(en), Nb0, dim, 3), dtype=numpy.float64)
+        S0 = numpy.swapaxes(SS[:,:,0:Nb0], 1, 2)
+        for ix in range(3):
+            DD[:,:,:,ix] = numpy.matmul(S0, numpy.matmul(D0[:,:,ix], SS))
+        
+        # squares of transition dipole moments
+        dd = numpy.sum(DD[:,0,ntr,:]**2, axis=2)
+        # transition energies
+        om = Etr-en[:,0:1]-self.rwa
+        # rotatory strengths
+        rr = self._excitonic_rotatory_strength_all(SS,AG)[:,ntr]
+        # linear dichroism strengths
+        ld = 3*numpy.dot(DD[:,0,ntr,:],self.ld_axis)**2 - dd # *3/2
+        
+        # equilibrium populations (weak coupling limit)
+        temperature = AG.sbi.get_temperature()
+        pops = numpy.zeros(Etr.shape, dtype=numpy.float64)
+        start = AG.Nb[0]
+        if temperature == 0.0:
+            pops[:,start-1] = 1.0
+        else:
+            ens = en[:,start:] - numpy.min(en[:,start:], axis=1)[:,None]
+            ne = numpy.exp(-ens/(kB_intK*temperature))
+            pops[:,start-1:] = ne/numpy.sum(ne, axis=1)[:,numpy.newaxis]
+        
+        # lineshape functions and reorganization energies
+        ct = self._excitonic_coft_all(SS,AG)
+        gt = self._c2g(ta,ct[:,ntr,:])
+        re = self._excitonic_reorg_energy_all(SS,AG)[:,ntr]
+        
+        # Additional gaussian broadening of the spectra
+        if self._gauss_broad and (self.gauss != 0.0):
+            sgm = self.gauss/(2*numpy.sqrt(2*numpy.log(2)))
+            rt = numpy.exp(-2*(numpy.pi**2)*(sgm**2)*(tt**2))
+        else:
+            rt = numpy.ones(ta.length, dtype=numpy.float64)
+            
+        at = numpy.exp(-gt - 1j*om[:,:,numpy.newaxis]*tt)*rt
+        resp[0,:] += numpy.einsum("rk,rkt->t", dd, at)
+        resp[2,:] += numpy.einsum("rk,rkt->t", rr, at)
+        resp[3,:] += numpy.einsum("rk,rkt->t", ld, at)
+        
+        at = numpy.exp(-numpy.conjugate(gt) 
+                       + 2j*re[:,:,numpy.newaxis]*tt)*rt
+        for jj in range(Nb0):
+            sel = ntr > jj
+            dd_j = numpy.sum(DD[:,jj,ntr[sel],:]**2, axis=2)
+            om_j = Etr[:,sel]-en[:,jj:jj+1]-self.rwa
+            resp[1,:] += numpy.einsum("rk,rkt->t", pops[:,sel]*dd_j,
+                        at[:,sel,:]*numpy.exp(-1j*om_j[:,:,numpy.newaxis]*tt))
+            
+        if self._gass_lineshape:
+            gs = self._gauss_lineshapes(axis, om)
+            gauss_data += numpy.einsum("irk,rkf->if", 
+                                       numpy.array([dd, rr, ld]), gs)
+        
                    
 class AbsSpectrumCalculator(LinSpectrumCalculator):
     def __init__(self, timeaxis,
@@ -527,4 +527,370 @@ class liouville_pathway(UnitsManaged):
     
     
 
-        
\ No newline at end of file
+        
+
+class LiouvillePathwayTable:
+    """Liouville pathways stored in a columnar (structure-of-arrays) form
+
+    All properties of the pathways (initial states, transitions, sides,
+    frequencies, transition dipole moments, widths, evolution factors and
+    prefactors) are stored in arrays whose first index runs over the
+    pathways. The `liouville_pathway` objects are created only on demand,
+    when the table is indexed or iterated.
+
+    Pathways of different types (names) can be stored in one table; the
+    type of each pathway is given by `name_index`.
+
+
+    Parameters
+    ----------
+
+    aggregate
+        Aggregate object in which the Liouville pathways are taken
+
+    order : int
+        Order of the pathways (3 or 1)
+
+    """
+
+    def __init__(self, aggregate, order=3):
+
+        if not aggregate:
+            raise Exception("aggregate has to be specified")
+
+        self.aggregate = aggregate
+        self.order = order
+
+        # number of events (interactions and at most one relaxation)
+        self.nevents = order + 2
+
+        # properties of the pathway types
+        self.names = []
+        self.ptypes = []
+        self.relax_orders = []
+        self.popt_bands = []
+        self.events = []
+        self.has_widths = []
+        self.has_evolfac = []
+        self.has_evf_tol = []
+
+        nint = order + 1
+        self.name_index = numpy.zeros(0, dtype=int)
+        self.sinit = numpy.zeros(0, dtype=int)
+        self.transitions = numpy.zeros((0, nint, 2), dtype=int)
+        self.sides = numpy.zeros((0, nint), dtype=int)
+        self.relaxations = numpy.zeros((0, 2, 2), dtype=int)
+        self.states = numpy.zeros((0, self.nevents, 2), dtype=int)
+        self.frequency = numpy.zeros((0, self.nevents), dtype=qr.REAL)
+        self.energy = numpy.zeros((0, nint), dtype=qr.REAL)
+        self.dmoments = numpy.zeros((0, nint, 3), dtype=qr.REAL)
+        self.widths = numpy.zeros((0, 4), dtype=qr.REAL)
+        self.dephs = numpy.zeros((0, 4), dtype=qr.REAL)
+        self.evolfac = numpy.zeros(0, dtype=qr.COMPLEX)
+        self.evf_index = numpy.zeros((0, 4), dtype=int)
+        self.sign = numpy.zeros(0, dtype=qr.REAL)
+        self.F4n = numpy.zeros((0, 3), dtype=qr.REAL)
+        self.or_av_1 = numpy.zeros(0, dtype=qr.REAL)
+        self.pref = numpy.zeros(0, dtype=qr.COMPLEX)
+
+        # were the prefactors calculated?
+        self.averaged = False
+
+
+    def add_pathways(self, name, ptype, events, sinit, transitions, sides,
+                     states, frequency, energy, dmoments,
+                     relaxations=None, widths=None, dephs=None,
+                     evolfac=None, evf_index=None, evf_tol=False,
+                     popt_band=0, relax_order=0):
+        """Appends a block of pathways of one type to the table
+
+
+        Parameters
+        ----------
+
+        name : str
+            Name of the pathways (e.g. "R1g")
+
+        ptype : str {"R", "NR", "DC"}
+            Type of the pathways
+
+        events : sequence of str
+            Events ("I" for interaction, "R" for relaxation) of the
+            pathways in the order of their occurence
+
+        sinit : array of int
+            Initial states of the pathways
+
+        transitions : array of int
+            Final and initial states of the light induced transitions,
+            shape (Np, order+1, 2)
+
+        sides : array of int
+            Sides of the diagram (+1 left, -1 right) of the interactions
+
+        states : array of int
+            States of the pathway after each event, shape (Np, Ne, 2)
+            where Ne is the number of events
+
+        frequency : array of float
+            Frequencies of the density matrix after each event
+
+        energy : array of float
+            Transition energies of the interactions
+
+        dmoments : array of float
+            Transition dipole moments of the interactions
+
+        relaxations : array of int, optional
+            Final and starting states (Np, 2, 2) of the relaxation event
+
+        widths, dephs : array of float, optional
+            Widths and dephasings of the intervals (Np, 4); -1 stands for
+            undefined values
+
+        evolfac : array, optional
+            Factors from the evolution superoperator
+
+        evf_index : array of int, optional
+            Indices (Np, 4) of the elements of the evolution superoperator
+            which form the evolution factors
+
+        evf_tol : bool
+            If True, the pathways are only valid if the absolute value
+            of their evolution factor is above a tolerance
+
+        popt_band : int
+            Band through which the pathways travel at population time
+
+        relax_order : int
+            Number of relaxation events in the pathways
+
+        """
+        Np = len(sinit)
+        Ne = len(events)
+
+        self.names.append(name)
+        self.ptypes.append(ptype)
+        self.relax_orders.append(relax_order)
+        self.popt_bands.append(popt_band)
+        self.events.append(tuple(events))
+        self.has_widths.append(widths is not None)
+        self.has_evolfac.append(evolfac is not None)
+        self.has_evf_tol.append(evf_tol)
+
+        def _padded(arr, shape, dtype, value=0.0):
+            out = numpy.zeros(shape, dtype=dtype)
+            out[...] = value
+            if arr is not None:
+                out[:, :arr.shape[1], ...] = arr
+            return out
+
+        if relaxations is None:
+            relaxations = numpy.zeros((Np, 2, 2), dtype=int)
+        if evolfac is None:
+            evolfac = numpy.ones(Np, dtype=qr.COMPLEX)
+        if evf_index is None:
+            evf_index = -numpy.ones((Np, 4), dtype=int)
+
+        nint = self.order + 1
+        states = _padded(states[:, :Ne, :], (Np, self.nevents, 2), int)
+        frequency = _padded(frequency[:, :Ne], (Np, self.nevents), qr.REAL)
+        widths = _padded(widths, (Np, 4), qr.REAL, -1.0)
+        dephs = _padded(dephs, (Np, 4), qr.REAL, -1.0)
+
+        # vector for the orientational averaging
+        d = dmoments
+        F4n = numpy.zeros((Np, 3), dtype=qr.REAL)
+        or_av_1 = numpy.zeros(Np, dtype=qr.REAL)
+        if self.order == 3:
+            dd = numpy.einsum("nik,njk->nij", d, d)
+            F4n[:, 0] = dd[:, 3, 2]*dd[:, 1, 0]
+            F4n[:, 1] = dd[:, 3, 1]*dd[:, 2, 0]
+            F4n[:, 2] = dd[:, 3, 0]*dd[:, 2, 1]
+            sign = numpy.prod(sides, axis=1).astype(qr.REAL)
+        elif self.order == 1:
+            or_av_1 = (1.0/3.0)*numpy.einsum("nk,nk->n", d[:, 0, :],
+                                             d[:, 1, :])
+            sign = numpy.ones(Np, dtype=qr.REAL)
+
+        def _cat(old, new):
+            return numpy.concatenate((old, numpy.asarray(new,
+                                                         dtype=old.dtype)))
+
+        self.name_index = _cat(self.name_index,
+                               numpy.full(Np, len(self.names)-1))
+        self.sinit = _cat(self.sinit, sinit)
+        self.transitions = _cat(self.transitions,
+                                numpy.reshape(transitions, (Np, nint, 2)))
+        self.sides = _cat(self.sides, numpy.reshape(sides, (Np, nint)))
+        self.relaxations = _cat(self.relaxations, relaxations)
+        self.states = _cat(self.states, states)
+        self.frequency = _cat(self.frequency, frequency)
+        self.energy = _cat(self.energy, energy)
+        self.dmoments = _cat(self.dmoments, dmoments)
+        self.widths = _cat(self.widths, widths)
+        self.dephs = _cat(self.dephs, dephs)
+        self.evolfac = _cat(self.evolfac, evolfac)
+        self.evf_index = _cat(self.evf_index, evf_index)
+        self.sign = _cat(self.sign, sign)
+        self.F4n = _cat(self.F4n, F4n)
+        self.or_av_1 = _cat(self.or_av_1, or_av_1)
+        self.pref = _cat(self.pref, -numpy.ones(Np))
+        self.averaged = False
+
+
+    def orientational_averaging(self, lab):
+        """Orientational averaging of all pathways in the table
+
+        Calculates the prefactors of all pathways from the orientational
+        averaging and the population of their initial states
+
+        """
+        n0 = self.transitions[:, 0, 1]
+        pop = numpy.real(numpy.diag(self.aggregate.rho0))[n0]
+
+        if self.order == 3:
+            self.pref = self.sign*(numpy.dot(self.F4n, lab.F4eM4)
+                                   *pop)*self.evolfac
+        elif self.order == 1:
+            self.pref = (pop*self.or_av_1).astype(qr.COMPLEX)
+
+        self.averaged = True
+
+
+    def get_evolution_factors(self, eUt, times=None):
+        """Evolution factors of all pathways at all (or selected) times
+
+        The elements of the evolution superoperator are gathered for
+        all pathways at once; pathways without evolution factor obtain
+        the value 1.
+
+
+        Parameters
+        ----------
+
+        eUt : EvolutionSuperOperator or SuperOperator
+            Evolution superoperator; a time independent superoperator
+            yields the same factors at all times
+
+        times : array of float, optional
+            Times at which the factors are returned; all times of the
+            evolution superoperator by default
+
+
+        Returns
+        -------
+
+        evf : complex array
+            Evolution factors, shape (Nt, Np)
+
+        """
+        has = self.evf_index[:, 0] >= 0
+        ii = self.evf_index[has, :]
+        indices = (ii[:, 0], ii[:, 1], ii[:, 2], ii[:, 3])
+
+        if hasattr(eUt, "get_elements"):
+            sel = eUt.get_elements(indices, times=times)
+        else:
+            # time independent superoperator
+            if times is None:
+                times = [0.0]
+            sel = numpy.broadcast_to(eUt.data[indices],
+                                     (len(times), ii.shape[0]))
+
+        evf = numpy.ones((sel.shape[0], len(self)), dtype=qr.COMPLEX)
+        evf[:, has] = sel
+
+        return evf
+
+
+    def get_evf_tolerance_mask(self):
+        """Returns True for the pathways whose evolution factors are subject
+        to a tolerance
+
+        """
+        return numpy.array(self.has_evf_tol, dtype=bool)[self.name_index]
+
+
+    def __len__(self):
+        return self.sinit.shape[0]
+
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self.get_pathway(k)
+                    for k in range(*item.indices(len(self)))]
+        return self.get_pathway(item)
+
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self.get_pathway(k)
+
+
+    def get_pathway(self, k):
+        """Returns the k-th pathway as a `liouville_pathway` object
+
+        """
+        Np = len(self)
+        if k < 0:
+            k += Np
+        if (k < 0) or (k >= Np):
+            raise IndexError("Pathway index out of range")
+
+        nn = self.name_index[k]
+        relax_order = self.relax_orders[nn]
+        events = self.events[nn]
+        Ne = 1 + self.order + relax_order
+
+        lp = liouville_pathway(self.ptypes[nn], self.sinit[k],
+                               aggregate=self.aggregate, order=self.order,
+                               pname=self.names[nn],
+                               relax_order=relax_order,
+                               popt_band=self.popt_bands[nn])
+
+        lp.transitions[:, :] = self.transitions[k]
+        lp.sides[:] = self.sides[k]
+        lp.states[:, :] = self.states[k, :Ne, :]
+        lp.frequency[:] = self.frequency[k, :Ne]
+        lp.energy[:] = self.energy[k]
+        lp.dmoments[:, :] = self.dmoments[k]
+        if self.has_widths[nn]:
+            lp.widths = self.widths[k].copy()
+            lp.dephs = self.dephs[k].copy()
+
+        nrel = 0
+        for ne, ev in enumerate(events):
+            lp.event[ne] = ev
+            if ev == "R":
+                fin = (int(self.relaxations[k, 0, 0]),
+                       int(self.relaxations[k, 0, 1]))
+                sta = (int(self.relaxations[k, 1, 0]),
+                       int(self.relaxations[k, 1, 1]))
+                lp.relaxations[nrel] = (fin, sta)
+                nrel += 1
+        lp.current[:] = self.states[k, len(events)-1, :]
+        lp.nint = self.order + 1
+        lp.nrel = nrel
+        lp.ne = len(events)
+
+        if self.has_evolfac[nn]:
+            lp.set_evolution_factor(self.evolfac[k])
+
+        lp.F4n[:] = self.F4n[k]
+        lp.sign = self.sign[k]
+        if self.order == 1:
+            lp.or_av_1 = self.or_av_1[k]
+        lp.built = True
+
+        if self.averaged:
+            lp.pref = self.pref[k]
+
+        return lp
+
+
+    def get_pathways(self):
+        """Returns a list of all pathways as `liouville_pathway` objects
+
+        """
+        return [self.get_pathway(k) for k in range(len(self))]
@@ -83,16 +83,11 @@ def voigt2D(omega1, cent1, delta1, gamma1,
     """
     if corr == 0.0:
         
-        N1 = omega1.shape[0]
-        N2 = omega2.shape[0]
-        
         dat1 = cvoigt(omega1, cent1, delta1, gamma1)
         dat2 = cvoigt(omega2, cent2, delta2, gamma2)
         
-        data = numpy.zeros((N1, N2), dtype=COMPLEX)  
-
-        for k in range(N1):
-            data[:, k] = dat1[k]*dat2[:]
+        # data[:, k] = dat1[k]*dat2[:]
+        data = numpy.outer(dat2, dat1).astype(COMPLEX)
         
     else:
         
@@ -108,18 +103,12 @@ def lorentzian2D(omega1, cent1, gamma1, omega2, cent2, gamma2, corr=0.0):
     
     if corr == 0.0:
         
-        N1 = omega1.shape[0]
-        N2 = omega2.shape[0]
-        
         dat1 = lorentzian(omega1, cent1, gamma1) + \
                lorentzian_im(omega1, cent1, gamma1)
         dat2 = lorentzian(omega2, cent2, gamma2) + \
                lorentzian_im(omega2, cent2, gamma2)
         
-        data = numpy.zeros((N1, N2), dtype=COMPLEX)  
-
-        for k in range(N1):
-            data[k, :] = dat1[k]*dat2[:]
+        data = numpy.outer(dat1, dat2).astype(COMPLEX)
         
     else:
         
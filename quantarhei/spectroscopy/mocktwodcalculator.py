@@ -11,6 +11,10 @@ from .. import COMPLEX
 from .. import signal_REPH, signal_NONR
 from .lineshapes import gaussian2D
 from .lineshapes import lorentzian2D
+from .lineshapes import cvoigt
+from .lineshapes import lorentzian
+from .lineshapes import lorentzian_im
+from .diagramatics import LiouvillePathwayTable
 from ..core.managers import Manager
 from ..core.managers import energy_units
 
@@ -105,17 +109,10 @@ class MockTwoDResponseCalculator(TwoDResponseCalculator):
         onetwod._add_data(data, dtype=signal_REPH)
         onetwod._add_data(data, dtype=signal_NONR)
 
-        if self.pathways is not None:        
-            for pwy in self.pathways:
-                
-                data = self.calculate_pathway(pwy, shape=self.shape)
-    
-                if pwy.pathway_type == "R":
-                    onetwod._add_data(data, dtype=signal_REPH)
-                elif pwy.pathway_type == "NR":
-                    onetwod._add_data(data, dtype=signal_NONR)
-                else:
-                    raise Exception("Unknown pathway type")
+        if self.pathways is not None:
+            signals = self.calculate_signals(self.pathways, shape=self.shape)
+            for dtype in signals:
+                onetwod._add_data(signals[dtype], dtype=dtype)
 
         onetwod.set_t2(self.t2axis.data[tc])    
             
@@ -132,21 +129,11 @@ class MockTwoDResponseCalculator(TwoDResponseCalculator):
         onetwod.set_axis_3(self.oa3)
         onetwod.set_resolution("signals")
         
-        k = 0
-        for pwy in self.pathways:
-            
-            data = self.calculate_pathway(pwy, shape=self.shape)
-            
-            if pwy.pathway_type == "R":
-                onetwod._add_data(data, dtype=signal_REPH)
-            elif pwy.pathway_type == "NR":
-                onetwod._add_data(data, dtype=signal_NONR)
-            else:
-                raise Exception("Unknown pathway type")
-                
-            k += 1
+        signals = self.calculate_signals(self.pathways, shape=self.shape)
+        for dtype in signals:
+            onetwod._add_data(signals[dtype], dtype=dtype)
         
-        if k == 0:
+        if len(signals) == 0:
             pwy = None
             data = self.calculate_pathway(pwy, shape=self.shape)
             onetwod._add_data(data, dtype=signal_REPH)
@@ -157,14 +144,30 @@ class MockTwoDResponseCalculator(TwoDResponseCalculator):
 
 
     def calculate_all_system(self, sys, eUt, lab, 
-                             selection=None, show_progress=False, dtol=0.0001):
+                             selection=None, show_progress=False, dtol=0.0001,
+                             reuse_pathways=False, etol=1.0e-6):
         """Calculates all 2D spectra for a system and evolution superoperator
         
+        
+        Parameters
+        ----------
+        
+        reuse_pathways : bool
+            If True (and no `selection` is specified), the Liouville pathways
+            are generated only once and only their evolution factors are
+            evaluated at each waiting time. Pathways whose evolution factor 
+            is not larger than `etol` contribute no signal, as if they
+            were generated at that waiting time.
+        
         """
         self.tc = 0
         
         tcont = TwoDResponseContainer(t2axis=self.t2axis)
         
+        if reuse_pathways and (selection is None):
+            return self._calculate_all_reused(tcont, sys, eUt, lab,
+                                              show_progress, dtol, etol)
+        
         kk = 1
         Nk = self.t2axis.length
         for T2 in self.t2axis.data:
@@ -193,18 +196,79 @@ class MockTwoDResponseCalculator(TwoDResponseCalculator):
         return tcont
 
 
-    def calculate_one_system(self, t2, sys, eUt, lab, 
-                             selection=None, pways=None, dtol=0.0001):
-        """Returns 2D spectrum at t2 for a system and evolution superoperator
+    def _calculate_all_reused(self, tcont, sys, eUt, lab,
+                              show_progress, dtol, etol):
+        """All 2D spectra from one set of pathways
+        
+        The pathways are generated without the evolution superoperator
+        and their evolution factors are gathered for all waiting times
+        at once. The lineshapes are calculated only once, too.
         
         """
-        try:
-            Uin = eUt.at(t2)
-        except:
-            Uin = eUt
-            
         H = eUt.get_Hamiltonian()
+        self._set_thermal_state(sys)
+        
+        tab = sys.liouville_pathways_3T(ptype=self._ptypes(), eUt=None, 
+                                        ham=H, lab=lab, dtol=dtol,
+                                        columnar=True)
+        if len(tab) == 0:
+            print("No pathways found; no spectrum calculated")
+            return tcont
+        
+        evf = tab.get_evolution_factors(eUt, times=self.t2axis.data)
+        prefs = tab.pref[numpy.newaxis,:]*evf
+        
+        # pathways are excluded where the evolution factor is too small
+        tolerated = tab.get_evf_tolerance_mask()
+        prefs[(numpy.abs(evf) <= etol) & tolerated[numpy.newaxis,:]] = 0.0
+        
+        factors = self._signal_factors(tab, self.shape)[0]
+        
+        Nk = self.t2axis.length
+        for kk, T2 in enumerate(self.t2axis.data):
+            
+            if show_progress:
+                print(" - calculating", kk+1, "of", Nk, "at t2 =", T2, "fs")
+                
+            onetwod = TwoDResponse()
+            onetwod.set_axis_1(self.oa1)
+            onetwod.set_axis_3(self.oa3)
+            onetwod.set_resolution("signals")
+            
+            data = self.calculate_pathway(None, shape=self.shape)
+            onetwod._add_data(data, dtype=signal_REPH)
+            onetwod._add_data(data, dtype=signal_NONR)
+            
+            signals = self._accumulate_signals(factors, prefs[kk,:],
+                                               self.shape)
+            for dtype in signals:
+                onetwod._add_data(signals[dtype], dtype=dtype)
+            onetwod.set_t2(T2)
+            
+            tcont.set_spectrum(onetwod, tag=T2)
+            
+        return tcont
     
+    
+    def _ptypes(self):
+        """Types of Liouville pathways included in the calculation
+        
+        """
+        # if the Hamiltonian is larger than eUt, we will calculate ESA
+        has_ESA = True
+#        if H1.dim == eUt.dim:
+#            has_ESA = False
+        if has_ESA:
+            return ("R1g", "R2g", "R3g", "R4g", "R1f*", "R2f*", 
+                    "R1gE", "R2gE")
+        else:
+            return ("R1g", "R2g", "R3g", "R4g", "R1gE", "R2gE")
+        
+        
+    def _set_thermal_state(self, sys):
+        """Sets thermal density matrix of the system as its initial state
+        
+        """
         # FIXME: this needs to be set differently, and it mu
         # density matrix stored into sys.rho0
         #temp = sys.get_temperature()
@@ -214,25 +278,30 @@ class MockTwoDResponseCalculator(TwoDResponseCalculator):
         else:
             rho0 = sys.get_DensityMatrix(condition_type="thermal",
                                      temperature=self.temp)
+        return rho0
         
-        # if the Hamiltonian is larger than eUt, we will calculate ESA
-        has_ESA = True
-        H1 = sys.get_Hamiltonian()
-#        if H1.dim == eUt.dim:
-#            has_ESA = False
         
-        # get Liouville pathways
-        if has_ESA:
-            pws = sys.liouville_pathways_3T(ptype=("R1g", "R2g", "R3g",
-                                                   "R4g", "R1f*", "R2f*",
-                                                   "R1gE", "R2gE"),
-                                                   eUt=Uin, ham=H, t2=t2,
-                                                   lab=lab, dtol=dtol)
-        else:
-            pws = sys.liouville_pathways_3T(ptype=("R1g", "R2g", "R3g",
-                                                   "R4g", "R1gE", "R2gE"),
-                                                   eUt=Uin, ham=H, t2=t2,
-                                                   lab=lab, dtol=dtol)
+    def calculate_one_system(self, t2, sys, eUt, lab, 
+                             selection=None, pways=None, dtol=0.0001):
+        """Returns 2D spectrum at t2 for a system and evolution superoperator
+        
+        """
+        try:
+            Uin = eUt.at(t2)
+        except:
+            Uin = eUt
+            
+        H = eUt.get_Hamiltonian()
+    
+        rho0 = self._set_thermal_state(sys)
+        
+        # get Liouville pathways; without selection rules they are only
+        # needed in the form of a table
+        columnar = selection is None
+        pws = sys.liouville_pathways_3T(ptype=self._ptypes(),
+                                        eUt=Uin, ham=H, t2=t2,
+                                        lab=lab, dtol=dtol,
+                                        columnar=columnar)
             
         if selection is not None:
             
@@ -288,6 +357,179 @@ class MockTwoDResponseCalculator(TwoDResponseCalculator):
         return twod1
         
 
+    def calculate_signals(self, pathways, shape="Gaussian"):
+        """Calculates the rephasing and non-rephasing signals of pathways
+        
+        Uncorrelated 2D lineshapes are outer products of 1D lineshapes.
+        The 1D factors of all pathways of a given signal type are stacked
+        into matrices and the signal is obtained by a single matrix
+        multiplication. Pathways with the same centres and widths are merged
+        beforehand.
+        
+        Parameters
+        ----------
+        
+        pathways : list or LiouvillePathwayTable
+            Liouville pathways, either as a list of LiouvillePathway objects
+            or as their columnar table
+            
+        shape : str {"Gaussian", "Lorentzian"}
+            Line shape of the pathways
+            
+            
+        Returns
+        -------
+        
+        signals : dict
+            Dictionary with the rephasing and non-rephasing signals (only
+            those for which there are pathways)
+        
+        """
+        factors, pref = self._signal_factors(pathways, shape)
+        
+        return self._accumulate_signals(factors, pref, shape)
+    
+    
+    def _signal_factors(self, pathways, shape):
+        """1D lineshape factors of the merged pathways of each signal type
+        
+        Returns a list of (signal type, selection of pathways, index of
+        the merged pathway for each selected pathway, first factors, 
+        second factors) tuples and the prefactors of all pathways.
+        
+        """
+        if shape not in ("Gaussian", "Lorentzian"):
+            raise Exception("Unknown line shape: "+shape)
+            
+        (rephasing, cen1, cen3, widthx, widthy, dephx, dephy,
+         pref) = self._pathway_parameters(pathways)
+        
+        if shape == "Gaussian":
+            wx = widthx
+            wy = widthy
+        else:
+            wx = dephx
+            wy = dephy
+        
+        factors = []
+        for dtype, sel in [(signal_REPH, rephasing),
+                           (signal_NONR, numpy.logical_not(rephasing))]:
+            if not numpy.any(sel):
+                continue
+            
+            # pathways with the same centres and widths are merged
+            keys = numpy.stack((cen1[sel], wx[sel], cen3[sel], wy[sel]),
+                               axis=1)
+            ukeys, inv = numpy.unique(keys, axis=0, return_inverse=True)
+            inv = numpy.reshape(inv, -1)
+            
+            if dtype == signal_REPH:
+                oo1 = -self.oa1.data
+            else:
+                oo1 = self.oa1.data
+            oo3 = self.oa3.data
+            
+            # 1D factors (Nu, N1) and (Nu, N3)
+            AA = self._lineshape_factors(oo1, ukeys[:,0], ukeys[:,1], shape)
+            BB = self._lineshape_factors(oo3, ukeys[:,2], ukeys[:,3], shape)
+            
+            factors.append((dtype, sel, inv, AA, BB))
+            
+        return factors, pref
+    
+    
+    def _accumulate_signals(self, factors, pref, shape):
+        """Sums the lineshapes of the pathways with given prefactors
+        
+        """
+        signals = dict()
+        for (dtype, sel, inv, AA, BB) in factors:
+            
+            Nu = AA.shape[0]
+            upref = (numpy.bincount(inv, weights=numpy.real(pref[sel]),
+                                    minlength=Nu)
+                     + 1j*numpy.bincount(inv, weights=numpy.imag(pref[sel]),
+                                         minlength=Nu))
+            
+            AA = AA*upref[:,numpy.newaxis]
+            if shape == "Gaussian":
+                signals[dtype] = numpy.dot(BB.T, AA)
+            else:
+                signals[dtype] = numpy.dot(AA.T, BB)
+                
+        return signals
+    
+    
+    def _lineshape_factors(self, omega, cent, width, shape):
+        """Matrix of 1D lineshapes with centres and widths given by arrays
+        
+        Equal lineshapes are calculated only once.
+        
+        """
+        pars, inv = numpy.unique(numpy.stack((cent, width), axis=1), axis=0,
+                                 return_inverse=True)
+        inv = numpy.reshape(inv, -1)
+        
+        cc = pars[:,0][:,numpy.newaxis]
+        ww = pars[:,1][:,numpy.newaxis]
+        if shape == "Gaussian":
+            data = cvoigt(omega[numpy.newaxis,:], cc, ww, 0.0)
+        else:
+            data = (lorentzian(omega[numpy.newaxis,:], cc, ww)
+                    + lorentzian_im(omega[numpy.newaxis,:], cc, ww))
+            
+        return numpy.asarray(data, dtype=COMPLEX)[inv,:]
+        
+        
+    def _pathway_parameters(self, pathways):
+        """Centres, widths and prefactors of all pathways as arrays
+        
+        """
+        if isinstance(pathways, LiouvillePathwayTable):
+            ptype = numpy.array(pathways.ptypes)[pathways.name_index]
+            rorder = numpy.array(pathways.relax_orders,
+                                 dtype=int)[pathways.name_index]
+            noe = 1 + pathways.order + rorder
+            Np = len(pathways)
+            cen1 = pathways.frequency[:,0]
+            cen3 = pathways.frequency[numpy.arange(Np), noe-2]
+            widths = pathways.widths
+            dephs = pathways.dephs
+            pref = pathways.pref
+        else:
+            Np = len(pathways)
+            ptype = numpy.array([pwy.pathway_type for pwy in pathways])
+            cen1 = numpy.zeros(Np, dtype=numpy.float64)
+            cen3 = numpy.zeros(Np, dtype=numpy.float64)
+            widths = -numpy.ones((Np, 4), dtype=numpy.float64)
+            dephs = -numpy.ones((Np, 4), dtype=numpy.float64)
+            pref = numpy.zeros(Np, dtype=COMPLEX)
+            for k, pwy in enumerate(pathways):
+                noe = 1+pwy.order+pwy.relax_order
+                cen1[k] = pwy.frequency[0]
+                cen3[k] = pwy.frequency[noe-2]
+                if pwy.widths is not None:
+                    widths[k,:] = pwy.widths
+                    dephs[k,:] = pwy.dephs
+                pref[k] = pwy.pref
+        
+        rephasing = (ptype == "R")
+        if not numpy.all(numpy.logical_or(rephasing, ptype == "NR")):
+            raise Exception("Unknown pathway type")
+            
+        # negative widths are replaced by the defaults of the calculator
+        widthx = numpy.where(widths[:,1] < 0.0, self.widthx, widths[:,1])
+        widthy = numpy.where(widths[:,3] < 0.0, self.widthy, widths[:,3])
+        dephx = numpy.where(dephs[:,1] < 0.0, self.dephx, dephs[:,1])
+        dephy = numpy.where(dephs[:,3] < 0.0, self.dephy, dephs[:,3])
+        
+        if numpy.any(widthx < 1e-5) or numpy.any(widthy < 1e-5):
+            print("widthx, widthy:", numpy.min(widthx), numpy.min(widthy))
+        
+        return (rephasing, cen1, cen3, widthx, widthy, dephx, dephy,
+                numpy.asarray(pref, dtype=COMPLEX))
+        
+
     def calculate_pathway(self, pathway, shape="Gaussian"):
         """Calculate the shape of a Liouville pathway
         
@@ -444,4 +444,120 @@ class AggregateTest(unittest.TestCase):
         
         
         
-        
\ No newline at end of file
+        
+
+    def test_build_matrices(self):
+        """(Aggregate) Testing matrices created by build() against state-by-state evaluation
+        
+        """
+        mols = []
+        with energy_units("1/cm"):
+            for ii in range(3):
+                mol = Molecule(elenergies=[0.0, 12000.0+100.0*ii])
+                mol.set_dipole(0, 1, [1.0, 0.2*ii, 0.1])
+                mol.position = [float(ii), 0.5*ii, 0.0]
+                mod = Mode(300.0)
+                mol.add_Mode(mod)
+                mod.set_nmax(0, 2)
+                mod.set_nmax(1, 2)
+                mod.set_HR(1, 0.1+0.05*ii)
+                mols.append(mol)
+                
+        agg = Aggregate(molecules=mols)
+        with energy_units("1/cm"):
+            agg.set_resonance_coupling(0, 1, 50.0)
+            agg.set_resonance_coupling(1, 2, 30.0)
+        agg.build(mult=2)
+        
+        Ntot = agg.Ntot
+        HH = numpy.zeros((Ntot, Ntot))
+        DD = numpy.zeros((Ntot, Ntot, 3))
+        FC = numpy.zeros((Ntot, Ntot))
+        for a, s1 in agg.allstates(mult=2):
+            HH[a,a] = s1._energy()
+            for b, s2 in agg.allstates(mult=2):
+                DD[a,b,:] = numpy.real(agg.transition_dipole(s1, s2))
+                FC[a,b] = agg.fc_factor(s1, s2)
+                if a != b:
+                    HH[a,b] = agg.coupling_vec(s1, s2)
+
+        numpy.testing.assert_allclose(agg.HH, HH, atol=1.0e-12)
+        numpy.testing.assert_allclose(agg.DD, DD, atol=1.0e-12)
+        numpy.testing.assert_allclose(agg.FCf, FC, atol=1.0e-12)
+        numpy.testing.assert_allclose(agg.D2, 
+                                      numpy.sum(DD**2, axis=2), atol=1.0e-12)
+
+
+    def test_liouville_pathways_table(self):
+        """(Aggregate) Testing columnar generation of Liouville pathways
+        
+        """
+        mols = []
+        with energy_units("1/cm"):
+            for ii in range(3):
+                mol = Molecule(elenergies=[0.0, 12000.0+100.0*ii])
+                mol.set_dipole(0, 1, [1.0, 0.3*ii, 0.1*ii*ii])
+                mols.append(mol)
+                
+        agg = Aggregate(molecules=mols)
+        with energy_units("1/cm"):
+            agg.set_resonance_coupling(0, 1, 50.0)
+            agg.set_resonance_coupling(1, 2, 30.0)
+        agg.build(mult=2)
+        agg.diagonalize()
+        agg.get_DensityMatrix(condition_type="thermal", temperature=0.0)
+        
+        H = agg.get_Hamiltonian()
+        eUt = qr.qm.SOpUnity(dim=H.dim)
+        lab = qr.LabSetup()
+        lab.set_polarizations(pulse_polarizations=(qr.utils.vectors.X,
+                                                   qr.utils.vectors.Y,
+                                                   qr.utils.vectors.X),
+                              detection_polarization=qr.utils.vectors.Y)
+        
+        ptypes = ("R1g", "R2g", "R3g", "R4g", "R1f*", "R2f*")
+        tab = agg.liouville_pathways_3T(ptype=ptypes, eUt=eUt, ham=H,
+                                        lab=lab, columnar=True)
+        lst = agg.liouville_pathways_3T(ptype=ptypes, eUt=eUt, ham=H,
+                                        lab=lab)
+        self.assertEqual(len(tab), len(lst))
+        
+        # R3g pathways enumerated by explicit loops
+        dip_tol = numpy.sqrt(agg.D2_max)*0.001
+        ngs = agg.get_electronic_groundstate()
+        nes = agg.get_excitonic_band(band=1)
+        r3g = []
+        for i1g in ngs:
+            for i2e in nes:
+                for i3g in ngs:
+                    for i4e in nes:
+                        if ((agg.D2[i2e,i1g] > dip_tol) and 
+                            (agg.D2[i3g,i2e] > dip_tol) and
+                            (agg.D2[i4e,i1g] > dip_tol) and
+                            (agg.D2[i3g,i4e] > dip_tol)):
+                            r3g.append((i1g, i2e, i3g, i4e))
+                            
+        self.assertTrue(len(r3g) > 0)
+        sel = numpy.nonzero(tab.name_index == tab.names.index("R3g"))[0]
+        trs = tab.transitions[sel]
+        self.assertEqual([(a[0,1], a[0,0], a[1,0], a[2,0]) for a in trs],
+                         r3g)
+        
+        # pathway objects created on demand agree with pathways
+        # built transition by transition
+        for kk in sel:
+            lp = tab[kk]
+            ref = qr.spectroscopy.diagramatics.liouville_pathway("R", 
+                                    lp.sinit[0], aggregate=agg, order=3,
+                                    pname="R3g")
+            for ii in range(4):
+                tr = lp.transitions[ii]
+                ref.add_transition((tr[0], tr[1]), lp.sides[ii])
+            ref.build()
+            ref.orientational_averaging(lab)
+            
+            numpy.testing.assert_allclose(lp.frequency, ref.frequency)
+            numpy.testing.assert_allclose(lp.dmoments, ref.dmoments)
+            numpy.testing.assert_array_equal(lp.states, ref.states)
+            numpy.testing.assert_allclose(lp.pref, ref.pref)
+            self.assertEqual(lp.pref, lst[kk].pref)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy
+
+"""
+*******************************************************************************
+
+
+    Tests of the quantarhei.Disorder class
+
+
+*******************************************************************************
+"""
+
+from quantarhei import Disorder
+
+
+class TestDisorder(unittest.TestCase):
+    """Tests for the Disorder class
+
+
+    """
+
+    def setUp(self,verbose=False):
+
+        self.H0 = numpy.array([[0.0, 0.0, 0.0, 0.0],
+                               [0.0, 1.0, 0.1, 0.0],
+                               [0.0, 0.1, 1.1, 0.05],
+                               [0.0, 0.0, 0.05, 1.2]])
+
+
+    def test_realizations(self):
+        """(Disorder) Testing reproducibility of the disorder realizations
+
+        """
+        dis = Disorder(data=self.H0, seed=3)
+        dis.set_distribution("Gaussian", dict(width=0.05))
+
+        HH = dis.get_Hamiltonians(range(10))
+        self.assertEqual(HH.shape, (10, 4, 4))
+
+        # only the excited state energies are changed
+        numpy.testing.assert_array_equal(HH[:,0,:], 0.0)
+        for ii in range(10):
+            numpy.testing.assert_array_equal(HH[ii] - numpy.diag(
+                                             numpy.diag(HH[ii])),
+                                             self.H0 - numpy.diag(
+                                             numpy.diag(self.H0)))
+
+        # a realization does not depend on the other calculated ones
+        H1 = dis.get_Hamiltonians([7, 2])
+        numpy.testing.assert_array_equal(H1, HH[[7, 2]])
+
+        # the same seed gives the same realizations
+        dis2 = Disorder(data=self.H0, seed=3)
+        dis2.set_distribution("Gaussian", dict(width=0.05))
+        numpy.testing.assert_array_equal(dis2.get_Hamiltonians([9, 0, 4]),
+                                         HH[[9, 0, 4]])
+
+        H1 = dis.get_Hamiltonians(range(3), ignore_first=True)
+        numpy.testing.assert_array_equal(H1[0], self.H0)
+        numpy.testing.assert_array_equal(H1[1:], HH[1:3])
+
+        # batched diagonalization
+        ee, SS = dis.diagonalize_Hamiltonians(range(10))
+        for ii in range(10):
+            numpy.testing.assert_allclose(
+                numpy.dot(SS[ii].T, numpy.dot(HH[ii], SS[ii])),
+                numpy.diag(ee[ii]), atol=1.0e-12)
+
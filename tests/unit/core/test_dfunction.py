@@ -78,3 +78,44 @@ class TestDFunction(unittest.TestCase):
         self.assertEqual(val_mez_spline, new_mez_spline)
         self.assertEqual(fce._splines_initialized, fce2._splines_initialized)
         numpy.testing.assert_array_equal(fce.data, fce2.data)
+
+
+    def test_dfunction_interpolation(self):
+        """Testing interpolation of DFunction at arrays of arguments
+        
+        """
+        wa = FrequencyAxis(0.0, 100, 1.0)
+        fw = numpy.exp(-wa.data/30.0) + 1j*numpy.sin(wa.data/10.0)
+        fce = DFunction(wa, fw)
+        
+        xx = numpy.linspace(0.0, 99.5, 301)
+        for approx in ["linear", "cubic", "spline"]:
+            vals = fce.at(xx, approx=approx)
+            self.assertEqual(vals.shape, xx.shape)
+            for k in [0, 17, 150, 300]:
+                numpy.testing.assert_allclose(vals[k], 
+                                        fce.at(xx[k], approx=approx))
+            # exact at the points of the axis
+            numpy.testing.assert_allclose(fce.at(wa.data[:-1], approx=approx),
+                                          fw[:-1], rtol=1.0e-12)
+        
+        xx = xx[xx <= 99.0]
+        exact = numpy.exp(-xx/30.0) + 1j*numpy.sin(xx/10.0)
+        dexact = -numpy.exp(-xx/30.0)/30.0 + 1j*numpy.cos(xx/10.0)/10.0
+        numpy.testing.assert_allclose(fce.at(xx, approx="cubic"), exact,
+                                      atol=1.0e-3)
+        numpy.testing.assert_allclose(fce.at(xx, approx="cubic", deriv=1),
+                                      dexact, atol=3.0e-3)
+        numpy.testing.assert_allclose(fce.at(xx, approx="spline", deriv=1),
+                                      dexact, atol=1.0e-4)
+        
+        # splines follow new data
+        data = fce.data.copy()
+        data[20] += 1.0
+        fce.data = data
+        self.assertAlmostEqual(fce.at(20.0, approx="spline"), data[20])
+        fce.data += 1.0
+        self.assertAlmostEqual(fce.at(20.0, approx="spline"), fce.data[20])
+        
+        with self.assertRaises(Exception):
+            fce.at(numpy.array([10.0, 120.0]), approx="linear")
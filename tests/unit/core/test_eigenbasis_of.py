@@ -284,6 +284,57 @@ class TestEigenbasisOf(unittest.TestCase):
             
         
 
+    def test_of_weak_registry(self):
+        """Testing that objects are not kept alive by basis management
+        
+        
+        """
+        import gc
+        import weakref
+        
+        manager = self.H.manager
+        x,Sh = numpy.linalg.eigh(self.H.data)
+        Sh1 = numpy.linalg.inv(Sh)
+        
+        with eigenbasis_of(self.H):
+            with eigenbasis_of(self.B):
+                
+                refs = []
+                for k in range(100):
+                    A = BasisManagedObject(numpy.eye(2)*k, "A")
+                    refs.append(weakref.ref(A))
+                del A
+                gc.collect()
+                self.assertTrue(all(ref() is None for ref in refs))
+                
+                # objects transformed from the outside basis
+                trans = manager.get_basis_info()["transformations"]
+                self.P.data
+                self.D.data
+                info = manager.get_basis_info()
+                self.assertEqual(info["transformations"], trans+2)
+                self.assertEqual(info["chains"], 1)
+                self.assertEqual(info["depth"], 2)
+                
+            # D moved to the registry of the enclosing context
+            self.assertTrue(manager.is_registered_with_basis(
+                            manager.get_current_basis(), self.D))
+            D = self.D
+            self.D = None
+            ref = weakref.ref(D)
+            del D
+            gc.collect()
+            self.assertIsNone(ref())
+            
+            self.assertTrue(numpy.allclose(self.P.data, 
+                                numpy.dot(Sh1,numpy.dot(self.p_copy,Sh))))
+            
+        self.assertTrue(numpy.allclose(self.P.data,self.p_copy))
+        self.assertEqual(manager.get_basis_info()["registered"], 0)
+        self.assertEqual(manager.get_basis_info()["depth"], 0)
+            
+        
+
 
 def generate(only=-1):
     N = 16
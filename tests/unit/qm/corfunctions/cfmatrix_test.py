@@ -68,3 +68,116 @@ class TestCFMatrix(unittest.TestCase):
 
                 
 
+
+
+    def test_of_spectral_cache(self):
+        """(CorrelationFunctionMatrix) Test of the cache of integrals
+        """
+        from quantarhei.qm.corfunctions.correlationfunctions import c2g
+        from quantarhei.qm.corfunctions.correlationfunctions import \
+            half_fourier_transform
+        
+        cors.CorrelationFunctionMatrix.clear_spectral_cache()
+        
+        # integrals of analytical functions do not use the cache
+        pars = dict(ftype="Value-defined", reorg=30, T=self.temperature)
+        cfv = qr.CorrelationFunction(self.time, pars, values=self.cf1.data)
+        
+        cfm1 = cors.CorrelationFunctionMatrix(self.time, nob=2)
+        cfm1.set_correlation_function(cfv, [(0,0),(1,1)])
+        cfm2 = cors.CorrelationFunctionMatrix(self.time, nob=2)
+        cfm2.set_correlation_function(cfv, [(0,0),(1,1)])
+        
+        gt = c2g(self.time, self.cf1.data)
+        numpy.testing.assert_allclose(cfm1.get_goft(0,0), gt)
+        
+        # the second matrix reuses the integrals of the first one
+        info = cors.CorrelationFunctionMatrix.get_spectral_cache_info()
+        misses = info["misses"]
+        numpy.testing.assert_allclose(cfm2.get_goft(1,1), gt)
+        info = cors.CorrelationFunctionMatrix.get_spectral_cache_info()
+        self.assertEqual(info["misses"], misses)
+        self.assertTrue(info["hits"] > 0)
+        
+        om = numpy.linspace(-0.1, 0.1, 11)
+        ft1 = cfm1.get_half_fourier_transform(0, 0, om)
+        ft2 = half_fourier_transform(self.time, self.cf1.data, om)
+        numpy.testing.assert_allclose(ft1, ft2)
+
+        # size of the cache is bounded
+        size = cors.CorrelationFunctionMatrix.spectral_cache_size
+        try:
+            cors.CorrelationFunctionMatrix.spectral_cache_size = 2
+            cfm1.create_one_integral()
+            cfm1.create_double_integral()
+            info = cors.CorrelationFunctionMatrix.get_spectral_cache_info()
+            self.assertEqual(info["size"], 2)
+        finally:
+            cors.CorrelationFunctionMatrix.spectral_cache_size = size
+            cors.CorrelationFunctionMatrix.clear_spectral_cache()
+
+
+    def test_of_analytical_integrals(self):
+        """(CorrelationFunctionMatrix) Test of integrals of analytical functions
+        """
+        from quantarhei.qm.corfunctions.correlationfunctions import c2g
+
+        pars = dict(ftype="Value-defined", reorg=30, T=self.temperature)
+        cfv = qr.CorrelationFunction(self.time, pars, values=self.cf2.data)
+
+        cfm = cors.CorrelationFunctionMatrix(self.time, nob=3)
+        cfm.set_correlation_function(self.cf1, [(0,0)])
+        cfm.set_correlation_function(self.cf2, [(1,1)])
+        cfm.set_correlation_function(cfv, [(2,2)])
+
+        numpy.testing.assert_allclose(cfm.get_goft(0,0), self.cf1.get_goft())
+        numpy.testing.assert_allclose(cfm.get_hoft(1,1), self.cf2.get_hoft())
+        numpy.testing.assert_allclose(cfm.get_goft(2,2),
+                                      c2g(self.time, self.cf2.data))
+        numpy.testing.assert_allclose(cfm.get_goft(0,1), 0.0)
+
+
+    def test_of_transformation(self):
+        """(CorrelationFunctionMatrix) Test of basis transformation
+        """
+        nob = 3
+        cfm = cors.CorrelationFunctionMatrix(self.time, nob=nob)
+        cfm.set_correlation_function(self.cf1, [(0,0),(2,2)])
+        cfm.set_correlation_function(self.cf2, [(1,1),(0,1),(1,0)])
+        
+        HH = numpy.array([[1.0, 0.2, 0.0],
+                          [0.2, 1.5, 0.1],
+                          [0.0, 0.1, 0.7]])
+        ee, SS = numpy.linalg.eigh(HH)
+        cfm.transform(SS)
+        
+        A4 = numpy.zeros((nob,nob,nob,nob,cfm.nof))
+        for a in range(nob):
+            for b in range(nob):
+                for c in range(nob):
+                    for d in range(nob):
+                        for k in range(cfm.nof):
+                            for n in range(nob):
+                                for m in range(nob):
+                                    A4[a,b,c,d,k] += SS[n,a]*SS[n,b]*\
+                                    cfm._A2[n,m,k+1]*SS[m,c]*SS[m,d]
+        numpy.testing.assert_allclose(cfm._A4, A4, atol=1.0e-12)
+        
+        gm = cfm.get_goft_matrix()
+        numpy.testing.assert_allclose(gm[0,1,1,2,:],
+                            cfm.get_goft4(0,1,1,2)[0:gm.shape[4]])
+        
+        # subsets of the elements
+        gaabb = cfm.get_goft_matrix(subset="aabb")
+        for a in range(nob):
+            for b in range(nob):
+                numpy.testing.assert_allclose(gaabb[a,b,:], gm[a,a,b,b,:])
+        habbb = cfm.get_hoft_matrix(subset="abbb")
+        numpy.testing.assert_allclose(habbb[1,2,:], 
+                                      cfm.get_hoft_matrix()[1,2,2,2,:])
+        caaaa = cfm.get_coft_matrix(t=10.0, subset="aaaa")
+        numpy.testing.assert_allclose(caaaa,
+                    [cfm.get_coft_matrix(t=10.0)[a,a,a,a] for a in range(nob)])
+        laabb = cfm.get_reorganization_energy_matrix(subset="aabb")
+        numpy.testing.assert_allclose(laabb[0,2], 
+                                      cfm.get_reorganization_energy4(0,0,2,2))
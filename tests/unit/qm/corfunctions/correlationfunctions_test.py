@@ -293,6 +293,68 @@ class TestCorrelationFunction(unittest.TestCase):
             
         self.assertTrue(f3.reorganization_energy_consistent())
         
+    def test_of_analytical_lineshape_functions(self):
+        """(CorrelationFunction) Testing closed form lineshape functions """
+        from quantarhei.qm.corfunctions.correlationfunctions import c2g
+        from quantarhei.qm.corfunctions.correlationfunctions import c2h
+        from quantarhei.qm.corfunctions.correlationfunctions import \
+            overdamped_brownian_exponents
+        from quantarhei.qm.corfunctions.correlationfunctions import exp2goft
+        
+        t = TimeAxis(0.0, 2000, 1.0)
+        params1 = dict(ftype="OverdampedBrownian",
+                       reorg = 30.0,
+                       cortime = 100.0,
+                       T = 300.0)
+        params2 = dict(ftype="OverdampedBrownian-HighTemperature",
+                       reorg = 30.0,
+                       cortime = 100.0,
+                       T = 300.0)
+        params3 = dict(ftype="UnderdampedBrownian",
+                       reorg = 20.0,
+                       freq = 150.0,
+                       gamma = 20.0,
+                       T = 300.0)
+        
+        with energy_units("1/cm"):
+            for params in [params1, params2, params3]:
+                f = CorrelationFunction(t, params)
+                self.assertTrue(f.is_analytical())
+                
+                # closed forms agree with numerical integration (within
+                # the accuracy of the latter for the fast Matsubara terms)
+                cc, nu = f.get_exponents()
+                numpy.testing.assert_allclose(
+                    numpy.sum(cc[:,None]*numpy.exp(-nu[:,None]*t.data),
+                              axis=0), f.data, rtol=1.0e-10, atol=1.0e-14)
+                gt = f.get_goft()
+                numpy.testing.assert_allclose(gt, c2g(t, f.data), rtol=0.0,
+                                              atol=1.0e-4*numpy.max(abs(gt)))
+                ht = f.get_hoft()
+                numpy.testing.assert_allclose(ht, c2h(t, f.data), rtol=0.0,
+                                              atol=1.0e-4*numpy.max(abs(ht)))
+            
+            # value-defined functions are integrated numerically
+            f = CorrelationFunction(t, params1)
+            prms = dict(ftype="Value-defined", reorg=30.0, T=300.0)
+            fv = CorrelationFunction(t, prms, values=f.data)
+            self.assertFalse(fv.is_analytical())
+            numpy.testing.assert_allclose(fv.get_goft(), c2g(t, f.data))
+            
+        # evaluation for many parameter sets at once
+        m = Manager()
+        with energy_units("1/cm"):
+            reorgs = m.convert_energy_2_internal_u(numpy.array([10.0, 30.0]))
+            cc, nu = overdamped_brownian_exponents(reorgs, [50.0, 100.0],
+                                                   300.0)
+            g2 = exp2goft(t.data, cc, nu)
+            params1["cortime"] = 50.0
+            params1["reorg"] = 10.0
+            f1 = CorrelationFunction(t, params1)
+        numpy.testing.assert_allclose(g2[0,:], f1.get_goft())
+        numpy.testing.assert_allclose(g2[1,:], f.get_goft())
+        
+        
     def test_of_correlation_function_as_Saveable(self):
         """(CorrelationFunction) Testing of saving """
         
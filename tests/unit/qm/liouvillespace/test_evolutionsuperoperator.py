@@ -101,6 +101,199 @@ class TestEvSupOp(unittest.TestCase):
                                           atol=1.0e-6)
                 
                 
+    def test_secular_representation(self):
+        """Compares secular representation with the full superoperator
+        
+        
+        
+        """
+        import quantarhei as qr
+        import quantarhei.models.modelgenerator as mgen
+        
+        time = qr.TimeAxis(0.0, 1000, 1.0)
+        
+        mg = mgen.ModelGenerator()
+        agg = mg.get_Aggregate_with_environment(name="trimer-1_env", 
+                                                timeaxis=time)
+        agg.build()
+        
+        sbi = agg.get_SystemBathInteraction()
+        ham = agg.get_Hamiltonian()
+
+        ham.protect_basis()
+        with qr.eigenbasis_of(ham):
+            RRT = qr.qm.RedfieldRelaxationTensor(ham, sbi)
+            RRT.secularize()
+            RRO = qr.qm.RedfieldRelaxationTensor(ham, sbi, as_operators=True)
+        ham.unprotect_basis()
+        
+        time2 = qr.TimeAxis(0.0, 50, 20.0)
+        eSO = qr.qm.EvolutionSuperOperator(time2, ham, RRT)
+        eSO.set_dense_dt(20)
+        eSO.calculate()
+        
+        # secular representation from the tensor and from the operators
+        eST = qr.qm.EvolutionSuperOperator(time2, ham, RRT, secular=True)
+        eST.calculate()
+        eSP = qr.qm.EvolutionSuperOperator(time2, ham, RRO, secular=True)
+        eSP.calculate()
+        
+        numpy.testing.assert_allclose(eSP.secular_pops, eST.secular_pops,
+                                      rtol=1.0e-7, atol=1.0e-10)
+        numpy.testing.assert_allclose(eSP.secular_rates, eST.secular_rates,
+                                      rtol=1.0e-7, atol=1.0e-10)
+
+        rho = qr.ReducedDensityMatrix(dim=ham.dim)
+        rho.data[3,3] = 0.5
+        rho.data[2,2] = 0.5
+        rho.data[2,3] = 0.5
+        rho.data[3,2] = 0.5
+        
+        for tt in [0.0, 100.0, 500.0]:
+            rho1 = eSO.apply(tt, rho)
+            rho2 = eST.apply(tt, rho)
+            numpy.testing.assert_allclose(rho1.data, rho2.data, 
+                                          rtol=1.0e-5, atol=1.0e-7)
+            
+            numpy.testing.assert_allclose(eSO.at(tt).data, eST.at(tt).data,
+                                          rtol=1.0e-5, atol=1.0e-7)
+            
+        with qr.eigenbasis_of(ham):
+            rhot1 = eSO.apply(time2, rho)
+            rhot2 = eST.apply(time2, rho)
+            numpy.testing.assert_allclose(rhot1.data, rhot2.data, 
+                                          rtol=1.0e-5, atol=1.0e-7)
+
+
+    def test_secular_degenerate(self):
+        """Secular representation with a degenerate Hamiltonian
+        
+        
+        
+        """
+        import quantarhei as qr
+        
+        # two degenerate levels in a non-diagonal representation
+        RR, rr = numpy.linalg.qr(numpy.array([[1.0, 0.3, 0.2],
+                                              [0.1, 1.0, 0.4],
+                                              [0.5, 0.2, 1.0]]))
+        ham = qr.Hamiltonian(data=numpy.dot(RR, numpy.dot(
+                             numpy.diag([0.0, 0.1, 0.1]), RR.T)))
+        
+        ops = []
+        for (a, b) in [(0,1), (1,2), (2,0)]:
+            ops.append(qr.qm.ProjectionOperator(a, b, dim=3))
+        sbi = qr.qm.SystemBathInteraction(sys_operators=ops,
+                                          rates=[1.0/50.0, 1.0/80.0, 
+                                                 1.0/120.0])
+        LL = qr.qm.LindbladForm(ham, sbi)
+        
+        time = qr.TimeAxis(0.0, 20, 10.0)
+        eST = qr.qm.EvolutionSuperOperator(time, ham, LL, secular=True)
+        eST.calculate()
+        
+        rho = qr.ReducedDensityMatrix(data=[[0.2, 0.1, 0.0],
+                                            [0.1, 0.5, 0.1],
+                                            [0.0, 0.1, 0.3]])
+        rho1 = eST.apply(100.0, rho)
+        U1 = eST.at(100.0).data
+        
+        # the result does not depend on the basis in which it is applied,
+        # although the eigenvectors of the degenerate levels are different
+        # when the Hamiltonian is diagonalized in a different basis
+        XX = qr.qm.SelfAdjointOperator(data=[[0.0, 0.2, 0.1],
+                                             [0.2, 0.3, 0.05],
+                                             [0.1, 0.05, 0.7]])
+        with qr.eigenbasis_of(XX):
+            rho2 = eST.apply(100.0, rho)
+            numpy.testing.assert_allclose(rho2.data, rho1.data,
+                                          rtol=1.0e-10, atol=1.0e-12)
+            U2 = eST.at(100.0)
+            
+        # the tensor is always returned in the current basis
+        numpy.testing.assert_allclose(U2.data, U1, 
+                                      rtol=1.0e-10, atol=1.0e-12)
+        
+
+    def test_file_storage(self):
+        """Compares superoperator stored in a file with the one in memory
+
+
+
+        """
+        import os
+        import tempfile
+        import quantarhei as qr
+        import quantarhei.models.modelgenerator as mgen
+
+        time = qr.TimeAxis(0.0, 1000, 1.0)
+
+        mg = mgen.ModelGenerator()
+        agg = mg.get_Aggregate_with_environment(name="trimer-1_env",
+                                                timeaxis=time)
+        agg.build()
+
+        sbi = agg.get_SystemBathInteraction()
+        ham = agg.get_Hamiltonian()
+
+        ham.protect_basis()
+        with qr.eigenbasis_of(ham):
+            RRT = qr.qm.RedfieldRelaxationTensor(ham, sbi)
+        ham.unprotect_basis()
+
+        time2 = qr.TimeAxis(0.0, 20, 20.0)
+        eSO = qr.qm.EvolutionSuperOperator(time2, ham, RRT)
+        eSO.set_dense_dt(20)
+        eSO.calculate()
+
+        with tempfile.TemporaryDirectory() as tdir:
+
+            fname = os.path.join(tdir, "eso.dat")
+            eSF = qr.qm.EvolutionSuperOperator(time2, ham, RRT, storage=fname,
+                                               slice_cache_size=2)
+            eSF.set_dense_dt(20)
+            eSF.calculate()
+
+            self.assertIsInstance(eSF.data, numpy.memmap)
+
+            rho = qr.ReducedDensityMatrix(dim=ham.dim)
+            rho.data[3,3] = 0.5
+            rho.data[2,2] = 0.5
+            rho.data[2,3] = 0.5
+            rho.data[3,2] = 0.5
+
+            for tt in [0.0, 100.0, 200.0, 100.0]:
+                rho1 = eSO.apply(tt, rho)
+                rho2 = eSF.apply(tt, rho)
+                numpy.testing.assert_allclose(rho1.data, rho2.data,
+                                              rtol=1.0e-10, atol=1.0e-12)
+            self.assertEqual(len(eSF._slice_cache), 2)
+            
+            data0 = numpy.array(eSF.data)
+            indices = ([0, 1, 2], [0, 2, 2], [1, 1, 3], [1, 2, 3])
+
+            with qr.eigenbasis_of(ham):
+                for tt in [100.0, 300.0]:
+                    numpy.testing.assert_allclose(eSO.at(tt).data,
+                                                  eSF.at(tt).data,
+                                                  rtol=1.0e-10, atol=1.0e-12)
+                rhot1 = eSO.apply(time2, rho)
+                rhot2 = eSF.apply(time2, rho)
+                numpy.testing.assert_allclose(rhot1.data, rhot2.data,
+                                              rtol=1.0e-10, atol=1.0e-12)
+                numpy.testing.assert_allclose(eSO.get_elements(indices),
+                                              eSF.get_elements(indices),
+                                              rtol=1.0e-10, atol=1.0e-12)
+                
+                # only the used slices were transformed, not the file
+                numpy.testing.assert_array_equal(eSF._data_storage, data0)
+
+            rho2 = eSF.apply(100.0, rho)
+            numpy.testing.assert_allclose(rho1.data, rho2.data,
+                                          rtol=1.0e-10, atol=1.0e-12)
+            del eSF
+
+
     def test_Lindblad_dynamics_comp(self):
         """Compares Lindblad dynamics calculated from propagator and superoperator
         
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy
+
+"""
+*******************************************************************************
+
+
+    Tests of the quantarhei.qm.FoersterRelaxationTensor class
+
+
+*******************************************************************************
+"""
+
+import quantarhei as qr
+from quantarhei.models.modelgenerator import ModelGenerator
+from quantarhei.qm.liouvillespace.foerstertensor import \
+    _reference_implementation
+
+
+class TestFoerster(unittest.TestCase):
+    """Tests for the FoersterRelaxationTensor class
+
+
+    """
+
+    def setUp(self,verbose=False):
+
+        self.verbose = verbose
+
+        time = qr.TimeAxis(0.0, 1000, 1.0)
+        mg = ModelGenerator()
+        agg = mg.get_Aggregate_with_environment(name="trimer-1_env",
+                                                timeaxis=time)
+        agg.build()
+
+        self.sbi = agg.get_SystemBathInteraction()
+        self.ham = agg.get_Hamiltonian()
+
+
+    def _reference_rates(self):
+
+        Na = self.ham.dim
+        CC = self.sbi.CC
+        gt = numpy.zeros((Na, self.sbi.TimeAxis.length),
+                         dtype=numpy.complex128)
+        ll = numpy.zeros(Na)
+        for ii in range(1, Na):
+            gt[ii,:] = CC.get_goft(ii-1,ii-1)
+            ll[ii] = CC.get_reorganization_energy(ii-1,ii-1)
+
+        return _reference_implementation(Na, self.ham.data,
+                                         self.sbi.TimeAxis.data, gt, ll)
+
+
+    def test_rates(self):
+        """Testing Foerster rates against pair-by-pair integration
+
+        """
+        FT = qr.qm.FoersterRelaxationTensor(self.ham, self.sbi)
+        KK = self._reference_rates()
+
+        Na = self.ham.dim
+        for a in range(Na):
+            for b in range(Na):
+                if a != b:
+                    numpy.testing.assert_allclose(numpy.real(FT.data[a,a,b,b]),
+                                                  KK[a,b], rtol=1.0e-8,
+                                                  atol=1.0e-14)
+
+
+    def test_coupling_threshold(self):
+        """Testing Foerster rates thresholded by coupling
+
+        """
+        KK = self._reference_rates()
+        with qr.energy_units("1/cm"):
+            JJ = numpy.abs(self.ham.data)
+            thr = numpy.sort(JJ[numpy.triu_indices(self.ham.dim, 1)])[-1]
+            FT = qr.qm.FoersterRelaxationTensor(self.ham, self.sbi,
+                                      coupling_threshold=0.9*thr)
+
+        Na = self.ham.dim
+        nonzero = 0
+        for a in range(Na):
+            for b in range(Na):
+                if a == b:
+                    continue
+                if JJ[a,b] > 0.9*thr:
+                    nonzero += 1
+                    numpy.testing.assert_allclose(
+                        numpy.real(FT.data[a,a,b,b]), KK[a,b], rtol=1.0e-8)
+                else:
+                    self.assertEqual(FT.data[a,a,b,b], 0.0)
+        self.assertTrue(nonzero > 0)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy
+
+"""
+*******************************************************************************
+
+
+    Tests of the quantarhei.qm.liouvillespace.heom module
+
+
+*******************************************************************************
+"""
+
+import quantarhei as qr
+from quantarhei.qm.liouvillespace.heom import KTHierarchy
+from quantarhei.qm.liouvillespace.heom import KTHierarchyPropagator
+
+
+class TestKTHierarchy(unittest.TestCase):
+    """Tests of the Kubo-Tanimura hierarchy
+    
+    
+    """
+    
+    def setUp(self, verbose=False):
+        
+        self.verbose = verbose
+        
+        with qr.energy_units("1/cm"):
+            m1 = qr.Molecule([0.0, 10000.0])
+            m2 = qr.Molecule([0.0, 10100.0])
+        agg = qr.Aggregate([m1, m2])
+        with qr.energy_units("1/cm"):
+            agg.set_resonance_coupling(0, 1, 80.0)
+        agg.build()
+        
+        self.ham = agg.get_Hamiltonian()
+        self.sbi = qr.qm.TestSystemBathInteraction("dimer-2-env")
+        
+        
+    def _cros_rhs_loops(self, hy, ado1, dt, slevel):
+        """Cross-terms of the hierarchy by explicit loops
+        
+        """
+        ado3 = numpy.zeros(ado1.shape, dtype=ado1.dtype)
+        for nn in range(slevel, hy.hsize):
+            for kk in range(hy.nbath):
+                nk = hy.hinds[nn,kk]   
+                jj = hy.nm1[nn,kk]
+                if nk*jj >= 0:
+                    rr = numpy.dot(hy.Vs[kk,:,:], ado1[jj,:,:])
+                    rl = numpy.dot(ado1[jj,:,:], hy.Vs[kk,:,:])
+                    ado3[nn,:,:] += dt*nk*hy.lam[kk]*hy.gamma[kk]*(rr+rl)
+                    ado3[nn,:,:] += (1j*dt)*2.0*nk*hy.lam[kk]*hy.kBT*(rr-rl)
+                jj = hy.np1[nn,kk]
+                if jj > 0:
+                    rr = numpy.dot(hy.Vs[kk,:,:], ado1[jj, :,:])
+                    rl = numpy.dot(ado1[jj,:,:], hy.Vs[kk,:,:])
+                    ado3[nn,:,:] += (1j*dt)*(rr-rl)
+        return ado3
+    
+
+    def test_sparse_rhs(self):
+        """(HEOM) Testing sparse right-hand side of the hierarchy
+        
+        """
+        hy = KTHierarchy(self.ham, self.sbi, 5)
+        time = qr.TimeAxis(0.0, 10, 1.0)
+        prop = KTHierarchyPropagator(time, hy)
+        
+        numpy.random.seed(0)
+        shape = (hy.hsize, hy.dim, hy.dim)
+        ado1 = numpy.random.rand(*shape) + 1j*numpy.random.rand(*shape)
+        
+        for slevel in [0, 1]:
+            ref = self._cros_rhs_loops(hy, ado1, 0.5, slevel)
+            cros = prop._ado_cros_rhs(ado1, 0.5, slevel)
+            numpy.testing.assert_allclose(cros, ref, rtol=1.0e-12,
+                                          atol=1.0e-14)
+            
+            out = numpy.zeros(shape, dtype=qr.COMPLEX)
+            prop._ado_rhs(ado1, 0.5, slevel, 
+                          prop._get_system_Hamiltonian(), out=out)
+            numpy.testing.assert_allclose(out, 
+                                cros + prop._ado_self_rhs(ado1, 0.5, slevel),
+                                rtol=1.0e-12, atol=1.0e-14)
+        
+        
+    def test_trace_conservation(self):
+        """(HEOM) Testing conservation of trace of the density matrix
+        
+        """
+        hy = KTHierarchy(self.ham, self.sbi, 4)
+        time = qr.TimeAxis(0.0, 200, 1.0)
+        prop = KTHierarchyPropagator(time, hy)
+        
+        rhoi = qr.ReducedDensityMatrix(dim=self.ham.dim)
+        rhoi.data[2,2] = 1.0
+        rhot = prop.propagate(rhoi)
+        
+        tr = numpy.trace(rhot.data, axis1=1, axis2=2)
+        numpy.testing.assert_allclose(tr, numpy.ones(time.length), 
+                                      rtol=1.0e-8)
+        
+
+    def test_adaptive_propagation(self):
+        """(HEOM) Testing propagation with an adaptive time step
+        
+        """
+        hy = KTHierarchy(self.ham, self.sbi, 4)
+        time = qr.TimeAxis(0.0, 200, 1.0)
+        prop = KTHierarchyPropagator(time, hy)
+        
+        rhoi = qr.ReducedDensityMatrix(dim=self.ham.dim)
+        rhoi.data[2,2] = 1.0
+        rhot_1 = prop.propagate(rhoi)
+        
+        hy.reset_ados()
+        rhot_2 = prop.propagate(rhoi, method="adaptive",
+                                mdata=dict(rtol=1.0e-8, atol=1.0e-10))
+        
+        numpy.testing.assert_allclose(rhot_1.data, rhot_2.data, 
+                                      rtol=1.0e-5, atol=1.0e-7)
+        self.assertTrue(prop.step_statistics["nsteps"] > 0)
+        
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy
+
+"""
+*******************************************************************************
+
+
+    Tests of the quantarhei.qm.liouvillespace.integrodiff module
+
+
+*******************************************************************************
+"""
+
+import quantarhei as qr
+from quantarhei.qm.liouvillespace.integrodiff.integrodiff \
+     import IntegrodiffPropagator
+
+
+class TestIntegrodiffPropagator(unittest.TestCase):
+    """Tests for the IntegrodiffPropagator class
+
+
+    """
+
+    def setUp(self,verbose=False):
+
+        self.time = qr.TimeAxis(0.0, 100, 0.5)
+        self.ham = qr.Hamiltonian(data=[[0.0, 0.1, 0.0],
+                                        [0.1, 0.01, 0.05],
+                                        [0.0, 0.05, 0.03]])
+
+        ops = []
+        for (a, b) in [(0,1), (1,0), (1,2), (2,1)]:
+            ops.append(qr.qm.ProjectionOperator(a, b, self.ham.dim))
+        sbi = qr.qm.SystemBathInteraction(sys_operators=ops,
+                                rates=[1.0/30.0, 1.0/20.0, 1.0/25.0, 1.0/40.0])
+        lbf = qr.qm.LindbladForm(self.ham, sbi, as_operators=False)
+
+        # kernel in the form returned by KTHierarchy.get_kernel
+        self.kernel = -lbf.data[numpy.newaxis,:,:,:,:]* \
+            numpy.exp(-self.time.data/20.0)[:,numpy.newaxis,numpy.newaxis,
+                                            numpy.newaxis,numpy.newaxis]
+
+        self.rhoi = qr.ReducedDensityMatrix(data=[[0.0, 0.0, 0.0],
+                                                  [0.0, 1.0, 0.0],
+                                                  [0.0, 0.0, 0.0]])
+
+
+    def test_fft_propagation(self):
+        """(IntegrodiffPropagator) Testing propagation by FFT method
+
+        """
+        prop = IntegrodiffPropagator(self.time, self.ham, kernel=self.kernel,
+                                     save_fft_kernel=True)
+        rhot = prop.propagate(self.rhoi)
+
+        # reference with explicitly inverted resolvent
+        N1 = self.ham.dim
+        unity = qr.qm.SOpUnity(dim=N1).data.reshape(N1**2, N1**2)
+        LL = qr.qm.Liouvillian(self.ham).data.reshape(N1**2, N1**2)
+        MM = prop.fftKernel.reshape(len(prop.om), N1**2, N1**2)
+        rhOm = numpy.zeros((len(prop.om), N1**2), dtype=qr.COMPLEX)
+        for io in range(len(prop.om)):
+            G = numpy.linalg.inv((-1j*prop.om[io] + prop.gamma)*unity
+                                 + 1j*LL + MM[io,:,:])
+            rhOm[io,:] = numpy.dot(G, self.rhoi.data.reshape(N1**2))
+        rhOm = numpy.fft.fft(rhOm, axis=0) \
+                *((prop.om[1]-prop.om[0])/(2.0*numpy.pi))
+
+        Nt = self.time.length
+        for ii in range(1, Nt):
+            ref = rhOm[ii,:].reshape(N1, N1) \
+                   *numpy.exp(prop.gamma*self.time.data[ii])
+            numpy.testing.assert_allclose(rhot.data[ii,:,:], ref,
+                                          rtol=1.0e-10, atol=1.0e-12)
+
+
+    def test_time_domain_propagation(self):
+        """(IntegrodiffPropagator) Testing blocked convolution with kernel
+
+        """
+        Nt = self.time.length
+        for cutoff_time in [-1, 10.0]:
+
+            # blocks longer than the time axis mean direct summation
+            prop = IntegrodiffPropagator(self.time, self.ham,
+                                         kernel=self.kernel, fft=False,
+                                         cutoff_time=cutoff_time,
+                                         block_length=Nt)
+            ref = prop.propagate(self.rhoi).data
+
+            for block_length in [None, 1, 7]:
+                prop = IntegrodiffPropagator(self.time, self.ham,
+                                             kernel=self.kernel, fft=False,
+                                             cutoff_time=cutoff_time,
+                                             block_length=block_length)
+                rhot = prop.propagate(self.rhoi)
+                numpy.testing.assert_allclose(rhot.data, ref, rtol=1.0e-10,
+                                    atol=1.0e-12*numpy.max(numpy.abs(ref)))
+
+        # without kernel, the evolution is unitary
+        prop = IntegrodiffPropagator(self.time, self.ham, fft=False)
+        rhot = prop.propagate(self.rhoi)
+        ref = qr.ReducedDensityMatrixPropagator(self.time,
+                                                self.ham).propagate(self.rhoi)
+        numpy.testing.assert_allclose(rhot.data, ref.data, rtol=1.0e-10,
+                                      atol=1.0e-12)
+
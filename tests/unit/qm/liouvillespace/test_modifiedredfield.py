@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy
+from scipy import integrate
+
+"""
+*******************************************************************************
+
+
+    Tests of the quantarhei.qm.ModifiedRedfieldRateMatrix class
+
+
+*******************************************************************************
+"""
+
+import quantarhei as qr
+from quantarhei.models.modelgenerator import ModelGenerator
+
+
+class TestModifiedRedfield(unittest.TestCase):
+    """Tests for the ModifiedRedfieldRateMatrix class
+
+
+    """
+
+    def setUp(self,verbose=False):
+
+        self.verbose = verbose
+
+        self.time = qr.TimeAxis(0.0, 1000, 1.0)
+        mg = ModelGenerator()
+        agg = mg.get_Aggregate_with_environment(name="trimer-1_env",
+                                                timeaxis=self.time)
+        agg.build()
+
+        self.sbi = agg.get_SystemBathInteraction()
+        self.ham = agg.get_Hamiltonian()
+
+
+    def _reference_rates(self, Nt):
+        """Rates evaluated element by element
+
+        """
+        CC = self.sbi.CC
+        Nb = CC.nob
+        hD, SS = numpy.linalg.eigh(self.ham.data[1:,1:])
+        CC.transform(SS)
+        g4 = CC.get_goft_matrix()
+        h4 = CC.get_hoft_matrix()
+        c4 = CC.get_coft_matrix()
+        tt = self.time.data[0:Nt]
+        lm = numpy.zeros((Nb,Nb,Nb,Nb))
+        for a in range(Nb):
+            for b in range(Nb):
+                for c in range(Nb):
+                    for d in range(Nb):
+                        lm[a,b,c,d] = CC.get_reorganization_energy4(a,b,c,d)
+
+        RR = numpy.zeros((Nb,Nb))
+        for a in range(Nb):
+            for b in range(Nb):
+                if a == b:
+                    continue
+                E0a = hD[a] - lm[a,a,a,a]
+                E0b = hD[b] - lm[b,b,b,b]
+                Fb = numpy.exp(-1j*(E0b - lm[b,b,b,b])*tt
+                               - numpy.conj(g4[b,b,b,b,0:Nt]))
+                Aa = numpy.exp(-1j*(E0a + lm[a,a,a,a])*tt - g4[a,a,a,a,0:Nt])
+                Nab = ((c4[b,a,a,b,0:Nt]
+                        - (h4[b,a,a,a,0:Nt] - h4[b,a,b,b,0:Nt]
+                           - 2j*lm[b,a,b,b])
+                        *(h4[a,b,a,a,0:Nt] - h4[a,b,b,b,0:Nt]
+                          - 2j*lm[a,b,b,b]))
+                       *numpy.exp(2*(g4[a,a,b,b,0:Nt]
+                                     + 1j*lm[a,a,b,b]*tt)))
+                RR[a,b] = 2*numpy.real(integrate.simpson(
+                                                numpy.conj(Fb)*Aa*Nab, x=tt))
+        for a in range(Nb):
+            RR[a,a] = -numpy.sum(RR[:,a])
+
+        return RR
+
+
+    def test_rates(self):
+        """Testing Modified Redfield rates against element-wise evaluation
+
+        """
+        RRM = qr.qm.ModifiedRedfieldRateMatrix(self.ham, self.sbi, self.time)
+
+        Nt = min(self.sbi.CC.max_cutoff_index, self.time.length)
+        RR = self._reference_rates(Nt)
+
+        numpy.testing.assert_allclose(RRM.data[1:,1:], RR,
+                                      rtol=1.0e-7, atol=1.0e-12)
+        numpy.testing.assert_allclose(RRM.data[0,:], 0.0)
+        numpy.testing.assert_allclose(numpy.sum(RRM.data, axis=0), 0.0,
+                                      atol=1.0e-12)
+
+
+    def test_cutoff_time(self):
+        """Testing Modified Redfield rates with cut-off time
+
+        """
+        RRM = qr.qm.ModifiedRedfieldRateMatrix(self.ham, self.sbi, self.time,
+                                               cutoff_time=300.0)
+        RR = self._reference_rates(self.time.nearest(300.0)+1)
+
+        numpy.testing.assert_allclose(RRM.data[1:,1:], RR,
+                                      rtol=1.0e-7, atol=1.0e-12)
+
+
+    def test_two_exciton_band(self):
+        """Testing Modified Redfield rates with two-exciton band
+
+        """
+        mg = ModelGenerator()
+        agg = mg.get_Aggregate_with_environment(name="trimer-1_env",
+                                                timeaxis=self.time)
+        agg.build(mult=2, sbi_for_higher_ex=True)
+        sbi = agg.get_SystemBathInteraction()
+        ham = agg.get_Hamiltonian()
+
+        RRM = qr.qm.ModifiedRedfieldRateMatrix(ham, sbi, self.time)
+        RR = qr.qm.ModifiedRedfieldRateMatrix(self.ham, self.sbi, self.time)
+
+        # rates are calculated only in the single exciton band
+        numpy.testing.assert_allclose(RRM.data[1:4,1:4], RR.data[1:,1:],
+                                      rtol=1.0e-7, atol=1.0e-12)
+        numpy.testing.assert_allclose(RRM.data[4:,:], 0.0)
+        numpy.testing.assert_allclose(RRM.data[:,4:], 0.0)
@@ -150,3 +150,88 @@ class TestRedfield(unittest.TestCase):
                                       rtol=1.0e-5, atol=1.0e-12)
         numpy.testing.assert_allclose(rhot1_e.data, rhot2_e.data,
                                       rtol=1.0e-5, atol=1.0e-12)              
+
+
+    def test_fft_integration(self):
+        """(REDFIELD) Testing FFT integration against spline integration
+
+        """
+        
+        RT1 = RedfieldRelaxationTensor(self.H1, self.sbi1, as_operators=True)
+        RT2 = RedfieldRelaxationTensor(self.H1, self.sbi1, as_operators=True,
+                                       integration="fft")
+        
+        numpy.testing.assert_allclose(RT1.Lm, RT2.Lm, rtol=3.0e-3,
+                                      atol=1.0e-3*numpy.max(numpy.abs(RT1.Lm)))
+
+        RT1 = RedfieldRelaxationTensor(self.H1, self.sbi1, cutoff_time=300.0)
+        RT2 = RedfieldRelaxationTensor(self.H1, self.sbi1, cutoff_time=300.0,
+                                       integration="fft")
+        
+        # truncated correlation function is less precisely integrated 
+        # by splines
+        numpy.testing.assert_allclose(RT1.data, RT2.data, rtol=1.0e-2,
+                                    atol=3.0e-3*numpy.max(numpy.abs(RT1.data)))
+
+
+    def test_tensor_from_operators(self):
+        """(REDFIELD) Testing conversion of operators to tensor
+
+        """
+        import os
+        import tempfile
+        
+        time = TimeAxis(0.0,1000,1.0)
+        with energy_units("1/cm"):
+            params = {"ftype":"OverdampedBrownian",
+                      "reorg":30.0,
+                      "T":300.0,
+                      "cortime":100.0}
+            cf = CorrelationFunction(time,params)
+            ham = Hamiltonian(data=[[0.0, 0.0, 0.0],
+                                    [0.0, 12000.0, 100.0],
+                                    [0.0, 100.0, 12100.0]])
+        cm = CorrelationFunctionMatrix(time,2,1)
+        cm.set_correlation_function(cf,[(0,0),(1,1)])
+        
+        # ground state is not coupled to the excited states
+        K1 = Operator(data=numpy.diag([0.0, 1.0, 0.0]))
+        K2 = Operator(data=numpy.diag([0.0, 0.0, 1.0]))
+        sbi = SystemBathInteraction([K1,K2],cm)
+        
+        RT = RedfieldRelaxationTensor(ham, sbi, as_operators=True)
+        Km = RT.Km
+        Lm = RT.Lm
+        Ld = RT.Ld
+        
+        # element by element
+        Na = ham.dim
+        RR = numpy.zeros((Na,Na,Na,Na), dtype=numpy.complex128)
+        for m in range(sbi.N):
+            KdLm = numpy.dot(Km[m,:,:].T, Lm[m,:,:])
+            LdKm = numpy.dot(Ld[m,:,:], Km[m,:,:])
+            for a in range(Na):
+                for b in range(Na):
+                    for c in range(Na):
+                        for d in range(Na):
+                            RR[a,b,c,d] += (Km[m,a,c]*Ld[m,d,b] 
+                                            + Lm[m,a,c]*Km[m,b,d])
+                            if b == d:
+                                RR[a,b,c,d] -= KdLm[a,c] 
+                            if a == c:
+                                RR[a,b,c,d] -= LdKm[d,b]
+        
+        R1 = RT._convert_operators_2_tensor(Km, Lm, Ld)
+        numpy.testing.assert_allclose(R1, RR, rtol=1.0e-12, atol=1.0e-16)
+        
+        # block sparse conversion into a memory mapped array
+        with tempfile.TemporaryDirectory() as tdir:
+            out = numpy.memmap(os.path.join(tdir, "redfield.dat"),
+                               dtype=numpy.complex128, mode="w+",
+                               shape=(Na,Na,Na,Na))
+            out[:,:,:,:] = 1.0
+            RT.convert_2_tensor(out=out, block_sparse=True)
+            self.assertFalse(RT.as_operators)
+            self.assertIs(RT.data, out)
+            numpy.testing.assert_allclose(out, RR, rtol=1.0e-12, atol=1.0e-16)
+            del out
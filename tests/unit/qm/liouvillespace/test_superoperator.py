@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+import unittest
+import numpy
+
+"""
+*******************************************************************************
+
+
+    Tests of the quantarhei.qm.SuperOperator class
+
+
+*******************************************************************************
+"""
+
+from quantarhei import Hamiltonian, eigenbasis_of
+from quantarhei.qm import SuperOperator
+
+
+class TestSuperOperator(unittest.TestCase):
+    """Tests for the SuperOperator class
+
+
+    """
+
+    def setUp(self,verbose=False):
+
+        rng = numpy.random.RandomState(7)
+
+        self.H = Hamiltonian(data=[[0.0, 0.1, 0.0],
+                                   [0.1, 1.0, 0.2],
+                                   [0.0, 0.2, 1.5]])
+        self.rdata = (rng.normal(size=(3,3,3,3))
+                      + 1j*rng.normal(size=(3,3,3,3)))
+
+
+    def test_transformation(self):
+        """(SuperOperator) Testing transformation into eigenbasis
+
+        """
+
+        So = SuperOperator(data=self.rdata.copy())
+
+        hD, SS = numpy.linalg.eigh(self.H.data)
+        S1 = numpy.linalg.inv(SS)
+        ref = numpy.einsum("ai,jb,ijkl,ck,ld->abcd",
+                           S1, SS, self.rdata, S1, SS)
+
+        with eigenbasis_of(self.H):
+            numpy.testing.assert_allclose(So.data, ref, rtol=1.0e-12,
+                                          atol=1.0e-12)
+
+        numpy.testing.assert_allclose(So.data, self.rdata, rtol=1.0e-12,
+                                      atol=1.0e-12)
+
+
+    def test_lazy_transformation(self):
+        """(SuperOperator) Testing that cancelling transformations are skipped
+
+        """
+
+        So = SuperOperator(data=self.rdata.copy())
+
+        with eigenbasis_of(self.H):
+            data = So.data.copy()
+
+        # transformation back is pending until the data are read
+        self.assertIsNotNone(So._pending_transform)
+
+        # transformation of the next context cancels the pending one
+        with eigenbasis_of(self.H):
+            numpy.testing.assert_array_equal(So.data, data)
+            self.assertIsNone(So._pending_transform)
+
+        numpy.testing.assert_allclose(So.data, self.rdata, rtol=1.0e-12,
+                                      atol=1.0e-12)
+        self.assertIsNone(So._pending_transform)
+
+        # repeated transformations are composed
+        So.transform(numpy.eye(3)[:,[1,0,2]])
+        So.transform(numpy.eye(3)[:,[0,2,1]])
+        self.assertIsNotNone(So._pending_transform)
+        pp = [1,2,0]
+        numpy.testing.assert_allclose(So._data,
+                                      self.rdata[numpy.ix_(pp,pp,pp,pp)],
+                                      rtol=1.0e-12, atol=1.0e-12)
+        self.assertIsNone(So._pending_transform)
+
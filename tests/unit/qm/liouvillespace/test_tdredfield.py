@@ -122,3 +122,98 @@ class TDTestRedfield(unittest.TestCase):
                 
             
 
+
+
+    def test_converged_tail(self):
+        """Testing time-dependent Redfield tensor with compressed tail
+        
+        """
+        from quantarhei.qm import ReducedDensityMatrixPropagator
+        from quantarhei.qm import ReducedDensityMatrix
+        
+        RT = TDRedfieldRelaxationTensor(self.H1, self.sbi1)
+        RC = TDRedfieldRelaxationTensor(self.H1, self.sbi1,
+                                        tail_tolerance=1.0e-5)
+        
+        timeaxis = self.sbi1.CC.timeAxis
+        Nc = RC.data.shape[0]
+        self.assertLess(Nc, timeaxis.length)
+        self.assertEqual(RC.Nt, Nc)
+        
+        # transient part is stored as it is
+        numpy.testing.assert_allclose(RC.data[0:Nc-1,:,:,:,:],
+                                      RT.data[0:Nc-1,:,:,:,:], rtol=1.0e-12)
+        
+        # the last element is the asymptotic value
+        numpy.testing.assert_allclose(RC.data[Nc-1,:,:,:,:],
+                                      RT.data[timeaxis.length-1,:,:,:,:],
+                                      rtol=1.0e-12)
+        
+        # propagation uses the asymptotic value after the transient part
+        rho0 = ReducedDensityMatrix(dim=self.H1.dim)
+        rho0.data[1,1] = 1.0
+        rhot1 = ReducedDensityMatrixPropagator(timeaxis, self.H1,
+                                               RT).propagate(rho0)
+        rhot2 = ReducedDensityMatrixPropagator(timeaxis, self.H1,
+                                               RC).propagate(rho0)
+        numpy.testing.assert_allclose(rhot2.data, rhot1.data, rtol=1.0e-3,
+                                      atol=1.0e-4)
+
+
+    def test_converged_tail_evolution(self):
+        """Testing evolution superoperator with compressed tensor tail
+        
+        """
+        from quantarhei.qm import EvolutionSuperOperator
+        from quantarhei.qm import PureDephasing
+        
+        RT = TDRedfieldRelaxationTensor(self.H1, self.sbi1)
+        RC = TDRedfieldRelaxationTensor(self.H1, self.sbi1,
+                                        tail_tolerance=1.0e-2)
+        self.assertEqual(RC.cutoff_index, RC.data.shape[0])
+        
+        # the propagation of the intervals is longer than the stored tensor
+        time2 = TimeAxis(0.0, 3, 500.0)
+        self.assertLess(RC.cutoff_index, 500)
+        
+        pd = PureDephasing(drates=numpy.array([[0.0, 1.0e-6],
+                                               [1.0e-6, 0.0]]),
+                           dtype="Gaussian")
+        
+        for pdeph in [None, pd]:
+            eUts = []
+            for RR in [RT, RC]:
+                eUt = EvolutionSuperOperator(time2, self.H1, RR, pdeph=pdeph)
+                eUt.set_dense_dt(500)
+                eUt.calculate()
+                eUts.append(eUt)
+                
+            numpy.testing.assert_allclose(eUts[1].data, eUts[0].data,
+                                          rtol=1.0e-2, atol=1.0e-2)
+
+
+    def test_transformation(self):
+        """Testing basis transformation of time-dependent Redfield tensor
+        
+        """
+        RT = TDRedfieldRelaxationTensor(self.H1, self.sbi1, cutoff_time=100.0)
+        RO = TDRedfieldRelaxationTensor(self.H1, self.sbi1, cutoff_time=100.0,
+                                        as_operators=True)
+        data0 = RT.data.copy()
+        
+        SS = self.H1.get_diagonalization_matrix()
+        S1 = numpy.linalg.inv(SS)
+        ref = numpy.einsum("ai,tijkl,jb,ck,ld->tabcd", S1, data0, SS, S1, SS)
+        
+        with eigenbasis_of(self.H1):
+            numpy.testing.assert_allclose(RT.data, ref, rtol=1.0e-10,
+                                    atol=1.0e-12*numpy.max(numpy.abs(ref)))
+            RR = RO._convert_operators_2_tensor(RO.Km, RO.Lm, RO.Ld)
+            numpy.testing.assert_allclose(RR, ref, rtol=1.0e-10,
+                                    atol=1.0e-12*numpy.max(numpy.abs(ref)))
+            
+        # transformation back is applied only when the data are needed
+        self.assertIsNotNone(RT._pending_transform)
+        numpy.testing.assert_allclose(RT.data, data0, rtol=1.0e-10,
+                                    atol=1.0e-12*numpy.max(numpy.abs(data0)))
+        self.assertIsNone(RT._pending_transform)
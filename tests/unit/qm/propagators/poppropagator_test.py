@@ -80,3 +80,69 @@ class TestPopulationPropagator(unittest.TestCase):
         for n in range(Ntd):
             numpy.testing.assert_allclose(U[:,:,n],Ucheck[:,:,n])
         
+
+
+    def test_of_population_evolution_3(self):
+        """Testing population evolution matrix against matrix exponential"""
+        import scipy.linalg
+
+        # detailed balance, a general and a non-diagonalizable rate matrix
+        KKs = [numpy.array([[-1.0/100.0,  1.0/300.0,  0.0],
+                            [ 1.0/100.0, -1.0/150.0,  1.0/500.0],
+                            [ 0.0,        1.0/300.0, -1.0/500.0]]),
+               numpy.array([[-1.0/100.0,  1.0/300.0,  1.0/400.0],
+                            [ 1.0/200.0, -1.0/300.0,  0.0],
+                            [ 1.0/200.0,  0.0,       -1.0/400.0]]),
+               numpy.array([[-1.0/100.0,  0.0],
+                            [ 1.0/100.0, -1.0/100.0]])]
+
+        t = TimeAxis(0.0, 1000, 1.0)
+        td = TimeAxis(5.0, 20, 10.0)
+        for KK in KKs:
+            prop = PopulationPropagator(t, rate_matrix=KK)
+            U = prop.get_PropagationMatrix(td)
+            for n in range(td.length):
+                numpy.testing.assert_allclose(U[:,:,n],
+                                    scipy.linalg.expm(KK*td.data[n]),
+                                    rtol=1.0e-10, atol=1.0e-14)
+
+            pops = prop.propagate([1.0]+[0.0]*(KK.shape[0]-1))
+            numpy.testing.assert_allclose(pops[100,:],
+                                    scipy.linalg.expm(KK*100.0)[:,0],
+                                    rtol=1.0e-10, atol=1.0e-14)
+
+
+    def test_of_corrections(self):
+        """Testing corrections to population evolution matrix"""
+
+        KK = numpy.array([[-1.0/100.0,  1.0/100.0],
+                          [ 1.0/100.0, -1.0/100.0]])
+        k = 1.0/100.0
+
+        t = TimeAxis(0.0, 1000, 1.0)
+        td = TimeAxis(0.0, 50, 10.0)
+        tt = td.data
+
+        prop = PopulationPropagator(t, rate_matrix=KK)
+        U, (Uc0, Uc1, Uc2) = prop.get_PropagationMatrix(td, corrections=2,
+                                                        exact=True)
+
+        # equal depopulation rates
+        numpy.testing.assert_allclose(Uc0[0,0,:], numpy.exp(-k*tt))
+        numpy.testing.assert_allclose(Uc1[1,0,:], k*tt*numpy.exp(-k*tt),
+                                      atol=1.0e-14)
+        numpy.testing.assert_allclose(Uc2[0,0,:],
+                                      0.5*(k*tt)**2*numpy.exp(-k*tt),
+                                      atol=1.0e-14)
+
+        # numerical corrections converge to the exact ones
+        tf = TimeAxis(0.0, 500, 1.0)
+        U, cor = prop.get_PropagationMatrix(tf, corrections=2)
+        numpy.testing.assert_allclose(cor[1][:,:,::10], Uc1, atol=5.0e-3)
+        numpy.testing.assert_allclose(cor[2][:,:,::10], Uc2, atol=5.0e-3)
+
+        # repeated calls return equal, independent matrices
+        U1 = prop.get_PropagationMatrix(td)
+        U1[:,:,:] = 0.0
+        U2 = prop.get_PropagationMatrix(td)
+        numpy.testing.assert_allclose(U2[:,:,0], numpy.eye(2))
@@ -95,5 +95,225 @@ class TestRDMPropagator(unittest.TestCase):
         
 
 
+    def test_rdm_evolution_dense_exp(self):
+        """Testing propagation with precomputed step propagator
+        
+        """
+        HH = qr.Hamiltonian(data=[[0.0, 1.0],[1.0, 0.2]])
+        P01 = qr.qm.ProjectionOperator(0, 1, dim=2)
+        P10 = qr.qm.ProjectionOperator(1, 0, dim=2)
+        rates = [1.0/100.0, 1.0/600.0]
+        
+        sbi = qr.qm.SystemBathInteraction(sys_operators=[P01,P10],
+                                          rates=rates)
+        LL = qr.qm.LindbladForm(HH, sbi)
+        LL.convert_2_tensor()
+        Nt = 500
+        dt = 0.01
+        time = qr.TimeAxis(0.0, Nt, dt)
+        
+        prop = qr.ReducedDensityMatrixPropagator(time, Ham=HH, RTensor=LL)
+        rho_ini = qr.ReducedDensityMatrix(data=[[0.0, 0.0],[0.0, 1.0]])
+        
+        rhot_1 = prop.propagate(rho_ini)
+        rhot_2 = prop.propagate(rho_ini, method="dense-exp")
+        
+        numpy.testing.assert_allclose(rhot_1.data, rhot_2.data, rtol=1.0e-6,
+                                      atol=1.0e-9)
+        
+        # step propagator is cached
+        U1 = prop.get_step_propagator()
+        U2 = prop.get_step_propagator()
+        self.assertIs(U1, U2)
+        
+        
+    def test_rdm_evolution_dense_exp_operators(self):
+        """Testing precomputed step propagator with Redfield operators
+        
+        """
+        with qr.energy_units("1/cm"):
+            mol1 = qr.Molecule(elenergies=[0.0, 12000.0])
+            mol2 = qr.Molecule(elenergies=[0.0, 12100.0])
+            time = qr.TimeAxis(0.0, 1000, 1.0)
+            params = dict(ftype="OverdampedBrownian", reorg=30.0,
+                          cortime=100.0, T=300.0)
+            cf = qr.CorrelationFunction(time, params)
+            mol1.set_transition_environment((0,1), cf)
+            mol2.set_transition_environment((0,1), cf)
+            agg = qr.Aggregate(molecules=[mol1, mol2])
+            agg.set_resonance_coupling(0, 1, 100.0)
+            agg.build()
+            
+        HH = agg.get_Hamiltonian()
+        sbi = agg.get_SystemBathInteraction()
+        
+        RR = qr.qm.RedfieldRelaxationTensor(HH, sbi, as_operators=True)
+        RT = qr.qm.RedfieldRelaxationTensor(HH, sbi, as_operators=False)
+        
+        ptime = qr.TimeAxis(0.0, 200, 1.0)
+        rho_ini = qr.ReducedDensityMatrix(dim=HH.dim)
+        rho_ini.data[1,1] = 0.5
+        rho_ini.data[2,2] = 0.5
+        rho_ini.data[1,2] = 0.5
+        rho_ini.data[2,1] = 0.5
+        
+        with qr.eigenbasis_of(HH):
+            prop1 = qr.ReducedDensityMatrixPropagator(ptime, Ham=HH, 
+                                                      RTensor=RT)
+            prop1.setDtRefinement(10)
+            rhot_1 = prop1.propagate(rho_ini)
+            
+            prop2 = qr.ReducedDensityMatrixPropagator(ptime, Ham=HH, 
+                                                      RTensor=RR)
+            rhot_2 = prop2.propagate(rho_ini, method="dense-exp")
+        
+            numpy.testing.assert_allclose(rhot_1.data, rhot_2.data, 
+                                          rtol=1.0e-5, atol=1.0e-7)
+        
+
+    def test_rdm_evolution_batch(self):
+        """Testing propagation of a stack of initial density matrices
+        
+        """
+        HH = qr.Hamiltonian(data=[[0.0, 1.0],[1.0, 0.2]])
+        P01 = qr.qm.ProjectionOperator(0, 1, dim=2)
+        P10 = qr.qm.ProjectionOperator(1, 0, dim=2)
+        rates = [1.0/100.0, 1.0/600.0]
+        
+        sbi = qr.qm.SystemBathInteraction(sys_operators=[P01,P10],
+                                          rates=rates)
+        LO = qr.qm.LindbladForm(HH, sbi)
+        LT = qr.qm.LindbladForm(HH, sbi)
+        LT.convert_2_tensor()
+        time = qr.TimeAxis(0.0, 100, 0.1)
+        
+        rhois = numpy.zeros((3, 2, 2), dtype=qr.COMPLEX)
+        rhois[0,1,1] = 1.0
+        rhois[1,0,0] = 1.0
+        rhois[2,:,:] = 0.5
+        
+        for LL in [LO, LT, None]:
+            prop = qr.ReducedDensityMatrixPropagator(time, Ham=HH, 
+                                                     RTensor=LL)
+            prop.setDtRefinement(3)
+            for method in ["short-exp", "short-exp-2", "dense-exp"]:
+                rhots = prop.propagate(rhois, method=method)
+                self.assertEqual(rhots.shape, (3, time.length, 2, 2))
+                for kk in range(3):
+                    rho_ini = qr.ReducedDensityMatrix(data=rhois[kk,:,:])
+                    rhot = prop.propagate(rho_ini, method=method)
+                    numpy.testing.assert_allclose(rhots[kk,:,:,:], 
+                                                  rhot.data, 
+                                                  rtol=1.0e-7, atol=1.0e-10)
+                
+
+    def test_rdm_evolution_adaptive(self):
+        """Testing propagation with an adaptive time step
+        
+        """
+        HH = qr.Hamiltonian(data=[[0.0, 1.0],[1.0, 0.2]])
+        P01 = qr.qm.ProjectionOperator(0, 1, dim=2)
+        P10 = qr.qm.ProjectionOperator(1, 0, dim=2)
+        rates = [1.0/100.0, 1.0/600.0]
+        
+        sbi = qr.qm.SystemBathInteraction(sys_operators=[P01,P10],
+                                          rates=rates)
+        LO = qr.qm.LindbladForm(HH, sbi)
+        LL = qr.qm.LindbladForm(HH, sbi)
+        LL.convert_2_tensor()
+        time = qr.TimeAxis(0.0, 500, 0.1)
+        
+        rho_ini = qr.ReducedDensityMatrix(data=[[0.0, 0.0],[0.0, 1.0]])
+        
+        for RT in [LO, LL, None]:
+            prop = qr.ReducedDensityMatrixPropagator(time, Ham=HH, 
+                                                     RTensor=RT)
+            rhot_1 = prop.propagate(rho_ini, method="dense-exp")
+            rhot_2 = prop.propagate(rho_ini, method="adaptive",
+                                    mdata=dict(rtol=1.0e-8, atol=1.0e-10,
+                                               solver="DOP853"))
+        
+            numpy.testing.assert_allclose(rhot_1.data, rhot_2.data, 
+                                          rtol=1.0e-5, atol=1.0e-7)
+            
+            # internal steps are longer than the output step
+            stats = prop.step_statistics
+            self.assertTrue(stats["nsteps"] < time.length)
+            
+        with self.assertRaises(Exception):
+            prop.propagate(rho_ini, method="adaptive", 
+                           mdata=dict(solver="unknown"))
+            
+            
+    def test_rdm_evolution_adaptive_TD(self):
+        """Testing adaptive time step with time-dependent Redfield tensor
+        
+        """
+        with qr.energy_units("1/cm"):
+            mol1 = qr.Molecule(elenergies=[0.0, 12000.0])
+            mol2 = qr.Molecule(elenergies=[0.0, 12100.0])
+            time = qr.TimeAxis(0.0, 1000, 1.0)
+            params = dict(ftype="OverdampedBrownian", reorg=30.0,
+                          cortime=100.0, T=300.0)
+            cf = qr.CorrelationFunction(time, params)
+            mol1.set_transition_environment((0,1), cf)
+            mol2.set_transition_environment((0,1), cf)
+            agg = qr.Aggregate(molecules=[mol1, mol2])
+        agg.set_resonance_coupling(0, 1, qr.convert(100.0, "1/cm", "int"))
+        agg.build()
+            
+        HH = agg.get_Hamiltonian()
+        sbi = agg.get_SystemBathInteraction()
+        
+        ptime = qr.TimeAxis(0.0, 300, 1.0)
+        rho_ini = qr.ReducedDensityMatrix(dim=HH.dim)
+        rho_ini.data[2,2] = 1.0
+        
+        # reference: fixed step Runge-Kutta integration with a fine step
+        # and the tensor interpolated linearly between the time points
+        RR = qr.qm.TDRedfieldRelaxationTensor(HH, sbi, cutoff_time=200.0,
+                                              as_operators=False).data
+        last = ptime.nearest(200.0) - 1
+        N = HH.dim
+        
+        def rhs(t, rho):
+            k1 = min(int(numpy.floor(t)), last)
+            k2 = min(k1 + 1, last)
+            w2 = min(t - k1, 1.0) if k2 > k1 else 0.0
+            RRt = (1.0-w2)*RR[k1,:,:,:,:] + w2*RR[k2,:,:,:,:]
+            return -1j*(numpy.dot(HH.data, rho) - numpy.dot(rho, HH.data)) \
+                   + numpy.tensordot(RRt, rho)
+        
+        Nsub = 20
+        h = ptime.step/Nsub
+        ref = numpy.zeros((ptime.length, N, N), dtype=qr.COMPLEX)
+        ref[0,:,:] = rho_ini.data
+        rho = rho_ini.data.astype(qr.COMPLEX)
+        for ii in range(1, ptime.length):
+            for kk in range(Nsub):
+                t = ptime.data[ii-1] + kk*h
+                k1 = rhs(t, rho)
+                k2 = rhs(t + h/2.0, rho + (h/2.0)*k1)
+                k3 = rhs(t + h/2.0, rho + (h/2.0)*k2)
+                k4 = rhs(t + h, rho + h*k3)
+                rho = rho + (h/6.0)*(k1 + 2.0*k2 + 2.0*k3 + k4)
+            ref[ii,:,:] = rho
+        
+        for as_operators in [True, False]:
+            RT = qr.qm.TDRedfieldRelaxationTensor(HH, sbi, 
+                                                  cutoff_time=200.0,
+                                                  as_operators=as_operators)
+            prop = qr.ReducedDensityMatrixPropagator(ptime, Ham=HH, 
+                                                     RTensor=RT)
+            rhot = prop.propagate(rho_ini, method="adaptive",
+                                  mdata=dict(solver="DOP853", rtol=1.0e-8,
+                                             atol=1.0e-10))
+            
+            # the tolerances control the local error; the global error 
+            # accumulated over the whole time axis is somewhat larger
+            numpy.testing.assert_allclose(rhot.data, ref, 
+                                          rtol=0.0, atol=1.0e-6)
+
+
     def test_rdm_evolution_Saveable(self):
         pass
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+"""
+*******************************************************************************
+
+
+    Tests of the quantarhei.spectroscopy.abscalculator module
+
+
+*******************************************************************************
+"""
+import numpy
+
+from quantarhei import energy_units
+from quantarhei import Molecule, Aggregate, CorrelationFunction, TimeAxis
+from quantarhei.spectroscopy.abscalculator import LinSpectrumCalculator
+
+
+class TestLinSpectrumCalculator(unittest.TestCase):
+    """Tests of the LinSpectrumCalculator class
+
+
+    """
+
+    def setUp(self,verbose=False):
+
+        time = TimeAxis(0.0, 1000, 1.0)
+        self.ta = time
+        with energy_units("1/cm"):
+            mols = []
+            for ii in range(3):
+                mol = Molecule(elenergies=[0.0, 12000.0+150.0*ii])
+                mol.set_dipole(0,1,[1.0, 0.2*ii, 0.1*ii*ii])
+                mol.position = [0.0, 5.0*ii, 0.2*ii*ii]
+                params = dict(ftype="OverdampedBrownian", reorg=30.0+10.0*ii,
+                              cortime=100.0, T=300, matsubara=20)
+                cf = CorrelationFunction(time, params)
+                mol.set_transition_environment((0,1),cf)
+                mols.append(mol)
+            agg = Aggregate(molecules=mols)
+            agg.set_resonance_coupling(0,1,60.0)
+            agg.set_resonance_coupling(1,2,40.0)
+        agg.build()
+
+        self.agg = agg
+
+
+    def test_all_transitions(self):
+        """(LinSpectrumCalculator) Testing spectra of all transitions at once
+
+        """
+        calc = LinSpectrumCalculator(self.ta, system=self.agg)
+        with energy_units("1/cm"):
+            calc.bootstrap(rwa=12100.0)
+        spect = calc.calculate()
+
+        # transition by transition
+        HH = self.agg.get_Hamiltonian()
+        SS = HH.diagonalize()
+        DD = self.agg.get_TransitionDipoleMoment()
+        DD.transform(SS)
+
+        ct_all = calc._excitonic_coft_all(SS, self.agg)
+        energy = numpy.diag(HH.data)
+        temperature = self.agg.sbi.get_temperature()
+        rho_eq = calc._equilibrium_excit_populations(self.agg,
+                                                     temperature=temperature)
+
+        data = {}
+        for key in ["abs", "fluor", "CD", "LD"]:
+            data[key] = numpy.zeros(spect[key].data.shape, 
+                                    dtype=numpy.float64)
+        for ii in range(1, HH.dim):
+            ct = calc._excitonic_coft(SS, self.agg, ii)
+            numpy.testing.assert_allclose(ct_all[ii,:], ct, rtol=1.0e-12,
+                                          atol=1.0e-14*numpy.max(numpy.abs(ct)))
+            dd = numpy.dot(DD.data[0,ii,:],DD.data[0,ii,:])
+            tr = {"ta":self.ta,
+                  "dd":dd,
+                  "om":HH.data[ii,ii]-HH.data[0,0]-calc.rwa,
+                  "gt":calc._c2g(self.ta, ct),
+                  "gg":[0.0], "fwhm":0.0,
+                  "re":calc._excitonic_reorg_energy(SS, self.agg, ii),
+                  "rr":calc._excitonic_rotatory_strength_fullv(SS, self.agg,
+                                                               energy, ii),
+                  "ld":3*numpy.dot(DD.data[0,ii,:], calc.ld_axis)**2 - dd}
+            data["abs"] += numpy.real(calc.one_transition_spectrum_abs(tr))
+            data["CD"] += numpy.real(calc.one_transition_spectrum_cd(tr))
+            data["LD"] += numpy.real(calc.one_transition_spectrum_ld(tr))
+            tr["dd"] = rho_eq.data[ii,ii]*dd
+            data["fluor"] += numpy.real(calc.one_transition_spectrum_fluor(tr))
+
+        S1 = numpy.linalg.inv(SS)
+        HH.transform(S1)
+        DD.transform(S1)
+
+        for key in data:
+            ref = spect[key].axis.data*data[key]
+            numpy.testing.assert_allclose(spect[key].data, ref, 
+                                          rtol=1.0e-10,
+                                          atol=1.0e-12*numpy.max(
+                                                           numpy.abs(ref)))
+
+
+    def test_disorder_average(self):
+        """(LinSpectrumCalculator) Testing spectra averaged over disorder
+
+        """
+        from quantarhei import Disorder, convert
+
+        HH = self.agg.get_Hamiltonian()
+        H0 = HH.data.copy()
+        dis = Disorder(data=H0, seed=11)
+        dis.set_distribution("Gaussian",
+                             dict(width=convert(100.0, "1/cm", "int")))
+        Nreal = 5
+
+        calc = LinSpectrumCalculator(self.ta, system=self.agg)
+        with energy_units("1/cm"):
+            calc.bootstrap(rwa=12100.0, HWHH=50.0)
+        spect = calc.calculate_disorder_average(dis, Nreal, block_size=2)
+
+        # realization by realization
+        Hs = dis.get_Hamiltonians(range(Nreal))
+        ref = {}
+        for ri in range(Nreal):
+            HH._data[:,:] = Hs[ri,:,:]
+            sp = calc.calculate()
+            for key in sp:
+                ref[key] = ref.get(key, 0.0) + sp[key].data/Nreal
+        HH._data[:,:] = H0
+
+        for key in ref:
+            numpy.testing.assert_allclose(spect[key].data, ref[key],
+                            rtol=1.0e-8,
+                            atol=1.0e-10*numpy.max(numpy.abs(ref[key])))
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+import unittest
+
+"""
+*******************************************************************************
+
+
+    Tests of the quantarhei.spectroscopy.mocktwodcalculator module
+
+
+*******************************************************************************
+"""
+import numpy
+
+import quantarhei as qr
+from quantarhei import Molecule, Aggregate, TimeAxis
+from quantarhei import energy_units
+from quantarhei import signal_REPH, signal_NONR
+
+
+class TestMockTwoDCalculator(unittest.TestCase):
+    """Tests of the MockTwoDResponseCalculator class
+
+
+    """
+
+    def setUp(self, verbose=False):
+
+        mols = []
+        with energy_units("1/cm"):
+            for ii in range(3):
+                mol = Molecule(elenergies=[0.0, 12000.0+100.0*ii])
+                mol.set_dipole(0, 1, [1.0, 0.3*ii, 0.1*ii*ii])
+                mols.append(mol)
+
+        agg = Aggregate(molecules=mols)
+        with energy_units("1/cm"):
+            agg.set_resonance_coupling(0, 1, 50.0)
+            agg.set_resonance_coupling(1, 2, 30.0)
+        agg.build(mult=2)
+        agg.diagonalize()
+        agg.get_DensityMatrix(condition_type="thermal", temperature=0.0)
+
+        self.agg = agg
+        self.H = agg.get_Hamiltonian()
+        self.lab = qr.LabSetup()
+        self.lab.set_polarizations(pulse_polarizations=(qr.utils.vectors.X,
+                                                        qr.utils.vectors.Y,
+                                                        qr.utils.vectors.X),
+                                   detection_polarization=qr.utils.vectors.Y)
+        self.ptypes = ("R1g", "R2g", "R3g", "R4g", "R1f*", "R2f*")
+
+        self.t1 = TimeAxis(0.0, 100, 10.0)
+        self.t2 = TimeAxis(0.0, 2, 10.0)
+        self.t3 = TimeAxis(0.0, 100, 10.0)
+
+
+    def _pathways(self, columnar=False):
+
+        eUt = qr.qm.SOpUnity(dim=self.H.dim)
+        pws = self.agg.liouville_pathways_3T(ptype=self.ptypes, eUt=eUt,
+                                             ham=self.H, lab=self.lab,
+                                             columnar=columnar)
+        ww = qr.convert(numpy.array([200.0, 300.0, 200.0, 250.0]),
+                        "1/cm", "int")
+        dd = qr.convert(numpy.array([100.0, 150.0, 100.0, 120.0]),
+                        "1/cm", "int")
+        if columnar:
+            pws.widths[:,:] = ww
+            pws.dephs[:,:] = dd
+        else:
+            for pw in pws:
+                pw.widths = ww.copy()
+                pw.dephs = dd.copy()
+        return pws
+
+
+    def test_signals(self):
+        """(MockTwoDResponseCalculator) Testing accumulation of pathways
+
+        """
+        pws = self._pathways()
+        tab = self._pathways(columnar=True)
+
+        for shape in ["Gaussian", "Lorentzian"]:
+            calc = qr.MockTwoDResponseCalculator(self.t1, self.t2, self.t3)
+            with energy_units("1/cm"):
+                calc.bootstrap(rwa=12100.0, pathways=pws, shape=shape)
+
+            # pathway by pathway
+            N1 = calc.oa1.length
+            N3 = calc.oa3.length
+            ref = {signal_REPH:numpy.zeros((N1, N3), dtype=qr.COMPLEX),
+                   signal_NONR:numpy.zeros((N1, N3), dtype=qr.COMPLEX)}
+            for pw in pws:
+                data = calc.calculate_pathway(pw, shape=shape)
+                if pw.pathway_type == "R":
+                    ref[signal_REPH] += data
+                else:
+                    ref[signal_NONR] += data
+
+            for pathways in [pws, tab]:
+                calc.set_pathways(pathways)
+                twod = calc.calculate_one(0)
+                for dtype in [signal_REPH, signal_NONR]:
+                    twod.set_data_flag(dtype)
+                    numpy.testing.assert_allclose(twod.d__data, ref[dtype],
+                            rtol=1.0e-10,
+                            atol=1.0e-12*numpy.max(numpy.abs(ref[dtype])))
+
+
+    def test_reused_pathways(self):
+        """(MockTwoDResponseCalculator) Testing pathways reused at all t2
+
+        """
+        from quantarhei.qm import Operator
+        from quantarhei.qm import SystemBathInteraction
+        from quantarhei.qm import LindbladForm
+
+        time = TimeAxis(0.0, 5, 50.0)
+        ham = qr.Hamiltonian(data=self.H.data[0:4,0:4])
+        with qr.eigenbasis_of(ham):
+            K1 = Operator(dim=ham.dim, real=True)
+            K1.data[1,2] = 1.0
+            K2 = Operator(dim=ham.dim, real=True)
+            K2.data[2,3] = 1.0
+            sbi = SystemBathInteraction(sys_operators=[K1, K2],
+                                        rates=(1.0/100.0, 1.0/200.0))
+            LF = LindbladForm(ham, sbi, as_operators=False)
+            eUt = qr.qm.EvolutionSuperOperator(time, ham, LF)
+            eUt.set_dense_dt(5)
+            eUt.calculate()
+
+        for shape in ["Gaussian", "Lorentzian"]:
+            calcs = []
+            for reuse in [False, True]:
+                calc = qr.MockTwoDResponseCalculator(self.t1, time, self.t3)
+                with energy_units("1/cm"):
+                    calc.bootstrap(rwa=12100.0, shape=shape)
+                calcs.append(calc.calculate_all_system(self.agg, eUt,
+                                            self.lab, reuse_pathways=reuse))
+
+            for T2 in time.data:
+                ref = calcs[0].get_spectrum(T2)
+                twod = calcs[1].get_spectrum(T2)
+                self.assertEqual(twod.get_t2(), T2)
+                for dtype in [signal_REPH, signal_NONR]:
+                    ref.set_data_flag(dtype)
+                    twod.set_data_flag(dtype)
+                    numpy.testing.assert_allclose(twod.d__data, ref.d__data,
+                            rtol=1.0e-10,
+                            atol=1.0e-12*numpy.max(numpy.abs(ref.d__data)))
+
+
+    def test_secularized_tensor(self):
+        """(MockTwoDResponseCalculator) Testing 2D spectra with secular tensor
+
+        """
+        from quantarhei.qm import Operator
+        from quantarhei.qm import SystemBathInteraction
+        from quantarhei.qm import LindbladForm
+
+        ham = self.H
+        with qr.eigenbasis_of(ham):
+            K1 = Operator(dim=ham.dim, real=True)
+            K1.data[1,2] = 1.0
+            K2 = Operator(dim=ham.dim, real=True)
+            K2.data[5,6] = 1.0
+            sbi = SystemBathInteraction(sys_operators=[K1, K2],
+                                        rates=(1.0/100.0, 1.0/200.0))
+            RT = LindbladForm(ham, sbi, as_operators=False)
+            RT.secularize(legacy=False)
+        self.assertTrue(RT.is_secular)
+
+        t2 = TimeAxis(0.0, 3, 20.0)
+        eUts = []
+        for secular in [False, True]:
+            eUt = qr.qm.EvolutionSuperOperator(t2, ham, RT, secular=secular)
+            eUt.set_dense_dt(10)
+            eUt.calculate()
+            eUts.append(eUt)
+
+        # secular tensor does not switch the representation on its own
+        eUt = qr.qm.EvolutionSuperOperator(t2, ham, RT)
+        self.assertFalse(eUt.secular)
+        N = ham.dim
+        self.assertEqual(eUts[0].data.shape, (t2.length, N, N, N, N))
+        self.assertIsInstance(eUts[1].at(20.0), qr.qm.SuperOperator)
+
+        pws = [self.agg.liouville_pathways_3T(ptype=self.ptypes, eUt=eUt,
+                                              ham=ham, t2=20.0, lab=self.lab)
+               for eUt in eUts]
+        self.assertEqual(len(pws[0]), len(pws[1]))
+        self.assertTrue(len(pws[0]) > 0)
+
+        twods = []
+        for eUt in eUts:
+            calc = qr.MockTwoDResponseCalculator(self.t1, t2, self.t3)
+            with energy_units("1/cm"):
+                calc.bootstrap(rwa=12100.0, shape="Gaussian")
+            twods.append(calc.calculate_all_system(self.agg, eUt, self.lab))
+
+        for T2 in t2.data:
+            ref = twods[0].get_spectrum(T2)
+            twod = twods[1].get_spectrum(T2)
+            for dtype in [signal_REPH, signal_NONR]:
+                ref.set_data_flag(dtype)
+                twod.set_data_flag(dtype)
+                numpy.testing.assert_allclose(twod.d__data, ref.d__data,
+                        rtol=1.0e-5,
+                        atol=1.0e-5*numpy.max(numpy.abs(ref.d__data)))